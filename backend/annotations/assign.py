@@ -0,0 +1,73 @@
+"""
+Bulk material assignment.
+
+Links every given annotation of one kind to every given material with a
+single INSERT ... SELECT over the pairs, whatever their number. Pairs that are
+already linked, including ones another request links at the same moment, are
+skipped by ON CONFLICT DO NOTHING and keep their quantity; RETURNING tells
+which rows this call inserted. When no quantity is given, new links take the
+annotation's area in the same statement. Raw inserts send no signals, so the
+pages' takeoff summaries are refreshed here.
+"""
+from django.db import connection, transaction
+
+from . import bulk, summary
+
+# Annotation column copied into new links' quantity, by kind (None keeps the default)
+QUANTITY_FIELDS = {
+    bulk.ROOM: "area",
+    bulk.WALL: "area",
+    bulk.WINDOW_AND_DOOR: None,
+}
+
+MAX_BULK_LINKS = 20000
+
+
+def _insert_links(kind, annotation_ids, material_ids, quantity, notes):
+    """Insert the missing pairs and return the primary keys of the rows inserted."""
+    link_model, annotation_field = summary.LINKS[kind]
+    annotation_model = bulk.MODELS[kind]
+    meta = link_model._meta
+    annotation_column = meta.get_field(annotation_field).column
+    material_column = meta.get_field("material").column
+    qn = connection.ops.quote_name
+    annotation_type = annotation_model._meta.pk.db_type(connection)
+    material_type = meta.get_field("material").target_field.db_type(connection)
+
+    area_field = QUANTITY_FIELDS[kind]
+    if quantity is None and area_field:
+        quantity_sql = f"COALESCE(a.{qn(annotation_model._meta.get_field(area_field).column)}, 1.0)"
+        quantity_params = []
+    else:
+        quantity_sql = "%s"
+        quantity_params = [1.0 if quantity is None else quantity]
+
+    sql = f"""
+        INSERT INTO {qn(meta.db_table)}
+            ({qn(annotation_column)}, {qn(material_column)}, quantity, notes, created_at, updated_at)
+        SELECT a.{qn(annotation_model._meta.pk.column)}, m.id, {quantity_sql}, %s, now(), now()
+        FROM {qn(annotation_model._meta.db_table)} a
+        CROSS JOIN unnest(%s::{material_type}[]) AS m(id)
+        WHERE a.{qn(annotation_model._meta.pk.column)} = ANY(%s::{annotation_type}[])
+        ON CONFLICT ({qn(annotation_column)}, {qn(material_column)}) DO NOTHING
+        RETURNING {qn(meta.pk.column)}
+    """
+    params = [*quantity_params, notes, [str(pk) for pk in material_ids], [str(pk) for pk in annotation_ids]]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def assign_materials(kind, annotation_ids, material_ids, image_ids, quantity=None, notes=None):
+    """
+    Link each of ``annotation_ids`` (annotations of ``kind`` on the pages
+    ``image_ids``) to each of ``material_ids``, skipping pairs that already
+    exist. New links get ``quantity`` or, without one, the annotation's area
+    where the kind has one. Returns (created, already assigned) pair counts.
+    """
+    with transaction.atomic():
+        inserted = _insert_links(kind, annotation_ids, material_ids, quantity, notes)
+        if inserted:
+            summary.schedule_refresh(image_ids)
+    created = len(inserted)
+    return created, len(annotation_ids) * len(material_ids) - created
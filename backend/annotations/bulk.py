@@ -0,0 +1,163 @@
+import numpy as np
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Annotation, WallAnnotation, WindowAndDoorAnnotation
+from plans.geometry import pack_polygons, areas_sqft, dimensions_ft, wall_dimensions_ft
+
+ROOM = "room"
+WALL = "wall"
+WINDOW_AND_DOOR = "window_and_door"
+
+MODELS = {
+    ROOM: Annotation,
+    WALL: WallAnnotation,
+    WINDOW_AND_DOOR: WindowAndDoorAnnotation,
+}
+KINDS = tuple(MODELS)
+
+# Numeric columns each kind stores besides label, coordinates and annotation_type
+MEASUREMENT_FIELDS = {
+    ROOM: ("area", "width", "height", "confidence_score"),
+    WALL: ("area", "length_ft", "thickness_ft"),
+    WINDOW_AND_DOOR: ("length_ft", "breadth_ft"),
+}
+
+BULK_BATCH_SIZE = 500
+MAX_BULK_ANNOTATIONS = 5000
+
+
+def measure_rows(kind, rows, dpi, scale):
+    """
+    Add the measurements the annotation viewsets compute for single shapes to
+    every row, in one vectorized pass over all of their coordinates.
+    """
+    coords, offsets = pack_polygons([row["coordinates"] for row in rows])
+    if kind == ROOM:
+        widths, heights = dimensions_ft(coords, offsets, dpi, scale)
+        columns = {"area": areas_sqft(coords, offsets, dpi, scale), "width": widths, "height": heights}
+    elif kind == WALL:
+        lengths, thicknesses = wall_dimensions_ft(coords, offsets, dpi, scale)
+        columns = {"area": areas_sqft(coords, offsets, dpi, scale), "length_ft": lengths, "thickness_ft": thicknesses}
+    else:
+        lengths, breadths = dimensions_ft(coords, offsets, dpi, scale)
+        columns = {"length_ft": lengths, "breadth_ft": breadths}
+    columns = {field: values.tolist() for field, values in columns.items()}
+    for i, row in enumerate(rows):
+        row.update({field: values[i] for field, values in columns.items()})
+    return rows
+
+
+def _validate_text(rows, field, max_length, errors):
+    for i, row in enumerate(rows):
+        value = row.get(field)
+        if not isinstance(value, str) or not value.strip():
+            errors.setdefault(i, []).append(f"{field} is required.")
+        elif len(value) > max_length:
+            errors.setdefault(i, []).append(f"{field} must have at most {max_length} characters.")
+
+
+def _validate_coordinates(rows, errors):
+    """Checks every shape's points in one array: a list of finite [x, y] pairs."""
+    coordinates = [row.get("coordinates") for row in rows]
+    counts = np.array([len(c) if isinstance(c, (list, tuple)) else 0 for c in coordinates])
+    present = np.flatnonzero(counts > 0)
+    for i in np.flatnonzero(counts == 0):
+        errors.setdefault(int(i), []).append("coordinates must be a non-empty list of [x, y] points.")
+    if not len(present):
+        return
+
+    try:
+        flat = np.array([point for i in present for point in coordinates[i]], dtype=float)
+        if flat.ndim != 2 or flat.shape[1] != 2:
+            raise ValueError
+    except (ValueError, TypeError):
+        # Something in the batch is not a point; find which shapes one by one
+        for i in present:
+            try:
+                points = np.array(coordinates[i], dtype=float)
+                valid = points.ndim == 2 and points.shape[1] == 2 and np.isfinite(points).all()
+            except (ValueError, TypeError):
+                valid = False
+            if not valid:
+                errors.setdefault(int(i), []).append("coordinates must be a list of [x, y] number pairs.")
+        return
+
+    offsets = np.concatenate(([0], np.cumsum(counts[present])[:-1]))
+    finite = np.logical_and.reduceat(np.isfinite(flat).all(axis=1), offsets)
+    for i in present[~finite]:
+        errors.setdefault(int(i), []).append("coordinates must be a list of [x, y] number pairs.")
+
+
+def _validate_numbers(rows, field, errors):
+    """Optional float column; returns the parsed values (None where missing)."""
+    values = [row.get(field) for row in rows]
+    missing = np.array([v is None for v in values], dtype=bool)
+    try:
+        parsed = np.array([np.nan if v is None else v for v in values], dtype=float)
+        if parsed.ndim != 1:
+            raise ValueError
+    except (ValueError, TypeError):
+        parsed = np.zeros(len(values))
+        for i, value in enumerate(values):
+            try:
+                parsed[i] = np.nan if value is None else float(value)
+            except (ValueError, TypeError):
+                parsed[i] = np.nan
+                missing[i] = False
+    for i in np.flatnonzero(~missing & ~np.isfinite(parsed)):
+        errors.setdefault(int(i), []).append(f"{field} must be a finite number.")
+    return [None if m else float(v) for m, v in zip(missing, parsed)]
+
+
+def validate_rows(kind, rows):
+    """
+    Validate a batch of shapes for ``kind`` column by column and return them
+    cleaned to the model's fields. Raises ValidationError with the errors of
+    every bad row, keyed by its index, so a batch is written whole or not at all.
+    """
+    if kind not in MODELS:
+        raise ValidationError({"kind": [f"Must be one of: {', '.join(KINDS)}."]})
+    if not all(isinstance(row, dict) for row in rows):
+        raise ValidationError({"annotations": ["Each annotation must be an object."]})
+    model = MODELS[kind]
+    errors = {}
+    for field in ("label", "annotation_type"):
+        _validate_text(rows, field, model._meta.get_field(field).max_length, errors)
+    _validate_coordinates(rows, errors)
+    numbers = {field: _validate_numbers(rows, field, errors) for field in MEASUREMENT_FIELDS[kind]}
+    if errors:
+        raise ValidationError({"annotations": {i: errors[i] for i in sorted(errors)}})
+
+    return [
+        {
+            "label": row["label"],
+            "coordinates": row["coordinates"],
+            "annotation_type": row["annotation_type"],
+            **{field: numbers[field][i] for field in MEASUREMENT_FIELDS[kind]},
+        }
+        for i, row in enumerate(rows)
+    ]
+
+
+def insert_annotations(kind, blueprint_image, cleaned, batch_size=BULK_BATCH_SIZE):
+    """Insert rows returned by validate_rows with bulk_create in one transaction."""
+    model = MODELS[kind]
+    instances = [model(blueprint=blueprint_image, **row) for row in cleaned]
+    for instance in instances:
+        instance.sync_packed_coordinates()
+    with transaction.atomic():
+        model.objects.bulk_create(instances, batch_size=batch_size)
+    # bulk_create sends no post_save, so the page's takeoff summary is refreshed here
+    from .summary import schedule_refresh
+    schedule_refresh([blueprint_image.pk])
+    return instances
+
+
+def bulk_create_annotations(kind, blueprint_image, rows, batch_size=BULK_BATCH_SIZE):
+    """
+    Validate ``rows`` and insert them for ``blueprint_image``. This is the write
+    path for the annotation tasks and the bulk endpoint. Returns the created
+    instances.
+    """
+    return insert_annotations(kind, blueprint_image, validate_rows(kind, rows), batch_size)
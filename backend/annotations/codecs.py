@@ -0,0 +1,116 @@
+"""
+Compact encodings for annotation coordinates.
+
+``packed``: the points as little-endian float32 x, y pairs (8 bytes a point),
+base64 encoded. Decode with e.g. ``new Float32Array(bytes.buffer)`` in a browser.
+
+``delta``: the points quantized to 1/DELTA_PRECISION pixel; the first point is
+absolute and every other one the difference to the previous point. The
+integers are zigzag mapped and written as LEB128 varints, then base64
+encoded. Rectilinear shapes (walls, doors) come out at a few bytes a point.
+
+Both are returned as ``{"format", "count", "data"}`` objects in place of the
+JSON list of [x, y] pairs, when a client asks for them with ``?coords=``.
+"""
+import base64
+import numpy as np
+
+JSON = "json"
+PACKED = "packed"
+DELTA = "delta"
+COORDINATE_FORMATS = (JSON, PACKED, DELTA)
+
+POINT_DTYPE = np.dtype("<f4")
+DELTA_PRECISION = 100
+
+
+def as_points(coordinates):
+    """(N, 2) float array, or ValueError when the value is not a list of [x, y] pairs."""
+    points = np.asarray(coordinates, dtype=float)
+    if points.size == 0:
+        return points.reshape(0, 2)
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise ValueError("Coordinates must be a list of [x, y] pairs")
+    return points
+
+
+def pack_points(coordinates):
+    """Raw float32 point buffer, as stored in ``coordinates_packed``."""
+    return as_points(coordinates).astype(POINT_DTYPE).tobytes()
+
+
+def unpack_points(data):
+    return np.frombuffer(bytes(data), dtype=POINT_DTYPE).reshape(-1, 2)
+
+
+def _zigzag(values):
+    return (values << 1) ^ (values >> 63)
+
+
+def _unzigzag(values):
+    return (values >> 1) ^ -(values & 1)
+
+
+def _varints(values):
+    """LEB128 encode non-negative int64s (as uint64), seven bits at a time."""
+    values = values.astype(np.uint64)
+    out = bytearray()
+    for value in values.tolist():
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def _read_varints(data):
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return np.array(values, dtype=np.uint64).astype(np.int64)
+
+
+def delta_encode(coordinates):
+    points = np.round(as_points(coordinates) * DELTA_PRECISION).astype(np.int64)
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    return _varints(_zigzag(deltas.reshape(-1)))
+
+
+def delta_decode(data):
+    deltas = _unzigzag(_read_varints(data)).reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / DELTA_PRECISION
+
+
+def encode_coordinates(coordinates, fmt, packed=None):
+    """
+    Coordinates in the requested response format. ``packed`` is the stored
+    float32 buffer when the caller has it, which avoids re-reading the JSON.
+    Values that are not point lists are returned unchanged.
+    """
+    if fmt == JSON:
+        return coordinates
+    try:
+        if fmt == PACKED:
+            data = bytes(packed) if packed is not None else pack_points(coordinates)
+            count = len(data) // (2 * POINT_DTYPE.itemsize)
+        else:
+            data = delta_encode(coordinates)
+            count = len(as_points(coordinates))
+    except (ValueError, TypeError):
+        return coordinates
+    return {"format": fmt, "count": count, "data": base64.b64encode(data).decode("ascii")}
+
+
+def decode_coordinates(value):
+    """The inverse of encode_coordinates, as a list of [x, y] pairs."""
+    if not isinstance(value, dict):
+        return value
+    data = base64.b64decode(value["data"])
+    points = unpack_points(data) if value["format"] == PACKED else delta_decode(data)
+    return points.astype(float).tolist()
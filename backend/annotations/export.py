@@ -0,0 +1,128 @@
+"""
+Streaming takeoff export.
+
+A project's takeoff is one row per annotation and material, with one row
+(empty material columns) for each annotation without materials. Each
+annotation kind is read with a single LEFT JOIN query through a server-side
+cursor, so rows are written as they arrive and memory use stays flat however
+large the project is.
+
+CSV is streamed to the client directly. XLSX needs the whole file before it
+can be sent (the zip directory comes last), so openpyxl writes it in
+write-only mode to a temporary file, which is then streamed.
+"""
+import csv
+import tempfile
+
+from django.db.models import F, FloatField, Value
+
+from estimators.models import CSI_COLUMNS
+from . import bulk
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # pandas' optional Excel engine; CSV works without it
+    Workbook = None
+
+CSV = "csv"
+XLSX = "xlsx"
+EXPORT_FORMATS = (CSV, XLSX)
+CONTENT_TYPES = {
+    CSV: "text/csv",
+    XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+EXPORT_COLUMNS = [
+    "Blueprint", "Page", "Type", "Label", "Area (sqft)", "Length (ft)",
+    *CSI_COLUMNS,
+    "Spec Section", "Unit Price", "Currency", "Total",
+]
+
+# kind: (material link relation, area column, length column)
+EXPORT_FIELDS = {
+    bulk.ROOM: ("annotation_materials", "area", None),
+    bulk.WALL: ("wall_annotation_materials", "area", "length_ft"),
+    bulk.WINDOW_AND_DOOR: ("window_and_door_annotation_materials", None, "length_ft"),
+}
+
+CURSOR_CHUNK_SIZE = 2000
+# Rows joined into one chunk of the streamed CSV response
+CSV_ROWS_PER_CHUNK = 500
+
+
+def _column(field):
+    return F(field) if field else Value(None, output_field=FloatField())
+
+
+def _kind_rows(kind, project_id):
+    links, area, length = EXPORT_FIELDS[kind]
+    material = f"{links}__material"
+    queryset = (
+        bulk.MODELS[kind].objects.filter(blueprint__blueprint__project_id=project_id)
+        .order_by("blueprint__blueprint__title", "blueprint__created_at", "label", "created_at")
+        .values_list(
+            "blueprint__blueprint__title",
+            "blueprint__title",
+            "label",
+            _column(area),
+            _column(length),
+            f"{material}__subcategory__category__division",
+            f"{material}__material_name",
+            f"{material}__unit",
+            f"{links}__quantity",
+            f"{links}__notes",
+            f"{material}__spec_section",
+            f"{material}__price",
+            f"{material}__currency",
+        )
+    )
+    for blueprint, page, label, *values in queryset.iterator(chunk_size=CURSOR_CHUNK_SIZE):
+        quantity, price = values[5], values[8]
+        total = quantity * price if quantity is not None and price is not None else None
+        yield [blueprint, page, kind, label, *values, total]
+
+
+def export_rows(project_id):
+    """Every takeoff row of the project, in EXPORT_COLUMNS order, one kind after another."""
+    for kind in bulk.KINDS:
+        yield from _kind_rows(kind, project_id)
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(project_id):
+    """The export as CSV text chunks, for a StreamingHttpResponse."""
+    writer = csv.writer(_Echo())
+    chunk = [writer.writerow(EXPORT_COLUMNS)]
+    for row in export_rows(project_id):
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= CSV_ROWS_PER_CHUNK:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def write_xlsx(project_id, file):
+    """Write the export as an XLSX workbook to ``file`` (a path or binary file object)."""
+    if Workbook is None:
+        raise RuntimeError("XLSX export needs openpyxl (pip install openpyxl)")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Takeoff")
+    sheet.append(EXPORT_COLUMNS)
+    for row in export_rows(project_id):
+        sheet.append(row)
+    workbook.save(file)
+
+
+def xlsx_file(project_id):
+    """The export as an XLSX workbook in a temporary file, rewound for reading."""
+    file = tempfile.TemporaryFile(suffix=".xlsx")
+    write_xlsx(project_id, file)
+    file.seek(0)
+    return file
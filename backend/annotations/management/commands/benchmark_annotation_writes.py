@@ -0,0 +1,79 @@
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from annotations import bulk
+from annotations.serializers import (
+    AnnotationSerializer, WallAnnotationSerializer, WindowAndDoorAnnotationSerializer,
+)
+from plans.models import BlueprintImage
+
+SERIALIZERS = {
+    bulk.ROOM: AnnotationSerializer,
+    bulk.WALL: WallAnnotationSerializer,
+    bulk.WINDOW_AND_DOOR: WindowAndDoorAnnotationSerializer,
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def sample_rows(kind, count):
+    rows = []
+    for i in range(count):
+        x, y = random.uniform(0, 9000), random.uniform(0, 6000)
+        w, h = random.uniform(50, 800), random.uniform(50, 800)
+        row = {
+            "label": f"{kind} {i}",
+            "coordinates": [[x, y], [x + w, y], [x + w, y + h], [x, y + h]],
+            "annotation_type": "polygon" if kind == bulk.ROOM else "rectangle",
+        }
+        row.update({field: random.uniform(1, 500) for field in bulk.MEASUREMENT_FIELDS[kind]})
+        rows.append(row)
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rows/second of per-shape serializer saves with the bulk annotation "
+        "write path. Rows are written to an existing blueprint image inside a "
+        "transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument("--kinds", nargs="+", choices=bulk.KINDS, default=list(bulk.KINDS))
+        parser.add_argument("--image", help="Blueprint image id (defaults to the most recent one)")
+
+    def handle(self, *args, **options):
+        images = BlueprintImage.objects.all()
+        image = images.filter(pk=options["image"]).first() if options["image"] else images.first()
+        if image is None:
+            raise CommandError("Needs an existing blueprint image to write to")
+
+        for kind in options["kinds"]:
+            rows = sample_rows(kind, options["rows"])
+            timings = {}
+            try:
+                with transaction.atomic():
+                    started = time.perf_counter()
+                    for row in rows:
+                        serializer = SERIALIZERS[kind](data={**row, "blueprint": image.id})
+                        serializer.is_valid(raise_exception=True)
+                        serializer.save()
+                    timings["serializer"] = time.perf_counter() - started
+
+                    started = time.perf_counter()
+                    bulk.bulk_create_annotations(kind, image, rows)
+                    timings["bulk"] = time.perf_counter() - started
+                    raise Rollback
+            except Rollback:
+                pass
+
+            self.stdout.write(
+                f"{kind:>16}: serializer {len(rows) / timings['serializer']:10.0f} rows/s, "
+                f"bulk {len(rows) / timings['bulk']:10.0f} rows/s "
+                f"({timings['serializer'] / timings['bulk']:.1f}x)"
+            )
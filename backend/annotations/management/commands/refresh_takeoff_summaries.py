@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from annotations.summary import refresh_image_summaries
+from plans.models import BlueprintImage
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized takeoff summaries from the annotations and their materials."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--image", nargs="+", default=[], help="Blueprint image ids")
+        parser.add_argument("--project", help="Every page of this project")
+        parser.add_argument("--all", action="store_true", help="Every page")
+        parser.add_argument("--batch-size", type=int, default=100, help="Pages refreshed per transaction")
+
+    def handle(self, *args, **options):
+        image_ids = list(options["image"])
+        if options["all"]:
+            image_ids = list(BlueprintImage.objects.values_list("pk", flat=True))
+        elif options["project"]:
+            image_ids += BlueprintImage.objects.filter(
+                blueprint__project_id=options["project"]
+            ).values_list("pk", flat=True)
+        if not image_ids:
+            raise CommandError("Give --image, --project or --all")
+
+        started = time.perf_counter()
+        rows = 0
+        batch_size = options["batch_size"]
+        for start in range(0, len(image_ids), batch_size):
+            rows += refresh_image_summaries(image_ids[start:start + batch_size])
+        self.stdout.write(
+            f"{len(image_ids)} page(s), {rows} summary rows in {time.perf_counter() - started:.3f}s"
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from annotations.remeasure import remeasure_blueprint_images
+from plans.models import BlueprintImage
+
+
+class Command(BaseCommand):
+    help = "Recompute stored annotation measurements and area-based material quantities from each page's DPI and scale."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--image", nargs="+", default=[], help="Blueprint image ids")
+        parser.add_argument("--project", help="Every page of this project")
+
+    def handle(self, *args, **options):
+        image_ids = list(options["image"])
+        if options["project"]:
+            image_ids += BlueprintImage.objects.filter(
+                blueprint__project_id=options["project"]
+            ).values_list("pk", flat=True)
+        if not image_ids:
+            raise CommandError("Give --image or --project")
+
+        report = remeasure_blueprint_images(image_ids)
+        self.stdout.write(f"{report['images']} page(s) in {report['seconds']:.3f}s")
+        for kind in ("room", "wall", "window_and_door"):
+            counts = report[kind]
+            self.stdout.write(
+                f"{kind:>16}: {counts['updated']}/{counts['checked']} annotations updated, "
+                f"{counts['materials']} material quantities"
+            )
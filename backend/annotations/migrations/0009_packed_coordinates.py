@@ -0,0 +1,63 @@
+# Generated by Django 5.2.2 on 2026-10-17 16:24
+
+from django.db import migrations, models
+
+from annotations.codecs import pack_points
+
+
+def backfill_packed_coordinates(apps, schema_editor):
+    for model_name in ("Annotation", "WallAnnotation", "WindowAndDoorAnnotation"):
+        model = apps.get_model("annotations", model_name)
+        batch = []
+        for annotation in model.objects.only("id", "coordinates").iterator(chunk_size=2000):
+            try:
+                annotation.coordinates_packed = pack_points(annotation.coordinates)
+            except (ValueError, TypeError):
+                continue
+            annotation.point_count = len(annotation.coordinates_packed) // 8
+            batch.append(annotation)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ["coordinates_packed", "point_count"])
+                batch = []
+        model.objects.bulk_update(batch, ["coordinates_packed", "point_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('annotations', '0008_annotationmaterial_notes_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='annotation',
+            name='coordinates_packed',
+            field=models.BinaryField(blank=True, help_text='Coordinates as little-endian float32 x, y pairs', null=True),
+        ),
+        migrations.AddField(
+            model_name='annotation',
+            name='point_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='wallannotation',
+            name='coordinates_packed',
+            field=models.BinaryField(blank=True, help_text='Coordinates as little-endian float32 x, y pairs', null=True),
+        ),
+        migrations.AddField(
+            model_name='wallannotation',
+            name='point_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='windowanddoorannotation',
+            name='coordinates_packed',
+            field=models.BinaryField(blank=True, help_text='Coordinates as little-endian float32 x, y pairs', null=True),
+        ),
+        migrations.AddField(
+            model_name='windowanddoorannotation',
+            name='point_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_packed_coordinates, migrations.RunPython.noop),
+    ]
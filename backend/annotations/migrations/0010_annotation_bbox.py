@@ -0,0 +1,106 @@
+# Generated by Django 5.2.2 on 2026-10-17 16:40
+
+from django.db import migrations, models
+
+from annotations.spatial import BBOX_FIELDS, bounding_box
+
+
+def backfill_bounding_boxes(apps, schema_editor):
+    for model_name in ("Annotation", "WallAnnotation", "WindowAndDoorAnnotation"):
+        model = apps.get_model("annotations", model_name)
+        batch = []
+        for annotation in model.objects.only("id", "coordinates").iterator(chunk_size=2000):
+            try:
+                bbox = bounding_box(annotation.coordinates)
+            except (ValueError, TypeError):
+                continue
+            for field, value in zip(BBOX_FIELDS, bbox):
+                setattr(annotation, field, value)
+            batch.append(annotation)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, BBOX_FIELDS)
+                batch = []
+        model.objects.bulk_update(batch, BBOX_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('annotations', '0009_packed_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='annotation',
+            name='bbox_min_x',
+            field=models.FloatField(blank=True, editable=False, help_text="Left edge of the coordinates' bounding box in page pixels", null=True),
+        ),
+        migrations.AddField(
+            model_name='annotation',
+            name='bbox_min_y',
+            field=models.FloatField(blank=True, editable=False, help_text="Top edge of the coordinates' bounding box in page pixels", null=True),
+        ),
+        migrations.AddField(
+            model_name='annotation',
+            name='bbox_max_x',
+            field=models.FloatField(blank=True, editable=False, help_text="Right edge of the coordinates' bounding box in page pixels", null=True),
+        ),
+        migrations.AddField(
+            model_name='annotation',
+            name='bbox_max_y',
+            field=models.FloatField(blank=True, editable=False, help_text="Bottom edge of the coordinates' bounding box in page pixels", null=True),
+        ),
+        migrations.AddField(
+            model_name='wallannotation',
+            name='bbox_min_x',
+            field=models.FloatField(blank=True, editable=False, help_text="Left edge of the coordinates' bounding box in page pixels", null=True),
+        ),
+        migrations.AddField(
+            model_name='wallannotation',
+            name='bbox_min_y',
+            field=models.FloatField(blank=True, editable=False, help_text="Top edge of the coordinates' bounding box in page pixels", null=True),
+        ),
+        migrations.AddField(
+            model_name='wallannotation',
+            name='bbox_max_x',
+            field=models.FloatField(blank=True, editable=False, help_text="Right edge of the coordinates' bounding box in page pixels", null=True),
+        ),
+        migrations.AddField(
+            model_name='wallannotation',
+            name='bbox_max_y',
+            field=models.FloatField(blank=True, editable=False, help_text="Bottom edge of the coordinates' bounding box in page pixels", null=True),
+        ),
+        migrations.AddField(
+            model_name='windowanddoorannotation',
+            name='bbox_min_x',
+            field=models.FloatField(blank=True, editable=False, help_text="Left edge of the coordinates' bounding box in page pixels", null=True),
+        ),
+        migrations.AddField(
+            model_name='windowanddoorannotation',
+            name='bbox_min_y',
+            field=models.FloatField(blank=True, editable=False, help_text="Top edge of the coordinates' bounding box in page pixels", null=True),
+        ),
+        migrations.AddField(
+            model_name='windowanddoorannotation',
+            name='bbox_max_x',
+            field=models.FloatField(blank=True, editable=False, help_text="Right edge of the coordinates' bounding box in page pixels", null=True),
+        ),
+        migrations.AddField(
+            model_name='windowanddoorannotation',
+            name='bbox_max_y',
+            field=models.FloatField(blank=True, editable=False, help_text="Bottom edge of the coordinates' bounding box in page pixels", null=True),
+        ),
+        migrations.AddIndex(
+            model_name='annotation',
+            index=models.Index(fields=['blueprint', 'bbox_min_x', 'bbox_min_y', 'bbox_max_x', 'bbox_max_y'], name='room_annotation_bbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wallannotation',
+            index=models.Index(fields=['blueprint', 'bbox_min_x', 'bbox_min_y', 'bbox_max_x', 'bbox_max_y'], name='wall_annotation_bbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='windowanddoorannotation',
+            index=models.Index(fields=['blueprint', 'bbox_min_x', 'bbox_min_y', 'bbox_max_x', 'bbox_max_y'], name='window_door_bbox_idx'),
+        ),
+        migrations.RunPython(backfill_bounding_boxes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.2 on 2026-10-17 17:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('annotations', '0010_annotation_bbox'),
+        ('materials', '0001_initial'),
+        ('plans', '0003_page_artifact'),
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TakeoffSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(help_text='room, wall or window_and_door', max_length=20)),
+                ('label', models.CharField(max_length=255)),
+                ('annotation_count', models.PositiveIntegerField(default=0)),
+                ('quantity', models.FloatField(default=0.0, help_text='Sum of the material quantities')),
+                ('area', models.FloatField(default=0.0, help_text='Sum of the annotation areas')),
+                ('length_ft', models.FloatField(default=0.0, help_text='Sum of the wall lengths')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('blueprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='takeoff_summaries', to='plans.blueprint')),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='takeoff_summaries', to='plans.blueprintimage')),
+                ('material', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='takeoff_summaries', to='materials.material')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='takeoff_summaries', to='projects.project')),
+            ],
+            options={
+                'verbose_name': 'Takeoff Summary',
+                'verbose_name_plural': 'Takeoff Summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.2 on 2026-10-17 19:20
+
+import annotations.spatial
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('annotations', '0011_takeoffsummary'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='annotation',
+            name='room_annotation_bbox_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='wallannotation',
+            name='wall_annotation_bbox_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='windowanddoorannotation',
+            name='window_door_bbox_idx',
+        ),
+        migrations.AddIndex(
+            model_name='annotation',
+            index=django.contrib.postgres.indexes.GistIndex(annotations.spatial.Box('bbox_min_x', 'bbox_min_y', 'bbox_max_x', 'bbox_max_y'), name='room_annotation_bbox_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='wallannotation',
+            index=django.contrib.postgres.indexes.GistIndex(annotations.spatial.Box('bbox_min_x', 'bbox_min_y', 'bbox_max_x', 'bbox_max_y'), name='wall_annotation_bbox_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='windowanddoorannotation',
+            index=django.contrib.postgres.indexes.GistIndex(annotations.spatial.Box('bbox_min_x', 'bbox_min_y', 'bbox_max_x', 'bbox_max_y'), name='window_door_bbox_gist'),
+        ),
+    ]
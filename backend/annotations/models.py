@@ -1,10 +1,74 @@
+from django.contrib.postgres.indexes import GistIndex
 from django.db import models
-from plans.models import BlueprintImage
+from plans.models import Blueprint, BlueprintImage
+from projects.models import Project
 import uuid
 from materials.models import Material
+from .codecs import pack_points
+from .spatial import BBOX_FIELDS, Box, bounding_box
 
 
-class Annotation(models.Model):
+def bbox_field(name):
+    return models.FloatField(
+        null=True, blank=True, editable=False,
+        help_text=f"{name} of the coordinates' bounding box in page pixels",
+    )
+
+
+def bbox_index(name):
+    # GiST (R-tree) over the bounding box, for the && test in spatial.intersecting
+    return GistIndex(Box(*BBOX_FIELDS), name=name)
+
+
+class PackedCoordinatesMixin:
+    """
+    Keeps ``coordinates_packed`` (float32 point buffer), ``point_count`` and
+    the bounding box columns in step with the ``coordinates`` JSON on every
+    save. bulk_create skips save(), so bulk writers call
+    sync_packed_coordinates themselves.
+    """
+
+    DERIVED_FIELDS = ("coordinates_packed", "point_count", *BBOX_FIELDS)
+
+    def sync_packed_coordinates(self):
+        try:
+            self.coordinates_packed = pack_points(self.coordinates)
+            self.point_count = len(self.coordinates_packed) // 8
+        except (ValueError, TypeError):
+            self.coordinates_packed = None
+            self.point_count = 0
+        bbox = bounding_box(self.coordinates) if self.point_count else (None,) * 4
+        for field, value in zip(BBOX_FIELDS, bbox):
+            setattr(self, field, value)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            self.sync_packed_coordinates()
+        elif "coordinates" in update_fields:
+            self.sync_packed_coordinates()
+            kwargs["update_fields"] = {*update_fields, *self.DERIVED_FIELDS}
+        super().save(*args, **kwargs)
+
+
+class MaterialLinkMixin:
+    """
+    Refreshes the page's takeoff summary when a material link is deleted on
+    its own. A post_delete receiver would do the same but stops Django from
+    fast-deleting links when their annotation, page or project is deleted.
+    """
+
+    def delete(self, *args, **kwargs):
+        from .summary import link_image_id, schedule_refresh
+
+        image_id = link_image_id(self)
+        result = super().delete(*args, **kwargs)
+        if image_id is not None:
+            schedule_refresh([image_id])
+        return result
+
+
+class Annotation(PackedCoordinatesMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     blueprint = models.ForeignKey(
         BlueprintImage, on_delete=models.CASCADE, related_name="annotations"
@@ -13,6 +77,15 @@ class Annotation(models.Model):
     coordinates = models.JSONField(
         verbose_name="Coordinates", help_text="Polygon or point data for the annotation"
     )
+    coordinates_packed = models.BinaryField(
+        null=True, blank=True, editable=False,
+        help_text="Coordinates as little-endian float32 x, y pairs",
+    )
+    point_count = models.PositiveIntegerField(default=0, editable=False)
+    bbox_min_x = bbox_field("Left edge")
+    bbox_min_y = bbox_field("Top edge")
+    bbox_max_x = bbox_field("Right edge")
+    bbox_max_y = bbox_field("Bottom edge")
     area = models.FloatField(
         verbose_name="Area Size",
         help_text="Size of the area in square units",
@@ -59,9 +132,10 @@ class Annotation(models.Model):
         verbose_name = "Annotation"
         verbose_name_plural = "Annotations"
         ordering = ["-created_at"]
+        indexes = [bbox_index("room_annotation_bbox_gist")]
 
 
-class WallAnnotation(models.Model):
+class WallAnnotation(PackedCoordinatesMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     blueprint = models.ForeignKey(
         BlueprintImage, on_delete=models.CASCADE, related_name="wall_annotations"
@@ -70,6 +144,15 @@ class WallAnnotation(models.Model):
     coordinates = models.JSONField(
         verbose_name="Coordinates", help_text="Rectangle point for the annotation"
     )
+    coordinates_packed = models.BinaryField(
+        null=True, blank=True, editable=False,
+        help_text="Coordinates as little-endian float32 x, y pairs",
+    )
+    point_count = models.PositiveIntegerField(default=0, editable=False)
+    bbox_min_x = bbox_field("Left edge")
+    bbox_min_y = bbox_field("Top edge")
+    bbox_max_x = bbox_field("Right edge")
+    bbox_max_y = bbox_field("Bottom edge")
     annotation_type = models.CharField(
         max_length=50,
         verbose_name="Annotation Type",
@@ -109,9 +192,10 @@ class WallAnnotation(models.Model):
         verbose_name = "Wall Annotation"
         verbose_name_plural = "Wall Annotations"
         ordering = ["-created_at"]
+        indexes = [bbox_index("wall_annotation_bbox_gist")]
 
 
-class WindowAndDoorAnnotation(models.Model):
+class WindowAndDoorAnnotation(PackedCoordinatesMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     blueprint = models.ForeignKey(
         BlueprintImage,
@@ -124,6 +208,15 @@ class WindowAndDoorAnnotation(models.Model):
     coordinates = models.JSONField(
         verbose_name="Coordinates", help_text="Polygon or point data for the annotation"
     )
+    coordinates_packed = models.BinaryField(
+        null=True, blank=True, editable=False,
+        help_text="Coordinates as little-endian float32 x, y pairs",
+    )
+    point_count = models.PositiveIntegerField(default=0, editable=False)
+    bbox_min_x = bbox_field("Left edge")
+    bbox_min_y = bbox_field("Top edge")
+    bbox_max_x = bbox_field("Right edge")
+    bbox_max_y = bbox_field("Bottom edge")
     annotation_type = models.CharField(
         max_length=50,
         verbose_name="Annotation Type",
@@ -158,12 +251,13 @@ class WindowAndDoorAnnotation(models.Model):
         verbose_name = "Window & Door Annotation"
         verbose_name_plural = "Windows & Doors Annotations"
         ordering = ["-created_at"]
+        indexes = [bbox_index("window_door_bbox_gist")]
 
 
 # ---------- Add Notes Field to All Material Relations ----------
 
 
-class AnnotationMaterial(models.Model):
+class AnnotationMaterial(MaterialLinkMixin, models.Model):
     annotation = models.ForeignKey(
         Annotation, on_delete=models.CASCADE, related_name="annotation_materials"
     )
@@ -182,7 +276,7 @@ class AnnotationMaterial(models.Model):
         unique_together = ("annotation", "material")
 
 
-class WallAnnotationMaterial(models.Model):
+class WallAnnotationMaterial(MaterialLinkMixin, models.Model):
     wall_annotation = models.ForeignKey(
         WallAnnotation,
         on_delete=models.CASCADE,
@@ -203,7 +297,7 @@ class WallAnnotationMaterial(models.Model):
         unique_together = ("wall_annotation", "material")
 
 
-class WindowAndDoorAnnotationMaterial(models.Model):
+class WindowAndDoorAnnotationMaterial(MaterialLinkMixin, models.Model):
     window_and_door_annotation = models.ForeignKey(
         WindowAndDoorAnnotation,
         on_delete=models.CASCADE,
@@ -220,3 +314,43 @@ class WindowAndDoorAnnotationMaterial(models.Model):
 
     class Meta:
         unique_together = ("window_and_door_annotation", "material")
+
+
+class TakeoffSummary(models.Model):
+    """
+    Materialized takeoff totals of one page, maintained by annotations.summary.
+    There is a row per annotation kind, label and material, and a row without
+    a material per kind and label that totals every annotation of that label.
+    Blueprint and project are copied onto the row so that a blueprint or
+    project rollup is one indexed read.
+    """
+    image = models.ForeignKey(
+        BlueprintImage, on_delete=models.CASCADE, related_name="takeoff_summaries"
+    )
+    blueprint = models.ForeignKey(
+        Blueprint, on_delete=models.CASCADE, related_name="takeoff_summaries"
+    )
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="takeoff_summaries"
+    )
+    kind = models.CharField(max_length=20, help_text="room, wall or window_and_door")
+    label = models.CharField(max_length=255)
+    material = models.ForeignKey(
+        Material,
+        on_delete=models.CASCADE,
+        related_name="takeoff_summaries",
+        blank=True,
+        null=True,
+    )
+    annotation_count = models.PositiveIntegerField(default=0)
+    quantity = models.FloatField(default=0.0, help_text="Sum of the material quantities")
+    area = models.FloatField(default=0.0, help_text="Sum of the annotation areas")
+    length_ft = models.FloatField(default=0.0, help_text="Sum of the wall lengths")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.label} on {self.image_id}"
+
+    class Meta:
+        verbose_name = "Takeoff Summary"
+        verbose_name_plural = "Takeoff Summaries"
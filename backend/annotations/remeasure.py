@@ -0,0 +1,97 @@
+import time
+from django.db import transaction
+
+from plans.models import BlueprintImage
+from . import bulk
+from .models import AnnotationMaterial, WallAnnotationMaterial
+from .summary import schedule_refresh
+
+# Material links whose quantity follows the annotation's area (the link views
+# copy the area into the quantity when a material is added or synced)
+AREA_LINKS = {
+    bulk.ROOM: (AnnotationMaterial, "annotation_id"),
+    bulk.WALL: (WallAnnotationMaterial, "wall_annotation_id"),
+}
+
+# Computed columns; confidence_score is not a measurement
+REMEASURED_FIELDS = {
+    bulk.ROOM: ("area", "width", "height"),
+    bulk.WALL: ("area", "length_ft", "thickness_ft"),
+    bulk.WINDOW_AND_DOOR: ("length_ft", "breadth_ft"),
+}
+
+
+def _measurable(coordinates):
+    return (
+        isinstance(coordinates, list) and coordinates
+        and all(isinstance(p, (list, tuple)) and len(p) == 2 for p in coordinates)
+    )
+
+
+def remeasure_kind(kind, pages):
+    """
+    Recompute the stored measurements of every ``kind`` annotation on
+    ``pages`` ({image id: (dpi, scale)}) in one vectorized pass, and write only
+    the rows whose values changed. Material quantities that still equal the old
+    area are moved to the new area; quantities entered by hand are left alone.
+    """
+    model = bulk.MODELS[kind]
+    fields = REMEASURED_FIELDS[kind]
+    rows = [
+        row for row in model.objects.filter(blueprint_id__in=pages).values("id", "blueprint_id", "coordinates", *fields)
+        if _measurable(row["coordinates"])
+    ]
+    report = {"checked": len(rows), "updated": 0, "materials": 0}
+    if not rows:
+        return report
+
+    dpis = [pages[row["blueprint_id"]][0] for row in rows]
+    scales = [pages[row["blueprint_id"]][1] for row in rows]
+    measured = bulk.measure_rows(kind, [{"coordinates": row["coordinates"]} for row in rows], dpis, scales)
+
+    changed = []
+    old_areas = {}
+    for row, new in zip(rows, measured):
+        if all(row[field] == new[field] for field in fields):
+            continue
+        changed.append(model(id=row["id"], **{field: new[field] for field in fields}))
+        if "area" in fields and row["area"] != new["area"]:
+            old_areas[row["id"]] = (row["area"], new["area"])
+
+    model.objects.bulk_update(changed, fields, batch_size=bulk.BULK_BATCH_SIZE)
+    report["updated"] = len(changed)
+
+    if kind in AREA_LINKS and old_areas:
+        link_model, annotation_field = AREA_LINKS[kind]
+        links = [
+            link_model(id=link_id, quantity=old_areas[annotation_id][1])
+            for link_id, annotation_id, quantity in link_model.objects.filter(
+                **{f"{annotation_field}__in": old_areas}
+            ).values_list("id", annotation_field, "quantity")
+            if old_areas[annotation_id][0] is not None and quantity == old_areas[annotation_id][0]
+        ]
+        link_model.objects.bulk_update(links, ["quantity"], batch_size=bulk.BULK_BATCH_SIZE)
+        report["materials"] = len(links)
+    return report
+
+
+def remeasure_blueprint_images(image_ids):
+    """
+    Bring every annotation on the given pages (one page or a whole project) in
+    line with the pages' current DPI and scale. Pages without a DPI or a scale
+    cannot be measured and are skipped. Returns counts per kind and the time taken.
+    """
+    started = time.perf_counter()
+    pages = {
+        pk: (dpi, scale)
+        for pk, dpi, scale in BlueprintImage.objects.filter(pk__in=image_ids).values_list("pk", "dpi", "scale")
+        if dpi and scale
+    }
+    report = {"images": len(pages)}
+    with transaction.atomic():
+        for kind in bulk.KINDS:
+            report[kind] = remeasure_kind(kind, pages) if pages else {"checked": 0, "updated": 0, "materials": 0}
+    schedule_refresh(pages)
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    print(f"[INFO] Re-measured annotations: {report}")
+    return report
@@ -1,5 +1,8 @@
+import math
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from .models import (
+    PackedCoordinatesMixin,
     Annotation,
     WallAnnotation,
     WindowAndDoorAnnotation,
@@ -8,9 +11,92 @@ from .models import (
     WindowAndDoorAnnotationMaterial,
 )
 from materials.serializers import MaterialSerializer
-
-
-class AnnotationMaterialSerializer(serializers.ModelSerializer):
+from .codecs import COORDINATE_FORMATS, JSON, PACKED, encode_coordinates, unpack_points
+from .spatial import simplify_points
+
+
+def requested_coordinate_format(request):
+    """The ``?coords=`` format of ``request``, JSON when absent or unknown."""
+    fmt = request.query_params.get("coords") if request is not None else None
+    return fmt if fmt in COORDINATE_FORMATS else JSON
+
+
+def skips_json_coordinates(request):
+    """
+    Whether ``request`` reads packed or delta coordinates, which
+    CoordinateFormatMixin can encode from ``coordinates_packed`` without the
+    JSON column. Writes keep the column; they need the points.
+    """
+    return request is not None and request.method in SAFE_METHODS and requested_coordinate_format(request) != JSON
+
+
+def without_json_coordinates(queryset, request):
+    """``queryset`` with ``coordinates`` deferred when skips_json_coordinates(request)."""
+    return queryset.defer("coordinates") if skips_json_coordinates(request) else queryset
+
+
+# Columns kept for storage and viewport queries, not part of the API
+STORAGE_FIELDS = list(PackedCoordinatesMixin.DERIVED_FIELDS)
+
+
+class CoordinateFormatMixin:
+    """
+    Writes ``coordinates`` in the format a client asks for with
+    ``?coords=json|packed|delta`` (or a ``coords`` context entry); see
+    annotations.codecs. Anything else gets the plain JSON list. A
+    ``simplify_tolerance`` context entry (page pixels) simplifies the shapes
+    first; see annotations.spatial.
+
+    When ``coordinates`` was deferred (see without_json_coordinates) packed and
+    delta output is decoded from ``coordinates_packed`` instead of loading the
+    JSON column.
+    """
+
+    def coordinate_format(self):
+        fmt = self.context.get("coords")
+        request = self.context.get("request")
+        if fmt is None and request is not None:
+            fmt = request.query_params.get("coords")
+        return fmt if fmt in COORDINATE_FORMATS else JSON
+
+    def to_representation(self, instance):
+        fmt = self.coordinate_format()
+        unpacked = (
+            fmt != JSON
+            and "coordinates" in instance.get_deferred_fields()
+            and instance.__dict__.get("coordinates_packed") is not None
+        )
+        if unpacked:
+            instance.__dict__["coordinates"] = unpack_points(instance.coordinates_packed)
+        try:
+            data = super().to_representation(instance)
+        finally:
+            if unpacked:
+                # Left deferred, so a later save() does not write the array back
+                del instance.__dict__["coordinates"]
+        if "coordinates" not in data:
+            return data
+        coordinates = simplify_points(data["coordinates"], self.context.get("simplify_tolerance"))
+        if fmt != JSON:
+            # The stored float32 buffer is used as is for packed output of unsimplified shapes
+            packed = None
+            if fmt == PACKED and coordinates is data["coordinates"]:
+                packed = instance.__dict__.get("coordinates_packed")
+            coordinates = encode_coordinates(coordinates, fmt, packed)
+        data["coordinates"] = coordinates
+        return data
+
+
+class FiniteQuantityMixin:
+    """Rejects NaN and infinite quantities, which float() and FloatField accept."""
+
+    def validate_quantity(self, value):
+        if value is not None and not math.isfinite(value):
+            raise serializers.ValidationError("A finite number is required.")
+        return value
+
+
+class AnnotationMaterialSerializer(FiniteQuantityMixin, serializers.ModelSerializer):
     material_detail = MaterialSerializer(source="material", read_only=True)
 
     class Meta:
@@ -25,7 +111,7 @@ class AnnotationMaterialSerializer(serializers.ModelSerializer):
         ]
 
 
-class WallAnnotationMaterialSerializer(serializers.ModelSerializer):
+class WallAnnotationMaterialSerializer(FiniteQuantityMixin, serializers.ModelSerializer):
     wall_material_detail = MaterialSerializer(source="material", read_only=True)
 
     class Meta:
@@ -40,7 +126,7 @@ class WallAnnotationMaterialSerializer(serializers.ModelSerializer):
         ]
 
 
-class WindowAndDoorAnnotationMaterialSerializer(serializers.ModelSerializer):
+class WindowAndDoorAnnotationMaterialSerializer(FiniteQuantityMixin, serializers.ModelSerializer):
     window_and_door_material_detail = MaterialSerializer(
         source="material", read_only=True
     )
@@ -57,42 +143,42 @@ class WindowAndDoorAnnotationMaterialSerializer(serializers.ModelSerializer):
         ]
 
 
-class AnnotationSerializer(serializers.ModelSerializer):
+class AnnotationSerializer(CoordinateFormatMixin, serializers.ModelSerializer):
     materials = AnnotationMaterialSerializer(
         source="annotation_materials", many=True, read_only=True
     )
 
     class Meta:
         model = Annotation
-        fields = "__all__"
+        exclude = STORAGE_FIELDS
         read_only_fields = ["created_at", "updated_at"]
         extra_kwargs = {
             "blueprint": {"required": True},
         }
 
 
-class WallAnnotationSerializer(serializers.ModelSerializer):
+class WallAnnotationSerializer(CoordinateFormatMixin, serializers.ModelSerializer):
     materials = WallAnnotationMaterialSerializer(
         source="wall_annotation_materials", many=True, read_only=True
     )
 
     class Meta:
         model = WallAnnotation
-        fields = "__all__"
+        exclude = STORAGE_FIELDS
         read_only_fields = ["created_at", "updated_at"]
         extra_kwargs = {
             "blueprint": {"required": True},
         }
 
 
-class WindowAndDoorAnnotationSerializer(serializers.ModelSerializer):
+class WindowAndDoorAnnotationSerializer(CoordinateFormatMixin, serializers.ModelSerializer):
     materials = WindowAndDoorAnnotationMaterialSerializer(
         source="window_and_door_annotation_materials", many=True, read_only=True
     )
 
     class Meta:
         model = WindowAndDoorAnnotation
-        fields = "__all__"
+        exclude = STORAGE_FIELDS
         read_only_fields = ["created_at", "updated_at"]
         extra_kwargs = {
             "blueprint": {"required": True},
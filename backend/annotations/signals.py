@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from plans.models import Blueprint, BlueprintImage
+from projects.models import Project
+from .tasks import remeasure_annotations
+from .models import (
+    Annotation,
+    WallAnnotation,
+    WindowAndDoorAnnotation,
+    AnnotationMaterial,
+    WallAnnotationMaterial,
+    WindowAndDoorAnnotationMaterial,
+)
+from .summary import link_image_id, schedule_refresh
+
+MEASUREMENT_BASIS = ("dpi", "scale")
+# Deleting one of these deletes the page's summary rows too
+PAGE_OWNERS = (BlueprintImage, Blueprint, Project)
+_UNKNOWN = object()
+
+
+def _basis(instance):
+    # __dict__ so a deferred field is not loaded with an extra query
+    return tuple(instance.__dict__.get(field, _UNKNOWN) for field in MEASUREMENT_BASIS)
+
+
+def _deletes_page(origin):
+    """Whether a delete started from a page, blueprint or project (a model instance or queryset)."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, PAGE_OWNERS)
+
+
+@receiver(post_init, sender=BlueprintImage)
+def remember_measurement_basis(sender, instance, **kwargs):
+    instance._measurement_basis = _basis(instance)
+
+
+@receiver(post_save, sender=BlueprintImage)
+def remeasure_on_scale_change(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Queue a re-measurement of the page's annotations once a changed DPI or scale is committed."""
+    previous = getattr(instance, "_measurement_basis", None)
+    instance._measurement_basis = _basis(instance)
+    if created or raw or previous is None or _UNKNOWN in previous:
+        return
+    if update_fields is not None and not set(update_fields) & set(MEASUREMENT_BASIS):
+        return
+    if previous == instance._measurement_basis:
+        return
+    image_id = str(instance.pk)
+    transaction.on_commit(lambda: remeasure_annotations.delay([image_id]))
+
+
+@receiver(post_save, sender=Annotation)
+@receiver(post_save, sender=WallAnnotation)
+@receiver(post_save, sender=WindowAndDoorAnnotation)
+@receiver(post_delete, sender=Annotation)
+@receiver(post_delete, sender=WallAnnotation)
+@receiver(post_delete, sender=WindowAndDoorAnnotation)
+def refresh_summary_on_annotation_change(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or _deletes_page(origin):
+        return
+    schedule_refresh([instance.blueprint_id])
+
+
+@receiver(post_save, sender=AnnotationMaterial)
+@receiver(post_save, sender=WallAnnotationMaterial)
+@receiver(post_save, sender=WindowAndDoorAnnotationMaterial)
+def refresh_summary_on_material_link_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    image_id = link_image_id(instance)
+    if image_id is not None:
+        schedule_refresh([image_id])
@@ -0,0 +1,113 @@
+"""
+Viewport queries over annotations.
+
+Every annotation stores the bounding box of its coordinates in page pixels
+(``bbox_min_x`` .. ``bbox_max_y``, kept in step by the models' save and by the
+bulk writer). The tables carry a GiST index on Postgres' built-in ``box`` of
+those columns (an R-tree; no PostGIS needed), and a viewport query is a
+``box && box`` overlap test that the index answers directly. The page filter
+uses the blueprint foreign key's own index, and Postgres combines the two.
+
+For zoomed-out views ``zoom`` is the number of screen pixels a page pixel
+covers. Shapes smaller than SIMPLIFY_SCREEN_PIXELS on screen are left out and
+the rest are simplified (Douglas-Peucker) to that tolerance, so the response
+shrinks with the zoom level as well as with the viewport.
+"""
+import cv2
+import numpy as np
+from django.db import models
+from django.db.models import F, Func, Lookup, Q, Value
+
+from .codecs import as_points
+
+BBOX_FIELDS = ("bbox_min_x", "bbox_min_y", "bbox_max_x", "bbox_max_y")
+
+SIMPLIFY_SCREEN_PIXELS = 1.0
+# Polygons with this many points or fewer (rectangles, walls, doors) are kept as they are
+MIN_SIMPLIFY_POINTS = 4
+
+
+def bounding_box(coordinates):
+    """(min_x, min_y, max_x, max_y) of a list of [x, y] pairs; ValueError when empty."""
+    points = as_points(coordinates)
+    if not len(points):
+        raise ValueError("Coordinates are empty")
+    (min_x, min_y), (max_x, max_y) = points.min(axis=0), points.max(axis=0)
+    return float(min_x), float(min_y), float(max_x), float(max_y)
+
+
+class BoxField(models.Field):
+    """Postgres ``box``; only used as the output type of Box expressions."""
+
+    def db_type(self, connection):
+        return "box"
+
+
+class Box(Func):
+    """
+    ``box(point(min_x, min_y), point(max_x, max_y))``. The GiST indexes are
+    built on Box(*BBOX_FIELDS), and a query has to use the same expression
+    for Postgres to pick them.
+    """
+    arity = 4
+    output_field = BoxField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        corners, params = [], []
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            corners.append(sql)
+            params.extend(expression_params)
+        return "box(point(%s, %s), point(%s, %s))" % tuple(corners), params
+
+
+@BoxField.register_lookup
+class Overlaps(Lookup):
+    """``box && box``: the boxes share at least one point, edges included."""
+    lookup_name = "overlaps"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} && {rhs}", (*lhs_params, *rhs_params)
+
+
+def simplify_tolerance(zoom):
+    """Page pixels that cover SIMPLIFY_SCREEN_PIXELS on screen at ``zoom``; 0 when zoomed in."""
+    if not zoom or zoom >= 1:
+        return 0.0
+    return SIMPLIFY_SCREEN_PIXELS / zoom
+
+
+def intersecting(queryset, x0, y0, x1, y1, min_size=0.0):
+    """
+    Annotations in ``queryset`` whose bounding box overlaps the rectangle
+    (x0, y0)-(x1, y1), edges included. With ``min_size`` shapes whose box is
+    smaller than that in both directions are left out.
+    """
+    viewport = Box(*(Value(float(edge)) for edge in (x0, y0, x1, y1)))
+    queryset = queryset.alias(bbox=Box(*BBOX_FIELDS)).filter(bbox__overlaps=viewport)
+    if min_size:
+        queryset = queryset.filter(
+            Q(bbox_max_x__gte=F("bbox_min_x") + min_size) | Q(bbox_max_y__gte=F("bbox_min_y") + min_size)
+        )
+    return queryset
+
+
+def simplify_points(coordinates, tolerance):
+    """
+    ``coordinates`` simplified as a closed shape to within ``tolerance`` page
+    pixels. The value itself is returned when there is nothing to simplify.
+    """
+    if not tolerance:
+        return coordinates
+    try:
+        points = as_points(coordinates)
+    except (ValueError, TypeError):
+        return coordinates
+    if len(points) <= MIN_SIMPLIFY_POINTS:
+        return coordinates
+    simplified = cv2.approxPolyDP(points.astype(np.float32).reshape(-1, 1, 2), tolerance, True)
+    if len(simplified) == len(points):
+        return coordinates
+    return np.round(simplified.reshape(-1, 2).astype(float), 2).tolist()
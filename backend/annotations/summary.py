@@ -0,0 +1,206 @@
+"""
+Materialized takeoff totals.
+
+TakeoffSummary holds each page's totals by annotation kind, label and
+material. When an annotation or a material link is saved or deleted its page
+is marked dirty, and once the transaction commits the dirty pages are
+recomputed with a few aggregate queries each. Writers that bypass save()
+(bulk inserts, re-measurement) call schedule_refresh themselves. There is
+no ATOMIC_REQUESTS, so views that save more than once run in
+transaction.atomic; otherwise every save would recompute the page on its own.
+
+Deletes cascading from a page, blueprint or project refresh nothing: the
+summary rows are deleted with the page. Material links are refreshed from
+their model's delete() rather than a post_delete receiver, which would stop
+Django from fast-deleting the links of a deleted annotation or page; the
+annotation's own receiver already covers its page.
+
+Reads for a page, a blueprint or a whole project are one query over the
+indexed summary rows, joined to the materials for names, units, prices and
+CSI divisions. Material prices are not copied, so editing a price needs no
+refresh.
+"""
+import threading
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q, Sum
+
+from plans.models import BlueprintImage
+from . import bulk
+from .models import AnnotationMaterial, WallAnnotationMaterial, WindowAndDoorAnnotationMaterial, TakeoffSummary
+
+# kind: (material link model, the link's annotation field)
+LINKS = {
+    bulk.ROOM: (AnnotationMaterial, "annotation"),
+    bulk.WALL: (WallAnnotationMaterial, "wall_annotation"),
+    bulk.WINDOW_AND_DOOR: (WindowAndDoorAnnotationMaterial, "window_and_door_annotation"),
+}
+
+LINK_ANNOTATION_FIELDS = {link_model: field for link_model, field in LINKS.values()}
+
+# Annotation columns summed into the summary's area and length_ft, by kind
+SUMMED_FIELDS = {
+    bulk.ROOM: ("area",),
+    bulk.WALL: ("area", "length_ft"),
+    bulk.WINDOW_AND_DOOR: (),
+}
+
+# group_by: output column -> summary lookup
+GROUPINGS = {
+    "material": {
+        "material_id": "material_id",
+        "material_name": "material__material_name",
+        "spec_section": "material__spec_section",
+        "unit": "material__unit",
+        "price": "material__price",
+        "currency": "material__currency",
+        "division": "material__subcategory__category__division",
+    },
+    "division": {
+        "division": "material__subcategory__category__division",
+        "category_name": "material__subcategory__category__category_name",
+    },
+    "label": {
+        "kind": "kind",
+        "label": "label",
+    },
+    "unit": {
+        "unit": "material__unit",
+    },
+}
+
+_pending = threading.local()
+
+
+def _label_totals(kind, image_ids):
+    model = bulk.MODELS[kind]
+    return (
+        model.objects.filter(blueprint_id__in=image_ids)
+        .values(image=F("blueprint_id"), group_label=F("label"))
+        .annotate(total_count=Count("id"), **{f"total_{field}": Sum(field) for field in SUMMED_FIELDS[kind]})
+        .order_by()
+    )
+
+
+def _material_totals(kind, image_ids):
+    link_model, annotation_field = LINKS[kind]
+    return (
+        link_model.objects.filter(**{f"{annotation_field}__blueprint_id__in": image_ids})
+        .values(
+            "material_id",
+            image=F(f"{annotation_field}__blueprint_id"),
+            group_label=F(f"{annotation_field}__label"),
+        )
+        .annotate(
+            total_count=Count("id"),
+            total_quantity=Sum("quantity"),
+            **{f"total_{field}": Sum(f"{annotation_field}__{field}") for field in SUMMED_FIELDS[kind]},
+        )
+        .order_by()
+    )
+
+
+def link_image_id(link):
+    """The page of a material link, read from its annotation when that is loaded."""
+    field = link._meta.get_field(LINK_ANNOTATION_FIELDS[type(link)])
+    if field.is_cached(link):
+        return getattr(link, field.name).blueprint_id
+    return field.related_model.objects.filter(
+        pk=getattr(link, field.attname)
+    ).values_list("blueprint_id", flat=True).first()
+
+
+def refresh_image_summaries(image_ids):
+    """
+    Recompute the TakeoffSummary rows of the given pages from their
+    annotations and material links. Returns the number of rows written.
+    """
+    image_ids = list(image_ids)
+    with transaction.atomic():
+        # Locking the pages serializes concurrent refreshes of the same page
+        pages = {
+            pk: (blueprint_id, project_id)
+            for pk, blueprint_id, project_id in BlueprintImage.objects.select_for_update(of=("self",))
+            .filter(pk__in=image_ids)
+            .values_list("pk", "blueprint_id", "blueprint__project_id")
+        }
+        TakeoffSummary.objects.filter(image_id__in=image_ids).delete()
+        rows = []
+        for kind in bulk.KINDS:
+            for totals in (*_label_totals(kind, pages), *_material_totals(kind, pages)):
+                blueprint_id, project_id = pages[totals["image"]]
+                rows.append(TakeoffSummary(
+                    image_id=totals["image"],
+                    blueprint_id=blueprint_id,
+                    project_id=project_id,
+                    kind=kind,
+                    label=totals["group_label"],
+                    material_id=totals.get("material_id"),
+                    annotation_count=totals["total_count"],
+                    quantity=totals.get("total_quantity") or 0.0,
+                    area=totals.get("total_area") or 0.0,
+                    length_ft=totals.get("total_length_ft") or 0.0,
+                ))
+        TakeoffSummary.objects.bulk_create(rows, batch_size=bulk.BULK_BATCH_SIZE)
+    return len(rows)
+
+
+def flush_pending():
+    image_ids = getattr(_pending, "image_ids", None)
+    if image_ids:
+        _pending.image_ids = set()
+        refresh_image_summaries(image_ids)
+
+
+def schedule_refresh(image_ids):
+    """
+    Refresh the summaries of ``image_ids`` after the current transaction
+    commits (right away outside one). Pages marked several times in one
+    transaction are refreshed once.
+    """
+    pending = getattr(_pending, "image_ids", None)
+    if pending is None:
+        pending = _pending.image_ids = set()
+    pending.update(image_ids)
+    # Registered on every call: the first callback to run takes every pending
+    # page and the rest find nothing, and pages left over from a rolled back
+    # transaction are simply recomputed with the next commit.
+    transaction.on_commit(flush_pending)
+
+
+def summarize(group_by, **scope):
+    """
+    Totals for ``scope`` (image_id, blueprint_id or project_id) grouped by
+    ``group_by`` (a GROUPINGS key), with the cost of the material quantities.
+    Label groups count and measure every annotation of the label; the other
+    groups cover material quantities only.
+    """
+    columns = GROUPINGS[group_by]
+    fields = [name for name, lookup in columns.items() if name == lookup]
+    aliases = {name: F(lookup) for name, lookup in columns.items() if name != lookup}
+    cost = ExpressionWrapper(F("quantity") * F("material__price"), output_field=FloatField())
+    queryset = TakeoffSummary.objects.filter(**scope)
+    if group_by == "label":
+        without_material = Q(material__isnull=True)
+        totals = {
+            "annotation_count": Sum("annotation_count", filter=without_material),
+            "area": Sum("area", filter=without_material),
+            "length_ft": Sum("length_ft", filter=without_material),
+            "cost": Sum(cost),
+        }
+    else:
+        queryset = queryset.filter(material__isnull=False)
+        totals = {
+            "annotation_count": Sum("annotation_count"),
+            "quantity": Sum("quantity"),
+            "cost": Sum(cost),
+        }
+    # Aggregates may not share a name with a model field, so they are renamed after the query
+    rows = list(
+        queryset.values(*fields, **aliases)
+        .annotate(**{f"total_{name}": total for name, total in totals.items()})
+        .order_by(*columns)
+    )
+    for row in rows:
+        for name in totals:
+            row[name] = row.pop(f"total_{name}") or 0
+    return rows
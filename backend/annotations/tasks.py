@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .remeasure import remeasure_blueprint_images
+
+
+@shared_task(name="remeasure_annotations")
+def remeasure_annotations(image_ids):
+    """Re-measure every annotation on the given blueprint images after a scale or DPI change."""
+    return remeasure_blueprint_images(image_ids)
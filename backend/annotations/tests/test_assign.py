@@ -0,0 +1,125 @@
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from annotations import assign, bulk
+from annotations.models import Annotation, AnnotationMaterial, TakeoffSummary, WindowAndDoorAnnotation
+from annotations.tests.test_bulk import make_image
+from estimators.models import EstimatorRequest
+from materials.models import Material, MaterialCategory, MaterialSubcategory
+from users.models import CustomUser, Role
+
+SQUARE = [[0, 0], [300, 0], [300, 300], [0, 300]]
+
+
+class BulkMaterialAssignmentTests(APITestCase):
+
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(
+            email="assignowner@gmail.com",
+            username="assignowner",
+            first_name="Assign",
+            last_name="Owner",
+            password="HelloWorld!1",
+            role=Role.USER
+        )
+        self.estimator = CustomUser.objects.create_user(
+            email="assignestimator@ssnbuilders.com",
+            username="assignestimator",
+            first_name="Assign",
+            last_name="Estimator",
+            password="HelloWorld!1",
+            role=Role.ESTIMATOR
+        )
+        self.image = make_image(self.owner)
+        EstimatorRequest.objects.create(image=self.image, requested_by=self.owner, assigned_estimator=self.estimator)
+        subcategory = MaterialSubcategory.objects.create(
+            category=MaterialCategory.objects.create(category_name="Finishes", division="09"), subcategory_name="Flooring"
+        )
+        self.tile = Material.objects.create(material_name="Tile", subcategory=subcategory, unit="sqft", price=2.0)
+        self.paint = Material.objects.create(material_name="Paint", subcategory=subcategory, unit="sqft", price=1.0)
+        self.rooms = [
+            Annotation.objects.create(
+                blueprint=self.image, label="Bedroom" if i % 2 else "Hall", coordinates=SQUARE,
+                annotation_type="polygon", area=10.0 * (i + 1),
+            )
+            for i in range(6)
+        ]
+        self.url = reverse("annotation-material-bulk")
+        self.client.force_authenticate(user=self.estimator)
+
+    def test_links_are_written_with_a_fixed_number_of_queries(self):
+        AnnotationMaterial.objects.create(annotation=self.rooms[0], material=self.tile, quantity=99.0)
+        ids = [room.pk for room in self.rooms]
+
+        with self.assertNumQueries(3):  # savepoint, INSERT ... ON CONFLICT DO NOTHING RETURNING, release
+            created, existing = assign.assign_materials(
+                bulk.ROOM, ids, [self.tile.pk, self.paint.pk], {self.image.pk}
+            )
+
+        self.assertEqual((created, existing), (11, 1))
+        self.assertEqual(AnnotationMaterial.objects.count(), 12)
+        self.assertEqual(AnnotationMaterial.objects.get(annotation=self.rooms[0], material=self.tile).quantity, 99.0)
+        self.assertEqual(AnnotationMaterial.objects.get(annotation=self.rooms[3], material=self.paint).quantity, 40.0)
+
+    def test_every_room_with_a_label(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {
+                "kind": "room", "blueprint": str(self.image.pk), "label": "Bedroom",
+                "materials": [str(self.tile.pk)], "notes": "Porcelain",
+            }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 3)
+        self.assertEqual(set(AnnotationMaterial.objects.values_list("notes", flat=True)), {"Porcelain"})
+        # bulk writes send no signals, so the summary is refreshed by the assignment itself
+        self.assertEqual(TakeoffSummary.objects.get(material=self.tile).quantity, 20.0 + 40.0 + 60.0)
+
+        response = self.client.post(self.url, {
+            "kind": "room", "blueprint": str(self.image.pk), "materials": [str(self.tile.pk)],
+        }, format="json")
+        self.assertEqual((response.data["created"], response.data["already_assigned"]), (3, 3))
+
+    def test_quantity_for_kinds_without_area(self):
+        opening = WindowAndDoorAnnotation.objects.create(
+            blueprint=self.image, label="Door", coordinates=SQUARE, annotation_type="rectangle"
+        )
+        response = self.client.post(self.url, {
+            "kind": "window_and_door", "annotations": [str(opening.pk)], "materials": [str(self.paint.pk)],
+            "quantity": 2,
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(opening.window_and_door_annotation_materials.get().quantity, 2.0)
+
+    def test_invalid_requests(self):
+        base = {"kind": "room", "annotations": [str(self.rooms[0].pk)], "materials": [str(self.tile.pk)]}
+        for change in ({"kind": "floor"}, {"materials": []}, {"annotations": ["nope"]},
+                       {"annotations": [str(self.tile.pk)]}, {"materials": [str(self.rooms[0].pk)]},
+                       {"quantity": "nan"}, {"quantity": "inf"}):
+            response = self.client.post(self.url, {**base, **change}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, change)
+        self.assertFalse(AnnotationMaterial.objects.exists())
+
+    def test_unassigned_estimator_is_denied(self):
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.post(self.url, {
+            "kind": "room", "annotations": [str(self.rooms[0].pk)], "materials": [str(self.tile.pk)],
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_links_made_since_are_counted_as_already_assigned(self):
+        ids = [room.pk for room in self.rooms[:2]]
+        assign.assign_materials(bulk.ROOM, ids[:1], [self.tile.pk], {self.image.pk}, quantity=5.0)
+
+        created, existing = assign.assign_materials(bulk.ROOM, ids, [self.tile.pk], {self.image.pk})
+
+        self.assertEqual((created, existing), (1, 1))
+        # The other request's link keeps its quantity; only the new one takes the area
+        self.assertEqual(AnnotationMaterial.objects.get(annotation=self.rooms[0]).quantity, 5.0)
+        self.assertEqual(AnnotationMaterial.objects.get(annotation=self.rooms[1]).quantity, 20.0)
+
+    def test_non_finite_quantity_is_rejected_on_update(self):
+        AnnotationMaterial.objects.create(annotation=self.rooms[0], material=self.tile, quantity=3.0)
+        url = f"/api/annotation/room/{self.rooms[0].pk}/materials/{self.tile.pk}/"
+        for value in ("nan", "inf", "-inf"):
+            response = self.client.patch(url, {"quantity": value}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, value)
+        self.assertEqual(AnnotationMaterial.objects.get().quantity, 3.0)
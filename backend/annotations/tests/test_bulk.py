@@ -0,0 +1,156 @@
+import uuid
+from django.test import TestCase
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+from annotations import bulk
+from annotations.models import Annotation, WallAnnotation, WindowAndDoorAnnotation
+from plans.models import Blueprint, BlueprintImage
+from projects.models import Project
+from users.models import CustomUser, Role
+
+
+def make_image(owner):
+    project = Project.objects.create(title="Bulk Project", owner=owner)
+    blueprint = Blueprint.objects.create(title="Bulk Blueprint", description="Sheet", project=project)
+    return BlueprintImage.objects.create(
+        blueprint=blueprint,
+        image=SimpleUploadedFile("page.jpg", b"image_content", content_type="image/jpeg"),
+        title="Bulk Image",
+        dpi=300,
+        scale=0.25,
+    )
+
+
+def room(i, **extra):
+    return {
+        "label": f"Room {i}",
+        "coordinates": [[0, 0], [300, 0], [300, 150], [0, 150]],
+        "annotation_type": "polygon",
+        **extra,
+    }
+
+
+class BulkWriteTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="bulk@gmail.com",
+            username="bulkuser",
+            first_name="Bulk",
+            last_name="User",
+            password="HelloWorld!1",
+            role=Role.USER
+        )
+        self.image = make_image(self.user)
+
+    def test_rows_are_inserted_in_one_statement(self):
+        rows = [room(i, area=12.5, width=4, height="3.5", confidence_score=None) for i in range(50)]
+
+        with self.assertNumQueries(3):  # savepoint, INSERT, release
+            created = bulk.bulk_create_annotations(bulk.ROOM, self.image, rows)
+
+        self.assertEqual(len(created), 50)
+        self.assertEqual(Annotation.objects.filter(blueprint=self.image).count(), 50)
+        saved = Annotation.objects.get(label="Room 7")
+        self.assertEqual((saved.area, saved.width, saved.height), (12.5, 4.0, 3.5))
+        self.assertIsNone(saved.confidence_score)
+        self.assertEqual(saved.coordinates, rows[7]["coordinates"])
+        self.assertIsNotNone(saved.created_at)
+
+    def test_every_bad_row_is_reported_and_nothing_is_written(self):
+        rows = [
+            room(0),
+            room(1, label=""),
+            room(2, coordinates=[[0, 0], [1]]),
+            room(3, coordinates=[]),
+            room(4, area="a lot"),
+            room(5, coordinates=[[0, 0], [float("nan"), 2], [3, 3]]),
+            room(6, annotation_type="x" * 51),
+        ]
+
+        with self.assertRaises(ValidationError) as ctx:
+            bulk.bulk_create_annotations(bulk.ROOM, self.image, rows)
+
+        errors = ctx.exception.detail["annotations"]
+        self.assertEqual(sorted(int(i) for i in errors), [1, 2, 3, 4, 5, 6])
+        self.assertIn("area", str(errors[4][0]))
+        self.assertFalse(Annotation.objects.exists())
+
+    def test_walls_and_openings_keep_their_own_columns(self):
+        bulk.bulk_create_annotations(bulk.WALL, self.image, [
+            {"label": "wall", "coordinates": [[0, 0], [10, 0], [10, 2], [0, 2]], "annotation_type": "rectangle",
+             "area": 1.0, "length_ft": 10.0, "thickness_ft": 0.5},
+        ])
+        bulk.bulk_create_annotations(bulk.WINDOW_AND_DOOR, self.image, [
+            {"label": "door", "coordinates": [[0, 0], [3, 0], [3, 7], [0, 7]], "annotation_type": "rectangle",
+             "length_ft": 3.0, "breadth_ft": 7.0},
+        ])
+
+        self.assertEqual(WallAnnotation.objects.get().thickness_ft, 0.5)
+        self.assertEqual(WindowAndDoorAnnotation.objects.get().breadth_ft, 7.0)
+
+
+class BulkAnnotationViewTests(APITestCase):
+
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(
+            email="bulkowner@gmail.com",
+            username="bulkowner",
+            first_name="Bulk",
+            last_name="Owner",
+            password="HelloWorld!1",
+            role=Role.USER
+        )
+        self.estimator = CustomUser.objects.create_user(
+            email="bulkestimator@ssnbuilders.com",
+            username="bulkestimator",
+            first_name="Bulk",
+            last_name="Estimator",
+            password="HelloWorld!1",
+            role=Role.ESTIMATOR
+        )
+        self.image = make_image(self.owner)
+        self.url = reverse("annotation-bulk")
+
+    def test_estimator_creates_measured_annotations(self):
+        self.client.force_authenticate(user=self.estimator)
+        payload = {"blueprint": str(self.image.id), "kind": "room", "annotations": [room(i) for i in range(3)]}
+
+        response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 3)
+        saved = Annotation.objects.get(pk=response.data["ids"][0])
+        # 300 x 150 px at 300 DPI and 1/4" = 1' is 4 ft x 2 ft
+        self.assertAlmostEqual(saved.area, 8.0)
+        self.assertEqual((saved.width, saved.height), (4.0, 2.0))
+
+    def test_invalid_rows_return_400(self):
+        self.client.force_authenticate(user=self.estimator)
+        payload = {"blueprint": str(self.image.id), "kind": "wall",
+                   "annotations": [room(0, annotation_type="rectangle"), {"label": "wall"}]}
+
+        response = self.client.post(self.url, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("1", {str(k) for k in response.data["annotations"]})
+        self.assertFalse(WallAnnotation.objects.exists())
+
+    def test_unknown_kind_and_image(self):
+        self.client.force_authenticate(user=self.estimator)
+        response = self.client.post(self.url, {"blueprint": str(self.image.id), "kind": "stairs",
+                                               "annotations": [room(0)]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(self.url, {"blueprint": str(uuid.uuid4()), "kind": "room",
+                                               "annotations": [room(0)]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_non_estimator_is_forbidden(self):
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.post(self.url, {"blueprint": str(self.image.id), "kind": "room",
+                                               "annotations": [room(0)]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,143 @@
+import base64
+import unittest
+import numpy as np
+from django.test import TestCase
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from annotations import bulk
+from annotations.codecs import (DELTA, JSON, PACKED, decode_coordinates, delta_decode, delta_encode,
+                                encode_coordinates, unpack_points)
+from annotations.models import Annotation, WallAnnotation
+from annotations.serializers import WallAnnotationSerializer, without_json_coordinates
+from plans.models import Blueprint, BlueprintImage
+from projects.models import Project
+from users.models import CustomUser, Role
+
+WALL = [[120, 40], [1840, 40], [1840, 52], [120, 52]]
+
+
+def make_image(owner):
+    project = Project.objects.create(title="Codec Project", owner=owner)
+    blueprint = Blueprint.objects.create(title="Codec Blueprint", description="Sheet", project=project)
+    return BlueprintImage.objects.create(
+        blueprint=blueprint,
+        image=SimpleUploadedFile("page.jpg", b"image_content", content_type="image/jpeg"),
+        title="Codec Image",
+        dpi=300,
+        scale=0.25,
+    )
+
+
+class CodecTests(unittest.TestCase):
+
+    def test_round_trips(self):
+        rng = np.random.default_rng(7)
+        points = np.round(rng.uniform(0, 10800, (200, 2)), 2).tolist()
+
+        self.assertEqual(decode_coordinates(encode_coordinates(points, JSON)), points)
+        np.testing.assert_allclose(decode_coordinates(encode_coordinates(points, PACKED)), points, atol=1e-3)
+        np.testing.assert_allclose(decode_coordinates(encode_coordinates(points, DELTA)), points, atol=1e-9)
+
+    def test_delta_is_compact_for_rectilinear_shapes(self):
+        data = delta_encode(WALL)
+        self.assertEqual(delta_decode(data).tolist(), WALL)
+        self.assertLess(len(data), 8 * len(WALL))
+        self.assertEqual(encode_coordinates(WALL, DELTA)["count"], 4)
+
+    def test_values_that_are_not_point_lists_pass_through(self):
+        for value in ([], {"x": 1}, [[1, 2, 3]]):
+            encoded = encode_coordinates(value, PACKED)
+            if value == []:
+                self.assertEqual(encoded["count"], 0)
+            else:
+                self.assertEqual(encoded, value)
+
+
+class PackedColumnTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="codec@gmail.com",
+            username="codecuser",
+            first_name="Codec",
+            last_name="User",
+            password="HelloWorld!1",
+            role=Role.USER
+        )
+        self.image = make_image(self.user)
+
+    def test_save_keeps_packed_column_in_step(self):
+        wall = WallAnnotation.objects.create(blueprint=self.image, label="Wall", coordinates=WALL, annotation_type="rectangle")
+        wall.refresh_from_db()
+        self.assertEqual(wall.point_count, 4)
+        self.assertEqual(unpack_points(wall.coordinates_packed).tolist(), WALL)
+
+        wall.coordinates = WALL[:3]
+        wall.save(update_fields=["coordinates"])
+        wall.refresh_from_db()
+        self.assertEqual(wall.point_count, 3)
+
+    def test_bulk_insert_fills_packed_column(self):
+        rows = [{"label": "Room", "coordinates": WALL, "annotation_type": "polygon"}]
+        bulk.bulk_create_annotations(bulk.ROOM, self.image, rows)
+        saved = Annotation.objects.get()
+        self.assertEqual(saved.point_count, 4)
+        self.assertEqual(unpack_points(saved.coordinates_packed).tolist(), WALL)
+
+
+class CoordinateFormatApiTests(APITestCase):
+
+    def setUp(self):
+        self.estimator = CustomUser.objects.create_user(
+            email="codecestimator@ssnbuilders.com",
+            username="codecestimator",
+            first_name="Codec",
+            last_name="Estimator",
+            password="HelloWorld!1",
+            role=Role.ESTIMATOR
+        )
+        self.image = make_image(self.estimator)
+        WallAnnotation.objects.create(blueprint=self.image, label="Wall", coordinates=WALL, annotation_type="rectangle")
+        self.client.force_authenticate(user=self.estimator)
+
+    def test_list_in_each_format(self):
+        url = reverse("wall_annotation-list")
+
+        plain = self.client.get(url).data[0]
+        self.assertEqual(plain["coordinates"], WALL)
+        self.assertNotIn("coordinates_packed", plain)
+        self.assertNotIn("point_count", plain)
+        self.assertNotIn("bbox_min_x", plain)
+
+        packed = self.client.get(url, {"coords": PACKED}).data[0]["coordinates"]
+        self.assertEqual((packed["format"], packed["count"]), (PACKED, 4))
+        self.assertEqual(len(base64.b64decode(packed["data"])), 32)
+        self.assertEqual(decode_coordinates(packed), WALL)
+
+        delta = self.client.get(url, {"coords": DELTA}).data[0]["coordinates"]
+        self.assertEqual(decode_coordinates(delta), WALL)
+
+        self.assertEqual(self.client.get(url, {"coords": "bogus"}).data[0]["coordinates"], WALL)
+
+    def test_packed_output_does_not_load_json_column(self):
+        wall = WallAnnotation.objects.defer("coordinates").get(blueprint=self.image)
+        for fmt in (PACKED, DELTA):
+            with self.assertNumQueries(0):
+                data = WallAnnotationSerializer(wall, context={"coords": fmt}).data
+            self.assertEqual(decode_coordinates(data["coordinates"]), WALL)
+        self.assertIn("coordinates", wall.get_deferred_fields())
+
+    def test_json_column_is_deferred_only_for_packed_reads(self):
+        factory = APIRequestFactory()
+        queryset = WallAnnotation.objects.all()
+        cases = [
+            (factory.get("/", {"coords": PACKED}), True),
+            (factory.get("/", {"coords": DELTA}), True),
+            (factory.get("/"), False),
+            (factory.patch("/?coords=packed"), False),
+        ]
+        for request, deferred in cases:
+            wall = without_json_coordinates(queryset, Request(request)).get()
+            self.assertEqual("coordinates" in wall.get_deferred_fields(), deferred)
@@ -0,0 +1,74 @@
+import csv
+import io
+import unittest
+from django.test import TestCase
+from annotations import export
+from annotations.models import Annotation, WallAnnotation, WindowAndDoorAnnotation, AnnotationMaterial
+from materials.models import Material, MaterialCategory, MaterialSubcategory
+from plans.models import Blueprint, BlueprintImage
+from projects.models import Project
+from users.models import CustomUser, Role
+
+SQUARE = [[0, 0], [300, 0], [300, 300], [0, 300]]
+
+
+class TakeoffExportTests(TestCase):
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(
+            email="export@gmail.com",
+            username="exportuser",
+            first_name="Export",
+            last_name="User",
+            password="HelloWorld!1",
+            role=Role.USER
+        )
+        self.project = Project.objects.create(title="Export Project", owner=user)
+        blueprint = Blueprint.objects.create(title="Ground Floor", description="Sheet", project=self.project)
+        image = BlueprintImage.objects.create(blueprint=blueprint, title="A-101", dpi=300, scale=0.25)
+        subcategory = MaterialSubcategory.objects.create(
+            category=MaterialCategory.objects.create(category_name="Finishes", division="09"), subcategory_name="Flooring"
+        )
+        tile = Material.objects.create(material_name="Tile", subcategory=subcategory, unit="sqft", price=2.5, spec_section="09 30 00")
+        grout = Material.objects.create(material_name="Grout", subcategory=subcategory, unit="lb", price=1.0)
+        room = Annotation.objects.create(blueprint=image, label="Kitchen", coordinates=SQUARE, annotation_type="polygon", area=100.0)
+        AnnotationMaterial.objects.create(annotation=room, material=tile, quantity=100.0, notes="Porcelain")
+        AnnotationMaterial.objects.create(annotation=room, material=grout, quantity=8.0)
+        WallAnnotation.objects.create(
+            blueprint=image, label="Exterior", coordinates=SQUARE, annotation_type="rectangle", area=5.0, length_ft=20.0
+        )
+        WindowAndDoorAnnotation.objects.create(
+            blueprint=image, label="Door", coordinates=SQUARE, annotation_type="rectangle", length_ft=3.0, breadth_ft=0.5
+        )
+
+    def test_rows(self):
+        rows = [dict(zip(export.EXPORT_COLUMNS, row)) for row in export.export_rows(self.project.pk)]
+        self.assertEqual(len(rows), 4)
+
+        tile = next(row for row in rows if row["Description"] == "Tile")
+        self.assertEqual(
+            (tile["Blueprint"], tile["Page"], tile["Type"], tile["Label"], tile["CSI Division"], tile["Unit"]),
+            ("Ground Floor", "A-101", "room", "Kitchen", "09", "sqft"),
+        )
+        self.assertEqual((tile["Quantity"], tile["Notes"], tile["Total"]), (100.0, "Porcelain", 250.0))
+
+        wall = next(row for row in rows if row["Type"] == "wall")
+        self.assertEqual((wall["Area (sqft)"], wall["Length (ft)"], wall["Description"], wall["Total"]), (5.0, 20.0, None, None))
+        door = next(row for row in rows if row["Type"] == "window_and_door")
+        self.assertEqual((door["Area (sqft)"], door["Length (ft)"]), (None, 3.0))
+
+    def test_csv_uses_the_import_columns(self):
+        text = "".join(export.stream_csv(self.project.pk))
+        rows = list(csv.DictReader(io.StringIO(text)))
+        self.assertEqual(len(rows), 4)
+        for column in ("CSI Division", "Description", "Unit", "Quantity", "Notes"):
+            self.assertIn(column, rows[0])
+
+    @unittest.skipIf(export.Workbook is None, "openpyxl is not installed")
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        sheet = load_workbook(export.xlsx_file(self.project.pk), read_only=True)["Takeoff"]
+        rows = list(sheet.values)
+        self.assertEqual(list(rows[0]), export.EXPORT_COLUMNS)
+        self.assertEqual(len(rows), 5)
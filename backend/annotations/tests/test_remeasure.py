@@ -0,0 +1,96 @@
+from unittest.mock import patch
+from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from annotations import bulk
+from annotations.models import Annotation, WallAnnotation, WindowAndDoorAnnotation, AnnotationMaterial
+from annotations.remeasure import remeasure_blueprint_images
+from materials.models import Material, MaterialCategory, MaterialSubcategory
+from plans.models import Blueprint, BlueprintImage
+from projects.models import Project
+from users.models import CustomUser, Role
+
+RECTANGLE = [[0, 0], [300, 0], [300, 150], [0, 150]]
+
+
+class RemeasureTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="remeasure@gmail.com",
+            username="remeasureuser",
+            first_name="Re",
+            last_name="Measure",
+            password="HelloWorld!1",
+            role=Role.USER
+        )
+        project = Project.objects.create(title="Remeasure Project", owner=self.user)
+        blueprint = Blueprint.objects.create(title="Remeasure Blueprint", description="Sheet", project=project)
+        self.image = BlueprintImage.objects.create(
+            blueprint=blueprint,
+            image=SimpleUploadedFile("page.jpg", b"image_content", content_type="image/jpeg"),
+            title="Remeasure Image",
+            dpi=300,
+            scale=0.25,
+        )
+        for kind, annotation_type in ((bulk.ROOM, "polygon"), (bulk.WALL, "rectangle"), (bulk.WINDOW_AND_DOOR, "rectangle")):
+            rows = [{"label": kind, "coordinates": RECTANGLE, "annotation_type": annotation_type}]
+            bulk.insert_annotations(kind, self.image, bulk.measure_rows(kind, bulk.validate_rows(kind, rows), 300, 0.25))
+
+        self.room = Annotation.objects.get()
+        subcategory = MaterialSubcategory.objects.create(
+            category=MaterialCategory.objects.create(category_name="Finishes"), subcategory_name="Flooring"
+        )
+        self.tracking = AnnotationMaterial.objects.create(
+            annotation=self.room, material=Material.objects.create(material_name="Tile", subcategory=subcategory),
+            quantity=self.room.area,
+        )
+        self.manual = AnnotationMaterial.objects.create(
+            annotation=self.room, material=Material.objects.create(material_name="Grout", subcategory=subcategory),
+            quantity=3.0,
+        )
+
+    @patch("annotations.signals.remeasure_annotations.delay")
+    def test_scale_change_queues_a_remeasure_after_commit(self, mock_delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.image.title = "Renamed"
+            self.image.save()
+        mock_delay.assert_not_called()
+
+        image = BlueprintImage.objects.get(pk=self.image.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            image.scale = 0.125
+            image.save()
+        mock_delay.assert_called_once_with([str(image.pk)])
+
+    @patch("annotations.signals.remeasure_annotations.delay")
+    def test_remeasure_updates_changed_rows_and_area_linked_quantities(self, mock_delay):
+        self.assertAlmostEqual(self.room.area, 8.0)
+        BlueprintImage.objects.filter(pk=self.image.pk).update(scale=0.125)
+
+        report = remeasure_blueprint_images([self.image.pk])
+
+        self.assertEqual(report["images"], 1)
+        for kind in bulk.KINDS:
+            self.assertEqual((report[kind]["checked"], report[kind]["updated"]), (1, 1))
+        self.assertEqual(report[bulk.ROOM]["materials"], 1)
+
+        self.room.refresh_from_db()
+        self.assertAlmostEqual(self.room.area, 32.0)
+        self.assertEqual((self.room.width, self.room.height), (8.0, 4.0))
+        self.assertEqual(WallAnnotation.objects.get().length_ft, 8.0)
+        self.assertEqual(WindowAndDoorAnnotation.objects.get().breadth_ft, 4.0)
+        self.tracking.refresh_from_db()
+        self.manual.refresh_from_db()
+        self.assertEqual(self.tracking.quantity, self.room.area)
+        self.assertEqual(self.manual.quantity, 3.0)
+
+        # Nothing is stale any more, so nothing is written
+        with self.assertNumQueries(6):  # page lookup, savepoint pair, one SELECT per kind
+            again = remeasure_blueprint_images([self.image.pk])
+        self.assertEqual(sum(again[kind]["updated"] for kind in bulk.KINDS), 0)
+
+    def test_pages_without_scale_are_skipped(self):
+        BlueprintImage.objects.filter(pk=self.image.pk).update(scale=None)
+        report = remeasure_blueprint_images([self.image.pk])
+        self.assertEqual(report["images"], 0)
+        self.assertAlmostEqual(Annotation.objects.get().area, 8.0)
@@ -0,0 +1,163 @@
+import unittest
+import numpy as np
+from django.test import TestCase
+from django.urls import reverse
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import status
+from rest_framework.test import APITestCase
+from annotations import bulk
+from annotations.codecs import PACKED, decode_coordinates
+from annotations.models import Annotation, WallAnnotation, WindowAndDoorAnnotation
+from annotations.spatial import bounding_box, intersecting, simplify_points, simplify_tolerance
+from plans.models import Blueprint, BlueprintImage
+from projects.models import Project
+from users.models import CustomUser, Role
+
+WEST_WALL = [[100, 100], [112, 100], [112, 2000], [100, 2000]]
+EAST_WALL = [[5000, 100], [5012, 100], [5012, 2000], [5000, 2000]]
+# A 400 px room whose outline was traced with many nearly collinear points
+ROOM = [[100 + x, 100] for x in range(0, 400, 10)] + [[500, 100], [500, 500], [100, 500]]
+
+
+def make_image(owner):
+    project = Project.objects.create(title="Spatial Project", owner=owner)
+    blueprint = Blueprint.objects.create(title="Spatial Blueprint", description="Sheet", project=project)
+    return BlueprintImage.objects.create(
+        blueprint=blueprint,
+        image=SimpleUploadedFile("page.jpg", b"image_content", content_type="image/jpeg"),
+        title="Spatial Image",
+        dpi=300,
+        scale=0.25,
+    )
+
+
+class SpatialHelperTests(unittest.TestCase):
+
+    def test_bounding_box(self):
+        self.assertEqual(bounding_box(WEST_WALL), (100.0, 100.0, 112.0, 2000.0))
+        with self.assertRaises(ValueError):
+            bounding_box([])
+
+    def test_tolerance_only_when_zoomed_out(self):
+        self.assertEqual(simplify_tolerance(None), 0)
+        self.assertEqual(simplify_tolerance(2), 0)
+        self.assertEqual(simplify_tolerance(0.25), 4)
+
+    def test_simplify_drops_collinear_points(self):
+        simplified = simplify_points(ROOM, 2)
+        self.assertEqual(len(simplified), 4)
+        np.testing.assert_allclose(sorted(simplified), sorted([[100, 100], [500, 100], [500, 500], [100, 500]]))
+
+    def test_small_shapes_and_no_tolerance_are_unchanged(self):
+        self.assertIs(simplify_points(ROOM, 0), ROOM)
+        self.assertIs(simplify_points(WEST_WALL, 50), WEST_WALL)
+        self.assertEqual(simplify_points({"x": 1}, 2), {"x": 1})
+
+
+class BoundingBoxColumnTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="spatial@gmail.com",
+            username="spatialuser",
+            first_name="Spatial",
+            last_name="User",
+            password="HelloWorld!1",
+            role=Role.USER
+        )
+        self.image = make_image(self.user)
+
+    def test_save_and_bulk_insert_fill_the_box(self):
+        wall = WallAnnotation.objects.create(blueprint=self.image, label="Wall", coordinates=WEST_WALL, annotation_type="rectangle")
+        wall.coordinates = EAST_WALL
+        wall.save(update_fields=["coordinates"])
+        wall.refresh_from_db()
+        self.assertEqual((wall.bbox_min_x, wall.bbox_max_x), (5000, 5012))
+
+        bulk.bulk_create_annotations(bulk.ROOM, self.image, [{"label": "Room", "coordinates": ROOM, "annotation_type": "polygon"}])
+        room = Annotation.objects.get()
+        self.assertEqual((room.bbox_min_x, room.bbox_min_y, room.bbox_max_x, room.bbox_max_y), (100, 100, 500, 500))
+
+    def test_intersecting(self):
+        for coordinates in (WEST_WALL, EAST_WALL):
+            WallAnnotation.objects.create(blueprint=self.image, label="Wall", coordinates=coordinates, annotation_type="rectangle")
+        walls = WallAnnotation.objects.filter(blueprint=self.image)
+
+        self.assertEqual(intersecting(walls, 0, 0, 1000, 1000).count(), 1)
+        self.assertEqual(intersecting(walls, 112, 2000, 6000, 3000).count(), 2)
+        self.assertEqual(intersecting(walls, 200, 0, 4000, 3000).count(), 0)
+        # Walls are 12 px wide but 1900 px long, so they stay visible
+        self.assertEqual(intersecting(walls, 0, 0, 6000, 3000, min_size=100).count(), 2)
+        self.assertEqual(intersecting(walls, 0, 0, 6000, 3000, min_size=2000).count(), 0)
+
+    def test_query_uses_the_indexed_box_expression(self):
+        sql = str(intersecting(WallAnnotation.objects.filter(blueprint=self.image), 0, 0, 10, 10).query)
+        self.assertIn('box(point("annotations_wallannotation"."bbox_min_x", "annotations_wallannotation"."bbox_min_y")', sql)
+        self.assertIn("&& box(point(", sql)
+
+
+class AnnotationViewportApiTests(APITestCase):
+
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(
+            email="viewportowner@gmail.com",
+            username="viewportowner",
+            first_name="Viewport",
+            last_name="Owner",
+            password="HelloWorld!1",
+            role=Role.USER
+        )
+        self.other = CustomUser.objects.create_user(
+            email="viewportother@gmail.com",
+            username="viewportother",
+            first_name="Viewport",
+            last_name="Other",
+            password="HelloWorld!1",
+            role=Role.USER
+        )
+        self.image = make_image(self.owner)
+        for coordinates in (WEST_WALL, EAST_WALL):
+            WallAnnotation.objects.create(blueprint=self.image, label="Wall", coordinates=coordinates, annotation_type="rectangle")
+        Annotation.objects.create(blueprint=self.image, label="Room", coordinates=ROOM, annotation_type="polygon")
+        WindowAndDoorAnnotation.objects.create(
+            blueprint=self.image, label="Door", coordinates=[[4000, 4000], [4030, 4000], [4030, 4010], [4000, 4010]],
+            annotation_type="rectangle",
+        )
+        self.url = reverse("annotation-viewport", kwargs={"blueprint_id": self.image.id})
+        self.client.force_authenticate(user=self.owner)
+
+    def test_returns_only_shapes_in_the_viewport(self):
+        response = self.client.get(self.url, {"x0": 0, "y0": 0, "x1": 1000, "y1": 1000})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["wall_annotations"]), 1)
+        self.assertEqual(response.data["wall_annotations"][0]["coordinates"], WEST_WALL)
+        self.assertEqual(response.data["annotations"][0]["coordinates"], ROOM)
+        self.assertEqual(response.data["window_and_door_annotations"], [])
+
+    def test_zoom_simplifies_and_drops_small_shapes(self):
+        params = {"x0": 0, "y0": 0, "x1": 6000, "y1": 6000, "zoom": 0.02, "coords": PACKED}
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(decode_coordinates(response.data["annotations"][0]["coordinates"])), 4)
+        self.assertEqual(len(response.data["wall_annotations"]), 2)
+        # The 30 px door is under one screen pixel at 1/50 zoom
+        self.assertEqual(response.data["window_and_door_annotations"], [])
+
+    def test_kinds_filter(self):
+        response = self.client.get(self.url, {"x0": 0, "y0": 0, "x1": 6000, "y1": 6000, "kinds": "wall"})
+        self.assertEqual(set(response.data) - {"viewport", "zoom"}, {"wall_annotations"})
+
+    def test_invalid_parameters(self):
+        for params in (
+            {"x0": 0, "y0": 0, "x1": 10},
+            {"x0": 0, "y0": 0, "x1": "a", "y1": 10},
+            {"x0": 10, "y0": 0, "x1": 0, "y1": 10},
+            {"x0": 0, "y0": 0, "x1": 10, "y1": 10, "zoom": 0},
+            {"x0": 0, "y0": 0, "x1": 10, "y1": 10, "kinds": "floor"},
+        ):
+            self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_cannot_query(self):
+        self.client.force_authenticate(user=self.other)
+        response = self.client.get(self.url, {"x0": 0, "y0": 0, "x1": 10, "y1": 10})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,164 @@
+from unittest.mock import patch
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from annotations import bulk
+from annotations.models import Annotation, WallAnnotation, AnnotationMaterial, WallAnnotationMaterial, TakeoffSummary
+from annotations.summary import refresh_image_summaries, summarize
+from materials.models import Material, MaterialCategory, MaterialSubcategory
+from plans.models import Blueprint, BlueprintImage
+from projects.models import Project
+from users.models import CustomUser, Role
+
+SQUARE = [[0, 0], [300, 0], [300, 300], [0, 300]]
+WALL = [[0, 0], [600, 0], [600, 12], [0, 12]]
+
+
+class TakeoffSummaryTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="summary@gmail.com",
+            username="summaryuser",
+            first_name="Summary",
+            last_name="User",
+            password="HelloWorld!1",
+            role=Role.USER
+        )
+        self.project = Project.objects.create(title="Summary Project", owner=self.user)
+        self.blueprint = Blueprint.objects.create(title="Summary Blueprint", description="Sheet", project=self.project)
+        self.pages = [
+            BlueprintImage.objects.create(
+                blueprint=self.blueprint,
+                image=SimpleUploadedFile("page.jpg", b"image_content", content_type="image/jpeg"),
+                title=f"Page {i}",
+                dpi=300,
+                scale=0.25,
+            )
+            for i in range(2)
+        ]
+        finishes = MaterialSubcategory.objects.create(
+            category=MaterialCategory.objects.create(category_name="Finishes", division="09"), subcategory_name="Flooring"
+        )
+        framing = MaterialSubcategory.objects.create(
+            category=MaterialCategory.objects.create(category_name="Wood", division="06"), subcategory_name="Framing"
+        )
+        self.tile = Material.objects.create(material_name="Tile", subcategory=finishes, unit="sqft", price=2.0)
+        self.stud = Material.objects.create(material_name="Stud", subcategory=framing, unit="sqft", price=0.5)
+
+    def add_room(self, page, label="Kitchen"):
+        room = Annotation.objects.create(blueprint=page, label=label, coordinates=SQUARE, annotation_type="polygon", area=100.0)
+        AnnotationMaterial.objects.create(annotation=room, material=self.tile, quantity=room.area)
+        return room
+
+    def test_changes_refresh_the_page_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            room = self.add_room(self.pages[0])
+        tile = TakeoffSummary.objects.get(image=self.pages[0], material=self.tile)
+        self.assertEqual((tile.kind, tile.label, tile.annotation_count, tile.quantity), ("room", "Kitchen", 1, 100.0))
+        self.assertEqual(tile.project_id, self.project.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AnnotationMaterial.objects.filter(annotation=room).get().delete()
+        self.assertFalse(TakeoffSummary.objects.filter(material=self.tile).exists())
+        self.assertEqual(TakeoffSummary.objects.get(material=None).annotation_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            room.delete()
+        self.assertFalse(TakeoffSummary.objects.exists())
+
+    def test_deleting_a_page_refreshes_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for page in self.pages:
+                self.add_room(page)
+        with patch("annotations.signals.schedule_refresh") as schedule_refresh:
+            self.pages[0].delete()
+        schedule_refresh.assert_not_called()
+        self.assertEqual(TakeoffSummary.objects.filter(image=self.pages[1]).count(), 2)
+
+    def test_bulk_inserts_refresh_the_page(self):
+        rows = [{"label": "Exterior", "coordinates": WALL, "annotation_type": "rectangle"}] * 3
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.insert_annotations(bulk.WALL, self.pages[1], bulk.measure_rows(bulk.WALL, bulk.validate_rows(bulk.WALL, rows), 300, 0.25))
+        walls = TakeoffSummary.objects.get(image=self.pages[1])
+        self.assertEqual(walls.annotation_count, 3)
+        self.assertAlmostEqual(walls.length_ft, 3 * WallAnnotation.objects.first().length_ft)
+
+    def test_rollups(self):
+        for page in self.pages:
+            self.add_room(page)
+        self.add_room(self.pages[1], label="Bath")
+        wall = WallAnnotation.objects.create(blueprint=self.pages[0], label="Exterior", coordinates=WALL, annotation_type="rectangle")
+        WallAnnotationMaterial.objects.create(wall_annotation=wall, material=self.stud, quantity=40.0)
+        refresh_image_summaries([page.pk for page in self.pages])
+
+        by_material = {row["material_name"]: row for row in summarize("material", project_id=self.project.pk)}
+        self.assertEqual(by_material["Tile"]["quantity"], 300.0)
+        self.assertEqual(by_material["Tile"]["cost"], 600.0)
+        self.assertEqual(by_material["Stud"]["division"], "06")
+
+        by_division = {row["division"]: row["cost"] for row in summarize("division", blueprint_id=self.blueprint.pk)}
+        self.assertEqual(by_division, {"06": 20.0, "09": 600.0})
+
+        by_label = {(row["kind"], row["label"]): row for row in summarize("label", image_id=self.pages[1].pk)}
+        self.assertEqual(set(by_label), {("room", "Kitchen"), ("room", "Bath")})
+        self.assertEqual(by_label[("room", "Bath")]["area"], 100.0)
+        self.assertEqual(by_label[("room", "Bath")]["cost"], 200.0)
+
+        # Prices are read at query time
+        Material.objects.filter(pk=self.tile.pk).update(price=3.0)
+        self.assertEqual(summarize("unit", project_id=self.project.pk)[0]["cost"], 920.0)
+
+
+class TakeoffSummaryApiTests(APITestCase):
+
+    def setUp(self):
+        self.owner = CustomUser.objects.create_user(
+            email="summaryowner@gmail.com",
+            username="summaryowner",
+            first_name="Summary",
+            last_name="Owner",
+            password="HelloWorld!1",
+            role=Role.USER
+        )
+        self.other = CustomUser.objects.create_user(
+            email="summaryother@gmail.com",
+            username="summaryother",
+            first_name="Summary",
+            last_name="Other",
+            password="HelloWorld!1",
+            role=Role.USER
+        )
+        self.project = Project.objects.create(title="Summary Api Project", owner=self.owner)
+        blueprint = Blueprint.objects.create(title="Summary Api Blueprint", description="Sheet", project=self.project)
+        image = BlueprintImage.objects.create(blueprint=blueprint, title="Page", dpi=300, scale=0.25)
+        subcategory = MaterialSubcategory.objects.create(
+            category=MaterialCategory.objects.create(category_name="Finishes", division="09"), subcategory_name="Paint"
+        )
+        paint = Material.objects.create(material_name="Paint", subcategory=subcategory, unit="sqft", price=1.5)
+        room = Annotation.objects.create(blueprint=image, label="Office", coordinates=SQUARE, annotation_type="polygon", area=10.0)
+        AnnotationMaterial.objects.create(annotation=room, material=paint, quantity=10.0)
+        refresh_image_summaries([image.pk])
+        self.url = reverse("takeoff-summary")
+
+    def test_project_summary(self):
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.get(self.url, {"project": str(self.project.pk), "group_by": "division"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["rows"][0]["division"], "09")
+        self.assertEqual(response.data["total_cost"], 15.0)
+
+    def test_invalid_requests(self):
+        self.client.force_authenticate(user=self.owner)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.client.get(self.url, {"project": str(self.project.pk), "group_by": "color"}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    def test_other_users_cannot_read(self):
+        self.client.force_authenticate(user=self.other)
+        response = self.client.get(self.url, {"project": str(self.project.pk)})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -5,7 +5,11 @@ from .views import (AnnotationViewSet,
                     AnnotationMaterialView, 
                     # FloorAnnotationViewSet, 
                     WallAnnotationMaterialView,
-                    WindowAndDoorAnnotationMaterialView)
+                    WindowAndDoorAnnotationMaterialView,
+                    BulkAnnotationView,
+                    BulkAnnotationMaterialView,
+                    AnnotationViewportView,
+                    TakeoffSummaryView)
 from django.urls import path
 
 
@@ -15,6 +19,10 @@ router.register(r'wall-annotations', WallAnnotationViewSet, basename='wall_annot
 router.register(r'window-door-annotations', WindowandDoorAnnotationViewSet, basename='window_and_door_annotation')
 # router.register(r'floor-annotations', FloorAnnotationViewSet, basename='floor_annotation')
 urlpatterns = [
+    path('annotations/bulk/', BulkAnnotationView.as_view(), name='annotation-bulk'),
+    path('annotations/materials/bulk/', BulkAnnotationMaterialView.as_view(), name='annotation-material-bulk'),
+    path('annotations/viewport/<uuid:blueprint_id>/', AnnotationViewportView.as_view(), name='annotation-viewport'),
+    path('takeoff/summary/', TakeoffSummaryView.as_view(), name='takeoff-summary'),
     path('room/<uuid:annotation_id>/materials/', AnnotationMaterialView.as_view()),
     path('room/<uuid:annotation_id>/materials/<uuid:material_id>/', AnnotationMaterialView.as_view()),
     path('wall/<uuid:wall_annotation_id>/materials/', WallAnnotationMaterialView.as_view()),
@@ -11,17 +11,24 @@ from .serializers import (AnnotationSerializer,
                           WindowAndDoorAnnotationSerializer, 
                           AnnotationMaterialSerializer, 
                           WallAnnotationMaterialSerializer,
-                          WindowAndDoorAnnotationMaterialSerializer)
+                          WindowAndDoorAnnotationMaterialSerializer,
+                          without_json_coordinates)
 from config.permissions import IsEstimator
 from plans.utils import compute_sqft, polygon_dimension
 from rest_framework.response import Response
 from users.models import Role
 from rest_framework.views import APIView
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from materials.models import Material
 from estimators.models import EstimatorRequest
 import numpy as np
+import uuid
 from estimators.utils import compute_wall_dimensions
+from plans.models import BlueprintImage
+from . import assign, bulk, spatial, summary
+from plans.models import Blueprint
+from projects.models import Project
 
 class AnnotationViewSet(viewsets.ModelViewSet):
     serializer_class = AnnotationSerializer
@@ -29,9 +36,10 @@ class AnnotationViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = without_json_coordinates(Annotation.objects.all(), self.request)
         if user.role == Role.ESTIMATOR:
-            return Annotation.objects.all()
-        return Annotation.objects.filter(
+            return queryset
+        return queryset.filter(
             blueprint__blueprint__project__owner=user
         )
     
@@ -72,9 +80,10 @@ class WallAnnotationViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = without_json_coordinates(WallAnnotation.objects.all(), self.request)
         if user.role == Role.ESTIMATOR:
-            return WallAnnotation.objects.all()
-        return WallAnnotation.objects.filter(
+            return queryset
+        return queryset.filter(
             blueprint__blueprint__project__owner=user
         )
     
@@ -90,6 +99,7 @@ class WallAnnotationViewSet(viewsets.ModelViewSet):
         else:
             raise PermissionDenied("You do not have permission to add wall annotations to this image.")
 
+    @transaction.atomic
     def perform_update(self, serializer):
         blueprint = serializer.instance.blueprint
         if blueprint.blueprint.project.owner == self.request.user or self.request.user.role == Role.ESTIMATOR:
@@ -121,9 +131,10 @@ class WindowandDoorAnnotationViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = without_json_coordinates(WindowAndDoorAnnotation.objects.all(), self.request)
         if user.role == Role.ESTIMATOR:
-            return WindowAndDoorAnnotation.objects.all()
-        return WindowAndDoorAnnotation.objects.filter(
+            return queryset
+        return queryset.filter(
             blueprint__blueprint__project__owner=user
         )
     
@@ -138,6 +149,7 @@ class WindowandDoorAnnotationViewSet(viewsets.ModelViewSet):
         else:
             raise PermissionDenied("You are not allowed to add window & door annotations to this image.")
     
+    @transaction.atomic
     def perform_update(self, serializer):
         blueprint = serializer.instance.blueprint
         user = self.request.user
@@ -168,6 +180,148 @@ class WindowandDoorAnnotationViewSet(viewsets.ModelViewSet):
         else:
             raise PermissionDenied("You are not allowed to delete window & door annotations on this image.")
 
+class BulkAnnotationView(APIView):
+    """
+    Create many annotations of one kind on a blueprint image in one request:
+    {"blueprint": <image id>, "kind": "room" | "wall" | "window_and_door",
+    "annotations": [{"label", "coordinates", "annotation_type"}, ...]}.
+    Measurements are computed from the image's DPI and scale, as for single
+    creates. Either every annotation is created or none is.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsEstimator]
+
+    def post(self, request):
+        kind = request.data.get('kind')
+        rows = request.data.get('annotations')
+        if kind not in bulk.KINDS:
+            raise ValidationError({"kind": [f"Must be one of: {', '.join(bulk.KINDS)}."]})
+        if not isinstance(rows, list) or not rows:
+            raise ValidationError({"annotations": ["Provide a non-empty list of annotations."]})
+        if len(rows) > bulk.MAX_BULK_ANNOTATIONS:
+            raise ValidationError({"annotations": [f"At most {bulk.MAX_BULK_ANNOTATIONS} annotations per request."]})
+
+        try:
+            blueprint_id = uuid.UUID(str(request.data.get('blueprint')))
+        except ValueError:
+            raise ValidationError({"blueprint": ["A valid blueprint image id is required."]})
+        blueprint = get_object_or_404(BlueprintImage.objects.select_related('blueprint__project'), pk=blueprint_id)
+        if not (blueprint.blueprint.project.owner == request.user or request.user.role == Role.ESTIMATOR):
+            raise PermissionDenied("You cannot add annotations to this image.")
+
+        cleaned = bulk.measure_rows(kind, bulk.validate_rows(kind, rows), blueprint.dpi, blueprint.scale)
+        instances = bulk.insert_annotations(kind, blueprint, cleaned)
+        return Response(
+            {"created": len(instances), "ids": [str(instance.id) for instance in instances]},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class AnnotationViewportView(APIView):
+    """
+    Annotations of one blueprint image that intersect a pixel rectangle:
+    ``?x0=&y0=&x1=&y1=`` in page pixels, optionally ``&zoom=`` (screen pixels
+    per page pixel) to drop and simplify shapes too small to see, ``&kinds=``
+    (comma separated, default all) and ``&coords=`` as for the other
+    annotation endpoints. The response uses the keys of the image detail view.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    # kind: (response key, serializer, materials relation)
+    KINDS = {
+        bulk.ROOM: ('annotations', AnnotationSerializer, 'annotation_materials'),
+        bulk.WALL: ('wall_annotations', WallAnnotationSerializer, 'wall_annotation_materials'),
+        bulk.WINDOW_AND_DOOR: (
+            'window_and_door_annotations',
+            WindowAndDoorAnnotationSerializer,
+            'window_and_door_annotation_materials',
+        ),
+    }
+
+    def _number(self, request, name, required=True):
+        value = request.query_params.get(name)
+        if value is None and not required:
+            return None
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValidationError({name: ["A number is required."]})
+        if not np.isfinite(number):
+            raise ValidationError({name: ["A finite number is required."]})
+        return number
+
+    def get(self, request, blueprint_id):
+        x0, y0, x1, y1 = (self._number(request, name) for name in ('x0', 'y0', 'x1', 'y1'))
+        if x1 < x0 or y1 < y0:
+            raise ValidationError({"detail": "x1 and y1 must not be less than x0 and y0."})
+        zoom = self._number(request, 'zoom', required=False)
+        if zoom is not None and zoom <= 0:
+            raise ValidationError({"zoom": ["Must be greater than 0."]})
+        kinds = request.query_params.get('kinds')
+        kinds = kinds.split(',') if kinds else list(self.KINDS)
+        unknown = [kind for kind in kinds if kind not in self.KINDS]
+        if unknown:
+            raise ValidationError({"kinds": [f"Must be a subset of: {', '.join(self.KINDS)}."]})
+
+        blueprint = get_object_or_404(BlueprintImage.objects.select_related('blueprint__project'), pk=blueprint_id)
+        if not (blueprint.blueprint.project.owner == request.user or request.user.role == Role.ESTIMATOR):
+            raise PermissionDenied("You cannot view annotations on this image.")
+
+        tolerance = spatial.simplify_tolerance(zoom)
+        context = {'request': request, 'simplify_tolerance': tolerance}
+        response_data = {"viewport": [x0, y0, x1, y1], "zoom": zoom}
+        for kind in kinds:
+            key, serializer_class, materials = self.KINDS[kind]
+            queryset = spatial.intersecting(
+                without_json_coordinates(bulk.MODELS[kind].objects.filter(blueprint=blueprint), request),
+                x0, y0, x1, y1, min_size=tolerance,
+            ).prefetch_related(f'{materials}__material__subcategory__category')
+            response_data[key] = serializer_class(queryset, many=True, context=context).data
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+class TakeoffSummaryView(APIView):
+    """
+    Takeoff totals from the materialized summaries for one of ``?project=``,
+    ``?blueprint=`` or ``?image=``, grouped by ``?group_by=material`` (default),
+    ``division``, ``label`` or ``unit``. Each row carries the quantity and its
+    cost at the material's current price; ``total_cost`` sums them.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    # query parameter: (model, summary column, path to the project owner)
+    SCOPES = {
+        'project': (Project, 'project_id', 'owner'),
+        'blueprint': (Blueprint, 'blueprint_id', 'project__owner'),
+        'image': (BlueprintImage, 'image_id', 'blueprint__project__owner'),
+    }
+
+    def get(self, request):
+        group_by = request.query_params.get('group_by', 'material')
+        if group_by not in summary.GROUPINGS:
+            raise ValidationError({"group_by": [f"Must be one of: {', '.join(summary.GROUPINGS)}."]})
+        given = [scope for scope in self.SCOPES if request.query_params.get(scope)]
+        if len(given) != 1:
+            raise ValidationError({"detail": f"Give exactly one of: {', '.join(self.SCOPES)}."})
+        scope = given[0]
+        model, column, owner_path = self.SCOPES[scope]
+        try:
+            pk = uuid.UUID(request.query_params[scope])
+        except ValueError:
+            raise ValidationError({scope: ["A valid id is required."]})
+
+        owner_id = get_object_or_404(model.objects.values_list(f'{owner_path}_id', flat=True), pk=pk)
+        if not (owner_id == request.user.pk or request.user.role == Role.ESTIMATOR):
+            raise PermissionDenied("You cannot view the takeoff of this project.")
+
+        rows = summary.summarize(group_by, **{column: pk})
+        return Response({
+            scope: str(pk),
+            "group_by": group_by,
+            "rows": rows,
+            "total_cost": sum(row["cost"] for row in rows),
+        }, status=status.HTTP_200_OK)
+
+
 class BaseAnnotationMaterialView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -206,6 +360,7 @@ class BaseAnnotationMaterialView(APIView):
         serializer = self.serializer_class(materials_qs, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @transaction.atomic
     def post(self, request, **kwargs):
         annotation = self._get_annotation(kwargs)
         if not self._is_estimator_assigned(request.user, annotation):
@@ -244,6 +399,7 @@ class BaseAnnotationMaterialView(APIView):
 
         return Response(result, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
+    @transaction.atomic
     def patch(self, request, material_id, **kwargs):
         annotation = self._get_annotation(kwargs)
         if not self._is_estimator_assigned(request.user, annotation):
@@ -315,3 +471,83 @@ class WindowAndDoorAnnotationMaterialView(BaseAnnotationMaterialView):
     annotation_lookup_kwarg = 'window_and_door_annotation_id'
     serializer_class = WindowAndDoorAnnotationMaterialSerializer
 
+
+
+class BulkAnnotationMaterialView(APIView):
+    """
+    Assign materials to many annotations of one kind in one request:
+    {"kind": "room" | "wall" | "window_and_door", "materials": [<material id>, ...],
+    "annotations": [<annotation id>, ...]} or, for every annotation of the kind
+    on a page, "blueprint": <image id> with an optional "label" filter.
+    Optional "quantity" and "notes" apply to every new link; without a quantity
+    rooms and walls take their area. Pairs already linked are left as they are.
+    The estimator must be assigned to every page involved.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def _ids(self, values, field):
+        if not isinstance(values, list) or not values:
+            raise ValidationError({field: ["Provide a non-empty list of ids."]})
+        try:
+            return list(dict.fromkeys(uuid.UUID(str(value)) for value in values))
+        except ValueError:
+            raise ValidationError({field: ["Every id must be a valid UUID."]})
+
+    def _annotations(self, request, kind):
+        model = bulk.MODELS[kind]
+        if request.data.get('blueprint'):
+            try:
+                blueprint_id = uuid.UUID(str(request.data['blueprint']))
+            except ValueError:
+                raise ValidationError({"blueprint": ["A valid blueprint image id is required."]})
+            queryset = model.objects.filter(blueprint_id=blueprint_id)
+            if request.data.get('label'):
+                queryset = queryset.filter(label=request.data['label'])
+            return dict(queryset.values_list('pk', 'blueprint_id'))
+
+        annotation_ids = self._ids(request.data.get('annotations'), 'annotations')
+        pages = dict(model.objects.filter(pk__in=annotation_ids).values_list('pk', 'blueprint_id'))
+        missing = [str(pk) for pk in annotation_ids if pk not in pages]
+        if missing:
+            raise ValidationError({"annotations": [f"Unknown {kind} annotations: {', '.join(missing)}."]})
+        return pages
+
+    def post(self, request):
+        kind = request.data.get('kind')
+        if kind not in bulk.KINDS:
+            raise ValidationError({"kind": [f"Must be one of: {', '.join(bulk.KINDS)}."]})
+        material_ids = self._ids(request.data.get('materials'), 'materials')
+        quantity = request.data.get('quantity')
+        if quantity is not None:
+            try:
+                quantity = float(quantity)
+            except (TypeError, ValueError):
+                raise ValidationError({"quantity": ["A valid number is required."]})
+            if not np.isfinite(quantity):
+                raise ValidationError({"quantity": ["A finite number is required."]})
+        notes = request.data.get('notes') or None
+
+        pages = self._annotations(request, kind)
+        if not pages:
+            raise ValidationError({"annotations": ["No annotations to assign materials to."]})
+        if len(pages) * len(material_ids) > assign.MAX_BULK_LINKS:
+            raise ValidationError({"detail": f"At most {assign.MAX_BULK_LINKS} annotation and material pairs per request."})
+
+        found = set(Material.objects.filter(pk__in=material_ids).values_list('pk', flat=True))
+        missing = [str(pk) for pk in material_ids if pk not in found]
+        if missing:
+            raise ValidationError({"materials": [f"Unknown materials: {', '.join(missing)}."]})
+
+        image_ids = set(pages.values())
+        assigned = set(
+            EstimatorRequest.objects.filter(assigned_estimator=request.user, image_id__in=image_ids)
+            .values_list('image_id', flat=True)
+        )
+        if assigned != image_ids:
+            raise PermissionDenied("Access denied.")
+
+        created, existing = assign.assign_materials(kind, list(pages), material_ids, image_ids, quantity, notes)
+        return Response(
+            {"created": created, "already_assigned": existing, "annotations": len(pages), "materials": len(material_ids)},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
@@ -1,11 +1,55 @@
 import os
 from celery import Celery
+from kombu import Queue
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.production')
 app = Celery('config')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.conf.broker_url = 'redis://localhost:6379/0'
+
+# Task queues. Each is served by its own worker profile (see docker-compose.yml)
+# so that a verification email never waits behind a 200-page PDF:
+#   rasterize  prefork   PDF rendering, scale OCR (it runs inside page rendering) and tiling, CPU bound
+#   inference  threads   YOLO models loaded once per worker and shared by its threads
+#   email      threads   SendGrid calls, I/O bound
+#   default    prefork   everything else (spreadsheet imports, re-measurement)
+# A worker started without -Q consumes every queue, as before.
+DEFAULT_QUEUE = 'default'
+RASTERIZE_QUEUE = 'rasterize'
+INFERENCE_QUEUE = 'inference'
+EMAIL_QUEUE = 'email'
+
+TASK_QUEUES = {
+    RASTERIZE_QUEUE: ('process_blueprint', 'process_page', 'finalize_blueprint', 'fail_blueprint', 'tile_page'),
+    INFERENCE_QUEUE: (
+        'create_annotation',
+        'create_wall_annotation',
+        'create_window_and_door_annotation',
+        'create_all_annotations',
+    ),
+    EMAIL_QUEUE: (
+        'send_email_verification',
+        'send_rest_password_email',
+        'send_book_demo',
+        'estimator_request',
+        'assigned_estimator',
+        'send_email_to_user_after_annotation',
+    ),
+}
+
+app.conf.task_queues = [Queue(name) for name in (DEFAULT_QUEUE, *TASK_QUEUES)]
+app.conf.task_default_queue = DEFAULT_QUEUE
+app.conf.task_routes = {
+    task: {'queue': queue} for queue, tasks in TASK_QUEUES.items() for task in tasks
+}
+
 app.autodiscover_tasks()
 
+
+def worker_consumes(sender, queue):
+    """Whether the worker behind a worker signal ``sender`` consumes ``queue``."""
+    return queue in sender.app.amqp.queues.consume_from
+
+
 import estimators.celery_signals
-import plans.celery_signals
\ No newline at end of file
+import plans.celery_signals
@@ -0,0 +1,188 @@
+"""
+Outgoing email.
+
+The email tasks used to build a new SendGridAPIClient for every message,
+whose urllib client opens a fresh TLS connection each time and has no
+timeout. Messages now go through one transport per worker process:
+
+    sendgrid  SendGrid's v3 API over a requests Session; its keep-alive
+              connection pool is shared by every thread of the email worker
+    django    Django's EMAIL_BACKEND; with the locmem backend this is the
+              local stub for tests (django.core.mail.outbox), with the
+              console backend messages are printed during development
+
+EMAIL_TRANSPORT picks one. send_many() delivers a batch: messages that differ
+only by recipient become one SendGrid request with a personalization each,
+and the django transport sends the whole batch over one connection.
+
+Images are not attached at full size: image_preview() makes a small JPEG,
+decoded at reduced resolution, to send along with a link to the original.
+"""
+import base64
+import io
+import os
+import threading
+import requests
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils.html import strip_tags
+from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SENDGRID = "sendgrid"
+DJANGO = "django"
+TRANSPORTS = (SENDGRID, DJANGO)
+
+SENDGRID_URL = "https://api.sendgrid.com/v3/mail/send"
+# SendGrid takes at most 1000 personalizations per request
+MAX_PERSONALIZATIONS = 1000
+# Responses meaning SendGrid did not accept the message, so it is safe to post
+# again. A 502 or 504 comes from a proxy that may already have handed the
+# message on, so those are not retried: a retry could send it twice.
+RETRY_STATUSES = (429, 503)
+
+PREVIEW_SIZE = (800, 800)
+PREVIEW_QUALITY = 80
+
+
+def message(to, subject, html=None, text=None, from_email=None, reply_to=None, attachments=()):
+    """
+    An email as a dict. ``to`` is an address or a list of addresses and each
+    attachment a (file name, content bytes, MIME type) tuple.
+    """
+    return {
+        "to": [to] if isinstance(to, str) else list(to),
+        "subject": subject,
+        "html": html,
+        "text": text,
+        "from_email": from_email or settings.EMAIL_HOST_USER,
+        "reply_to": reply_to,
+        "attachments": [tuple(attachment) for attachment in attachments],
+    }
+
+
+class SendGridTransport:
+    """Posts to SendGrid's v3 API through one pooled, keep-alive HTTP session."""
+
+    def __init__(self, api_key, pool_size=10, timeout=10):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+        # Connection errors are retried (nothing was sent yet), read errors are not
+        retry = Retry(
+            total=3, connect=3, read=0, other=0, status=3,
+            backoff_factor=0.5, status_forcelist=RETRY_STATUSES, allowed_methods=None,
+        )
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry))
+
+    def _payload(self, batch):
+        first = batch[0]
+        content = []
+        if first["text"]:
+            content.append({"type": "text/plain", "value": first["text"]})
+        if first["html"]:
+            content.append({"type": "text/html", "value": first["html"]})
+        payload = {
+            "personalizations": [{"to": [{"email": address} for address in msg["to"]]} for msg in batch],
+            "from": {"email": first["from_email"]},
+            "subject": first["subject"],
+            "content": content,
+        }
+        if first["reply_to"]:
+            payload["reply_to"] = {"email": first["reply_to"]}
+        if first["attachments"]:
+            payload["attachments"] = [
+                {"content": base64.b64encode(data).decode(), "filename": name, "type": mimetype, "disposition": "attachment"}
+                for name, data, mimetype in first["attachments"]
+            ]
+        return payload
+
+    def send_messages(self, messages):
+        groups = {}
+        for msg in messages:
+            key = (msg["from_email"], msg["subject"], msg["html"], msg["text"], msg["reply_to"], tuple(msg["attachments"]))
+            groups.setdefault(key, []).append(msg)
+        sent = 0
+        for group in groups.values():
+            for start in range(0, len(group), MAX_PERSONALIZATIONS):
+                batch = group[start:start + MAX_PERSONALIZATIONS]
+                response = self.session.post(SENDGRID_URL, json=self._payload(batch), timeout=self.timeout)
+                response.raise_for_status()
+                sent += len(batch)
+        return sent
+
+    def close(self):
+        self.session.close()
+
+
+class DjangoTransport:
+    """Hands messages to Django's EMAIL_BACKEND, a batch per connection."""
+
+    def send_messages(self, messages):
+        emails = []
+        for msg in messages:
+            email = EmailMultiAlternatives(
+                subject=msg["subject"],
+                body=msg["text"] or strip_tags(msg["html"] or ""),
+                from_email=msg["from_email"],
+                to=msg["to"],
+                reply_to=[msg["reply_to"]] if msg["reply_to"] else None,
+            )
+            if msg["html"]:
+                email.attach_alternative(msg["html"], "text/html")
+            for name, data, mimetype in msg["attachments"]:
+                email.attach(name, data, mimetype)
+            emails.append(email)
+        with get_connection() as connection:
+            return connection.send_messages(emails) or 0
+
+    def close(self):
+        pass
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport():
+    """The EMAIL_TRANSPORT transport, created once per process and shared by its threads."""
+    name = settings.EMAIL_TRANSPORT
+    if name not in TRANSPORTS:
+        raise ValueError(f"Unknown email transport: {name}")
+    with _transports_lock:
+        if name not in _transports:
+            if name == SENDGRID:
+                _transports[name] = SendGridTransport(
+                    settings.SEND_GRID_API_KEY, settings.EMAIL_POOL_SIZE, settings.EMAIL_TIMEOUT
+                )
+            else:
+                _transports[name] = DjangoTransport()
+    return _transports[name]
+
+
+def send_many(messages):
+    """Deliver ``messages`` (from message()) as a batch. Returns how many were sent."""
+    messages = list(messages)
+    return get_transport().send_messages(messages) if messages else 0
+
+
+def send(msg):
+    """Deliver one message; True once the transport has accepted it."""
+    return send_many([msg]) == 1
+
+
+def image_preview(path, size=PREVIEW_SIZE, quality=PREVIEW_QUALITY):
+    """
+    A JPEG preview of the image at ``path`` as an attachment tuple. JPEGs are
+    decoded at a fraction of their resolution (draft mode), so a large scan
+    never needs its full-size bitmap in memory.
+    """
+    with Image.open(path) as image:
+        image.draft("RGB", size)
+        preview = image.convert("RGB")
+    preview.thumbnail(size)
+    buffer = io.BytesIO()
+    preview.save(buffer, format="JPEG", quality=quality, optimize=True)
+    name = f"{os.path.splitext(os.path.basename(path))[0]}_preview.jpg"
+    return name, buffer.getvalue(), "image/jpeg"
@@ -215,7 +215,77 @@ REST_AUTH = {
 }
 
 DATA_UPLOAD_MAX_MEMORY_SIZE = 262144000  # 250MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 262144000  # 250MB
+# Uploads above 2.5MB are streamed to a temporary file instead of being held in
+# the web worker's memory; the storage backend then moves that file into MEDIA_ROOT.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB
+FILE_UPLOAD_TEMP_DIR = config("FILE_UPLOAD_TEMP_DIR", default=None)
+
+
+# Blueprint page processing
+# "sequential" renders one page per poppler call inside the Celery task.
+# "pipelined" renders page ranges in a process pool and overlaps OCR / JPEG
+# encoding with rendering; the stored pages are identical. Prefork worker
+# children are daemonic and cannot start that pool, so under --pool=prefork
+# (the rasterize profile) pages are rendered in the task's own process; run
+# the rasterize worker with --pool=solo or threads to get the overlap.
+# "fanout" dispatches one process_page task per page range and lets a chord
+# callback set the blueprint status, so pages spread across the worker fleet.
+BLUEPRINT_PROCESSING_MODE = config("BLUEPRINT_PROCESSING_MODE", default="sequential")
+BLUEPRINT_PIPELINE_WORKERS = config("BLUEPRINT_PIPELINE_WORKERS", default=2, cast=int)
+BLUEPRINT_PIPELINE_PAGES_PER_TASK = config("BLUEPRINT_PIPELINE_PAGES_PER_TASK", default=4, cast=int)
+# Upper bound on rendered pages held in memory (workers + pages waiting to be stored)
+BLUEPRINT_PIPELINE_MAX_IN_FLIGHT_PAGES = config("BLUEPRINT_PIPELINE_MAX_IN_FLIGHT_PAGES", default=8, cast=int)
+BLUEPRINT_FANOUT_PAGES_PER_TASK = config("BLUEPRINT_FANOUT_PAGES_PER_TASK", default=1, cast=int)
+
+# Scale OCR
+# "subprocess" starts a tesseract process per image (PNG round trip).
+# "persistent" keeps tesseract loaded in-process via tesserocr (pip install tesserocr)
+# and falls back to "subprocess" when the bindings are missing.
+OCR_ENGINE = config("OCR_ENGINE", default="subprocess")
+OCR_POOL_WORKERS = config("OCR_POOL_WORKERS", default=2, cast=int)
+OCR_LANGUAGE = config("OCR_LANGUAGE", default="eng")
+
+# Rendered pages are cached by content hash under MEDIA_ROOT/page_cache so that
+# identical pages in later uploads are linked instead of re-rendered. The least
+# recently used pages are evicted once the cache grows past PAGE_CACHE_MAX_BYTES.
+PAGE_CACHE_ENABLED = config("PAGE_CACHE_ENABLED", default=True, cast=bool)
+PAGE_CACHE_MAX_BYTES = config("PAGE_CACHE_MAX_BYTES", default=5 * 1024 ** 3, cast=int)
+
+# Deep zoom pyramids (plans.pyramid): every processed page also gets
+# PAGE_TILE_SIZE tiles at each zoom level and a PAGE_THUMBNAIL_SIZE thumbnail
+# under MEDIA_ROOT/blueprints/tiles, served with year-long cache headers.
+PAGE_TILES_ENABLED = config("PAGE_TILES_ENABLED", default=True, cast=bool)
+PAGE_TILE_SIZE = config("PAGE_TILE_SIZE", default=256, cast=int)
+PAGE_TILE_OVERLAP = config("PAGE_TILE_OVERLAP", default=1, cast=int)
+PAGE_TILE_QUALITY = config("PAGE_TILE_QUALITY", default=80, cast=int)
+PAGE_THUMBNAIL_SIZE = config("PAGE_THUMBNAIL_SIZE", default=512, cast=int)
+PAGE_TILE_MAX_AGE = config("PAGE_TILE_MAX_AGE", default=365 * 24 * 3600, cast=int)
+
+# Page renditions (plans.renditions): downsized WebP/JPEG copies of the pages,
+# made on first request and kept in RENDITION_CACHE_DIR (MEDIA_ROOT/renditions
+# when empty). The least recently used are evicted past RENDITION_CACHE_MAX_BYTES.
+RENDITION_CACHE_DIR = config("RENDITION_CACHE_DIR", default="")
+RENDITION_CACHE_MAX_BYTES = config("RENDITION_CACHE_MAX_BYTES", default=1024 ** 3, cast=int)
+RENDITION_FORMAT = config("RENDITION_FORMAT", default="webp")
+RENDITION_QUALITY = config("RENDITION_QUALITY", default=80, cast=int)
+RENDITION_MAX_AGE = config("RENDITION_MAX_AGE", default=365 * 24 * 3600, cast=int)
+
+# YOLO inference (plans.inference). Images submitted to the same model within
+# INFERENCE_MAX_WAIT_MS of each other are run as one batch of up to
+# INFERENCE_MAX_BATCH_SIZE. Batches only fill across tasks when the worker runs
+# tasks concurrently (--pool=threads); INFERENCE_MAX_BATCH_SIZE=1 disables batching.
+INFERENCE_MAX_BATCH_SIZE = config("INFERENCE_MAX_BATCH_SIZE", default=4, cast=int)
+INFERENCE_MAX_WAIT_MS = config("INFERENCE_MAX_WAIT_MS", default=25, cast=int)
+
+# Tiled inference: run the models over overlapping INFERENCE_TILE_SIZE tiles of
+# the full-resolution page instead of letting YOLO downscale the whole sheet.
+# Detections cut by a seam are merged back together. INFERENCE_TILE_WORKERS
+# tiles per model are in flight (and in memory) at a time, so set it to at
+# least INFERENCE_MAX_BATCH_SIZE for full batches.
+INFERENCE_TILING = config("INFERENCE_TILING", default=False, cast=bool)
+INFERENCE_TILE_SIZE = config("INFERENCE_TILE_SIZE", default=1280, cast=int)
+INFERENCE_TILE_OVERLAP = config("INFERENCE_TILE_OVERLAP", default=256, cast=int)
+INFERENCE_TILE_WORKERS = config("INFERENCE_TILE_WORKERS", default=4, cast=int)
 
 
 # UNFOLD = {
@@ -8,4 +8,11 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL')
 
-SEND_GRID_API_KEY = config('SEND_GRID_API_KEY')
\ No newline at end of file
+SEND_GRID_API_KEY = config('SEND_GRID_API_KEY')
+
+# Transport used by config.mail: "sendgrid", or "django" to go through
+# EMAIL_BACKEND (the locmem backend in tests, the console backend locally)
+EMAIL_TRANSPORT = config('EMAIL_TRANSPORT', default='sendgrid')
+# Keep-alive connections per email worker process and the per-request timeout (seconds)
+EMAIL_POOL_SIZE = config('EMAIL_POOL_SIZE', default=10, cast=int)
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=float)
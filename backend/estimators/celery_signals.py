@@ -1,7 +1,11 @@
 from celery.signals import worker_ready
 from .utils import get_wall_model, get_window_and_door_model
 
-def preload_models(**kwargs):
+def preload_models(sender=None, **kwargs):
+    # Only workers that run inference keep the models in memory
+    from config.celery import INFERENCE_QUEUE, worker_consumes
+    if sender is not None and not worker_consumes(sender, INFERENCE_QUEUE):
+        return
     print("Preloading Wall and Windows and Doors AI models in Celery worker")
     get_wall_model()
     get_window_and_door_model()
@@ -0,0 +1,73 @@
+"""
+JSON-ready data from pandas DataFrames.
+
+JSON has no NaN, NaT or infinities and json.dumps does not know numpy
+scalars, so spreadsheet frames are cleaned before they are stored or sent.
+Each column is converted in one pass: numeric columns through numpy, with
+non-finite values masked to None, and other columns through pandas' null
+mask. ndarray.tolist() then turns numpy scalars into Python ones, and rows
+are zipped from the column lists instead of being built cell by cell.
+
+Two layouts are offered:
+
+    records  [{column: value, ...}, ...]   one dict per row
+    columns  {column: [value, ...], ...}   one list per column
+
+The columnar layout names each column once instead of once per row, so it is
+smaller and quicker to encode and parse for long sheets.
+"""
+import numpy as np
+import pandas as pd
+
+RECORDS = "records"
+COLUMNS = "columns"
+LAYOUTS = (RECORDS, COLUMNS)
+
+INFINITIES = [np.inf, -np.inf]
+
+
+def column_values(series):
+    """A Series as a list of JSON-ready Python values, nulls and +/-inf as None."""
+    values = series.to_numpy()
+    kind = values.dtype.kind
+    if kind in "biu":
+        return values.tolist()
+    if kind == "f":
+        missing = ~np.isfinite(values)
+        if not missing.any():
+            return values.tolist()
+        values = values.astype(object)
+    else:
+        # Strings, mixed columns, datetimes (as Timestamps) and nullable extension dtypes
+        values = series.to_numpy(dtype=object, copy=True)
+        missing = pd.isna(values)
+        if kind == "O":
+            missing |= series.isin(INFINITIES).to_numpy(dtype=bool)
+        if not missing.any():
+            return values.tolist()
+    values[missing] = None
+    return values.tolist()
+
+
+def json_columns(frame):
+    """``frame`` as {column: [values]}."""
+    return {column: column_values(frame.iloc[:, i]) for i, column in enumerate(frame.columns)}
+
+
+def json_records(frame):
+    """``frame`` as [{column: value}], one dict per row."""
+    columns = list(frame.columns)
+    values = [column_values(frame.iloc[:, i]) for i in range(len(columns))]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def encode_frame(frame, layout=RECORDS):
+    """``frame`` in the given layout (RECORDS or COLUMNS)."""
+    if layout not in LAYOUTS:
+        raise ValueError(f"layout must be one of {', '.join(LAYOUTS)}")
+    return json_columns(frame) if layout == COLUMNS else json_records(frame)
+
+
+def columns_from_records(columns, records):
+    """Already cleaned records (e.g. stored rows) in the columnar layout."""
+    return {column: [record.get(column) for record in records] for column in columns}
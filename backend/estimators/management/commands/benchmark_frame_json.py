@@ -0,0 +1,88 @@
+import json
+import math
+import time
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from estimators.frame_json import json_columns, json_records
+
+
+def per_cell_records(df):
+    """The per-cell cleaning the spreadsheet views used before estimators.frame_json."""
+    df = df.replace([np.inf, -np.inf], np.nan)
+    for col in df.columns:
+        if df[col].dtype in ["float64", "float32", "int64", "int32"]:
+            df[col] = df[col].apply(
+                lambda x: None if pd.isna(x) or (isinstance(x, float) and (math.isnan(x) or math.isinf(x))) else x
+            )
+        else:
+            df[col] = df[col].apply(lambda x: None if pd.isna(x) else x)
+    return df.to_dict(orient="records")
+
+
+def without_nan(records):
+    # apply() turns the per-cell None back into NaN in float columns, so NaN counts as None
+    return [{k: None if isinstance(v, float) and math.isnan(v) else v for k, v in row.items()} for row in records]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time JSON cleaning of an estimator-style sheet: the old per-cell lambdas against "
+        "estimators.frame_json's column-wise records and columnar layouts, and check they agree."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000)
+        parser.add_argument("--missing", type=float, default=0.1, help="Share of empty numeric cells")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def sheet(self, rows, missing, rng):
+        quantity = rng.uniform(0, 5000, rows).round(2)
+        quantity[rng.random(rows) < missing] = np.nan
+        quantity[rng.random(rows) < missing / 100] = np.inf
+        notes = np.where(rng.random(rows) < 0.7, None, "verify on site").astype(object)
+        return pd.DataFrame({
+            "CSI Division": rng.choice(["03", "06", "08", "09", "26"], rows),
+            "Description": [f"Item {i}" for i in range(rows)],
+            "Unit": rng.choice(["sqft", "lf", "ea", "cy"], rows),
+            "Quantity": quantity,
+            "Notes": notes,
+            "Line": np.arange(rows),
+        })
+
+    def timed(self, function, frame, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = function(frame)
+        return result, (time.perf_counter() - started) / repeat
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        frame = self.sheet(options["rows"], options["missing"], rng)
+        repeat = options["repeat"]
+
+        legacy, legacy_seconds = self.timed(per_cell_records, frame, repeat)
+        records, records_seconds = self.timed(json_records, frame, repeat)
+        columns, columns_seconds = self.timed(json_columns, frame, repeat)
+        if records != without_nan(legacy):
+            raise CommandError("Column-wise records differ from the per-cell cleaning")
+        if any(columns[name] != [row[name] for row in records] for name in frame.columns):
+            raise CommandError("Columnar layout differs from the records")
+
+        rows = len(frame)
+        self.stdout.write(f"{rows} rows x {len(frame.columns)} columns, mean of {repeat} run(s)")
+        self.stdout.write(f"  per-cell     {legacy_seconds * 1000:8.1f} ms ({rows / legacy_seconds:10.0f} rows/s)")
+        for name, seconds in (("records", records_seconds), ("columns", columns_seconds)):
+            self.stdout.write(
+                f"  {name:<12} {seconds * 1000:8.1f} ms ({rows / seconds:10.0f} rows/s) - "
+                f"{legacy_seconds / seconds:.1f}x"
+            )
+        for name, data in (("records", records), ("columns", columns)):
+            started = time.perf_counter()
+            encoded = json.dumps(data, cls=DjangoJSONEncoder)
+            self.stdout.write(
+                f"  json.dumps {name:<8} {(time.perf_counter() - started) * 1000:8.1f} ms, {len(encoded) / 1e6:.1f} MB"
+            )
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.2 on 2026-10-17 18:02
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_csv_data_to_rows(apps, schema_editor):
+    extra_info_model = apps.get_model("estimators", "BlueprintExtraInfo")
+    row_model = apps.get_model("estimators", "BlueprintExtraInfoRow")
+    for extra_info in extra_info_model.objects.iterator(chunk_size=100):
+        records = extra_info.csv_data or []
+        row_model.objects.bulk_create(
+            (row_model(extra_info=extra_info, index=index, data=record) for index, record in enumerate(records)),
+            batch_size=2000,
+        )
+        extra_info.columns = list(records[0]) if records else []
+        extra_info.status = "complete"
+        extra_info.total_rows = extra_info.processed_rows = len(records)
+        extra_info.save(update_fields=["columns", "status", "total_rows", "processed_rows"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estimators', '0003_alter_blueprintextrainfo_csv_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blueprintextrainfo',
+            name='columns',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='blueprintextrainfo',
+            name='error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='blueprintextrainfo',
+            name='file_name',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='blueprintextrainfo',
+            name='processed_rows',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='blueprintextrainfo',
+            name='source_file',
+            field=models.FileField(blank=True, null=True, upload_to='imports/extra_info/'),
+        ),
+        migrations.AddField(
+            model_name='blueprintextrainfo',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('complete', 'Complete'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='blueprintextrainfo',
+            name='total_rows',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='BlueprintExtraInfoRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('extra_info', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rows', to='estimators.blueprintextrainfo')),
+            ],
+            options={
+                'verbose_name': 'Blueprint Extra Info Row',
+                'verbose_name_plural': 'Blueprint Extra Info Rows',
+                'ordering': ['index'],
+                'unique_together': {('extra_info', 'index')},
+            },
+        ),
+        migrations.RunPython(move_csv_data_to_rows, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='blueprintextrainfo',
+            name='csv_data',
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from plans.models import BlueprintImage
 from users.models import CustomUser
@@ -40,6 +41,17 @@ class EstimatorRequest(models.Model):
         verbose_name_plural = "Estimator Requests"
 
 
+class ImportStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    PROCESSING = "processing", "Processing"
+    COMPLETE = "complete", "Complete"
+    FAILED = "failed", "Failed"
+
+
+# Columns an extra info spreadsheet must have; takeoff exports use the same names
+CSI_COLUMNS = ["CSI Division", "Description", "Unit", "Quantity", "Notes"]
+
+
 class BlueprintExtraInfo(models.Model):
     """Model to store extra information imported via CSV for blueprints"""
 
@@ -47,13 +59,16 @@ class BlueprintExtraInfo(models.Model):
     blueprint = models.OneToOneField(
         BlueprintImage, on_delete=models.CASCADE, related_name="extra_info"
     )
-    csv_data = models.JSONField(
-        null=True,  # allow null in DB
-        blank=True,  # allow blank forms
-        default=list,  # ensure default is a list, avoids DB errors
-        verbose_name="CSV Data",
-        help_text="Imported CSV data as JSON",
+    source_file = models.FileField(upload_to="imports/extra_info/", null=True, blank=True)
+    file_name = models.CharField(max_length=255, blank=True, default="")
+    columns = models.JSONField(default=list, blank=True)
+    # Rows are parsed into BlueprintExtraInfoRow by the import_extra_info task
+    status = models.CharField(
+        max_length=10, choices=ImportStatus.choices, default=ImportStatus.PENDING
     )
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    processed_rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
 
     imported_by = models.ForeignKey(
         CustomUser, on_delete=models.CASCADE, related_name="imported_csv_files"
@@ -68,3 +83,22 @@ class BlueprintExtraInfo(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Blueprint Extra Info"
         verbose_name_plural = "Blueprint Extra Info"
+
+
+class BlueprintExtraInfoRow(models.Model):
+    """One row of an imported extra info spreadsheet, keyed by column name"""
+
+    extra_info = models.ForeignKey(
+        BlueprintExtraInfo, on_delete=models.CASCADE, related_name="rows"
+    )
+    index = models.PositiveIntegerField()
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    def __str__(self):
+        return f"Row {self.index} of {self.extra_info}"
+
+    class Meta:
+        ordering = ["index"]
+        unique_together = ("extra_info", "index")
+        verbose_name = "Blueprint Extra Info Row"
+        verbose_name_plural = "Blueprint Extra Info Rows"
@@ -1,14 +1,18 @@
 from rest_framework import serializers
-from .models import EstimatorRequest, BlueprintExtraInfo
+from .models import EstimatorRequest, BlueprintExtraInfo, ImportStatus
+from .frame_json import COLUMNS, columns_from_records
+from plans.serializers import page_renditions
 
 
 class EstimatorRequestSerializer(serializers.ModelSerializer):
     requested_by = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = EstimatorRequest
         fields = [
             "image",
+            "image_renditions",
             "requested_by",
             "assigned_estimator",
             "status",
@@ -17,18 +21,53 @@ class EstimatorRequestSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["status", "created_at", "updated_at"]
 
+    def get_image_renditions(self, obj):
+        # Annotated by EstimatorImageListView, so the page itself is not loaded
+        image_name = getattr(obj, "image_name", None) or obj.image.image.name
+        return page_renditions(obj.image_id, image_name, self.context.get("request"))
+
 
 class BlueprintExtraInfoSerializer(serializers.ModelSerializer):
     imported_by = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    csv_data = serializers.SerializerMethodField()
+    progress = serializers.SerializerMethodField()
+
+    DEFAULT_PAGE_SIZE = 100
 
     class Meta:
         model = BlueprintExtraInfo
         fields = [
             "id",
             "blueprint",
+            "file_name",
+            "columns",
+            "status",
+            "total_rows",
+            "processed_rows",
+            "progress",
+            "error",
             "csv_data",
             "imported_by",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "created_at", "updated_at"]
+        read_only_fields = [
+            "id", "file_name", "columns", "status", "total_rows", "processed_rows", "error", "created_at", "updated_at",
+        ]
+
+    def get_csv_data(self, obj):
+        """One page of the imported rows (context "page", "page_size" and "layout"), only the data."""
+        page = self.context.get("page", 1)
+        page_size = self.context.get("page_size", self.DEFAULT_PAGE_SIZE)
+        start = (page - 1) * page_size
+        records = list(obj.rows.values_list("data", flat=True)[start:start + page_size])
+        if self.context.get("layout") == COLUMNS:
+            return columns_from_records(obj.columns, records)
+        return records
+
+    def get_progress(self, obj):
+        if obj.status == ImportStatus.COMPLETE:
+            return 1.0
+        if not obj.total_rows:
+            return 0.0
+        return round(min(obj.processed_rows / obj.total_rows, 1.0), 3)
@@ -0,0 +1,203 @@
+"""
+Estimator spreadsheets (CSV, XLS, XLSX/XLSM) read a chunk of rows at a time.
+
+CSV is parsed by pandas in chunks and XLSX/XLSM is streamed by openpyxl in
+read-only mode, so neither is held in memory whole; a preview parses only
+the rows it shows. XLS files can only be read whole (xlrd), then chunked.
+Rows are made JSON-ready by estimators.frame_json.
+
+import_extra_info_rows runs the background import: it stores every row of a
+BlueprintExtraInfo's uploaded file as a BlueprintExtraInfoRow, a chunk per
+query, and updates the import's progress as it goes. The file is parsed once:
+the row total shown while it runs is estimate_rows' guess, replaced by the
+exact count at the end.
+"""
+import codecs
+import itertools
+import pandas as pd
+
+from .frame_json import json_records
+from .models import BlueprintExtraInfo, BlueprintExtraInfoRow, ImportStatus
+
+try:
+    from openpyxl import load_workbook
+except ImportError:
+    load_workbook = None
+
+CSV = "csv"
+XLSX = "xlsx"
+XLS = "xls"
+FILE_TYPES = {".csv": CSV, ".xlsx": XLSX, ".xlsm": XLSX, ".xls": XLS}
+
+CHUNK_ROWS = 2000
+PREVIEW_ROWS = 10
+_ENCODING_PROBE_BYTES = 1 << 20
+
+
+def file_type(name):
+    """CSV, XLSX or XLS for a file name, or None for anything else."""
+    for extension, kind in FILE_TYPES.items():
+        if name.lower().endswith(extension):
+            return kind
+    return None
+
+
+def _csv_encoding(file):
+    """UTF-8 when the whole file decodes as UTF-8, else ISO-8859-1 (as the import views did)."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        for block in iter(lambda: file.read(_ENCODING_PROBE_BYTES), b""):
+            decoder.decode(block)
+        decoder.decode(b"", final=True)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "ISO-8859-1"
+    finally:
+        file.seek(0)
+
+
+def _header(values):
+    """Column names as pandas gives them: blanks become "Unnamed: i", repeats get ".1", ".2"."""
+    columns, seen = [], {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if value is None or str(value).strip() == "" else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+def _csv_frames(file, chunk_rows, nrows):
+    encoding = _csv_encoding(file)
+    empty = True
+    for frame in pd.read_csv(file, encoding=encoding, keep_default_na=True, chunksize=chunk_rows, nrows=nrows):
+        empty = False
+        yield frame
+    if empty:
+        file.seek(0)
+        yield pd.read_csv(file, encoding=encoding, nrows=0)
+
+
+def _xlsx_frames(file, chunk_rows, nrows):
+    if load_workbook is None:
+        raise ValueError("Reading .xlsx files needs openpyxl.")
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        columns = _header(next(rows, ()))
+        # Fully empty rows (formatting left below the data) are skipped
+        rows = (row for row in rows if any(value is not None for value in row))
+        if nrows is not None:
+            rows = itertools.islice(rows, nrows)
+        empty = True
+        while True:
+            chunk = [row[:len(columns)] for row in itertools.islice(rows, chunk_rows)]
+            if not chunk:
+                break
+            empty = False
+            yield pd.DataFrame(chunk, columns=columns)
+        if empty:
+            yield pd.DataFrame(columns=columns)
+    finally:
+        workbook.close()
+
+
+def _xls_frames(file, chunk_rows, nrows):
+    frame = pd.read_excel(file, engine="xlrd", nrows=nrows)
+    for start in range(0, max(len(frame), 1), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+READERS = {CSV: _csv_frames, XLSX: _xlsx_frames, XLS: _xls_frames}
+
+
+def read_frames(file, name, chunk_rows=CHUNK_ROWS, nrows=None):
+    """
+    The first sheet (or the CSV) of an uploaded file as DataFrames of at most
+    ``chunk_rows`` rows, stopping after ``nrows`` rows when given. There is
+    always at least one frame, empty for a header-only file, so the columns
+    are known.
+    """
+    kind = file_type(name)
+    if kind is None:
+        raise ValueError("Only Excel files (.xls, .xlsx, .xlsm) or CSV files (.csv) are allowed.")
+    return READERS[kind](file, chunk_rows, nrows)
+
+
+def read_preview(file, name, rows=PREVIEW_ROWS):
+    """The first ``rows`` rows of an uploaded file, parsing nothing past them."""
+    return next(read_frames(file, name, chunk_rows=max(rows, 1), nrows=max(rows, 1))).head(rows)
+
+
+def _csv_line_count(file):
+    lines, last = 0, b"\n"
+    for block in iter(lambda: file.read(_ENCODING_PROBE_BYTES), b""):
+        lines += block.count(b"\n")
+        last = block[-1:]
+    # A last line without a newline still counts
+    return lines + (last != b"\n")
+
+
+def _xlsx_dimension_rows(file):
+    if load_workbook is None:
+        return None
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        # Read from the sheet's <dimension> element, not by reading the rows
+        return workbook.worksheets[0].max_row
+    finally:
+        workbook.close()
+
+
+def estimate_rows(file, name):
+    """
+    Roughly how many data rows an uploaded file has, without parsing them: the
+    CSV's line count (quoted line breaks count as rows) or the XLSX sheet's
+    recorded dimension (which includes formatted empty rows). None when the
+    file does not say, as for XLS. Rewinds the file.
+    """
+    kind = file_type(name)
+    try:
+        if kind == CSV:
+            lines = _csv_line_count(file)
+        elif kind == XLSX:
+            lines = _xlsx_dimension_rows(file)
+        else:
+            lines = None
+    finally:
+        file.seek(0)
+    # Less the header row
+    return None if lines is None else max(lines - 1, 0)
+
+
+def import_extra_info_rows(extra_info_id, chunk_rows=CHUNK_ROWS):
+    """
+    Parse the uploaded file of a BlueprintExtraInfo into BlueprintExtraInfoRow
+    rows. Each chunk is committed on its own so that processed_rows shows the
+    progress; a failed import keeps no rows and records the error.
+    """
+    extra_info = BlueprintExtraInfo.objects.get(pk=extra_info_id)
+    imports = BlueprintExtraInfo.objects.filter(pk=extra_info_id)
+    imports.update(status=ImportStatus.PROCESSING, processed_rows=0, error="")
+    extra_info.rows.all().delete()
+    index = 0
+    try:
+        with extra_info.source_file.open("rb") as file:
+            # An estimate for the progress; the exact count is known once every row is read
+            imports.update(total_rows=estimate_rows(file, extra_info.file_name))
+            for frame in read_frames(file, extra_info.file_name, chunk_rows):
+                BlueprintExtraInfoRow.objects.bulk_create(
+                    BlueprintExtraInfoRow(extra_info_id=extra_info_id, index=index + i, data=record)
+                    for i, record in enumerate(json_records(frame))
+                )
+                index += len(frame)
+                imports.update(processed_rows=index)
+    except Exception as e:
+        extra_info.rows.all().delete()
+        imports.update(status=ImportStatus.FAILED, error=str(e))
+        raise
+    imports.update(status=ImportStatus.COMPLETE, total_rows=index)
+    return index
@@ -3,54 +3,57 @@ from django.conf import settings
 from plans.models import BlueprintImage
 from PIL import Image
 from .utils import get_wall_model, get_window_and_door_model
-from annotations.serializers import WallAnnotationSerializer, WindowAndDoorAnnotationSerializer
+from annotations.bulk import bulk_create_annotations, WALL, WINDOW_AND_DOOR
 import json
 from django.core.files.base import ContentFile
 from io import BytesIO
 from annotations.models import WallAnnotation, WindowAndDoorAnnotation
-from .utils import compute_wall_dimensions
-import base64
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, To, Attachment, FileContent, FileName, FileType, Disposition
-from django.conf import settings
+from config import mail
 import gc
-from plans.utils import compute_sqft, polygon_dimension
+from plans.utils import get_model, read_page_bgr, page_size, annotation_json_file
+from plans.inference import get_inference_engine
+from plans.geometry import pack_polygons, areas_sqft, dimensions_ft, wall_dimensions_ft
+from plans.page_cache import cached_predictions, remember_predictions
+from plans.tasks import (
+    room_inference_engine, room_detections, room_shapes, save_room_annotations,
+    prediction_key, tiled_page_detections,
+)
+from plans.tiling import merge_boxes, merge_polygons
+from .spreadsheets import import_extra_info_rows
+from annotations.models import Annotation
+from users.models import CustomUser, Role
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+import traceback
 import numpy as np
 
 @shared_task(name='estimator_request')
-def send_estimator_request_email(image_path, submitted_by_email):
+def send_estimator_request_email(image_path, submitted_by_email, image_url=None):
+    """
+    Tell the estimators about a submitted image: the team inbox and every
+    active estimator, each as their own recipient, in one batch. The image is
+    sent as a small preview with a link to the original (``image_url``)
+    rather than attached at full size.
+    """
     subject = "New Blueprint Image Submitted"
-    body = f"A new image has been submitted by {submitted_by_email} for annotation."
+    body = f"<p>A new image has been submitted by {submitted_by_email} for annotation.</p>"
+    if image_url:
+        body += f'<p><a href="{image_url}">Open the full-resolution image</a></p>'
 
     try:
-        with open(image_path, 'rb') as f:
-            data = f.read()
-            encoded_file = base64.b64encode(data).decode()
-
-        attached_file = Attachment(
-            FileContent(encoded_file),
-            FileName(image_path.split('/')[-1]),
-            FileType('application/octet-stream'), 
-            Disposition('attachment')
-        )
-
-        message = Mail(
-            from_email=Email(submitted_by_email), 
-            to_emails=To(settings.DEFAULT_FROM_EMAIL),
-            subject=subject,
-            html_content=body
-        )
-        message.attachment = attached_file
-
-        sg = SendGridAPIClient(settings.SEND_GRID_API_KEY)
-        response = sg.send(message)
-        print(f"SendGrid Response: {response.status_code}")
-        return response.status_code == 202
+        preview = mail.image_preview(image_path)
+        estimators = CustomUser.objects.filter(role=Role.ESTIMATOR, is_active=True).values_list("email", flat=True)
+        recipients = dict.fromkeys([settings.DEFAULT_FROM_EMAIL, *estimators])
+        messages = [
+            mail.message(recipient, subject, html=body, from_email=submitted_by_email, attachments=[preview])
+            for recipient in recipients
+        ]
+        return mail.send_many(messages) == len(messages)
     except Exception as e:
-        print(f"Error sending email with SendGrid: {e}")
+        print(f"Error sending email: {e}")
         return False
 
-    
+
 @shared_task(name='assigned_estimator')
 def send_image_email_task_to_estimator(estimator_email, estimator_name, image_id):
     subject = "New Blueprint Assignment"
@@ -62,46 +65,153 @@ def send_image_email_task_to_estimator(estimator_email, estimator_name, image_id
     """
 
     try:
-        mail = Mail(
-            from_email=Email(settings.EMAIL_HOST_USER), 
-            to_emails=To(estimator_email),
-            subject=subject,
-            html_content=message
-        )
-
-        sg = SendGridAPIClient(settings.SEND_GRID_API_KEY)
-        response = sg.send(mail)
-        print(f"SendGrid Response: {response.status_code}")
-        return f"Email sent to {estimator_email}" if response.status_code == 202 else f"SendGrid failed with status: {response.status_code}"
+        sent = mail.send(mail.message(estimator_email, subject, html=message))
+        return f"Email sent to {estimator_email}" if sent else f"Email to {estimator_email} was not accepted"
     except Exception as e:
-        print(f"SendGrid error: {e}")
+        print(f"Email error: {e}")
         return f"Failed to send email: {str(e)}"
-    
+
+
 @shared_task(name='send_email_to_user_after_annotation')
 def send_email_to_user_after_annotation(estimator_email, owner_email):
     subject = "Your Annotated Blueprint Image"
     message = "Hi, find your verified annotated blueprint image attached."
 
     try:
-        mail = Mail(
-            from_email=Email(estimator_email), 
-            to_emails=To(owner_email),
-            subject=subject,
-            plain_text_content=message
-        )
-        mail.reply_to = Email(estimator_email)
-
-        sg = SendGridAPIClient(settings.SEND_GRID_API_KEY)
-        response = sg.send(mail)
-        print(f"SendGrid Response: {response.status_code}")
-        return f"Email sent to {owner_email}" if response.status_code == 202 else f"SendGrid failed with status: {response.status_code}"
+        sent = mail.send(mail.message(
+            owner_email, subject, text=message, from_email=estimator_email, reply_to=estimator_email
+        ))
+        return f"Email sent to {owner_email}" if sent else f"Email to {owner_email} was not accepted"
     except Exception as e:
-        print(f"SendGrid error: {e}")
+        print(f"Email error: {e}")
         return f"Failed to send email: {str(e)}"
 
+
+def wall_inference_engine():
+    return get_inference_engine(
+        "wall",
+        save=True,
+        project="wall_predictions",
+        name="test",
+        exist_ok=True
+    )
+
+
+def window_and_door_inference_engine():
+    return get_inference_engine(
+        "window_and_door",
+        save=True,
+        project="windows_and_doors_predictions",
+        name="test",
+        exist_ok=True
+    )
+
+
+def box_detections(result, model, first_word=False):
+    """Bounding boxes of a Results object as rectangles in pixel coordinates."""
+    detections = []
+    if hasattr(result, "boxes") and result.boxes is not None:
+        for i, box in enumerate(result.boxes.xyxy):
+            class_id = int(result.boxes.cls[i].item())
+            label = model.names[class_id]
+            if first_word:
+                label = label.split()[0]
+            x1, y1, x2, y2 = box.tolist()
+            detections.append({
+                "label": label,
+                "points": [[x1, y1], [x2, y1], [x2, y2], [x1, y2]],
+                "confidence_score": float(result.boxes.conf[i].item()),
+            })
+    return detections
+
+
+def wall_detections(result, model):
+    return box_detections(result, model, first_word=True)
+
+
+def window_and_door_detections(result, model):
+    return box_detections(result, model)
+
+
+def wall_shapes(detections, dpi, scale):
+    coords, offsets = pack_polygons([detection["points"] for detection in detections])
+    lengths, thicknesses = (values.tolist() for values in wall_dimensions_ft(coords, offsets, dpi, scale))
+    areas = areas_sqft(coords, offsets, dpi, scale).tolist()
+
+    shapes = []
+    for detection, length_ft, thickness_ft, area in zip(detections, lengths, thicknesses, areas):
+        shapes.append({
+            "label": detection["label"],
+            "points": detection["points"],
+            'length': length_ft,
+            'area': area,
+            'thickness': thickness_ft,
+            "group_id": None,
+            "shape_type": "rectangle",
+            "flags": {}
+        })
+    return shapes
+
+
+def window_and_door_shapes(detections, dpi, scale):
+    coords, offsets = pack_polygons([detection["points"] for detection in detections])
+    lengths, breadths = (values.tolist() for values in dimensions_ft(coords, offsets, dpi, scale))
+
+    shapes = []
+    for detection, length_ft, breadth_ft in zip(detections, lengths, breadths):
+        shapes.append({
+            "label": detection["label"],
+            "points": detection["points"],
+            'length': length_ft,
+            'breadth': breadth_ft,
+            "group_id": None,
+            "shape_type": "rectangle",
+            "flags": {}
+        })
+    return shapes
+
+
+def save_wall_annotations(blueprint_images, shapes, height, width):
+    """Create the wall annotations and attach the wall JSON (the caller saves the image)."""
+    bulk_create_annotations(WALL, blueprint_images, [
+        {
+            'label': str(shape['label']),
+            'coordinates': shape['points'],
+            'annotation_type': shape['shape_type'],
+            'area': shape['area'],
+            'length_ft': shape['length'],
+            'thickness_ft': shape['thickness'],
+        }
+        for shape in shapes
+    ])
+
+    filename = f"{blueprint_images.title}_wall_annotation.json"
+    blueprint_images.wall_json_file.save(
+        filename, annotation_json_file(shapes, blueprint_images.title, height, width), save=False
+    )
+
+
+def save_window_and_door_annotations(blueprint_images, shapes, height, width):
+    """Create the window/door annotations and attach their JSON (the caller saves the image)."""
+    bulk_create_annotations(WINDOW_AND_DOOR, blueprint_images, [
+        {
+            'label': str(shape['label']),
+            'coordinates': shape['points'],
+            'annotation_type': shape['shape_type'],
+            'length_ft': shape['length'],
+            'breadth_ft': shape['breadth'],
+        }
+        for shape in shapes
+    ])
+
+    filename = f"{blueprint_images.title}_window&door_annotation.json"
+    blueprint_images.window_json_file.save(
+        filename, annotation_json_file(shapes, blueprint_images.title, height, width), save=False
+    )
+
+
 @shared_task(name='create_wall_annotation')
 def async_create_wall_annotation(blueprint_id):
-    file_io = None
     blueprint_image = None
 
     try:
@@ -113,78 +223,27 @@ def async_create_wall_annotation(blueprint_id):
 
         scale = blueprint_images.scale
         dpi = blueprint_images.dpi
-        model = get_wall_model()
         blueprint_image = Image.open(blueprint_images.image)
-        
-        results = model.predict(
-            blueprint_image,
-            save=True,
-            project="wall_predictions",
-            name="test",
-            exist_ok=True
-        )
-
-        shapes = []
-        for pred in results:
-            if hasattr(pred, "boxes") and pred.boxes is not None:
-                for i, box in enumerate(pred.boxes.xyxy):
-                    class_id = int(pred.boxes.cls[i].item())
-                    label = model.names[class_id].split()[0]
-                    x1, y1, x2, y2 = box.tolist()
-                    points = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
-                    length_ft, thickness_ft = compute_wall_dimensions(points, dpi, scale)
-                    area = compute_sqft(points, dpi, scale)
-
-                    shapes.append({
-                        "label": label,
-                        "points": points,
-                        'length': length_ft,
-                        'area': area,
-                        'thickness': thickness_ft,
-                        "group_id": None,
-                        "shape_type": "rectangle",
-                        "flags": {}
-                    })
-
-        for shape in shapes:
-            data = {
-                'blueprint': blueprint_images.id,
-                'label': str(shape['label']),
-                'coordinates': shape['points'],
-                'annotation_type': shape['shape_type'],
-                'area': shape['area'],
-                'length_ft': shape['length'],  # typo fix suggestion below
-                'thickness_ft': shape['thickness'],
-            }
-            serializer = WallAnnotationSerializer(data=data)
-            if serializer.is_valid(raise_exception=True):
-                serializer.save()
-
-        json_data = {
-            "version": "4.5.6",
-            "flags": {},
-            "shapes": shapes,
-            "imagePath": blueprint_images.title,
-            "imageData": None,
-            "imageHeight": blueprint_image.height,
-            "imageWidth": blueprint_image.width,
-        }
-
-        json_str = json.dumps(json_data, indent=4)
-        file_io = BytesIO()
-        file_io.write(json_str.encode('utf-8'))
-        file_io.seek(0)
 
-        filename = f"{blueprint_images.title}_wall_annotation.json"
-        blueprint_images.wall_json_file.save(filename, ContentFile(file_io.read()))
+        key = prediction_key("wall")
+        detections = cached_predictions(blueprint_images.content_hash, key)
+        if detections is None:
+            model = get_wall_model()
+            if settings.INFERENCE_TILING:
+                job = (model, wall_inference_engine(), wall_detections, merge_boxes)
+                detections = tiled_page_detections(blueprint_images.image, {"wall": job})[0]["wall"]
+            else:
+                detections = wall_detections(wall_inference_engine().predict(model, blueprint_image), model)
+            remember_predictions(blueprint_images.content_hash, key, detections)
+        else:
+            print("Using cached wall detections")
+        shapes = wall_shapes(detections, dpi, scale)
+        save_wall_annotations(blueprint_images, shapes, blueprint_image.height, blueprint_image.width)
         blueprint_images.save()
 
         return blueprint_id
 
     finally:
-        if file_io is not None:
-            file_io.close()
-            del file_io
         if blueprint_image is not None:
             blueprint_image.close()
             del blueprint_image
@@ -193,7 +252,6 @@ def async_create_wall_annotation(blueprint_id):
 
 @shared_task(name="create_window_and_door_annotation")
 def async_create_window_and_door_annotation(blueprint_id):
-    file_io = None
     blueprint_image = None
 
     try:
@@ -203,82 +261,152 @@ def async_create_window_and_door_annotation(blueprint_id):
             print("Returning Existing Window and Door Annotation!")
             return blueprint_id
 
-        model = get_window_and_door_model()
         scale = blueprint_images.scale
         dpi = blueprint_images.dpi
         blueprint_image = Image.open(blueprint_images.image)
 
-        results = model.predict(
-            blueprint_image,
-            save=True,
-            project="windows_and_doors_predictions",
-            name="test",
-            exist_ok=True
-        )
-
-        shapes = []
-        for pred in results:
-            if hasattr(pred, "boxes") and pred.boxes is not None:
-                for i, box in enumerate(pred.boxes.xyxy):
-                    class_id = int(pred.boxes.cls[i].item())
-                    label = model.names[class_id]
-                    x1, y1, x2, y2 = box.tolist()
-                    points = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
-                    length_ft, breadth_ft = polygon_dimension(points, dpi, scale)
-                    print(length_ft, breadth_ft)
-                    shapes.append({
-                        "label": label,
-                        "points": points,
-                        'length': length_ft,
-                        'breadth': breadth_ft,
-                        "group_id": None,
-                        "shape_type": "rectangle",
-                        "flags": {}
-                    })
-
-        for shape in shapes:
-            data = {
-                'blueprint': blueprint_images.id,
-                'label': str(shape['label']),
-                'coordinates': shape['points'],
-                'annotation_type': shape['shape_type'],
-                'length_ft': shape['length'],
-                'breadth_ft': shape['breadth'],
-            }
-            serializer = WindowAndDoorAnnotationSerializer(data=data)
-            if serializer.is_valid(raise_exception=True):
-                serializer.save()
-
-        json_data = {
-            "version": "4.5.6",
-            "flags": {},
-            "shapes": shapes,
-            "imagePath": blueprint_images.title,
-            "imageData": None,
-            "imageHeight": blueprint_image.height,
-            "imageWidth": blueprint_image.width,
-        }
-
-        json_str = json.dumps(json_data, indent=4)
-        file_io = BytesIO()
-        file_io.write(json_str.encode('utf-8'))
-        file_io.seek(0)
-
-        filename = f"{blueprint_images.title}_window&door_annotation.json"
-        blueprint_images.window_json_file.save(filename, ContentFile(file_io.read()))
+        key = prediction_key("window_and_door")
+        detections = cached_predictions(blueprint_images.content_hash, key)
+        if detections is None:
+            model = get_window_and_door_model()
+            if settings.INFERENCE_TILING:
+                job = (model, window_and_door_inference_engine(), window_and_door_detections, merge_boxes)
+                detections = tiled_page_detections(blueprint_images.image, {"window_and_door": job})[0]["window_and_door"]
+            else:
+                detections = window_and_door_detections(window_and_door_inference_engine().predict(model, blueprint_image), model)
+            remember_predictions(blueprint_images.content_hash, key, detections)
+        else:
+            print("Using cached window and door detections")
+        shapes = window_and_door_shapes(detections, dpi, scale)
+        save_window_and_door_annotations(blueprint_images, shapes, blueprint_image.height, blueprint_image.width)
         blueprint_images.save()
 
         return blueprint_id
 
     finally:
-        if file_io is not None:
-            file_io.close()
-            del file_io
         if blueprint_image is not None:
             blueprint_image.close()
             del blueprint_image
         gc.collect()
 
+
+@shared_task(name="create_all_annotations")
+def async_create_all_annotations(blueprint_id, user_id):
+    """
+    Room, wall and window/door annotations for one page in a single task. The
+    page is decoded once and the shared array is submitted to all three models'
+    inference engines together, so the detectors run concurrently. With
+    INFERENCE_TILING the page is decoded once into a tile source instead and
+    each model runs over its tiles. The three annotation sets are then written
+    in one transaction.
+    """
+    image_array = None
+
+    try:
+        blueprint_images = BlueprintImage.objects.get(id=blueprint_id)
+        user = CustomUser.objects.get(id=user_id)
+        if not user.is_authenticated or user.role != Role.ESTIMATOR:
+            raise PermissionDenied("You do not have permission to create annotation")
+        if not blueprint_images.image:
+            raise ValueError("No image is found for this blueprint!")
+
+        detectors = {
+            "room": (
+                Annotation, get_model, room_inference_engine, room_detections,
+                room_detections, merge_polygons,
+            ),
+            "wall": (
+                WallAnnotation, get_wall_model, wall_inference_engine, wall_detections,
+                wall_detections, merge_boxes,
+            ),
+            "window_and_door": (
+                WindowAndDoorAnnotation, get_window_and_door_model,
+                window_and_door_inference_engine, window_and_door_detections,
+                window_and_door_detections, merge_boxes,
+            ),
+        }
+        needed = [
+            key for key, (annotation_model, *_) in detectors.items()
+            if not annotation_model.objects.filter(blueprint=blueprint_images).exists()
+        ]
+        if not needed:
+            print("Returning Existing Annotations!")
+            return blueprint_id
+
+        detections = {}
+        missing = []
+        for key in needed:
+            cached = cached_predictions(blueprint_images.content_hash, prediction_key(key))
+            if cached is not None:
+                detections[key] = cached
+            else:
+                missing.append(key)
+
+        if not missing:
+            # Every detection came from the page cache; only the page size is needed
+            height, width = page_size(blueprint_images)
+            predicted = {}
+        elif settings.INFERENCE_TILING:
+            jobs = {}
+            for key in missing:
+                _, get_detector, get_engine, _, tile_detect, merge = detectors[key]
+                jobs[key] = (get_detector(), get_engine(), tile_detect, merge)
+            predicted, (height, width) = tiled_page_detections(blueprint_images.image, jobs)
+        else:
+            image_array = read_page_bgr(blueprint_images.image)
+            height, width = image_array.shape[:2]
+            pending = {}
+            for key in missing:
+                _, get_detector, get_engine, detect, _, _ = detectors[key]
+                model = get_detector()
+                pending[key] = (model, detect, get_engine().submit(model, image_array))
+            predicted = {key: detect(future.result(), model) for key, (model, detect, future) in pending.items()}
+            del image_array
+            image_array = None
+
+        for key, value in predicted.items():
+            detections[key] = value
+            remember_predictions(blueprint_images.content_hash, prediction_key(key), value)
+
+        dpi = blueprint_images.dpi
+        scale = blueprint_images.scale
+        with transaction.atomic():
+            if "room" in detections:
+                save_room_annotations(blueprint_images, room_shapes(detections["room"], dpi, scale), height, width)
+            if "wall" in detections:
+                save_wall_annotations(blueprint_images, wall_shapes(detections["wall"], dpi, scale), height, width)
+            if "window_and_door" in detections:
+                save_window_and_door_annotations(
+                    blueprint_images, window_and_door_shapes(detections["window_and_door"], dpi, scale),
+                    height, width,
+                )
+            blueprint_images.save()
+
+        return blueprint_id
+
+    except BlueprintImage.DoesNotExist:
+        return {
+            'status': 'error',
+            'message': f"Blueprint with ID {blueprint_id} not found"
+        }
+    except Exception as e:
+        return {
+            'status': 'error',
+            'message': f"Unexpected error: {str(e)}",
+            'trace': traceback.format_exc()
+        }
+    finally:
+        if image_array is not None:
+            del image_array
+        gc.collect()
+
+
+@shared_task(name="import_extra_info")
+def import_extra_info(extra_info_id):
+    """Parse an uploaded extra info spreadsheet into rows (see estimators.spreadsheets)."""
+    return import_extra_info_rows(extra_info_id)
+
+
 # @shared_task(name="create_floor_annotation")
 # def async_create_floor_annotation(blueprint_id):
 #     file_io = None
@@ -0,0 +1,40 @@
+import math
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from estimators.frame_json import COLUMNS, columns_from_records, encode_frame, json_columns, json_records
+
+
+class FrameJsonTests(SimpleTestCase):
+
+    def setUp(self):
+        self.frame = pd.DataFrame({
+            "Quantity": [1.5, np.nan, np.inf, -np.inf],
+            "Description": ["Tile", None, "Stud", float("nan")],
+            "Line": np.arange(4),
+            "Mixed": ["a", 2, np.inf, None],
+        })
+
+    def test_records(self):
+        records = json_records(self.frame)
+        self.assertEqual(records[0], {"Quantity": 1.5, "Description": "Tile", "Line": 0, "Mixed": "a"})
+        self.assertEqual(records[1], {"Quantity": None, "Description": None, "Line": 1, "Mixed": 2})
+        self.assertEqual([r["Quantity"] for r in records[2:]], [None, None])
+        self.assertIsNone(records[2]["Mixed"])
+        self.assertIs(type(records[3]["Line"]), int)
+        self.assertFalse(any(isinstance(v, float) and not math.isfinite(v) for r in records for v in r.values()))
+
+    def test_columns_match_records(self):
+        columns = json_columns(self.frame)
+        self.assertEqual(list(columns), list(self.frame.columns))
+        self.assertEqual(columns["Quantity"], [1.5, None, None, None])
+        self.assertEqual(columns, columns_from_records(self.frame.columns, json_records(self.frame)))
+        self.assertEqual(encode_frame(self.frame, COLUMNS), columns)
+
+    def test_duplicate_and_empty(self):
+        frame = pd.DataFrame([[1, 2]], columns=["a", "a"])
+        self.assertEqual(json_records(frame), [{"a": 2}])
+        self.assertEqual(json_records(self.frame.iloc[:0]), [])
+        with self.assertRaises(ValueError):
+            encode_frame(self.frame, "table")
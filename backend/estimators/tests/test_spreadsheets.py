@@ -0,0 +1,131 @@
+import io
+import unittest
+from unittest.mock import patch
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from estimators.models import BlueprintExtraInfo, ImportStatus
+from estimators.spreadsheets import load_workbook, estimate_rows, import_extra_info_rows, read_frames, read_preview
+from plans.models import Blueprint, BlueprintImage
+from projects.models import Project
+from users.models import CustomUser, Role
+
+HEADER = "CSI Division,Description,Unit,Quantity,Notes\n"
+
+
+def csv_upload(rows, name="takeoff.csv"):
+    body = HEADER + "".join(f"09,Paint coat {i},sqft,{i}.5,\n" for i in range(rows))
+    return SimpleUploadedFile(name, body.encode("utf-8"), content_type="text/csv")
+
+
+class SpreadsheetReaderTests(TestCase):
+
+    def test_csv_is_read_in_chunks(self):
+        frames = list(read_frames(csv_upload(25), "takeoff.csv", chunk_rows=10))
+        self.assertEqual([len(frame) for frame in frames], [10, 10, 5])
+        self.assertEqual(frames[2]["Description"].iloc[-1], "Paint coat 24")
+
+    def test_preview_and_count(self):
+        upload = csv_upload(25)
+        preview = read_preview(upload, upload.name, rows=3)
+        self.assertEqual(list(preview.columns), ["CSI Division", "Description", "Unit", "Quantity", "Notes"])
+        self.assertEqual(len(preview), 3)
+        upload.seek(0)
+        self.assertEqual(estimate_rows(upload, upload.name), 25)
+        self.assertEqual(upload.tell(), 0)
+
+    @unittest.skipIf(load_workbook is None, "openpyxl is not installed")
+    def test_xlsx_estimate_reads_the_sheet_dimension(self):
+        from openpyxl import Workbook
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Description", "Quantity"])
+        for i in range(40):
+            sheet.append([f"Stud {i}", i])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        upload = SimpleUploadedFile("takeoff.xlsx", buffer.getvalue())
+        self.assertEqual(estimate_rows(upload, upload.name), 40)
+        self.assertIsNone(estimate_rows(io.BytesIO(b""), "takeoff.xls"))
+
+    def test_header_only_file_has_columns(self):
+        upload = SimpleUploadedFile("empty.csv", HEADER.encode("utf-8"))
+        preview = read_preview(upload, upload.name)
+        self.assertTrue(preview.empty)
+        self.assertEqual(len(preview.columns), 5)
+
+    def test_latin1_csv(self):
+        upload = SimpleUploadedFile("latin.csv", (HEADER + "09,Caf\xe9 tile,sqft,1,\n").encode("ISO-8859-1"))
+        self.assertEqual(read_preview(upload, upload.name)["Description"].iloc[0], "Caf\xe9 tile")
+
+    def test_unsupported_file(self):
+        with self.assertRaises(ValueError):
+            read_frames(io.BytesIO(b""), "takeoff.pdf")
+
+
+class ExtraInfoImportTests(APITestCase):
+
+    def setUp(self):
+        self.estimator = CustomUser.objects.create_user(
+            email="importer@ssnbuilders.com",
+            username="importer",
+            first_name="Import",
+            last_name="Estimator",
+            password="HelloWorld!1",
+            role=Role.ESTIMATOR
+        )
+        project = Project.objects.create(title="Import Project", owner=self.estimator)
+        blueprint = Blueprint.objects.create(title="Import Blueprint", description="Sheet", project=project)
+        self.image = BlueprintImage.objects.create(blueprint=blueprint, title="Page", dpi=300, scale=0.25)
+        self.url = reverse("import_excel_extra_info", args=[self.image.pk])
+        self.client.force_authenticate(user=self.estimator)
+
+    def test_import_runs_after_commit_and_pages_rows(self):
+        with patch("estimators.views.import_extra_info.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url, {"excel_file": csv_upload(250)}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["data"]["status"], ImportStatus.PENDING)
+        extra_info = BlueprintExtraInfo.objects.get(blueprint=self.image)
+        delay.assert_called_once_with(str(extra_info.pk))
+
+        self.assertEqual(import_extra_info_rows(extra_info.pk, chunk_rows=100), 250)
+        extra_info.refresh_from_db()
+        self.assertEqual((extra_info.status, extra_info.total_rows, extra_info.processed_rows), (ImportStatus.COMPLETE, 250, 250))
+
+        response = self.client.get(self.url, {"page": 3, "page_size": 100})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["progress"], 1.0)
+        self.assertEqual(len(response.data["csv_data"]), 50)
+        self.assertEqual(response.data["csv_data"][0]["Description"], "Paint coat 200")
+        response = self.client.get(self.url, {"page": 1, "page_size": 2, "layout": "columns"})
+        self.assertEqual(response.data["csv_data"]["Quantity"], [0.5, 1.5])
+        self.assertEqual(self.client.get(self.url, {"page_size": 0}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_missing_columns_are_rejected_up_front(self):
+        upload = SimpleUploadedFile("bad.csv", b"Description,Unit\nPaint,sqft\n")
+        response = self.client.post(self.url, {"excel_file": upload}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("csi division", response.data["missing_columns"])
+        self.assertFalse(BlueprintExtraInfo.objects.exists())
+
+    def test_failed_import_keeps_no_rows_and_can_be_replaced(self):
+        extra_info = BlueprintExtraInfo.objects.create(
+            blueprint=self.image,
+            source_file=SimpleUploadedFile("broken.xlsx", b"not a workbook"),
+            file_name="broken.xlsx",
+            imported_by=self.estimator,
+        )
+        with self.assertRaises(Exception):
+            import_extra_info_rows(extra_info.pk)
+        extra_info.refresh_from_db()
+        self.assertEqual(extra_info.status, ImportStatus.FAILED)
+        self.assertFalse(extra_info.rows.exists())
+
+        with patch("estimators.views.import_extra_info.delay"):
+            response = self.client.post(self.url, {"excel_file": csv_upload(2)}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(BlueprintExtraInfo.objects.get(blueprint=self.image).file_name, "takeoff.csv")
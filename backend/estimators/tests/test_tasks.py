@@ -2,13 +2,15 @@ from unittest.mock import patch, MagicMock
 import uuid, io
 from PIL import Image
 import numpy as np
-from django.test import TestCase
+from django.conf import settings
+from django.core import mail
+from django.test import TestCase, override_settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 from users.models import CustomUser, Role
 from projects.models import Project
 from plans.models import Blueprint, BlueprintImage
-from annotations.models import WallAnnotation, WindowAndDoorAnnotation
+from annotations.models import Annotation, WallAnnotation, WindowAndDoorAnnotation
 from estimators.tasks import (
     send_estimator_request_email,
     send_image_email_task_to_estimator,
@@ -63,31 +65,38 @@ class EstimatorTasksTest(TestCase):
             scale=1.0,
         )
 
-    @patch("django.core.mail.EmailMessage")
-    def test_send_estimator_request_email(self, email_cls):
-        email_obj = MagicMock()
-        email_cls.return_value = email_obj
-        email_obj.send.return_value = True
-
-        ok = send_estimator_request_email("dummy/path.jpg", self.user.email)
+    @override_settings(EMAIL_TRANSPORT="django", EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+    def test_send_estimator_request_email(self):
+        CustomUser.objects.filter(pk=self.estimator.pk).update(is_active=True)
+        ok = send_estimator_request_email(
+            self.blueprint_image.image.path, self.user.email, "https://example.com/media/img.jpg"
+        )
 
         self.assertTrue(ok)
-        email_obj.attach_file.assert_called_once_with("dummy/path.jpg")
-        email_obj.send.assert_called_once()
+        self.assertEqual([sent.to for sent in mail.outbox], [[settings.DEFAULT_FROM_EMAIL], [self.estimator.email]])
+        sent = mail.outbox[0]
+        self.assertIn("https://example.com/media/img.jpg", sent.alternatives[0][0])
+        name, content, mimetype = sent.attachments[0]
+        self.assertEqual(mimetype, "image/jpeg")
+        self.assertTrue(name.endswith("_preview.jpg"))
 
-    @patch("django.core.mail.send_mail")
-    def test_send_image_email_task_to_estimator(self, send_mail):
-        send_mail.return_value = 1
+    @override_settings(EMAIL_TRANSPORT="django", EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+    def test_send_estimator_request_email_missing_file(self):
+        self.assertFalse(send_estimator_request_email("dummy/path.jpg", self.user.email))
+
+    @override_settings(EMAIL_TRANSPORT="django", EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+    def test_send_image_email_task_to_estimator(self):
         res = send_image_email_task_to_estimator(
             self.estimator.email, "Test Blueprint", "img‑123"
         )
         self.assertIn("Email sent", res)
+        self.assertEqual(mail.outbox[0].to, [self.estimator.email])
 
-    @patch("django.core.mail.send_mail")
-    def test_send_email_to_user_after_annotation(self, send_mail):
-        send_mail.return_value = 1
-        res = send_email_to_user_after_annotation(self.user.email)
+    @override_settings(EMAIL_TRANSPORT="django", EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+    def test_send_email_to_user_after_annotation(self):
+        res = send_email_to_user_after_annotation(self.estimator.email, self.user.email)
         self.assertIn("Email sent", res)
+        self.assertEqual(mail.outbox[0].reply_to, [self.estimator.email])
 
     @patch("estimators.tasks.get_wall_model")
     def test_async_create_wall_annotation(self, mock_get_model):
@@ -131,3 +140,161 @@ class EstimatorTasksTest(TestCase):
         before = WindowAndDoorAnnotation.objects.count()
         async_create_window_and_door_annotation(self.blueprint_image.id)
         self.assertGreater(WindowAndDoorAnnotation.objects.count(), before)
+
+    @patch("estimators.tasks.get_wall_model")
+    def test_cached_wall_detections_skip_the_model(self, mock_get_model):
+        cached = [{"label": "wall", "points": [[10, 10], [50, 10], [50, 20], [10, 20]], "confidence_score": 0.9}]
+        with patch("estimators.tasks.cached_predictions", return_value=cached) as mock_cached:
+            async_create_wall_annotation(self.blueprint_image.id)
+
+        mock_cached.assert_called_once_with(self.blueprint_image.content_hash, "wall")
+        mock_get_model.assert_not_called()
+        self.assertEqual(WallAnnotation.objects.filter(blueprint=self.blueprint_image).count(), 1)
+
+
+class FakeResult:
+    """Just enough of an ultralytics Results object for the annotation helpers."""
+
+    def __init__(self, orig_img, boxes=(), classes=(), polygons=None):
+        self.orig_img = orig_img
+        self.probs = None
+        self.boxes = MagicMock()
+        self.boxes.xyxy = [np.array(box, dtype=float) for box in boxes]
+        self.boxes.cls = [np.array(c) for c in classes]
+        self.boxes.conf = [np.array(0.8) for _ in boxes]
+        self.masks = None
+        if polygons is not None:
+            self.masks = MagicMock()
+            self.masks.xy = [np.array(poly, dtype=float) for poly in polygons]
+            self.masks.cls = [np.array(0) for _ in polygons]
+            self.boxes = [MagicMock(conf=np.array(0.9)) for _ in polygons]
+
+
+class CombinedAnnotationTaskTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.estimator = CustomUser.objects.create_user(
+            email=f"{uuid.uuid4()}@ssnbuilders.com",
+            username=f"est_{uuid.uuid4().hex[:8]}",
+            first_name="Test",
+            last_name="Estimator",
+            password="testpass123",
+            role=Role.ESTIMATOR,
+        )
+        cls.project = Project.objects.create(title="Combined Project", owner=cls.estimator)
+        cls.blueprint = Blueprint.objects.create(
+            title="Combined Blueprint",
+            project=cls.project,
+            description="Demo blueprint",
+            pdf_file=SimpleUploadedFile("test.pdf", b"%PDF-1.4 fake", content_type="application/pdf"),
+        )
+        buf = io.BytesIO()
+        Image.new("RGB", (200, 100), "white").save(buf, format="JPEG")
+        cls.blueprint_image = BlueprintImage.objects.create(
+            title="Combined Image",
+            blueprint=cls.blueprint,
+            image=SimpleUploadedFile("combined.jpg", buf.getvalue(), content_type="image/jpeg"),
+            dpi=100,
+            scale=1.0,
+        )
+
+    def setUp(self):
+        def fake_model(names, result_for):
+            model = MagicMock()
+            model.names = names
+            model.predict.side_effect = lambda images, **kwargs: [result_for(image) for image in images]
+            return model
+
+        self.room_model = fake_model(
+            {0: "room"}, lambda img: FakeResult(img, polygons=[[[10, 10], [90, 10], [90, 60], [10, 60]]])
+        )
+        self.wall_model = fake_model({0: "wall segment"}, lambda img: FakeResult(img, [[0, 0, 200, 5]], [0]))
+        self.window_model = fake_model(
+            {0: "window", 1: "door"}, lambda img: FakeResult(img, [[20, 0, 40, 5], [100, 95, 120, 100]], [0, 1])
+        )
+        for target, model in (
+            ("estimators.tasks.get_model", self.room_model),
+            ("estimators.tasks.get_wall_model", self.wall_model),
+            ("estimators.tasks.get_window_and_door_model", self.window_model),
+        ):
+            patcher = patch(target, return_value=model)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_decodes_once_and_runs_all_three_models_on_the_same_array(self):
+        from estimators.tasks import async_create_all_annotations, read_page_bgr
+
+        with patch("estimators.tasks.read_page_bgr", wraps=read_page_bgr) as mock_read:
+            result = async_create_all_annotations(self.blueprint_image.id, self.estimator.id)
+
+        self.assertEqual(result, self.blueprint_image.id)
+        mock_read.assert_called_once()
+        arrays = [m.predict.call_args[0][0][0] for m in (self.room_model, self.wall_model, self.window_model)]
+        self.assertIs(arrays[0], arrays[1])
+        self.assertIs(arrays[1], arrays[2])
+        self.assertEqual(arrays[0].shape, (100, 200, 3))
+
+        self.assertEqual(Annotation.objects.filter(blueprint=self.blueprint_image).count(), 1)
+        wall = WallAnnotation.objects.get(blueprint=self.blueprint_image)
+        self.assertEqual(wall.label, "wall")
+        self.assertEqual(
+            sorted(WindowAndDoorAnnotation.objects.filter(blueprint=self.blueprint_image)
+                   .values_list("label", flat=True)),
+            ["door", "window"],
+        )
+        self.blueprint_image.refresh_from_db()
+        self.assertTrue(self.blueprint_image.floor_json_file)
+        self.assertTrue(self.blueprint_image.wall_json_file)
+        self.assertTrue(self.blueprint_image.window_json_file)
+
+    def test_annotation_sets_are_written_in_one_transaction(self):
+        from estimators.tasks import async_create_all_annotations
+
+        with patch("estimators.tasks.save_window_and_door_annotations", side_effect=Exception("disk full")):
+            result = async_create_all_annotations(self.blueprint_image.id, self.estimator.id)
+
+        self.assertEqual(result["status"], "error")
+        self.assertFalse(Annotation.objects.filter(blueprint=self.blueprint_image).exists())
+        self.assertFalse(WallAnnotation.objects.filter(blueprint=self.blueprint_image).exists())
+
+    def test_only_missing_annotation_sets_are_detected(self):
+        from estimators.tasks import async_create_all_annotations
+
+        WallAnnotation.objects.create(
+            blueprint=self.blueprint_image, label="wall", coordinates=[[0, 0], [1, 0], [1, 1], [0, 1]],
+        )
+        async_create_all_annotations(self.blueprint_image.id, self.estimator.id)
+
+        self.wall_model.predict.assert_not_called()
+        self.room_model.predict.assert_called_once()
+        self.window_model.predict.assert_called_once()
+        self.assertEqual(WallAnnotation.objects.filter(blueprint=self.blueprint_image).count(), 1)
+
+    def test_page_without_rooms_keeps_its_walls_and_openings(self):
+        from estimators.tasks import async_create_all_annotations
+
+        self.room_model.predict.side_effect = lambda images, **kwargs: [FakeResult(image) for image in images]
+        result = async_create_all_annotations(self.blueprint_image.id, self.estimator.id)
+
+        self.assertEqual(result, self.blueprint_image.id)
+        self.assertFalse(Annotation.objects.filter(blueprint=self.blueprint_image).exists())
+        self.assertTrue(WallAnnotation.objects.filter(blueprint=self.blueprint_image).exists())
+        self.assertEqual(WindowAndDoorAnnotation.objects.filter(blueprint=self.blueprint_image).count(), 2)
+
+    def test_fully_cached_page_is_not_decoded(self):
+        from estimators.tasks import async_create_all_annotations
+
+        cached = {
+            "room": [{"label": "room", "points": [[10, 10], [90, 10], [90, 60], [10, 60]], "confidence_score": 0.9}],
+            "wall": [],
+            "window_and_door": [],
+        }
+        with patch("estimators.tasks.cached_predictions", side_effect=lambda content_hash, key: cached[key]), \
+                patch("estimators.tasks.read_page_bgr") as mock_read:
+            result = async_create_all_annotations(self.blueprint_image.id, self.estimator.id)
+
+        self.assertEqual(result, self.blueprint_image.id)
+        mock_read.assert_not_called()
+        self.room_model.predict.assert_not_called()
+        self.assertEqual(Annotation.objects.filter(blueprint=self.blueprint_image).count(), 1)
@@ -64,14 +64,14 @@ class EstimatorViewsTestCase(TestCase):
         self.assertTrue(len(response.data) > 0)
 
     @patch('estimators.views.async_create_annotation.delay')
-    @patch('estimators.views.chain')
-    def test_estimator_image_detail_get_view(self, mock_chain, mock_async):
-        mock_chain.return_value.apply_async.return_value = None
+    @patch('estimators.views.async_create_all_annotations.delay')
+    def test_estimator_image_detail_get_view(self, mock_all, mock_async):
         url = reverse('estimator_image_detail', args=[self.blueprintimage.id]) 
         response = self.client.get(url) 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('data', response.data)
-        mock_chain.assert_called_once()
+        mock_all.assert_called_once_with(self.blueprintimage.id, self.estimator.id)
+        mock_async.assert_not_called()
 
     @patch('estimators.views.async_create_annotation.delay')
     def test_estimator_image_detail_put_triggers_update(self, mock_async):
@@ -3,64 +3,39 @@ from rest_framework import permissions, status
 from rest_framework.response import Response
 from config.permissions import IsEstimator
 from .serializers import EstimatorRequestSerializer, BlueprintExtraInfoSerializer
-from .models import EstimatorRequest, Process, BlueprintExtraInfo
+from .models import EstimatorRequest, Process, BlueprintExtraInfo, CSI_COLUMNS, ImportStatus
+from .spreadsheets import file_type, read_preview, estimate_rows
+from .frame_json import LAYOUTS, RECORDS, encode_frame
 from plans.models import BlueprintImage
 from plans.serializers import BlueprintImageDetailSerializer
+from plans.prefetch import prefetch_image_detail
 from plans.tasks import async_create_annotation
 from .tasks import (
     send_email_to_user_after_annotation,
-    async_create_wall_annotation,
-    async_create_window_and_door_annotation,
+    async_create_all_annotations,
+    import_extra_info,
 )
-from celery import chain
 from annotations.models import Annotation, WallAnnotation, WindowAndDoorAnnotation
 from django.db import transaction
-import numpy as np
+from django.db.models import F
 from annotations.serializers import (
     WallAnnotationSerializer,
     AnnotationSerializer,
     WindowAndDoorAnnotationSerializer,
+    skips_json_coordinates,
 )
 from .utils import compute_wall_dimensions
 from plans.utils import compute_sqft, polygon_dimension
 from users.models import Role
 
-import csv
-import io
-import pandas as pd
-import math
-
-
-def clean_dataframe_for_json(df):
-    """
-    Thoroughly clean DataFrame for JSON serialization.
-    Handles NaN, inf, -inf, and converts numpy types to Python types.
-    """
-    df = df.replace([np.inf, -np.inf], np.nan)
-
-    for col in df.columns:
-        if df[col].dtype in ["float64", "float32", "int64", "int32"]:
-            df[col] = df[col].apply(
-                lambda x: (
-                    None
-                    if pd.isna(x)
-                    or (isinstance(x, float) and (math.isnan(x) or math.isinf(x)))
-                    else x
-                )
-            )
-        else:
-            df[col] = df[col].apply(lambda x: None if pd.isna(x) else x)
-
-    return df
-
 
 class EstimatorImageListView(APIView):
     serializer_class = EstimatorRequestSerializer
     permission_classes = [permissions.IsAuthenticated, IsEstimator]
 
     def get(self, request, format=None):
-        blueprint = EstimatorRequest.objects.filter(assigned_estimator=request.user)
-        serializer = EstimatorRequestSerializer(blueprint, many=True)
+        blueprint = EstimatorRequest.objects.filter(assigned_estimator=request.user).annotate(image_name=F("image__image"))
+        serializer = EstimatorRequestSerializer(blueprint, many=True, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -68,7 +43,7 @@ class EstimatorImageDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsEstimator]
 
     def get_object(self, pk):
-        return BlueprintImage.objects.filter(pk=pk).first()
+        return prefetch_image_detail(BlueprintImage.objects, skips_json_coordinates(self.request)).filter(pk=pk).first()
 
     def get(self, request, pk):
         image = self.get_object(pk)
@@ -87,7 +62,7 @@ class EstimatorImageDetailView(APIView):
 
         self.check_object_permissions(request, image)
 
-        serializer = BlueprintImageDetailSerializer(image)
+        serializer = BlueprintImageDetailSerializer(image, context={'request': request})
 
         # Fetch extra info safely using filter().first()
         extra_info = BlueprintExtraInfo.objects.filter(blueprint=image).first()
@@ -95,12 +70,8 @@ class EstimatorImageDetailView(APIView):
             BlueprintExtraInfoSerializer(extra_info).data if extra_info else None
         )
 
-        # Start annotation tasks
-        chain(
-            async_create_annotation.s(image.pk, request.user.id),
-            async_create_wall_annotation.s(),
-            async_create_window_and_door_annotation.s(),
-        ).apply_async()
+        # Room, wall and window/door detection in one task on one decoded image
+        async_create_all_annotations.delay(image.pk, request.user.id)
 
         return Response(
             {
@@ -134,7 +105,7 @@ def get(self, request, pk):
 
     self.check_object_permissions(request, image)
 
-    serializer = BlueprintImageDetailSerializer(image)
+    serializer = BlueprintImageDetailSerializer(image, context={'request': request})
 
     # Fetch extra info safely using filter().first()
     extra_info = BlueprintExtraInfo.objects.filter(blueprint=image).first()
@@ -142,12 +113,8 @@ def get(self, request, pk):
         BlueprintExtraInfoSerializer(extra_info).data if extra_info else None
     )
 
-    # Start annotation tasks
-    chain(
-        async_create_annotation.s(image.pk, request.user.id),
-        async_create_wall_annotation.s(),
-        async_create_window_and_door_annotation.s(),
-    ).apply_async()
+    # Room, wall and window/door detection in one task on one decoded image
+    async_create_all_annotations.delay(image.pk, request.user.id)
 
     return Response(
         {
@@ -215,7 +182,10 @@ class SendVerifiedImageToCustomUser(APIView):
 
 
 class PreviewExcelDataView(APIView):
-    """API endpoint for previewing Excel/CSV data before importing"""
+    """
+    API endpoint for previewing Excel/CSV data before importing. preview_data
+    is a list of row dicts, or one list per column with layout=columns.
+    """
 
     permission_classes = [permissions.IsAuthenticated, IsEstimator]
 
@@ -228,7 +198,14 @@ class PreviewExcelDataView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            if not excel_file.name.lower().endswith((".xlsx", ".xls", ".xlsm", ".csv")):
+            layout = request.data.get("layout", RECORDS)
+            if layout not in LAYOUTS:
+                return Response(
+                    {"error": f"layout must be one of: {', '.join(LAYOUTS)}."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            if file_type(excel_file.name) is None:
                 return Response(
                     {
                         "error": "Only Excel files (.xls, .xlsx, .xlsm) or CSV files (.csv) are allowed."
@@ -236,37 +213,25 @@ class PreviewExcelDataView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            if excel_file.name.lower().endswith(".csv"):
-                try:
-                    df = pd.read_csv(excel_file, keep_default_na=True)
-                except UnicodeDecodeError:
-                    df = pd.read_csv(
-                        excel_file, encoding="ISO-8859-1", keep_default_na=True
-                    )
-            else:
-                if excel_file.name.lower().endswith((".xlsx", ".xlsm")):
-                    df = pd.read_excel(excel_file, engine="openpyxl")
-                else:
-                    df = pd.read_excel(excel_file, engine="xlrd")
-
+            # Only the previewed rows are parsed; the total is estimated without reading the rest
+            df = read_preview(excel_file, excel_file.name)
             if df.empty:
                 return Response(
                     {"error": "File contains no data."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-
-            df = clean_dataframe_for_json(df)
-
-            preview_data = df.head(10).to_dict(orient="records")
-            columns = df.columns.tolist()
+            excel_file.seek(0)
+            total_rows = estimate_rows(excel_file, excel_file.name)
+            of_total = f" of about {total_rows} total rows" if total_rows is not None else ""
 
             return Response(
                 {
-                    "columns": columns,
-                    "preview_data": preview_data,
-                    "total_rows": len(df),
+                    "columns": df.columns.tolist(),
+                    "preview_data": encode_frame(df, layout),
+                    "layout": layout,
+                    "total_rows": total_rows,
                     "file_name": excel_file.name,
-                    "message": f"Preview of {excel_file.name} - showing first 10 rows of {len(df)} total rows",
+                    "message": f"Preview of {excel_file.name} - showing first {len(df)} rows{of_total}",
                 },
                 status=status.HTTP_200_OK,
             )
@@ -279,11 +244,20 @@ class PreviewExcelDataView(APIView):
 
 
 class ImportExcelExtraInfoView(APIView):
-    """API endpoint for estimators to import/view/delete Excel/CSV data for blueprints"""
+    """
+    API endpoint for estimators to import/view/delete Excel/CSV data for blueprints.
+
+    POST validates the header and stores the upload, then the import_extra_info
+    task parses it into rows in the background; GET shows the import's status
+    and progress with one page of rows (?page=, ?page_size=), as row dicts or
+    with ?layout=columns one list per column.
+    """
 
     permission_classes = [permissions.IsAuthenticated, IsEstimator]
 
-    REQUIRED_COLUMNS = ["CSI Division", "Description", "Unit", "Quantity", "Notes"]
+    REQUIRED_COLUMNS = CSI_COLUMNS
+    PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
 
     def get(self, request, blueprint_id):
         try:
@@ -294,10 +268,35 @@ class ImportExcelExtraInfoView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+        try:
+            page = int(request.query_params.get("page", 1))
+            page_size = int(request.query_params.get("page_size", self.PAGE_SIZE))
+        except ValueError:
+            return Response(
+                {"error": "page and page_size must be integers."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if page < 1 or not 1 <= page_size <= self.MAX_PAGE_SIZE:
+            return Response(
+                {"error": f"page must be at least 1 and page_size between 1 and {self.MAX_PAGE_SIZE}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        layout = request.query_params.get("layout", RECORDS)
+        if layout not in LAYOUTS:
+            return Response(
+                {"error": f"layout must be one of: {', '.join(LAYOUTS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         try:
             extra_info = BlueprintExtraInfo.objects.get(blueprint=blueprint)
-            serializer = BlueprintExtraInfoSerializer(extra_info)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            serializer = BlueprintExtraInfoSerializer(
+                extra_info, context={"page": page, "page_size": page_size, "layout": layout}
+            )
+            return Response(
+                {**serializer.data, "page": page, "page_size": page_size, "layout": layout},
+                status=status.HTTP_200_OK,
+            )
         except BlueprintExtraInfo.DoesNotExist:
             return Response(
                 {"error": "No CSV data found for this blueprint."},
@@ -331,7 +330,7 @@ class ImportExcelExtraInfoView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if not excel_file.name.lower().endswith((".xlsx", ".xls", ".xlsm", ".csv")):
+        if file_type(excel_file.name) is None:
             return Response(
                 {
                     "error": "Only Excel files (.xls, .xlsx, .xlsm) or CSV files (.csv) are allowed."
@@ -339,35 +338,26 @@ class ImportExcelExtraInfoView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if BlueprintExtraInfo.objects.filter(blueprint=blueprint).exists():
-            return Response(
-                {"error": "Excel data already uploaded for this blueprint."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        existing = BlueprintExtraInfo.objects.filter(blueprint=blueprint).first()
+        if existing is not None:
+            if existing.status != ImportStatus.FAILED:
+                return Response(
+                    {"error": "Excel data already uploaded for this blueprint."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            # A failed import can be replaced by a new upload
+            existing.source_file.delete(save=False)
+            existing.delete()
 
-        # Read the file into a DataFrame
+        # Only the header and first rows are read here; the task parses the rest
         try:
-            if excel_file.name.lower().endswith(".csv"):
-                try:
-                    df = pd.read_csv(excel_file, keep_default_na=True)
-                except UnicodeDecodeError:
-                    df = pd.read_csv(
-                        excel_file, encoding="ISO-8859-1", keep_default_na=True
-                    )
-            else:
-                if excel_file.name.lower().endswith((".xlsx", ".xlsm")):
-                    df = pd.read_excel(excel_file, engine="openpyxl")
-                else:
-                    df = pd.read_excel(excel_file, engine="xlrd")
-
+            df = read_preview(excel_file, excel_file.name)
             if df.empty:
                 return Response(
                     {"error": "File is empty or contains no data."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            df = clean_dataframe_for_json(df)
-
             # Validate headers
             is_valid, missing = self._validate_headers(df)
             if not is_valid:
@@ -380,24 +370,26 @@ class ImportExcelExtraInfoView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            excel_data = df.to_dict(orient="records")
-
         except Exception as e:
             return Response(
                 {"error": f"Error reading file: {str(e)}"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        excel_file.seek(0)
         extra_info = BlueprintExtraInfo.objects.create(
             blueprint=blueprint,
-            csv_data=excel_data,
+            source_file=excel_file,
+            file_name=excel_file.name,
+            columns=[str(column) for column in df.columns],
             imported_by=request.user,
         )
+        transaction.on_commit(lambda: import_extra_info.delay(str(extra_info.id)))
 
         serializer = BlueprintExtraInfoSerializer(extra_info)
         return Response(
-            {"message": "File data uploaded successfully.", "data": serializer.data},
-            status=status.HTTP_201_CREATED,
+            {"message": "File uploaded, import started.", "data": serializer.data},
+            status=status.HTTP_202_ACCEPTED,
         )
 
     @transaction.atomic
@@ -412,6 +404,7 @@ class ImportExcelExtraInfoView(APIView):
 
         try:
             extra_info = BlueprintExtraInfo.objects.get(blueprint=blueprint)
+            extra_info.source_file.delete(save=False)
             extra_info.delete()
 
             return Response(
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Blueprint, BlueprintImage
+from .models import Blueprint, BlueprintImage, PageArtifact
 # from unfold.admin import ModelAdmin
 
 @admin.register(Blueprint)
@@ -17,3 +17,9 @@ class BlueprintImageAdmin(admin.ModelAdmin):
     search_fields = ('blueprint__title',)
     ordering = ('-created_at',)
     date_hierarchy = 'created_at'
+
+@admin.register(PageArtifact)
+class PageArtifactAdmin(admin.ModelAdmin):
+    list_display = ('content_hash', 'dpi', 'scale', 'size', 'last_used', 'created_at')
+    search_fields = ('content_hash',)
+    ordering = ('last_used',)
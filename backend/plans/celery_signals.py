@@ -2,7 +2,11 @@ from celery.signals import worker_ready
 from .utils import get_model
 
 
-def preload_models(**kwargs):
+def preload_models(sender=None, **kwargs):
+    # Only workers that run inference keep the models in memory
+    from config.celery import INFERENCE_QUEUE, worker_consumes
+    if sender is not None and not worker_consumes(sender, INFERENCE_QUEUE):
+        return
     print("Preloading Annotation AI models in Celery worker")
     
     get_model()
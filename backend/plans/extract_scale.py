@@ -1,10 +1,18 @@
 import pytesseract
 import re
-import tempfile
-import subprocess
 from PIL import Image
 from io import BytesIO
 
+from .ocr import SubprocessEngine
+from .scale_regions import scale_region_crops
+
+# Fractions written as a drawing scale (1/4" = 1'-0", SCALE: 1/8). Crops only
+# accept these; the full-page fallback keeps the looser "first fraction" match.
+SCALE_NOTATIONS = [
+    re.compile(r'(?<!\d)(\d{1,2})\s*/\s*(\d{1,2})\s*(?:["”]\s*[=:]?\s*1\s*[\'][-–]?\d*["”]?)'),
+    re.compile(r'SCALE\s*[:=\-]?\s*(\d{1,2})\s*/\s*(\d{1,2})(?!\d)'),
+]
+
 def is_pdf_file_bytes(file_bytes):
     return file_bytes.startswith(b'%PDF')
 
@@ -16,10 +24,28 @@ def is_image_file_bytes(file_bytes):
     except IOError:
         return False
 
+
+def is_pdf_file(path):
+    with open(path, 'rb') as f:
+        return is_pdf_file_bytes(f.read(4))
+
+
+def is_image_file(path):
+    # Image.open only reads the header, the pixels are not decoded
+    try:
+        with Image.open(path):
+            return True
+    except IOError:
+        return False
+
 def extract_text_from_image(image: Image.Image) -> str:
     return pytesseract.image_to_string(image)
 
 def extract_scale_from_image(image: Image.Image) -> float | None:
+    scale = extract_scale_from_regions(image, lambda crops: map(extract_text_from_image, crops))
+    if scale is not None:
+        return scale
+
     text = extract_text_from_image(image)
     cleaned_text = clean_text(text)
 
@@ -49,13 +75,18 @@ def extract_scale_from_image(image: Image.Image) -> float | None:
     return 1.1
 
 
-def extract_scale_from_image_subprocess(image: Image.Image) -> float | None:
+def extract_scale_from_image_subprocess(image: Image.Image, engine=None) -> float | None:
+    # `engine` is anything with image_to_text (see plans.ocr); by default a
+    # fresh tesseract process is started for the image.
     try:
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-            tmp_path = tmp.name
-            image.save(tmp_path)
+        engine = engine or SubprocessEngine()
+        # A pool OCRs all crops at once, a single engine stops at the first hit
+        ocr_crops = getattr(engine, "map", None) or (lambda crops: map(engine.image_to_text, crops))
+        scale = extract_scale_from_regions(image, ocr_crops)
+        if scale is not None:
+            return scale
 
-        text = subprocess.check_output(["tesseract", tmp_path, "stdout"], stderr=subprocess.DEVNULL).decode()
+        text = engine.image_to_text(image)
 
         return extract_scale_from_text(text)
 
@@ -63,10 +94,32 @@ def extract_scale_from_image_subprocess(image: Image.Image) -> float | None:
         print(f"[Tesseract Subprocess OCR Failed]: {e}")
         return 1.1
 
-    finally:
-        import os
-        if 'tmp_path' in locals() and os.path.exists(tmp_path):
-            os.remove(tmp_path)
+
+def extract_scale_from_regions(image: Image.Image, ocr_crops) -> float | None:
+    """
+    OCR only the title block / view title crops found by plans.scale_regions.
+    Returns None when there are no crops or none of them has a scale notation,
+    in which case callers OCR the full page.
+    """
+    crops = scale_region_crops(image)
+    if not crops:
+        return None
+    for text in ocr_crops(crops):
+        scale = match_scale(text)
+        if scale is not None:
+            print(f"[Region SCALE]: {scale}")
+            return scale
+    print("[Scale Not Found in regions], falling back to the full page")
+    return None
+
+
+def match_scale(text: str) -> float | None:
+    cleaned_text = clean_text(text)
+    for pattern in SCALE_NOTATIONS:
+        match = pattern.search(cleaned_text)
+        if match and int(match.group(2)):
+            return int(match.group(1)) / int(match.group(2))
+    return None
 
 
 def extract_scale_from_text(text: str) -> float | None:
@@ -0,0 +1,126 @@
+"""
+Measurements for many polygons at once.
+
+Polygons are packed into one ``(N, 2)`` coordinate array plus ``offsets``:
+polygon ``i`` is ``coords[offsets[i]:offsets[i + 1]]``. Every function works
+on the whole batch with per-polygon reductions (``np.*.reduceat``) and gives
+exactly the values of the scalar helpers in plans.utils and estimators.utils:
+points are rounded to whole pixels first, and the pixel-to-feet factor is
+computed the same way.
+
+``dpi`` and ``scale`` are either single values or one value per polygon, so
+shapes from several pages can be measured in one pass.
+"""
+from itertools import chain
+import numpy as np
+
+
+def pack_polygons(polygons):
+    """(coords, offsets) for a list of point lists. Empty polygons are rejected."""
+    counts = np.fromiter((len(p) for p in polygons), dtype=np.int64, count=len(polygons))
+    if counts.size and counts.min() == 0:
+        raise ValueError("Polygons must have at least one point")
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    if not counts.size:
+        return np.empty((0, 2)), offsets
+    try:
+        # One conversion for the whole batch when the points are plain lists
+        coords = np.array(list(chain.from_iterable(polygons)), dtype=float).reshape(-1, 2)
+    except ValueError:
+        coords = np.concatenate([np.asarray(p, dtype=float).reshape(-1, 2) for p in polygons])
+    if len(coords) != offsets[-1]:
+        raise ValueError("Points must be [x, y] pairs")
+    return coords, offsets
+
+
+def unpack_polygons(coords, offsets):
+    return [coords[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def _feet_per_pixel(dpi, scale):
+    inch_per_pixel = 1 / dpi
+    return inch_per_pixel / scale
+
+
+def _square_feet_per_pixel(dpi, scale):
+    return _feet_per_pixel(dpi, scale) ** 2
+
+
+def per_polygon(factor, dpi, scale):
+    """
+    ``factor(dpi, scale)`` as a scalar, or per polygon when dpi or scale are
+    arrays. Each distinct (dpi, scale) pair is computed once with Python floats,
+    exactly as the scalar helpers do.
+    """
+    if np.ndim(dpi) == 0 and np.ndim(scale) == 0:
+        return factor(dpi, scale)
+    dpi, scale = np.broadcast_arrays(np.asarray(dpi, dtype=float), np.asarray(scale, dtype=float))
+    pairs, inverse = np.unique(np.stack([dpi, scale], axis=1), axis=0, return_inverse=True)
+    values = np.array([factor(d, s) for d, s in pairs.tolist()])
+    return values[inverse.reshape(-1)]
+
+
+def _pixels(coords):
+    return np.round(coords).astype(int)
+
+
+def _starts(offsets):
+    return offsets[:-1]
+
+
+def _successors(offsets, count):
+    """Index of each point's next point, wrapping around within its polygon."""
+    following = np.arange(1, count + 1)
+    following[offsets[1:] - 1] = offsets[:-1]
+    return following
+
+
+def pixel_areas(coords, offsets):
+    """Shoelace area in square pixels of every polygon."""
+    if len(offsets) < 2:
+        return np.empty(0)
+    points = _pixels(coords)
+    x, y = points[:, 0], points[:, 1]
+    following = _successors(offsets, len(points))
+    forward = np.add.reduceat(x * y[following], _starts(offsets))
+    backward = np.add.reduceat(y * x[following], _starts(offsets))
+    return 0.5 * np.abs(forward - backward)
+
+
+def areas_sqft(coords, offsets, dpi, scale):
+    """compute_sqft for every polygon."""
+    return pixel_areas(coords, offsets) * per_polygon(_square_feet_per_pixel, dpi, scale)
+
+
+def pixel_extents(coords, offsets):
+    """Bounding box width and height in pixels of every polygon."""
+    if len(offsets) < 2:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    points = _pixels(coords)
+    starts = _starts(offsets)
+    widths = np.maximum.reduceat(points[:, 0], starts) - np.minimum.reduceat(points[:, 0], starts)
+    heights = np.maximum.reduceat(points[:, 1], starts) - np.minimum.reduceat(points[:, 1], starts)
+    return widths, heights
+
+
+def dimensions_ft(coords, offsets, dpi, scale):
+    """polygon_dimension for every polygon: bounding width and height in feet, to 2 decimals."""
+    feet = per_polygon(_feet_per_pixel, dpi, scale)
+    widths, heights = pixel_extents(coords, offsets)
+    return np.round(widths * feet, 2), np.round(heights * feet, 2)
+
+
+def wall_dimensions_ft(coords, offsets, dpi, scale):
+    """compute_wall_dimensions for every polygon: length along x, thickness along y."""
+    return dimensions_ft(coords, offsets, dpi, scale)
+
+
+def perimeters_ft(coords, offsets, dpi, scale):
+    """Perimeter in feet of every polygon (closed, on whole-pixel points)."""
+    if len(offsets) < 2:
+        return np.empty(0)
+    points = _pixels(coords)
+    following = _successors(offsets, len(points))
+    edges = np.hypot(*(points[following] - points).T)
+    return np.add.reduceat(edges, _starts(offsets)) * per_polygon(_feet_per_pixel, dpi, scale)
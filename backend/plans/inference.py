@@ -0,0 +1,101 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from django.conf import settings
+
+
+class BatchInferenceEngine:
+    """
+    Collects images submitted from any thread into micro-batches and runs the
+    model once per batch on a single background thread.
+
+    A batch is closed when it reaches ``max_batch_size`` or ``max_wait`` seconds
+    after its first image arrived, whichever comes first. Every caller gets a
+    Future that resolves to the Results object for its own image. Running all
+    predictions on one thread also means a YOLO predictor is never used by two
+    threads at once.
+    """
+
+    def __init__(self, max_batch_size=4, max_wait=0.025, name="inference", predict_kwargs=None):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.name = name
+        self.predict_kwargs = predict_kwargs or {}
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, model, image):
+        future = Future()
+        self._ensure_thread()
+        self._queue.put((model, image, future))
+        return future
+
+    def predict(self, model, image):
+        return self.submit(model, image).result()
+
+    def _ensure_thread(self):
+        # Started lazily so a prefork worker child starts its own thread after the fork
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            # Normally every request uses the same model; split just in case
+            by_model = {}
+            for model, image, future in batch:
+                by_model.setdefault(id(model), (model, []))[1].append((image, future))
+            for model, items in by_model.values():
+                self._predict_batch(model, items)
+
+    def _predict_batch(self, model, items):
+        try:
+            results = model.predict([image for image, _ in items], **self.predict_kwargs)
+            if len(results) != len(items):
+                raise RuntimeError(f"Expected {len(items)} results, got {len(results)}")
+        except Exception as e:
+            for _, future in items:
+                future.set_exception(e)
+            return
+        print(f"[INFO] {self.name}: ran a batch of {len(items)}")
+        for (_, future), result in zip(items, results):
+            future.set_result(result)
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_inference_engine(key, **predict_kwargs):
+    """
+    One engine per model key per process, sized from the INFERENCE_* settings.
+    ``predict_kwargs`` are passed to model.predict for every batch.
+    """
+    if key not in _engines:
+        with _engines_lock:
+            if key not in _engines:
+                _engines[key] = BatchInferenceEngine(
+                    max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+                    max_wait=settings.INFERENCE_MAX_WAIT_MS / 1000,
+                    name=f"{key}-inference",
+                    predict_kwargs=predict_kwargs,
+                )
+    return _engines[key]
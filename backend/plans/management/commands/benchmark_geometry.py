@@ -0,0 +1,58 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from plans import geometry
+from plans.utils import compute_sqft, polygon_dimension
+from estimators.utils import compute_wall_dimensions
+
+
+class Command(BaseCommand):
+    help = (
+        "Time area and dimension computation for many polygons: the per-shape helpers "
+        "in a loop against one vectorized pass of plans.geometry, and check they agree."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--polygons", type=int, default=10000)
+        parser.add_argument("--max-points", type=int, default=12)
+        parser.add_argument("--dpi", type=int, default=300)
+        parser.add_argument("--scale", type=float, default=0.25)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        dpi, scale = options["dpi"], options["scale"]
+        polygons = [
+            rng.uniform(0, 10000, (int(rng.integers(3, options["max_points"] + 1)), 2)).tolist()
+            for _ in range(options["polygons"])
+        ]
+
+        started = time.perf_counter()
+        scalar = [
+            (compute_sqft(np.array(p), dpi, scale), polygon_dimension(np.array(p), dpi, scale),
+             compute_wall_dimensions(np.array(p), dpi, scale))
+            for p in polygons
+        ]
+        scalar_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        coords, offsets = geometry.pack_polygons(polygons)
+        packed_seconds = time.perf_counter() - started
+        areas = geometry.areas_sqft(coords, offsets, dpi, scale)
+        widths, heights = geometry.dimensions_ft(coords, offsets, dpi, scale)
+        lengths, thicknesses = geometry.wall_dimensions_ft(coords, offsets, dpi, scale)
+        batch_seconds = time.perf_counter() - started
+
+        vectorized = [
+            (areas[i], (widths[i], heights[i]), (lengths[i], thicknesses[i])) for i in range(len(polygons))
+        ]
+        if vectorized != scalar:
+            raise CommandError("Vectorized results differ from the scalar helpers")
+
+        count = len(polygons)
+        self.stdout.write(
+            f"{count} polygons: per-shape {scalar_seconds * 1000:8.1f} ms ({count / scalar_seconds:10.0f}/s), "
+            f"vectorized {batch_seconds * 1000:8.1f} ms ({count / batch_seconds:10.0f}/s, "
+            f"{packed_seconds * 1000:.1f} ms of it packing) - {scalar_seconds / batch_seconds:.0f}x, identical results"
+        )
@@ -0,0 +1,88 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+from pdf2image import convert_from_path
+
+from plans.extract_scale import is_pdf_file, extract_scale_from_text, extract_scale_from_image_subprocess
+from plans.ocr import OCR_MODES, SUBPROCESS, PERSISTENT, OcrEnginePool, tesserocr
+
+
+class Command(BaseCommand):
+    help = (
+        "Time scale OCR over sample sheets with each OCR engine: one page at a time "
+        "(as the sequential task does), concurrently through the engine pool, and "
+        "on title block / view title crops with the full page as fallback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Sample sheets (PDF or image files)")
+        parser.add_argument("--dpi", type=int, default=300)
+        parser.add_argument("--max-pages", type=int, default=10, help="Pages rendered per PDF")
+        parser.add_argument("--workers", type=int, default=4, help="Engine pool size")
+        parser.add_argument("--repeat", type=int, default=1)
+        parser.add_argument("--modes", nargs="+", choices=OCR_MODES, default=list(OCR_MODES))
+
+    def load_pages(self, paths, dpi, max_pages):
+        pages = []
+        for path in paths:
+            if is_pdf_file(path):
+                pages += convert_from_path(path, dpi=dpi, first_page=1, last_page=max_pages)
+            else:
+                with Image.open(path) as img:
+                    img.load()
+                    pages.append(img)
+        return pages
+
+    def handle(self, *args, **options):
+        pages = self.load_pages(options["paths"], options["dpi"], options["max_pages"])
+        if not pages:
+            raise CommandError("No pages to benchmark")
+        self.stdout.write(f"{len(pages)} page(s), {options['workers']} pool worker(s)")
+
+        scales = {}
+        for mode in options["modes"]:
+            if mode == PERSISTENT and tesserocr is None:
+                self.stdout.write(self.style.WARNING("persistent: skipped, tesserocr is not installed"))
+                continue
+
+            pool = OcrEnginePool(mode=mode, workers=options["workers"])
+            try:
+                # Warm every engine so start-up cost is not counted
+                pool.map(pages[:1] * pool.workers)
+
+                started = time.perf_counter()
+                for _ in range(options["repeat"]):
+                    texts = [pool.image_to_text(page) for page in pages]
+                sequential = (time.perf_counter() - started) / options["repeat"]
+
+                started = time.perf_counter()
+                for _ in range(options["repeat"]):
+                    texts = pool.map(pages)
+                concurrent = (time.perf_counter() - started) / options["repeat"]
+
+                started = time.perf_counter()
+                for _ in range(options["repeat"]):
+                    region_scales = [extract_scale_from_image_subprocess(page, pool) for page in pages]
+                regions = (time.perf_counter() - started) / options["repeat"]
+            finally:
+                pool.close()
+
+            scales[mode] = [extract_scale_from_text(text) for text in texts]
+            self.stdout.write(
+                f"{mode:>10}: {sequential / len(pages) * 1000:8.1f} ms/page one at a time, "
+                f"{concurrent / len(pages) * 1000:8.1f} ms/page pooled "
+                f"({len(pages) / concurrent:.2f} pages/s)"
+            )
+            agree = sum(a == b for a, b in zip(region_scales, scales[mode]))
+            self.stdout.write(
+                f"{'':>10}  {regions / len(pages) * 1000:8.1f} ms/page with scale regions "
+                f"(same scale as full-page OCR on {agree}/{len(pages)} pages)"
+            )
+
+        if SUBPROCESS in scales and PERSISTENT in scales:
+            if scales[SUBPROCESS] == scales[PERSISTENT]:
+                self.stdout.write(self.style.SUCCESS("Detected scales match across engines"))
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f"Detected scales differ: subprocess={scales[SUBPROCESS]} persistent={scales[PERSISTENT]}"
+                ))
@@ -0,0 +1,129 @@
+import json
+import os
+import time
+import cv2
+from django.core.management.base import BaseCommand, CommandError
+
+from plans.inference import BatchInferenceEngine
+from plans.tasks import room_detections
+from plans.tiling import TileSource, tiled_detections, merge_boxes, merge_polygons
+from plans.utils import get_model
+from estimators.tasks import wall_detections, window_and_door_detections
+from estimators.utils import get_wall_model, get_window_and_door_model
+
+DETECTORS = {
+    "room": (get_model, room_detections, merge_polygons),
+    "wall": (get_wall_model, wall_detections, merge_boxes),
+    "window_and_door": (get_window_and_door_model, window_and_door_detections, merge_boxes),
+}
+
+
+def bbox(points):
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def iou(a, b):
+    inter_w = min(a[2], b[2]) - max(a[0], b[0])
+    inter_h = min(a[3], b[3]) - max(a[1], b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union else 0.0
+
+
+def recall(reference, detections, threshold):
+    """Share of reference shapes matched by a detection with the same label (box IoU)."""
+    if not reference:
+        return None
+    unmatched = [(d["label"], bbox(d["points"])) for d in detections]
+    found = 0
+    for shape in reference:
+        box = bbox(shape["points"])
+        for i, (label, other) in enumerate(unmatched):
+            if label == shape["label"] and iou(box, other) >= threshold:
+                found += 1
+                del unmatched[i]
+                break
+    return found / len(reference)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare tiled inference with the whole-image call on sample pages: latency, "
+        "and recall against LabelMe ground truth (or against the whole-image "
+        "detections when no ground truth is given). Runs on CPU."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Rendered page images")
+        parser.add_argument("--models", nargs="+", choices=list(DETECTORS), default=["room"])
+        parser.add_argument("--tile-size", type=int, default=1280)
+        parser.add_argument("--overlap", type=int, default=256)
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--batch-size", type=int, default=4)
+        parser.add_argument(
+            "--ground-truth", help="Directory of LabelMe JSON files named after each page (page.jpg -> page.json)"
+        )
+        parser.add_argument("--iou", type=float, default=0.5, help="Box IoU needed to count a match")
+
+    def ground_truth(self, directory, path):
+        if not directory:
+            return None
+        name = os.path.splitext(os.path.basename(path))[0] + ".json"
+        try:
+            with open(os.path.join(directory, name)) as fh:
+                return json.load(fh)["shapes"]
+        except FileNotFoundError:
+            return None
+
+    def handle(self, *args, **options):
+        engine = BatchInferenceEngine(
+            max_batch_size=options["batch_size"], max_wait=0.025, predict_kwargs={"device": "cpu", "verbose": False}
+        )
+        for key in options["models"]:
+            get_detector, detect, merge = DETECTORS[key]
+            model = get_detector()
+            self.stdout.write(self.style.MIGRATE_HEADING(key))
+
+            for path in options["paths"]:
+                image = cv2.imread(path, cv2.IMREAD_COLOR)
+                if image is None:
+                    raise CommandError(f"Could not read {path}")
+                # Warm up so model loading is not counted
+                engine.predict(model, image[:64, :64])
+
+                started = time.perf_counter()
+                whole = detect(engine.predict(model, image), model)
+                whole_seconds = time.perf_counter() - started
+                del image
+
+                started = time.perf_counter()
+                with TileSource.open(path) as source:
+                    tiled = tiled_detections(
+                        source, model, engine, detect, merge,
+                        tile_size=options["tile_size"], overlap=options["overlap"], workers=options["workers"],
+                    )
+                tiled_seconds = time.perf_counter() - started
+
+                truth = self.ground_truth(options["ground_truth"], path)
+                if truth is not None:
+                    truth = [shape for shape in truth if shape["label"] in model.names.values()] or truth
+                    whole_recall = recall(truth, whole, options["iou"])
+                    tiled_recall = recall(truth, tiled, options["iou"])
+                    against = "ground truth"
+                else:
+                    whole_recall = 1.0 if whole else None
+                    tiled_recall = recall(whole, tiled, options["iou"])
+                    against = "whole-image"
+
+                def fmt(value):
+                    return "n/a" if value is None else f"{value:.2%}"
+
+                self.stdout.write(
+                    f"{os.path.basename(path)}: whole image {whole_seconds * 1000:8.1f} ms, {len(whole)} detections, "
+                    f"recall {fmt(whole_recall)} | tiled {tiled_seconds * 1000:8.1f} ms, {len(tiled)} detections, "
+                    f"recall {fmt(tiled_recall)} (vs {against})"
+                )
@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from plans.models import BlueprintImage
+from plans.tasks import tile_stored_page
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the deep zoom pyramids and thumbnails of pages stored before they "
+        "were generated during processing, or rebuild them after changing PAGE_TILE_SIZE."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--image", nargs="+", default=[], help="Blueprint image ids")
+        parser.add_argument("--project", help="Every page of this project")
+        parser.add_argument("--all", action="store_true", help="Every page")
+        parser.add_argument("--rebuild", action="store_true", help="Also pages that already have tiles")
+
+    def handle(self, *args, **options):
+        images = BlueprintImage.objects.all()
+        if options["image"]:
+            images = images.filter(pk__in=options["image"])
+        elif options["project"]:
+            images = images.filter(blueprint__project_id=options["project"])
+        elif not options["all"]:
+            raise CommandError("Give --image, --project or --all")
+        if not options["rebuild"]:
+            images = images.filter(tile_size__isnull=True)
+
+        started = time.perf_counter()
+        built = skipped = 0
+        for image in images.iterator():
+            if tile_stored_page(image):
+                built += 1
+            else:
+                skipped += 1
+        self.stdout.write(f"{built} page(s) tiled, {skipped} not tiled in {time.perf_counter() - started:.3f}s")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-17 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blueprint',
+            name='failed_pages',
+            field=models.JSONField(blank=True, default=list, help_text='Pages that could not be processed, with the error message', verbose_name='Failed Pages'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.2 on 2026-10-17 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0002_blueprint_failed_pages'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageArtifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('image', models.FileField(upload_to='page_cache/')),
+                ('dpi', models.IntegerField(blank=True, null=True, verbose_name='DPI')),
+                ('scale', models.FloatField(blank=True, null=True)),
+                ('predictions', models.JSONField(blank=True, default=dict, help_text='Model detections in pixel coordinates, by model')),
+                ('size', models.BigIntegerField(default=0, help_text='Size of the cached image in bytes')),
+                ('last_used', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Page Artifact',
+                'verbose_name_plural': 'Page Artifacts',
+                'ordering': ['-last_used'],
+            },
+        ),
+        migrations.AddField(
+            model_name='blueprintimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, help_text='Key of the cached page artifact this page was rendered from', max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.2 on 2026-10-17 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0003_page_artifact'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blueprintimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, help_text='Width of the image in pixels', null=True),
+        ),
+        migrations.AddField(
+            model_name='blueprintimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, help_text='Height of the image in pixels', null=True),
+        ),
+        migrations.AddField(
+            model_name='blueprintimage',
+            name='tile_size',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Tile size of the deep zoom pyramid, empty until it is built', null=True),
+        ),
+    ]
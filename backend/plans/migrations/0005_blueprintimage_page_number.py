@@ -0,0 +1,38 @@
+# Generated by Django 5.2.2 on 2026-10-17 21:05
+
+import re
+from django.db import migrations, models
+
+PAGE_TITLE = re.compile(r" - Page (\d+)$")
+
+
+def number_pages(apps, schema_editor):
+    # Rendered pages were titled "<blueprint> - Page <n>"
+    BlueprintImage = apps.get_model('plans', 'BlueprintImage')
+    pages = []
+    for image in BlueprintImage.objects.only('pk', 'title').iterator():
+        match = PAGE_TITLE.search(image.title or '')
+        if match:
+            image.page_number = int(match.group(1))
+            pages.append(image)
+    BlueprintImage.objects.bulk_update(pages, ['page_number'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0004_blueprintimage_tiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blueprintimage',
+            name='page_number',
+            field=models.PositiveIntegerField(blank=True, help_text='Page of the blueprint file this image was rendered from', null=True),
+        ),
+        migrations.AlterModelOptions(
+            name='blueprintimage',
+            options={'ordering': ['page_number', '-created_at'], 'verbose_name': 'Blueprint Image', 'verbose_name_plural': 'Blueprint Images'},
+        ),
+        migrations.RunPython(number_pages, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-17 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plans', '0005_blueprintimage_page_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blueprintimage',
+            name='tile_version',
+            field=models.PositiveIntegerField(default=0, help_text='Version of the deep zoom pyramid, part of its URLs; bumped on every rebuild'),
+        ),
+    ]
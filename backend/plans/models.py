@@ -22,6 +22,7 @@ class Blueprint(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     category = models.CharField(max_length=10, choices=Category.choices, default=Category.PLAN)
+    failed_pages = models.JSONField(default=list, blank=True, verbose_name="Failed Pages", help_text="Pages that could not be processed, with the error message")
 
     def __str__(self):
         return self.title
@@ -34,12 +35,18 @@ class BlueprintImage(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     blueprint = models.ForeignKey(Blueprint, on_delete=models.CASCADE, related_name='images', verbose_name="Blueprint Title")
     title = models.CharField(max_length=150, null=True, blank=True)
+    page_number = models.PositiveIntegerField(null=True, blank=True, help_text='Page of the blueprint file this image was rendered from')
     image = models.ImageField(upload_to='blueprints/images/', default="Untitled Image")
     dpi = models.IntegerField(null=True, blank=True, default=None, verbose_name='DPI', help_text='Dots per inch of the image')
     scale = models.FloatField(null=True, blank=True, default=2.1, verbose_name='Scale', help_text='Scale of the image in inches per pixel')
     floor_json_file = models.FileField(upload_to='json/floor/', null=True, blank=True)
     wall_json_file = models.FileField(upload_to='json/wall/', null=True, blank=True)
     window_json_file = models.FileField(upload_to='json/window&door/', null=True, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True, help_text='Key of the cached page artifact this page was rendered from')
+    width = models.PositiveIntegerField(null=True, blank=True, help_text='Width of the image in pixels')
+    height = models.PositiveIntegerField(null=True, blank=True, help_text='Height of the image in pixels')
+    tile_size = models.PositiveSmallIntegerField(null=True, blank=True, help_text='Tile size of the deep zoom pyramid, empty until it is built')
+    tile_version = models.PositiveIntegerField(default=0, help_text='Version of the deep zoom pyramid, part of its URLs; bumped on every rebuild')
     is_verified = models.BooleanField(null=True, blank=True, default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -48,6 +55,32 @@ class BlueprintImage(models.Model):
         return f"Image for {self.blueprint.title}"
     
     class Meta:
-        ordering = ['-created_at']
+        # Pages are stored out of order (cache hits first, fan-out tasks in any
+        # order), so creation time says nothing about their place in the file.
+        # Uploaded images have no page number and come last, newest first.
+        ordering = ['page_number', '-created_at']
         verbose_name = 'Blueprint Image'
-        verbose_name_plural = 'Blueprint Images'
\ No newline at end of file
+        verbose_name_plural = 'Blueprint Images'
+
+class PageArtifact(models.Model):
+    """
+    Derived data for one rendered page, keyed by a hash of the page's PDF content
+    (or of the uploaded image) and the render settings. Identical pages in later
+    uploads are linked from here instead of being rendered and OCR'd again.
+    """
+    content_hash = models.CharField(max_length=64, unique=True)
+    image = models.FileField(upload_to='page_cache/')
+    dpi = models.IntegerField(null=True, blank=True, verbose_name='DPI')
+    scale = models.FloatField(null=True, blank=True)
+    predictions = models.JSONField(default=dict, blank=True, help_text='Model detections in pixel coordinates, by model')
+    size = models.BigIntegerField(default=0, help_text='Size of the cached image in bytes')
+    last_used = models.DateTimeField(auto_now_add=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.content_hash
+
+    class Meta:
+        ordering = ['-last_used']
+        verbose_name = 'Page Artifact'
+        verbose_name_plural = 'Page Artifacts'
@@ -0,0 +1,160 @@
+import os
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+
+try:
+    # Optional: in-process tesseract bindings for the persistent engine
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+SUBPROCESS = "subprocess"
+PERSISTENT = "persistent"
+OCR_MODES = (SUBPROCESS, PERSISTENT)
+
+
+class SubprocessEngine:
+    """Saves the image as a PNG and runs a fresh `tesseract` process on it."""
+
+    mode = SUBPROCESS
+
+    def __init__(self, lang="eng"):
+        self.lang = lang
+
+    def image_to_text(self, image):
+        try:
+            with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
+                tmp_path = tmp.name
+                image.save(tmp_path)
+            command = ["tesseract", tmp_path, "stdout"]
+            if self.lang != "eng":
+                command += ["-l", self.lang]
+            return subprocess.check_output(command, stderr=subprocess.DEVNULL).decode()
+        finally:
+            if 'tmp_path' in locals() and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def close(self):
+        pass
+
+
+class PersistentEngine:
+    """
+    Keeps one tesseract API instance (and its language data) loaded and hands it
+    the raw pixel buffer, so there is no PNG encode, temp file or process start.
+    """
+
+    mode = PERSISTENT
+
+    def __init__(self, lang="eng"):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        self.lang = lang
+        self.api = tesserocr.PyTessBaseAPI(lang=lang)
+
+    def image_to_text(self, image):
+        if image.mode not in ("L", "RGB"):
+            image = image.convert("RGB")
+        bytes_per_pixel = 1 if image.mode == "L" else 3
+        self.api.SetImageBytes(
+            image.tobytes(), image.width, image.height,
+            bytes_per_pixel, bytes_per_pixel * image.width,
+        )
+        dpi = image.info.get("dpi")
+        if dpi:
+            self.api.SetSourceResolution(round(dpi[0]))
+        try:
+            return self.api.GetUTF8Text()
+        finally:
+            self.api.Clear()
+
+    def close(self):
+        self.api.End()
+
+
+def create_engine(mode=SUBPROCESS, lang="eng"):
+    if mode not in OCR_MODES:
+        raise ValueError(f"Unknown OCR engine mode: {mode}")
+    if mode == PERSISTENT:
+        if tesserocr is not None:
+            return PersistentEngine(lang)
+        print("[OCR] tesserocr is not installed, falling back to the tesseract subprocess")
+    return SubprocessEngine(lang)
+
+
+_thread_engines = threading.local()
+
+
+def get_engine(mode=SUBPROCESS, lang="eng"):
+    """Engine cached per thread (tesseract API instances are not thread-safe)."""
+    engines = getattr(_thread_engines, "engines", None)
+    if engines is None:
+        engines = _thread_engines.engines = {}
+    if (mode, lang) not in engines:
+        engines[(mode, lang)] = create_engine(mode, lang)
+    return engines[(mode, lang)]
+
+
+class OcrEnginePool:
+    """
+    Thread pool with one warm engine per worker thread. Tesseract does its work
+    outside the GIL (in its own process, or in C++ with tesserocr), so images
+    submitted together are recognised concurrently across cores.
+    """
+
+    def __init__(self, mode=SUBPROCESS, workers=2, lang="eng"):
+        self.mode = mode
+        self.lang = lang
+        self.workers = max(1, workers)
+        self._local = threading.local()
+        self._engines = []
+        self._engines_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+
+    def _engine(self):
+        engine = getattr(self._local, "engine", None)
+        if engine is None:
+            engine = self._local.engine = create_engine(self.mode, self.lang)
+            with self._engines_lock:
+                self._engines.append(engine)
+        return engine
+
+    def _image_to_text(self, image):
+        return self._engine().image_to_text(image)
+
+    def submit(self, image):
+        return self._executor.submit(self._image_to_text, image)
+
+    def image_to_text(self, image):
+        return self.submit(image).result()
+
+    def map(self, images):
+        futures = [self.submit(image) for image in images]
+        return [future.result() for future in futures]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._engines_lock:
+            for engine in self._engines:
+                engine.close()
+            self._engines = []
+
+
+_pool_instance = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool():
+    global _pool_instance
+    if _pool_instance is None:
+        with _pool_lock:
+            if _pool_instance is None:
+                _pool_instance = OcrEnginePool(
+                    mode=settings.OCR_ENGINE,
+                    workers=settings.OCR_POOL_WORKERS,
+                    lang=settings.OCR_LANGUAGE,
+                )
+    return _pool_instance
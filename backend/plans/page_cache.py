@@ -0,0 +1,230 @@
+import os
+import mmap
+import hashlib
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from PyPDF2 import PdfReader # type: ignore
+from PyPDF2.generic import IndirectObject, StreamObject # type: ignore
+
+from .models import BlueprintImage, PageArtifact
+from .rasterize import DEFAULT_DPI
+
+# Part of every cache key: bump it when rendering, JPEG encoding, scale
+# detection or the room model change so existing artifacts stop matching.
+PAGE_CACHE_VERSION = 1
+
+# Keys that do not change how a page renders. /Parent and /P point back up the
+# page tree and would pull every other page into the hash.
+IGNORED_KEYS = {"/Parent", "/P", "/StructParents", "/Metadata", "/PieceInfo", "/LastModified", "/Thumb"}
+
+
+class PdfObjectHasher:
+    """
+    Hashes PDF objects by content. Each indirect object is hashed once and its
+    digest reused, so resources shared by many pages (fonts, title block
+    XObjects) are only read once per document.
+    """
+
+    def __init__(self):
+        self.digests = {}
+
+    def digest(self, obj):
+        sha = hashlib.sha256()
+        self._update(sha, obj, ())
+        return sha.digest()
+
+    def _update(self, sha, obj, parents):
+        if isinstance(obj, IndirectObject):
+            key = (obj.idnum, obj.generation)
+            if key in parents:
+                sha.update(b"cycle")
+                return
+            if key not in self.digests:
+                inner = hashlib.sha256()
+                self._update(inner, obj.get_object(), parents + (key,))
+                self.digests[key] = inner.digest()
+            sha.update(b"R" + self.digests[key])
+        elif isinstance(obj, dict):
+            sha.update(b"<<")
+            # dict.items keeps IndirectObjects unresolved (DictionaryObject.__getitem__ resolves them)
+            for key, value in sorted(dict.items(obj)):
+                if key in IGNORED_KEYS:
+                    continue
+                sha.update(key.encode())
+                self._update(sha, value, parents)
+            sha.update(b">>")
+            if isinstance(obj, StreamObject):
+                # Encoded bytes: nothing has to be decompressed to build the key
+                sha.update(obj._data or b"")
+        elif isinstance(obj, list):
+            sha.update(b"[")
+            for value in obj:
+                self._update(sha, value, parents)
+            sha.update(b"]")
+        else:
+            sha.update(type(obj).__name__.encode() + repr(obj).encode("utf-8", "surrogatepass"))
+
+
+def cache_key(digest, dpi):
+    return hashlib.sha256(f"{PAGE_CACHE_VERSION}:{dpi}:".encode() + digest).hexdigest()
+
+
+def pdf_page_hashes(pdf_path, dpi=DEFAULT_DPI):
+    """
+    One cache key per page. Returns None when the cache is disabled or the PDF
+    cannot be walked (e.g. encrypted), in which case every page is rendered.
+    """
+    if not settings.PAGE_CACHE_ENABLED:
+        return None
+    try:
+        with open(pdf_path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            hasher = PdfObjectHasher()
+            return [cache_key(hasher.digest(page), dpi) for page in PdfReader(mm).pages]
+    except Exception as e:
+        print(f"[WARNING] Could not hash PDF pages, page cache skipped: {e}")
+        return None
+
+
+def image_file_hash(path):
+    if not settings.PAGE_CACHE_ENABLED:
+        return None
+    sha = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return cache_key(sha.digest(), "image")
+
+
+def uploaded_file_hash(upload):
+    """image_file_hash of an uploaded file, read in chunks and rewound after."""
+    if not settings.PAGE_CACHE_ENABLED:
+        return None
+    sha = hashlib.sha256()
+    for chunk in upload.chunks():
+        sha.update(chunk)
+    upload.seek(0)
+    return cache_key(sha.digest(), "image")
+
+
+def cached_artifacts(page_hashes):
+    """{page number: PageArtifact} for the pages already in the cache."""
+    if not page_hashes:
+        return {}
+    artifacts = {
+        artifact.content_hash: artifact
+        for artifact in PageArtifact.objects.filter(content_hash__in=set(page_hashes))
+    }
+    found = {}
+    for idx, content_hash in enumerate(page_hashes, start=1):
+        artifact = artifacts.get(content_hash)
+        if artifact is None:
+            continue
+        if not artifact.image.storage.exists(artifact.image.name):
+            # The file went missing (e.g. MEDIA_ROOT was cleaned up), treat it as a miss
+            artifacts.pop(content_hash)
+            artifact.delete()
+            continue
+        found[idx] = artifact
+    if found:
+        PageArtifact.objects.filter(pk__in={a.pk for a in found.values()}).update(last_used=timezone.now())
+    return found
+
+
+def link_file(storage, source_name, target_name):
+    """
+    Make ``source_name`` also available as ``target_name`` and return the name
+    used. Local storage gets a hardlink (no copy on disk, and deleting either
+    name leaves the other intact); other storages get a copy.
+    """
+    try:
+        name = storage.get_available_name(target_name)
+        target_path = storage.path(name)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        os.link(storage.path(source_name), target_path)
+        return name
+    except (NotImplementedError, OSError):
+        with storage.open(source_name) as fh:
+            return storage.save(target_name, fh)
+
+
+def store_cached_page(artifact, blueprint, idx):
+    """Create the BlueprintImage for page ``idx`` from a cached artifact."""
+    blueprint_image = BlueprintImage(
+        title=f"{blueprint.title} - Page {idx}",
+        blueprint=blueprint,
+        page_number=idx,
+        dpi=artifact.dpi,
+        scale=artifact.scale,
+        content_hash=artifact.content_hash,
+    )
+    target_name = BlueprintImage._meta.get_field("image").generate_filename(
+        blueprint_image, f"{blueprint.title}_page_{idx}.jpg"
+    )
+    blueprint_image.image.name = link_file(artifact.image.storage, artifact.image.name, target_name)
+    blueprint_image.save()
+    return blueprint_image
+
+
+def remember_page(blueprint_image, size):
+    """Add a freshly rendered page to the cache, unless it is already there."""
+    content_hash = blueprint_image.content_hash
+    if not settings.PAGE_CACHE_ENABLED or not content_hash:
+        return None
+    if PageArtifact.objects.filter(content_hash=content_hash).exists():
+        return None
+    storage = blueprint_image.image.storage
+    extension = os.path.splitext(blueprint_image.image.name)[1] or ".jpg"
+    name = link_file(storage, blueprint_image.image.name, f"page_cache/{content_hash[:2]}/{content_hash}{extension}")
+    try:
+        with transaction.atomic():
+            return PageArtifact.objects.create(
+                content_hash=content_hash,
+                image=name,
+                dpi=blueprint_image.dpi,
+                scale=blueprint_image.scale,
+                size=size,
+            )
+    except IntegrityError:
+        # Another worker cached the same page first
+        storage.delete(name)
+        return None
+
+
+def cached_predictions(content_hash, model_name):
+    if not settings.PAGE_CACHE_ENABLED or not content_hash:
+        return None
+    artifact = PageArtifact.objects.filter(content_hash=content_hash).only("predictions").first()
+    if artifact is None:
+        return None
+    return artifact.predictions.get(model_name)
+
+
+def remember_predictions(content_hash, model_name, detections):
+    if not settings.PAGE_CACHE_ENABLED or not content_hash:
+        return
+    with transaction.atomic():
+        artifact = PageArtifact.objects.select_for_update().filter(content_hash=content_hash).first()
+        if artifact is not None:
+            artifact.predictions[model_name] = detections
+            artifact.save(update_fields=["predictions"])
+
+
+def evict_page_cache(max_bytes=None):
+    """Delete least recently used artifacts until the cache fits in ``max_bytes``."""
+    max_bytes = settings.PAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    total = PageArtifact.objects.aggregate(total=Sum("size"))["total"] or 0
+    evicted = 0
+    if total <= max_bytes:
+        return evicted
+    for artifact in PageArtifact.objects.order_by("last_used").iterator():
+        if total <= max_bytes:
+            break
+        # Only the cache's own link goes; BlueprintImage files linked to it remain
+        artifact.image.delete(save=False)
+        artifact.delete()
+        total -= artifact.size
+        evicted += 1
+    print(f"[INFO] Evicted {evicted} pages from the page cache")
+    return evicted
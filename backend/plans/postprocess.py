@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+
+ERODE_KERNEL = np.ones((3, 3), np.uint8)
+# One pixel for the 3x3 erosion and one more so that, away from the page edge,
+# the mask never touches the ROI border and erodes exactly as on the full page.
+ROI_PADDING = 2
+
+
+class PolygonSimplifier:
+    """
+    Turns mask polygons into simplified room polygons: rasterize, erode by one
+    pixel, keep the largest outer contour and approximate it at 1% of its
+    perimeter.
+
+    Each polygon is rasterized in its own bounding box (padded, clipped to the
+    page) instead of a page-sized canvas, and the scratch buffers are kept
+    between polygons, so the work per room is proportional to the room and not
+    to the sheet. The output is identical to doing the same on the full page.
+    """
+
+    def __init__(self, height, width):
+        self.height = height
+        self.width = width
+        self._mask = np.empty(0, dtype=np.uint8)
+        self._eroded = np.empty(0, dtype=np.uint8)
+
+    def _scratch(self, height, width):
+        size = height * width
+        if self._mask.size < size:
+            self._mask = np.empty(size, dtype=np.uint8)
+            self._eroded = np.empty(size, dtype=np.uint8)
+        # Contiguous views so OpenCV writes into them instead of allocating
+        mask = self._mask[:size].reshape(height, width)
+        mask.fill(0)
+        return mask, self._eroded[:size].reshape(height, width)
+
+    def simplify(self, polygon):
+        """Simplified points in page pixels, or None when nothing is left after erosion."""
+        points = np.array(polygon, dtype=np.int32).reshape(-1, 2)
+        if not len(points):
+            return None
+
+        x0 = max(int(points[:, 0].min()) - ROI_PADDING, 0)
+        y0 = max(int(points[:, 1].min()) - ROI_PADDING, 0)
+        x1 = min(int(points[:, 0].max()) + ROI_PADDING + 1, self.width)
+        y1 = min(int(points[:, 1].max()) + ROI_PADDING + 1, self.height)
+        if x0 >= x1 or y0 >= y1:
+            # Entirely off the page
+            return None
+
+        mask, eroded = self._scratch(y1 - y0, x1 - x0)
+        cv2.fillPoly(mask, [points - (x0, y0)], 255)
+        eroded = cv2.erode(mask, ERODE_KERNEL, dst=eroded, iterations=1)
+        contours, _ = cv2.findContours(eroded, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+
+        contour = max(contours, key=cv2.contourArea)
+        epsilon = 0.01 * cv2.arcLength(contour, True)
+        simplified = cv2.approxPolyDP(contour, epsilon, True).reshape(-1, 2) + (x0, y0)
+        return np.round(simplified.astype(float), 2).tolist()
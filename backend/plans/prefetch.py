@@ -0,0 +1,86 @@
+"""
+Prefetch plans for the nested blueprint serializers.
+
+BlueprintImageDetailSerializer renders every annotation of an image with its
+material links, and each link with its material, subcategory and category.
+Left to lazy loading that is several queries per annotation and per link.
+The plans here load the whole graph up front with one query per annotation
+table and one per material link table (which joins material, subcategory and
+category), so the number of queries does not depend on how many annotations
+or materials an image has:
+
+    image detail      1 (image) + 6
+    blueprint detail  1 (blueprint) + 1 (images) + 6
+
+With ``defer_coordinates`` the annotations are loaded without their JSON
+``coordinates`` column, for responses that encode packed or delta coordinates
+from ``coordinates_packed`` (see annotations.serializers.without_json_coordinates).
+
+with_cover_image() does the same for the page shown in blueprint lists.
+"""
+from django.db.models import F, OuterRef, Prefetch, Subquery
+
+from annotations.models import (
+    Annotation,
+    AnnotationMaterial,
+    WallAnnotation,
+    WallAnnotationMaterial,
+    WindowAndDoorAnnotation,
+    WindowAndDoorAnnotationMaterial,
+)
+from .models import BlueprintImage
+
+# Page 1, or the first image uploaded when the pages have no numbers
+COVER_ORDER = (F("page_number").asc(nulls_last=True), "created_at")
+
+MATERIAL_RELATED = "material__subcategory__category"
+
+# image relation: (annotation model, material link relation, link model)
+ANNOTATION_MATERIALS = {
+    "annotations": (Annotation, "annotation_materials", AnnotationMaterial),
+    "wall_annotations": (WallAnnotation, "wall_annotation_materials", WallAnnotationMaterial),
+    "window_and_door_annotations": (
+        WindowAndDoorAnnotation,
+        "window_and_door_annotation_materials",
+        WindowAndDoorAnnotationMaterial,
+    ),
+}
+
+
+def image_detail_prefetches(prefix="", defer_coordinates=False):
+    """
+    prefetch_related lookups for BlueprintImageDetailSerializer. ``prefix`` is
+    the path from the queryset's model to the images, e.g. ``"images__"``.
+    """
+    lookups = []
+    for annotations, (annotation_model, materials, model) in ANNOTATION_MATERIALS.items():
+        if defer_coordinates:
+            lookups.append(Prefetch(f"{prefix}{annotations}", queryset=annotation_model.objects.defer("coordinates")))
+        lookups.append(Prefetch(
+            f"{prefix}{annotations}__{materials}",
+            queryset=model.objects.select_related(MATERIAL_RELATED),
+        ))
+    return lookups
+
+
+def prefetch_image_detail(queryset, defer_coordinates=False):
+    """BlueprintImage queryset ready for BlueprintImageDetailSerializer."""
+    return queryset.prefetch_related(*image_detail_prefetches(defer_coordinates=defer_coordinates))
+
+
+def prefetch_blueprint_detail(queryset, defer_coordinates=False):
+    """Blueprint queryset ready for BlueprintDetailSerializer."""
+    return queryset.prefetch_related("images", *image_detail_prefetches("images__", defer_coordinates))
+
+
+def with_cover_image(queryset):
+    """
+    Blueprint queryset annotated with ``cover_image_id`` and
+    ``cover_image_name`` (its file, which versions the rendition URLs) of its
+    first page, which BlueprintSerializer shows as the blueprint's preview.
+    """
+    first_page = BlueprintImage.objects.filter(blueprint=OuterRef("pk")).order_by(*COVER_ORDER)
+    return queryset.annotate(
+        cover_image_id=Subquery(first_page.values("pk")[:1]),
+        cover_image_name=Subquery(first_page.values("image")[:1]),
+    )
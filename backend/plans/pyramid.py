@@ -0,0 +1,187 @@
+"""
+Deep Zoom tile pyramids for page images.
+
+The annotation UI used to download the full-resolution page (10-30MB) before
+it could show anything. Page processing now also writes a Deep Zoom (DZI)
+pyramid and a thumbnail next to the page, under MEDIA_ROOT:
+
+    blueprints/tiles/<image id>/<version>/page.dzi                           descriptor
+    blueprints/tiles/<image id>/<version>/page_files/<level>/<col>_<row>.jpg  tiles
+    blueprints/tiles/<image id>/<version>/thumbnail.jpg
+
+Tiles are served as immutable, so a rebuild (a new PAGE_TILE_SIZE, say) never
+rewrites them in place: it writes the next version, which changes every URL,
+and then removes the old one. Version 0 is the layout without a version
+folder that pyramids were built with before.
+
+The highest level is the page at full size and each level below it is half
+the size of the one above, down to 1x1 at level 0. A viewer (OpenSeadragon or
+any other Deep Zoom client) only fetches the tiles on screen at the current
+zoom. Every level is scaled from the one above it rather than from the full
+page, so the whole pyramid costs about a third more than one downscale.
+"""
+import io
+import math
+import posixpath
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from .utils import local_file_path
+
+TILES_DIR = "blueprints/tiles"
+DZI_NAME = "page.dzi"
+TILES_FOLDER = "page_files"
+THUMBNAIL_NAME = "thumbnail.jpg"
+TILE_FORMAT = "jpg"
+
+DZI_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" Format="{format}" Overlap="{overlap}" TileSize="{tile_size}">\n'
+    '  <Size Width="{width}" Height="{height}"/>\n'
+    '</Image>\n'
+)
+
+
+def pyramid_dir(image_id, version=0):
+    base = posixpath.join(TILES_DIR, str(image_id))
+    return posixpath.join(base, str(version)) if version else base
+
+
+def tile_name(image_id, level, col, row, version=0):
+    return posixpath.join(pyramid_dir(image_id, version), TILES_FOLDER, str(level), f"{col}_{row}.{TILE_FORMAT}")
+
+
+def max_level(width, height):
+    """Index of the full-size level: ceil(log2) of the longest side."""
+    return (max(width, height) - 1).bit_length()
+
+
+def level_size(width, height, level):
+    scale = 2 ** (max_level(width, height) - level)
+    return math.ceil(width / scale), math.ceil(height / scale)
+
+
+def tile_boxes(width, height, tile_size, overlap=0):
+    """
+    ``(col, row, box)`` for every tile of a ``width`` x ``height`` level. Tiles
+    reach ``overlap`` pixels into their neighbours, as Deep Zoom expects.
+    """
+    for col in range(math.ceil(width / tile_size)):
+        for row in range(math.ceil(height / tile_size)):
+            yield col, row, (
+                max(col * tile_size - overlap, 0),
+                max(row * tile_size - overlap, 0),
+                min((col + 1) * tile_size + overlap, width),
+                min((row + 1) * tile_size + overlap, height),
+            )
+
+
+def dzi_descriptor(width, height, tile_size, overlap):
+    return DZI_TEMPLATE.format(format=TILE_FORMAT, overlap=overlap, tile_size=tile_size, width=width, height=height)
+
+
+def write_file(storage, name, data):
+    """
+    Write ``data`` to ``name``, replacing any file already there. Tile names
+    are fixed, so they must not be renamed the way storage.save() does.
+    """
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(data))
+
+
+def encode_jpeg(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def build_pyramid(image, image_id, storage, tile_size=None, overlap=None, quality=None, thumbnail_size=None,
+                  version=0):
+    """
+    Write version ``version`` of the pyramid and thumbnail of the PIL
+    ``image`` for the page ``image_id`` to ``storage``. Returns the number of
+    tiles written.
+    """
+    tile_size = tile_size or settings.PAGE_TILE_SIZE
+    overlap = settings.PAGE_TILE_OVERLAP if overlap is None else overlap
+    quality = quality or settings.PAGE_TILE_QUALITY
+    thumbnail_size = thumbnail_size or settings.PAGE_THUMBNAIL_SIZE
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    width, height = image.size
+    base = pyramid_dir(image_id, version)
+    write_file(storage, posixpath.join(base, DZI_NAME), dzi_descriptor(width, height, tile_size, overlap).encode())
+
+    tiles = 0
+    level_image = image
+    thumbnail_source = image
+    for level in range(max_level(width, height), -1, -1):
+        size = level_size(width, height, level)
+        if level_image.size != size:
+            level_image = level_image.resize(size, Image.Resampling.BOX)
+        if max(size) >= thumbnail_size:
+            thumbnail_source = level_image
+        for col, row, box in tile_boxes(*size, tile_size, overlap):
+            write_file(storage, tile_name(image_id, level, col, row, version), encode_jpeg(level_image.crop(box), quality))
+            tiles += 1
+
+    thumbnail = thumbnail_source.copy()
+    thumbnail.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
+    write_file(storage, posixpath.join(base, THUMBNAIL_NAME), encode_jpeg(thumbnail, quality))
+    return tiles
+
+
+def _remove_tree(storage, path):
+    try:
+        dirs, files = storage.listdir(path)
+    except FileNotFoundError:
+        return
+    for name in files:
+        storage.delete(posixpath.join(path, name))
+    for name in dirs:
+        _remove_tree(storage, posixpath.join(path, name))
+
+
+def delete_pyramid(storage, image_id, keep=None):
+    """Remove every file of a page's pyramids, except version ``keep`` when given."""
+    base = pyramid_dir(image_id)
+    try:
+        dirs, files = storage.listdir(base)
+    except FileNotFoundError:
+        return
+    for name in files:
+        storage.delete(posixpath.join(base, name))
+    for name in dirs:
+        if keep is None or name != str(keep):
+            _remove_tree(storage, posixpath.join(base, name))
+
+
+def tile_page(blueprint_image, image=None):
+    """
+    Build the pyramid of a stored page, from ``image`` when the caller already
+    has it decoded and from the page file otherwise. Returns False when
+    tiling is disabled.
+    """
+    if not settings.PAGE_TILES_ENABLED:
+        return False
+    storage = blueprint_image.image.storage
+    version = blueprint_image.tile_version + 1
+    if image is None:
+        with local_file_path(blueprint_image.image) as path, Image.open(path) as page:
+            page.load()
+            tiles = build_pyramid(page, blueprint_image.pk, storage, version=version)
+            size = page.size
+    else:
+        tiles = build_pyramid(image, blueprint_image.pk, storage, version=version)
+        size = image.size
+    blueprint_image.width, blueprint_image.height = size
+    blueprint_image.tile_size = settings.PAGE_TILE_SIZE
+    blueprint_image.tile_version = version
+    blueprint_image.save(update_fields=["width", "height", "tile_size", "tile_version"])
+    # Only once the new version is the one handed out
+    delete_pyramid(storage, blueprint_image.pk, keep=version)
+    print(f"[INFO] Wrote {tiles} tiles for page {blueprint_image.pk}")
+    return True
@@ -0,0 +1,193 @@
+import os
+import gc
+import mmap
+import subprocess
+import tempfile
+import traceback
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from PIL import Image
+from pdf2image import convert_from_path
+from PyPDF2 import PdfReader # type: ignore
+
+from .extract_scale import extract_scale_from_image_subprocess
+from .ocr import SUBPROCESS, get_engine
+
+# Page rendering lives in its own module (no Django imports) so it can run inside
+# spawned worker processes without setting up the ORM.
+Image.MAX_IMAGE_PIXELS = None
+
+DEFAULT_DPI = 300
+
+
+def count_pdf_pages(pdf_path):
+    # PdfReader copies a path into a BytesIO; a read-only memory map keeps the
+    # file in the page cache instead of the Python heap.
+    with open(pdf_path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return len(PdfReader(mm).pages)
+
+
+def page_ranges(total_pages, pages_per_task, skip=()):
+    """Runs of at most ``pages_per_task`` consecutive pages, leaving out ``skip``."""
+    pages_per_task = max(1, pages_per_task)
+    ranges = []
+    for page in range(1, total_pages + 1):
+        if page in skip:
+            continue
+        if ranges and ranges[-1][1] == page - 1 and page - ranges[-1][0] < pages_per_task:
+            ranges[-1] = (ranges[-1][0], page)
+        else:
+            ranges.append((page, page))
+    return ranges
+
+
+def render_page_strip(pdf_path, page_number, y, width, height, dpi=DEFAULT_DPI):
+    """
+    Rows ``y`` to ``y + height`` of a page, as convert_from_path renders it at
+    ``dpi``, as an RGB image. pdftoppm crops while rasterizing (-x/-y/-W/-H),
+    so only the strip is ever held in memory.
+    """
+    result = subprocess.run(
+        [
+            "pdftoppm", "-r", str(dpi), "-f", str(page_number), "-l", str(page_number),
+            "-x", "0", "-y", str(y), "-W", str(width), "-H", str(height), pdf_path,
+        ],
+        capture_output=True, check=True,
+    )
+    strip = Image.open(BytesIO(result.stdout))
+    return strip.convert("RGB")
+
+
+def render_page_payload(image, idx, ocr=None):
+    """
+    OCR the scale and JPEG-encode one rendered page.
+    Returns the values process_page_image stores on the BlueprintImage.
+    """
+    buffer = BytesIO()
+    try:
+        scale = extract_scale_from_image_subprocess(image, ocr)
+        image = image.convert("RGB")
+        dpi_tuple = image.info.get('dpi')
+        raw_dpi = dpi_tuple[0] if dpi_tuple else DEFAULT_DPI
+        dpi = round(raw_dpi)
+        image.save(buffer, format='JPEG', quality=85)
+        return {"page": idx, "content": buffer.getvalue(), "dpi": dpi, "scale": scale}
+    finally:
+        buffer.close()
+
+
+def render_page_range(pdf_path, first_page, last_page, dpi=DEFAULT_DPI,
+                      ocr=None, ocr_mode=SUBPROCESS, ocr_lang="eng"):
+    """
+    Worker entry point. Poppler parses the PDF once for the whole range and writes
+    the rasters to a scratch folder; pages are then decoded one at a time so a
+    worker never holds more than one full-resolution page in memory.
+
+    ``ocr`` is an engine or pool from plans.ocr; worker processes pass
+    ``ocr_mode`` instead and keep one engine alive for their lifetime.
+    """
+    ocr = ocr or get_engine(ocr_mode, ocr_lang)
+    payloads = []
+    failed = []
+    with tempfile.TemporaryDirectory() as output_folder:
+        try:
+            paths = convert_from_path(
+                pdf_path, dpi=dpi,
+                first_page=first_page, last_page=last_page,
+                output_folder=output_folder, paths_only=True,
+            )
+        except Exception as e:
+            print(f"[ERROR] Pages {first_page}-{last_page} failed to render: {e}")
+            return payloads, [
+                {"page": page, "error": str(e)} for page in range(first_page, last_page + 1)
+            ]
+
+        for offset, path in enumerate(paths):
+            idx = first_page + offset
+            try:
+                with Image.open(path) as img:
+                    payloads.append(render_page_payload(img, idx, ocr))
+            except Exception as e:
+                print(f"[ERROR] Page {idx} failed: {e}")
+                traceback.print_exc()
+                failed.append({"page": idx, "error": str(e)})
+            finally:
+                os.remove(path)
+                gc.collect()
+    return payloads, failed
+
+
+def iter_rendered_pages(pdf_path, total_pages, workers=2, pages_per_task=4,
+                        max_in_flight_pages=8, dpi=DEFAULT_DPI, executor=None,
+                        ocr_mode=SUBPROCESS, ocr_lang="eng", skip=()):
+    """
+    Render a PDF in a bounded process pool and yield page payloads in page order.
+
+    Ranges are submitted only while fewer than ``max_in_flight_pages`` pages are
+    rendered-but-not-yet-consumed, which caps the memory held by finished pages
+    waiting for an earlier range. Failed pages are yielded as
+    ``{"page": n, "error": "..."}`` so the caller can log them like the
+    sequential path does. Pages in ``skip`` are not rendered.
+
+    A daemonic process (a prefork Celery worker child) may not start a pool
+    of its own, so there the ranges are rendered one after another in the
+    calling process instead, unless an ``executor`` is passed in.
+    """
+    ranges = page_ranges(total_pages, pages_per_task, skip)
+    own_executor = executor is None
+    if own_executor and ranges and multiprocessing.current_process().daemon:
+        print("[WARNING] Daemonic worker process cannot start a render pool; rendering pages in process")
+        yield from _iter_rendered_in_process(pdf_path, ranges, dpi, ocr_mode, ocr_lang)
+        return
+    if own_executor and ranges:
+        executor = ProcessPoolExecutor(
+            max_workers=max(1, workers),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    futures = {}
+    finished = {}
+    in_flight = 0
+    submitted = 0
+    next_range = 0
+    try:
+        while next_range < len(ranges):
+            while submitted < len(ranges):
+                first, last = ranges[submitted]
+                size = last - first + 1
+                if in_flight and in_flight + size > max_in_flight_pages:
+                    break
+                future = executor.submit(
+                    render_page_range, pdf_path, first, last, dpi,
+                    ocr_mode=ocr_mode, ocr_lang=ocr_lang,
+                )
+                futures[future] = submitted
+                submitted += 1
+                in_flight += size
+
+            if next_range not in finished:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = futures.pop(future)
+                    payloads, failed = future.result()
+                    finished[index] = sorted(payloads + failed, key=lambda p: p["page"])
+                continue
+
+            for result in finished.pop(next_range):
+                yield result
+            first, last = ranges[next_range]
+            in_flight -= last - first + 1
+            next_range += 1
+    finally:
+        for future in futures:
+            future.cancel()
+        if own_executor and ranges:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _iter_rendered_in_process(pdf_path, ranges, dpi, ocr_mode, ocr_lang):
+    ocr = get_engine(ocr_mode, ocr_lang)
+    for first, last in ranges:
+        payloads, failed = render_page_range(pdf_path, first, last, dpi, ocr=ocr)
+        yield from sorted(payloads + failed, key=lambda p: p["page"])
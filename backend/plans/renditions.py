@@ -0,0 +1,160 @@
+"""
+Downsized renditions of page images for lists and previews.
+
+List endpoints used to link every page at full resolution. A rendition is a
+page scaled to fit one of SIZES, as WebP or JPEG, made the first time it is
+requested and kept in a local disk cache:
+
+    <RENDITION_CACHE_DIR>/<image id>/<version>/<size>.<format>
+
+Renditions are served as immutable, so their URLs carry a version, a hash of
+the page's file name in storage (see rendition_version). Replacing a page's
+image saves it under a new name, which gives its renditions new URLs instead
+of leaving browsers and proxies with the old picture.
+
+The source is opened in draft mode: a JPEG is decoded with DCT scaling at the
+smallest power-of-two reduction (up to 1/8) that is still at least the
+rendition size, so a thumbnail of a 100MP sheet never decodes the full bitmap.
+
+Each hit refreshes the file's mtime. Once the cache grows past
+RENDITION_CACHE_MAX_BYTES the least recently used renditions are deleted; the
+cache is scanned after every EVICT_FRACTION of the limit written by a process,
+not after every write, so it can overshoot by about that much.
+"""
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+from django.conf import settings
+from PIL import Image, features
+
+from .utils import local_file_path
+
+# Longest side of each rendition, in pixels
+SIZES = {
+    "thumb": 256,
+    "preview": 1024,
+    "large": 2048,
+}
+WEBP = "webp"
+JPEG = "jpg"
+# Format in the URL: (PIL format, content type)
+FORMATS = {
+    WEBP: ("WEBP", "image/webp"),
+    JPEG: ("JPEG", "image/jpeg"),
+}
+if not features.check("webp"):
+    # Pillow built without libwebp
+    del FORMATS[WEBP]
+
+EVICT_FRACTION = 0.05
+
+_unchecked_bytes = 0
+_evict_lock = threading.Lock()
+
+
+def cache_dir():
+    return settings.RENDITION_CACHE_DIR or os.path.join(settings.MEDIA_ROOT, "renditions")
+
+
+def default_format():
+    return settings.RENDITION_FORMAT if settings.RENDITION_FORMAT in FORMATS else JPEG
+
+
+def rendition_version(image_name):
+    """URL and cache path segment of the renditions of the file stored as ``image_name``."""
+    return hashlib.sha256(image_name.encode()).hexdigest()[:12]
+
+
+def rendition_path(image_id, version, size, fmt):
+    return os.path.join(cache_dir(), str(image_id), version, f"{size}.{fmt}")
+
+
+def render(path, size, fmt, quality=None):
+    """Encoded bytes of the image at ``path`` scaled to fit ``size`` x ``size``."""
+    quality = quality or settings.RENDITION_QUALITY
+    with Image.open(path) as image:
+        image.draft("RGB", (size, size))
+        rendition = image.convert("RGB")
+    rendition.thumbnail((size, size), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    rendition.save(buffer, format=FORMATS[fmt][0], quality=quality)
+    return buffer.getvalue()
+
+
+def open_cached_rendition(image_id, version, size, fmt):
+    """A cached rendition opened for reading and marked as just used, or None on a miss."""
+    path = rendition_path(image_id, version, size, fmt)
+    try:
+        fh = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    # An open file stays readable even if it is evicted now
+    os.utime(fh.fileno())
+    return fh
+
+
+def create_rendition(blueprint_image, size, fmt):
+    """Render and cache one rendition of ``blueprint_image``; returns its path."""
+    with local_file_path(blueprint_image.image) as source:
+        data = render(source, SIZES[size], fmt)
+    path = rendition_path(blueprint_image.pk, rendition_version(blueprint_image.image.name), size, fmt)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Written aside and renamed, so a concurrent request never serves half a file
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp_path, path)
+    _written(len(data))
+    return path
+
+
+def _written(size):
+    global _unchecked_bytes
+    max_bytes = settings.RENDITION_CACHE_MAX_BYTES
+    with _evict_lock:
+        _unchecked_bytes += size
+        if _unchecked_bytes < max_bytes * EVICT_FRACTION:
+            return
+        _unchecked_bytes = 0
+    evict_renditions(max_bytes)
+
+
+def evict_renditions(max_bytes=None):
+    """Delete least recently used renditions until the cache fits in ``max_bytes``."""
+    max_bytes = settings.RENDITION_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    files = []
+    total = 0
+    for directory, _, names in os.walk(cache_dir()):
+        for name in names:
+            if name.endswith(".tmp"):
+                # Still being written by create_rendition
+                continue
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    evicted = 0
+    if total <= max_bytes:
+        return evicted
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        evicted += 1
+    print(f"[INFO] Evicted {evicted} renditions from the rendition cache")
+    return evicted
+
+
+def delete_renditions(image_id):
+    shutil.rmtree(os.path.join(cache_dir(), str(image_id)), ignore_errors=True)
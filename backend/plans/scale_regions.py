@@ -0,0 +1,129 @@
+import cv2
+import numpy as np
+
+# Region search runs on a downsampled copy of the page: a 36x24" sheet at
+# 300 DPI is ~10800px wide, this brings it to ~40 DPI where text lines are
+# still separable blobs.
+MAX_SIDE = 1600
+MAX_REGIONS = 6
+
+
+def find_scale_regions(image, max_side=MAX_SIDE, max_regions=MAX_REGIONS):
+    """
+    Boxes ``(left, top, right, bottom)`` in full-resolution pixels around the
+    parts of a sheet that usually carry the drawing scale, best candidates first:
+    the title block, then underlined view titles (the scale sits right below them).
+
+    Returns [] when nothing is found or the page cannot be analysed, so callers
+    fall back to OCR'ing the whole page.
+    """
+    try:
+        return _find_scale_regions(image, max_side, max_regions)
+    except Exception as e:
+        print(f"[Scale Region Detection Failed]: {e}")
+        return []
+
+
+def scale_region_crops(image, max_side=MAX_SIDE, max_regions=MAX_REGIONS):
+    return [image.crop(box) for box in find_scale_regions(image, max_side, max_regions)]
+
+
+def _downsample(image, max_side):
+    width, height = image.size
+    factor = max(1, int(np.ceil(max(width, height) / max_side)))
+    if image.mode not in ("L", "RGB", "RGBA"):
+        image = image.convert("RGB")
+    small = image.reduce(factor) if factor > 1 else image
+    return np.asarray(small.convert("L")), factor
+
+
+def _find_scale_regions(image, max_side, max_regions):
+    gray, factor = _downsample(image, max_side)
+    height, width = gray.shape
+
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+
+    # Ruling lines (sheet border, title block frame, view title underlines)
+    long_side = max(25, max(width, height) // 40)
+    horizontal = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (long_side, 1)))
+    vertical = cv2.morphologyEx(ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, long_side)))
+
+    # Text: what is left once ruling lines are removed, with characters joined into lines
+    text = cv2.bitwise_and(ink, cv2.bitwise_not(cv2.bitwise_or(horizontal, vertical)))
+    text = cv2.morphologyEx(text, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (7, 1)))
+    contours, _ = cv2.findContours(text, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    lines = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if not 3 <= h <= height // 30 or w < 2 * h or w > width // 3:
+            continue
+        fill = cv2.countNonZero(ink[y:y + h, x:x + w]) / float(w * h)
+        if 0.1 <= fill <= 0.85:
+            lines.append((x, y, w, h))
+
+    regions = []
+    title_block = _title_block(horizontal, vertical, lines, width, height)
+    if title_block is not None:
+        regions.append(title_block)
+
+    for x, y, w, h in sorted(lines, key=lambda line: (line[1], line[0])):
+        if len(regions) >= max_regions:
+            break
+        if title_block is not None and _inside((x, y, x + w, y + h), title_block):
+            continue
+        # A view title underlined by a ruling line at least half its width
+        band = horizontal[y + h:min(height, y + 3 * h), x:x + w]
+        if band.size and np.count_nonzero(band.max(axis=0)) >= w // 2:
+            # Scale notes sit under the title and can run wider than it
+            box = (x - w // 2, y - h, x + w + w // 2, y + 6 * h)
+            if not any(_inside(box, region) for region in regions):
+                regions.append(box)
+
+    return [_to_full_resolution(box, factor, image.size) for box in regions]
+
+
+def _title_block(horizontal, vertical, lines, width, height):
+    """Area right of the frame's last long vertical line, or below its last long horizontal one."""
+    left = top = None
+
+    columns = np.flatnonzero(np.count_nonzero(vertical, axis=0) >= height // 2)
+    columns = columns[(columns > width * 0.6) & (columns < width * 0.97)]
+    if columns.size:
+        left = int(columns.min())
+
+    rows = np.flatnonzero(np.count_nonzero(horizontal, axis=1) >= width // 2)
+    rows = rows[(rows > height * 0.7) & (rows < height * 0.97)]
+    if rows.size:
+        top = int(rows.min())
+
+    if left is not None:
+        area = (left, 0, width, height)
+    elif top is not None:
+        area = (0, top, width, height)
+    else:
+        return None
+
+    inside = [(x, y, x + w, y + h) for x, y, w, h in lines if _inside((x, y, x + w, y + h), area)]
+    if not inside:
+        return None
+    pad = 4
+    return (
+        max(area[0], min(box[0] for box in inside) - pad),
+        max(area[1], min(box[1] for box in inside) - pad),
+        min(area[2], max(box[2] for box in inside) + pad),
+        min(area[3], max(box[3] for box in inside) + pad),
+    )
+
+
+def _inside(box, region):
+    return box[0] >= region[0] and box[1] >= region[1] and box[2] <= region[2] and box[3] <= region[3]
+
+
+def _to_full_resolution(box, factor, size):
+    width, height = size
+    left, top, right, bottom = box
+    return (
+        max(0, left * factor), max(0, top * factor),
+        min(width, right * factor), min(height, bottom * factor),
+    )
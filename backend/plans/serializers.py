@@ -1,24 +1,61 @@
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
 from rest_framework import serializers
 from .models import Blueprint, Status, BlueprintImage
-from .tasks import process_blueprint_file
+from .tasks import process_blueprint_file, tile_page_image
+from . import renditions
+from .prefetch import COVER_ORDER
 from rest_framework.exceptions import PermissionDenied
 from PIL import Image
 from .extract_scale import extract_scale_from_image
+from .page_cache import uploaded_file_hash, cached_artifacts, remember_page
 from annotations.serializers import (
     AnnotationSerializer,
     WallAnnotationSerializer,
     WindowAndDoorAnnotationSerializer,
-    WallAnnotationMaterialSerializer,
-    WindowAndDoorAnnotationMaterialSerializer,
 )
-from annotations.models import WallAnnotationMaterial, WindowAndDoorAnnotationMaterial
+
+
+def page_tiles(image, request=None):
+    """
+    Where a viewer finds the page's deep zoom pyramid and thumbnail, or None
+    until the pyramid is built (pages uploaded before it existed, or tiling off).
+    """
+    if not image.tile_size:
+        return None
+    urls = {
+        "dzi": reverse("blueprint-image-dzi", args=[image.pk, image.tile_version]),
+        "thumbnail": reverse("blueprint-image-thumbnail", args=[image.pk, image.tile_version]),
+    }
+    if request is not None:
+        urls = {key: request.build_absolute_uri(url) for key, url in urls.items()}
+    return {**urls, "width": image.width, "height": image.height, "tile_size": image.tile_size}
+
+
+def page_renditions(image_id, image_name, request=None):
+    """
+    URL of each rendition size of a page, in the default rendition format.
+    ``image_name`` is the page's file name in storage, which versions the URLs.
+    """
+    fmt = renditions.default_format()
+    version = renditions.rendition_version(image_name)
+    urls = {
+        size: reverse("blueprint-image-rendition", args=[image_id, version, size, fmt])
+        for size in renditions.SIZES
+    }
+    if request is not None:
+        urls = {size: request.build_absolute_uri(url) for size, url in urls.items()}
+    return urls
 
 
 class BlueprintSerializer(serializers.ModelSerializer):
+    cover = serializers.SerializerMethodField()
+
     class Meta:
         model = Blueprint
         fields = "__all__"
-        read_only_fields = ["created_at", "updated_at"]
+        read_only_fields = ["created_at", "updated_at", "failed_pages"]
         extra_kwargs = {"pdf_file": {"required": True}, "project": {"required": True}}
 
     def create(self, validated_data):
@@ -28,38 +65,39 @@ class BlueprintSerializer(serializers.ModelSerializer):
         process_blueprint_file.delay(blueprint.id)
         return blueprint
 
+    def get_cover(self, obj):
+        # Annotated by plans.prefetch.with_cover_image on list querysets
+        if hasattr(obj, "cover_image_id"):
+            cover = (obj.cover_image_id, obj.cover_image_name)
+        else:
+            cover = obj.images.order_by(*COVER_ORDER).values_list("pk", "image").first()
+        if not cover or not cover[0]:
+            return None
+        return page_renditions(*cover, self.context.get("request"))
+
 
 class BlueprintImageDetailSerializer(serializers.ModelSerializer):
+    """
+    An image with all of its annotations and their materials. Load instances
+    through plans.prefetch.prefetch_image_detail, or each annotation and
+    material link costs its own queries.
+    """
     annotations = AnnotationSerializer(many=True, read_only=True)
-    wall_annotations = serializers.SerializerMethodField()
-    window_and_door_annotations = serializers.SerializerMethodField()
+    wall_annotations = WallAnnotationSerializer(many=True, read_only=True)
+    window_and_door_annotations = WindowAndDoorAnnotationSerializer(many=True, read_only=True)
+    tiles = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = BlueprintImage
         fields = "__all__"
-        read_only_fields = ["id", "created_at", "updated_at"]
-
-    def get_wall_annotations(self, obj):
-        wall_annotations_data = []
-        for wall_annotation in obj.wall_annotations.all():
-            serializer = WallAnnotationSerializer(wall_annotation)
-            data = serializer.data
-            materials = WallAnnotationMaterial.objects.filter(wall_annotation=wall_annotation)
-            material_serializer = WallAnnotationMaterialSerializer(materials, many=True)
-            data["materials"] = material_serializer.data
-            wall_annotations_data.append(data)
-        return wall_annotations_data
-
-    def get_window_and_door_annotations(self, obj):
-        window_door_annotations_data = []
-        for window_door_annotation in obj.window_and_door_annotations.all():
-            serializer = WindowAndDoorAnnotationSerializer(window_door_annotation)
-            data = serializer.data
-            materials = WindowAndDoorAnnotationMaterial.objects.filter(window_and_door_annotation=window_door_annotation)
-            material_serializer = WindowAndDoorAnnotationMaterialSerializer(materials, many=True)
-            data["materials"] = material_serializer.data
-            window_door_annotations_data.append(data)
-        return window_door_annotations_data
+        read_only_fields = ["id", "created_at", "updated_at", "page_number", "width", "height", "tile_size", "tile_version"]
+
+    def get_tiles(self, obj):
+        return page_tiles(obj, self.context.get("request"))
+
+    def get_renditions(self, obj):
+        return page_renditions(obj.pk, obj.image.name, self.context.get("request"))
 
 
 class BlueprintDetailSerializer(serializers.ModelSerializer):
@@ -73,10 +111,19 @@ class BlueprintDetailSerializer(serializers.ModelSerializer):
 
 
 class BlueprintImageSerializer(serializers.ModelSerializer):
+    tiles = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = BlueprintImage
         fields = "__all__"
-        read_only_fields = ["id", "created_at", "updated_at"]
+        read_only_fields = ["id", "created_at", "updated_at", "page_number", "width", "height", "tile_size", "tile_version"]
+
+    def get_tiles(self, obj):
+        return page_tiles(obj, self.context.get("request"))
+
+    def get_renditions(self, obj):
+        return page_renditions(obj.pk, obj.image.name, self.context.get("request"))
 
     def create(self, validated_data):
         request = self.context.get("request")
@@ -87,12 +134,20 @@ class BlueprintImageSerializer(serializers.ModelSerializer):
                 "You do not have permission to upload an image to this blueprint."
             )
         image_file = validated_data.get("image")
+        content_hash = uploaded_file_hash(image_file)
         image_pil = Image.open(image_file)
         dpi_tuple = image_pil.info.get("dpi")
         raw_dpi = dpi_tuple[0] if dpi_tuple else 300
         dpi = round(raw_dpi)
-        scale = extract_scale_from_image(image_pil)
+        # The same file uploaded before was already OCR'd
+        artifact = cached_artifacts([content_hash] if content_hash else None).get(1)
+        scale = artifact.scale if artifact else extract_scale_from_image(image_pil)
         validated_data["dpi"] = dpi
         validated_data["scale"] = scale
+        validated_data["content_hash"] = content_hash
         image = BlueprintImage.objects.create(**validated_data)
+        if artifact is None:
+            remember_page(image, image_file.size)
+        if settings.PAGE_TILES_ENABLED:
+            transaction.on_commit(lambda: tile_page_image.delay(str(image.pk)))
         return image
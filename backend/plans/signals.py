@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import BlueprintImage
+from .pyramid import delete_pyramid
+from .renditions import delete_renditions
+
+
+@receiver(post_delete, sender=BlueprintImage)
+def delete_page_tiles(sender, instance, **kwargs):
+    # A pyramid is hundreds of files that nothing else would ever clean up
+    if instance.tile_size:
+        # Bound now: the collector clears instance.pk once the delete is done
+        storage, image_id = instance.image.storage, instance.pk
+        transaction.on_commit(lambda: delete_pyramid(storage, image_id))
+
+
+@receiver(post_delete, sender=BlueprintImage)
+def delete_page_renditions(sender, instance, **kwargs):
+    image_id = instance.pk
+    transaction.on_commit(lambda: delete_renditions(image_id))
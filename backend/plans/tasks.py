@@ -1,27 +1,36 @@
-from celery import shared_task
+from celery import shared_task, chord
 from .models import Blueprint, BlueprintImage, Status
 from users.models import CustomUser, Role
 from annotations.models import Annotation
-from annotations.serializers import AnnotationSerializer
+from annotations.bulk import bulk_create_annotations, ROOM
 from PIL import Image
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_path
 from io import BytesIO
 from django.core.files.base import ContentFile
-from .utils import get_model, compute_sqft, polygon_dimension
+from .utils import get_model, compute_sqft, polygon_dimension, local_file_path, annotation_json_file
 from django.core.exceptions import PermissionDenied
 import traceback
-import cv2
-import numpy as np
 from concurrent.futures import ThreadPoolExecutor
-import traceback
 import json
 import gc
-from PyPDF2 import PdfReader # type: ignore
 import psutil
 import os
+from contextlib import ExitStack
+from django.conf import settings
 Image.MAX_IMAGE_PIXELS = None
 
-from .extract_scale import extract_scale_from_image_subprocess, is_pdf_file_bytes, is_image_file_bytes
+from .extract_scale import is_pdf_file, is_image_file
+from .rasterize import DEFAULT_DPI, render_page_payload, render_page_range, iter_rendered_pages, page_ranges, count_pdf_pages
+from .ocr import get_ocr_pool
+from .inference import get_inference_engine
+from .postprocess import PolygonSimplifier
+from .geometry import pack_polygons, areas_sqft, dimensions_ft
+from .tiling import TileSource, tiled_detections, merge_polygons
+from .page_cache import (
+    pdf_page_hashes, image_file_hash, cached_artifacts, store_cached_page, remember_page,
+    cached_predictions, remember_predictions, evict_page_cache,
+)
+from .pyramid import tile_page
 
 def log_memory_usage(note=""):
     process = psutil.Process(os.getpid())
@@ -34,31 +43,39 @@ def process_blueprint_file(blueprint_id):
     try:
         blueprint = Blueprint.objects.get(id=blueprint_id)
         blueprint.status = Status.PROCESSING
+        blueprint.failed_pages = []
         blueprint.save()
 
         if not blueprint.pdf_file:
             raise ValueError("No file found for the blueprint.")
 
-        file = blueprint.pdf_file
-        file.open()
-        file_bytes = file.read()
-        file.close()
-
-        if is_pdf_file_bytes(file_bytes):
-            reader = PdfReader(BytesIO(file_bytes))
-            total_pages = len(reader.pages)
-            process_pdf_sequentially(file_bytes, blueprint, total_pages)
+        # The upload is only ever read from disk: poppler and PyPDF2 get a path
+        # (PyPDF2 through a memory map), so the PDF bytes never sit in Python memory.
+        with local_file_path(blueprint.pdf_file) as path:
+            if is_pdf_file(path):
+                total_pages = count_pdf_pages(path)
+                page_hashes = pdf_page_hashes(path)
+                cached = store_cached_pages(blueprint, page_hashes)
+                if settings.BLUEPRINT_PROCESSING_MODE == "fanout":
+                    # Status is set by finalize_blueprint once every page task is done
+                    dispatch_page_tasks(blueprint, total_pages, page_hashes, cached)
+                    return blueprint.id
+                elif settings.BLUEPRINT_PROCESSING_MODE == "pipelined":
+                    process_pdf_pipelined(path, blueprint, total_pages, page_hashes, cached)
+                else:
+                    process_pdf_sequentially(path, blueprint, total_pages, page_hashes, cached)
 
-        elif is_image_file_bytes(file_bytes):
-            img = Image.open(BytesIO(file_bytes))
-            process_page_image(img, idx=1, blueprint=blueprint)
-            img.close()
+            elif is_image_file(path):
+                content_hash = image_file_hash(path)
+                if not store_cached_pages(blueprint, [content_hash] if content_hash else None):
+                    with Image.open(path) as img:
+                        process_page_image(img, idx=1, blueprint=blueprint, content_hash=content_hash)
 
-        else:
-            raise ValueError("Unsupported file format. Only PDFs and image files are allowed.")
+            else:
+                raise ValueError("Unsupported file format. Only PDFs and image files are allowed.")
 
-        del file_bytes
         gc.collect()
+        trim_page_cache()
 
         blueprint.status = Status.COMPLETE
         blueprint.save()
@@ -76,15 +93,152 @@ def process_blueprint_file(blueprint_id):
         gc.collect()
 
 
-def process_pdf_sequentially(file_bytes, blueprint, total_pages):
+def store_cached_pages(blueprint, page_hashes):
+    """Link every page already in the page cache; returns the page numbers done."""
+    stored = []
+    for idx, artifact in cached_artifacts(page_hashes).items():
+        try:
+            blueprint_image = store_cached_page(artifact, blueprint, idx)
+        except Exception as e:
+            print(f"[WARNING] Cached page {idx} could not be linked, rendering it: {e}")
+        else:
+            stored.append(idx)
+            tile_stored_page(blueprint_image)
+    if stored:
+        print(f"[INFO] {len(stored)} of {len(page_hashes)} pages linked from the page cache")
+    return stored
+
+
+def trim_page_cache():
+    try:
+        evict_page_cache()
+    except Exception as e:
+        print(f"[WARNING] Page cache eviction failed: {e}")
+
+
+def page_hash(page_hashes, idx):
+    return page_hashes[idx - 1] if page_hashes else None
+
+
+def dispatch_page_tasks(blueprint, total_pages, page_hashes=None, cached=()):
+    header = [
+        process_page.s(
+            str(blueprint.id), first, last,
+            page_hashes=page_hashes[first - 1:last] if page_hashes else None,
+        )
+        for first, last in page_ranges(total_pages, settings.BLUEPRINT_FANOUT_PAGES_PER_TASK, skip=cached)
+    ]
+    if not header:
+        return finalize_blueprint([], str(blueprint.id), cached_pages=list(cached))
+    print(f"[INFO] Dispatching {len(header)} page tasks for {total_pages} pages")
+    callback = finalize_blueprint.s(str(blueprint.id), cached_pages=list(cached))
+    # A page task that dies (worker lost, killed past --max-memory-per-child)
+    # fails the chord and finalize_blueprint never runs
+    callback.on_error(fail_blueprint.s(str(blueprint.id), total_pages))
+    return chord(header)(callback)
+
+
+@shared_task(name='process_page')
+def process_page(blueprint_id, first_page, last_page, page_hashes=None):
+    """
+    Render and store one page range of a blueprint. Errors are returned rather than
+    raised so a bad page never stops the chord callback from running.
+    ``page_hashes`` holds the page cache keys for the range, in page order.
+    """
+    stored = []
+    failed = []
+    try:
+        blueprint = Blueprint.objects.get(id=blueprint_id)
+        with local_file_path(blueprint.pdf_file) as path:
+            payloads, failed = render_page_range(path, first_page, last_page, ocr=get_ocr_pool())
+        for payload in payloads:
+            try:
+                content_hash = page_hashes[payload["page"] - first_page] if page_hashes else None
+                store_page_payload(payload, blueprint, content_hash)
+                stored.append(payload["page"])
+                print(f"[INFO] Processed page {payload['page']}")
+            except Exception as e:
+                print(f"[ERROR] Failed to store page {payload['page']}: {e}")
+                failed.append({"page": payload["page"], "error": str(e)})
+    except Exception as e:
+        print(f"[ERROR] Pages {first_page}-{last_page} failed: {e}")
+        traceback.print_exc()
+        done = set(stored)
+        failed = [
+            {"page": page, "error": str(e)}
+            for page in range(first_page, last_page + 1) if page not in done
+        ]
+    finally:
+        gc.collect()
+        log_memory_usage(f"After processing pages {first_page}-{last_page}")
+    return {"stored": stored, "failed": failed}
+
+
+@shared_task(name='tile_page')
+def tile_page_image(image_id):
+    """Tile a page uploaded as an image rather than rendered from a blueprint PDF."""
+    blueprint_image = BlueprintImage.objects.filter(pk=image_id).first()
+    if blueprint_image is not None:
+        tile_stored_page(blueprint_image)
+
+
+@shared_task(name='finalize_blueprint')
+def finalize_blueprint(results, blueprint_id, cached_pages=()):
+    try:
+        blueprint = Blueprint.objects.get(id=blueprint_id)
+    except Blueprint.DoesNotExist:
+        return {"status": "error", "message": f"Blueprint with ID {blueprint_id} not found"}
+
+    stored = [page for result in results for page in result["stored"]] + list(cached_pages)
+    failed = sorted(
+        (item for result in results for item in result["failed"]),
+        key=lambda item: item["page"],
+    )
+    blueprint.failed_pages = failed
+    blueprint.status = Status.COMPLETE if stored or not failed else Status.FAILED
+    blueprint.save(update_fields=["failed_pages", "status", "updated_at"])
+    print(f"[INFO] Blueprint {blueprint_id}: {len(stored)} pages stored, {len(failed)} failed")
+    trim_page_cache()
+    return blueprint_id
+
+
+@shared_task(name='fail_blueprint')
+def fail_blueprint(request, exc, exc_traceback, blueprint_id, total_pages):
+    """
+    Error callback of the page chord. Marks the blueprint FAILED with every
+    page that was not stored, so it does not stay PROCESSING forever.
+    """
+    try:
+        blueprint = Blueprint.objects.get(id=blueprint_id)
+    except Blueprint.DoesNotExist:
+        return {"status": "error", "message": f"Blueprint with ID {blueprint_id} not found"}
+
+    stored = set(blueprint.images.filter(page_number__isnull=False).values_list("page_number", flat=True))
+    blueprint.failed_pages = [
+        {"page": page, "error": f"Page task failed: {exc!r}"}
+        for page in range(1, total_pages + 1) if page not in stored
+    ]
+    blueprint.status = Status.FAILED
+    blueprint.save(update_fields=["failed_pages", "status", "updated_at"])
+    print(f"[ERROR] Blueprint {blueprint_id}: a page task failed ({exc!r}), {len(blueprint.failed_pages)} pages missing")
+    trim_page_cache()
+    return blueprint_id
+
+
+def process_pdf_sequentially(pdf_path, blueprint, total_pages, page_hashes=None, cached=()):
     for page_number in range(1, total_pages + 1):
+        if page_number in cached:
+            continue
         try:
-            images = convert_from_bytes(
-                file_bytes, dpi=300,
+            images = convert_from_path(
+                pdf_path, dpi=300,
                 first_page=page_number, last_page=page_number
             )
             for img in images:
-                process_page_image(img, idx=page_number, blueprint=blueprint)
+                process_page_image(
+                    img, idx=page_number, blueprint=blueprint,
+                    content_hash=page_hash(page_hashes, page_number),
+                )
                 img.close()
             print(f"[INFO] Processed page {page_number}")
         except Exception as e:
@@ -94,48 +248,214 @@ def process_pdf_sequentially(file_bytes, blueprint, total_pages):
             log_memory_usage(f"After processing page {page_number}")
 
 
-def process_page_image(image, idx, blueprint):
+def process_pdf_pipelined(pdf_path, blueprint, total_pages, page_hashes=None, cached=()):
+    """
+    Render page ranges in a process pool while earlier pages are being stored.
+    Pages are stored in page order, so the result matches process_pdf_sequentially.
+    """
+    pages = iter_rendered_pages(
+        pdf_path, total_pages,
+        workers=settings.BLUEPRINT_PIPELINE_WORKERS,
+        pages_per_task=settings.BLUEPRINT_PIPELINE_PAGES_PER_TASK,
+        max_in_flight_pages=settings.BLUEPRINT_PIPELINE_MAX_IN_FLIGHT_PAGES,
+        ocr_mode=settings.OCR_ENGINE,
+        ocr_lang=settings.OCR_LANGUAGE,
+        skip=set(cached),
+    )
+    for payload in pages:
+        page_number = payload["page"]
+        if "error" in payload:
+            print(f"[ERROR] Page {page_number} failed: {payload['error']}")
+            continue
+        try:
+            store_page_payload(payload, blueprint, page_hash(page_hashes, page_number))
+            print(f"[INFO] Processed page {page_number}")
+        except Exception as e:
+            print(f"[ERROR] Failed to process page {page_number}: {e}")
+            traceback.print_exc()
+        finally:
+            del payload
+            log_memory_usage(f"After processing page {page_number}")
+
+
+def store_page_payload(payload, blueprint, content_hash=None):
+    idx = payload["page"]
+    image_file = ContentFile(payload["content"], name=f"{blueprint.title}_page_{idx}.jpg")
+    image_title = f"{blueprint.title} - Page {idx}"
+
+    # Save to database
+    blueprint_image = BlueprintImage.objects.create(
+        title=image_title,
+        blueprint=blueprint,
+        page_number=idx,
+        image=image_file,
+        dpi=payload["dpi"],
+        scale=payload["scale"],
+        content_hash=content_hash,
+    )
     try:
-        buffer = BytesIO()
-
-        # Extract scale (before any conversion)
-        scale = extract_scale_from_image_subprocess(image)
-
-        # Ensure image is in RGB mode
-        image = image.convert("RGB")
-
-        # Optional: keep full resolution for accurate annotation prediction
-        resized = image  # No resizing for max quality
-
-        # Determine DPI
-        dpi_tuple = image.info.get('dpi')
-        raw_dpi = dpi_tuple[0] if dpi_tuple else 300
-        dpi = round(raw_dpi)
-
-        # Save to in-memory buffer
-        resized.save(buffer, format='JPEG', quality=85)
-        image_file = ContentFile(buffer.getvalue(), name=f"{blueprint.title}_page_{idx}.jpg")
-        image_title = f"{blueprint.title} - Page {idx}"
-
-        # Save to database
-        BlueprintImage.objects.create(
-            title=image_title,
-            blueprint=blueprint,
-            image=image_file,
-            dpi=dpi,
-            scale=scale,
-        )
+        remember_page(blueprint_image, len(payload["content"]))
+    except Exception as e:
+        print(f"[WARNING] Page {idx} was not added to the page cache: {e}")
+    if settings.PAGE_TILES_ENABLED:
+        with Image.open(BytesIO(payload["content"])) as image:
+            tile_stored_page(blueprint_image, image)
+    return blueprint_image
+
+
+def tile_stored_page(blueprint_image, image=None):
+    """Build the page's deep zoom pyramid; a page without one is still usable."""
+    try:
+        return tile_page(blueprint_image, image)
+    except Exception as e:
+        print(f"[WARNING] Tiles for page {blueprint_image.pk} could not be built: {e}")
+        return False
+
+
+def process_page_image(image, idx, blueprint, content_hash=None):
+    try:
+        # Extract scale, convert to RGB and encode at full resolution
+        payload = render_page_payload(image, idx, get_ocr_pool())
+        store_page_payload(payload, blueprint, content_hash)
+        del payload
 
         print(f"[INFO] Stored page {idx}")
     except Exception as e:
         print(f"[ERROR] Failed to process page {idx}: {e}")
         traceback.print_exc()
     finally:
-        buffer.close()
-        del buffer
         del image
         gc.collect()
 
+def room_inference_engine():
+    return get_inference_engine(
+        "room",
+        save=True,
+        # boxes=False,
+        # show_labels=False,
+        # show_conf=True,
+        project="room_predictions",
+        name="test",
+        exist_ok=True
+    )
+
+
+def room_detections(result, model):
+    """Simplify each room mask of a Results object to a polygon in pixel coordinates."""
+    masks = result.masks
+    if masks is None:
+        # A page (or tile) without any room
+        return []
+
+    height, width = result.orig_img.shape[:2]
+    simplifier = PolygonSimplifier(height, width)
+    detections = []
+    for i, poly in enumerate(masks.xy):
+        class_id = int(masks.cls[i].item()) if hasattr(masks, "cls") and masks.cls is not None \
+            else int(result.boxes[i].cls.item())
+        label = model.names[class_id]
+        confidence = (
+            float(result.probs[i].item()) if result.probs and len(result.probs) > i
+            else float(result.boxes[i].conf.item()) if hasattr(result.boxes[i], "conf")
+            else None
+        )
+
+        new_points = simplifier.simplify(poly)
+        if new_points is None:
+            continue
+
+        detections.append({
+            "label": label,
+            "points": new_points,
+            "confidence_score": confidence,
+        })
+    return detections
+
+
+def predict_room_polygons(blueprint_image):
+    """Run the room model on one page and return its room polygons."""
+    model = get_model()
+    return room_detections(room_inference_engine().predict(model, blueprint_image), model)
+
+
+def prediction_key(key):
+    """Tiled and whole-page detections of the same page are cached separately."""
+    return f"{key}:tiled" if settings.INFERENCE_TILING else key
+
+
+def tiled_page_detections(field_file, jobs):
+    """
+    Tiled inference for one page. ``jobs`` maps a name to
+    ``(model, engine, detect, merge)``; the page is loaded once into a
+    memory-mapped tile source (rendered in strips from the blueprint PDF when
+    it came from one) and every model walks its tiles concurrently.
+    Returns the detections per name and the page's (height, width).
+    """
+    options = {
+        "tile_size": settings.INFERENCE_TILE_SIZE,
+        "overlap": settings.INFERENCE_TILE_OVERLAP,
+        "workers": settings.INFERENCE_TILE_WORKERS,
+    }
+    with local_file_path(field_file) as path, ExitStack() as stack:
+        pdf_page = None
+        page = getattr(field_file, "instance", None)
+        if isinstance(page, BlueprintImage) and page.page_number and page.blueprint.pdf_file:
+            pdf_path = stack.enter_context(local_file_path(page.blueprint.pdf_file))
+            if is_pdf_file(pdf_path):
+                pdf_page = (pdf_path, page.page_number, page.dpi or DEFAULT_DPI)
+        source = stack.enter_context(TileSource.open(path, pdf_page))
+        with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as pool:
+            futures = {
+                key: pool.submit(tiled_detections, source, model, engine, detect, merge, **options)
+                for key, (model, engine, detect, merge) in jobs.items()
+            }
+            detections = {key: future.result() for key, future in futures.items()}
+        return detections, (source.height, source.width)
+
+
+def room_shapes(detections, dpi, scale):
+    coords, offsets = pack_polygons([detection["points"] for detection in detections])
+    areas = areas_sqft(coords, offsets, dpi, scale).tolist()
+    widths, heights = (values.tolist() for values in dimensions_ft(coords, offsets, dpi, scale))
+
+    shapes = []
+    for detection, area, width_ft, height_ft in zip(detections, areas, widths, heights):
+        shapes.append({
+            "label": detection["label"],
+            "points": detection["points"],
+            "confidence_score": detection["confidence_score"],
+            "measurement": area,
+            "width": width_ft,
+            "height": height_ft,
+            "group_id": None,
+            "shape_type": "polygon",
+            "flags": {}
+        })
+    return shapes
+
+
+def save_room_annotations(blueprint_images, shapes, height, width):
+    """Create the room annotations and attach the floor JSON (the caller saves the image)."""
+    bulk_create_annotations(ROOM, blueprint_images, [
+        {
+            'label': shape["label"],
+            'coordinates': shape["points"],
+            'area': shape["measurement"],
+            'annotation_type': shape["shape_type"],
+            'height': shape["height"],
+            'width': shape["width"],
+            'confidence_score': shape["confidence_score"],
+        }
+        for shape in shapes
+    ])
+
+    # Save to the FileField on the model
+    filename = f"{blueprint_images.title}_floor_annotation.json"
+    blueprint_images.floor_json_file.save(
+        filename, annotation_json_file(shapes, blueprint_images.title, height, width), save=False
+    )
+
+
 @shared_task(name='create_annotation')
 def async_create_annotation(blueprint_id, user_id):
     # sourcery skip: low-code-quality
@@ -151,102 +471,29 @@ def async_create_annotation(blueprint_id, user_id):
 
         scale = blueprint_images.scale
         dpi = blueprint_images.dpi
-        model = get_model()
 
         if not blueprint_images.image:
             raise ValueError("No image is found for this blueprint!")
         blueprint_image = Image.open(blueprint_images.image)
         if blueprint_image is not None:
-            results = model.predict(
-                blueprint_image,
-                save=True,
-                # boxes=False,
-                # show_labels=False,
-                # show_conf=True,
-                project="room_predictions",
-                name="test",
-                exist_ok=True
-            )
-            masks = results[0].masks
-            if masks is None:
-                raise ValueError("No segmentation masks found.")
-
-            height, width = results[0].orig_img.shape[:2]
-            shapes = []
-            for i, poly in enumerate(masks.xy):
-                class_id = int(masks.cls[i].item()) if hasattr(masks, "cls") and masks.cls is not None \
-                    else int(results[0].boxes[i].cls.item())
-                label = model.names[class_id]
-                confidence = (
-                    float(results[0].probs[i].item()) if results[0].probs and len(results[0].probs) > i
-                    else float(results[0].boxes[i].conf.item()) if hasattr(results[0].boxes[i], "conf")
-                    else None
-                )
-
-                temp_mask = np.zeros((height, width), dtype=np.uint8)
-                poly_int = np.array([poly], dtype=np.int32)
-                cv2.fillPoly(temp_mask, poly_int, 255)
-                eroded = cv2.erode(temp_mask, np.ones((3, 3), np.uint8), iterations=1)
-                contours, _ = cv2.findContours(eroded, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                if not contours:
-                    continue
-
-                contour = max(contours, key=cv2.contourArea)
-                epsilon = 0.01 * cv2.arcLength(contour, True)
-                simplified = cv2.approxPolyDP(contour, epsilon, True)
-                new_points = np.round(simplified.reshape(-1, 2).astype(float), 2).tolist()
-
-                area = compute_sqft(new_points, dpi, scale)
-                width_ft, height_ft = polygon_dimension(new_points, dpi, scale)
-
-                shapes.append({
-                    "label": label,
-                    "points": new_points,
-                    "confidence_score": confidence,
-                    "measurement": area,
-                    "width": width_ft,
-                    "height": height_ft,
-                    "group_id": None,
-                    "shape_type": "polygon",
-                    "flags": {}
-                })
-            for shape in shapes:
-                data = {
-                    'blueprint': blueprint_images.id,
-                    'label': shape["label"],
-                    'coordinates': shape["points"],
-                    'area': shape["measurement"],
-                    'annotation_type': shape["shape_type"],
-                    'height': shape["height"],
-                    'width': shape["width"],
-                    'confidence_score': shape["confidence_score"],
-                }
-                serializer = AnnotationSerializer(data=data)
-                if serializer.is_valid(raise_exception=True):
-                    serializer.save()
-
+            # Identical pages from earlier uploads already have their detections cached
+            key = prediction_key("room")
+            detections = cached_predictions(blueprint_images.content_hash, key)
+            if detections is None:
+                if settings.INFERENCE_TILING:
+                    job = (get_model(), room_inference_engine(), room_detections, merge_polygons)
+                    detections = tiled_page_detections(blueprint_images.image, {"room": job})[0]["room"]
                 else:
-                    print("Invalid Shape Data: ", serializer.data)
-            json_data = {
-                "version": "4.5.6",
-                "flags": {},
-                "shapes": shapes,
-                "imagePath": blueprint_images.title,
-                "imageData": None,
-                "imageHeight": blueprint_image.height,
-                "imageWidth": blueprint_image.width,
-            }
-            json_str = json.dumps(json_data, indent=4)
-            file_io = BytesIO()
-            file_io.write(json_str.encode('utf-8'))
-            file_io.seek(0)
-
-            # Save to the FileField on the model
-            filename = f"{blueprint_images.title}_floor_annotation.json"
-            blueprint_images.floor_json_file.save(filename, ContentFile(file_io.read()))
+                    detections = predict_room_polygons(blueprint_image)
+                remember_predictions(blueprint_images.content_hash, key, detections)
+            else:
+                print("Using cached room detections")
+
+            shapes = room_shapes(detections, dpi, scale)
+            save_room_annotations(blueprint_images, shapes, blueprint_image.height, blueprint_image.width)
             blueprint_images.save()
             blueprint_image.close()
-            del json_str, json_data, shapes, results, file_io, blueprint_image
+            del shapes, detections, blueprint_image
             gc.collect()
             return blueprint_id
 
@@ -1,6 +1,7 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from plans.extract_scale import extract_scale_from_image, clean_text, extract_text_from_image
+import tempfile
+from plans.extract_scale import extract_scale_from_image, clean_text, extract_text_from_image, is_pdf_file, is_image_file
 import unicodedata
 
 
@@ -55,5 +56,17 @@ class ExtractScaleTests(unittest.TestCase):
         result = extract_text_from_image(blank)
         self.assertIsInstance(result, str)
 
+    def test_file_type_detection_reads_only_the_header(self):
+        from PIL import Image
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf, tempfile.NamedTemporaryFile(suffix=".png") as png:
+            pdf.write(b"%PDF-1.4 rest of file")
+            pdf.flush()
+            Image.new('RGB', (10, 10), color='white').save(png, format="PNG")
+            png.flush()
+            self.assertTrue(is_pdf_file(pdf.name))
+            self.assertFalse(is_image_file(pdf.name))
+            self.assertTrue(is_image_file(png.name))
+            self.assertFalse(is_pdf_file(png.name))
+
 # if __name__ == '__main__':
 #     unittest.main()
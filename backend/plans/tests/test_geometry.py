@@ -0,0 +1,66 @@
+import unittest
+import numpy as np
+from plans import geometry
+from plans.utils import compute_sqft, polygon_dimension
+from estimators.utils import compute_wall_dimensions
+
+
+def random_polygons(rng, count):
+    polygons = []
+    for _ in range(count):
+        size = int(rng.integers(1, 12))
+        points = rng.uniform(-500, 12000, (size, 2))
+        if rng.random() < 0.3:
+            # Half-pixel coordinates exercise the round-half-to-even step
+            points = np.floor(points) + 0.5
+        polygons.append(points.tolist())
+    return polygons
+
+
+class GeometryPropertyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(1234)
+
+    def test_matches_scalar_helpers_for_one_page(self):
+        for dpi, scale in [(300, 0.25), (150, 0.125), (72, 2.1), (300, 0.1875)]:
+            polygons = random_polygons(self.rng, 300)
+            coords, offsets = geometry.pack_polygons(polygons)
+
+            areas = geometry.areas_sqft(coords, offsets, dpi, scale)
+            widths, heights = geometry.dimensions_ft(coords, offsets, dpi, scale)
+            lengths, thicknesses = geometry.wall_dimensions_ft(coords, offsets, dpi, scale)
+
+            for i, points in enumerate(polygons):
+                self.assertEqual(areas[i], compute_sqft(np.array(points), dpi, scale))
+                self.assertEqual((widths[i], heights[i]), polygon_dimension(np.array(points), dpi, scale))
+                self.assertEqual((lengths[i], thicknesses[i]), compute_wall_dimensions(np.array(points), dpi, scale))
+
+    def test_matches_scalar_helpers_across_pages(self):
+        polygons = random_polygons(self.rng, 500)
+        dpis = self.rng.choice([72, 150, 300], len(polygons))
+        scales = self.rng.choice([0.125, 0.25, 2.1, 0.0625], len(polygons))
+        coords, offsets = geometry.pack_polygons(polygons)
+
+        areas = geometry.areas_sqft(coords, offsets, dpis, scales)
+        widths, heights = geometry.dimensions_ft(coords, offsets, dpis, scales)
+
+        for i, points in enumerate(polygons):
+            dpi, scale = int(dpis[i]), float(scales[i])
+            self.assertEqual(areas[i], compute_sqft(np.array(points), dpi, scale))
+            self.assertEqual((widths[i], heights[i]), polygon_dimension(np.array(points), dpi, scale))
+
+    def test_perimeter_and_packing(self):
+        polygons = [[[0, 0], [300, 0], [300, 150], [0, 150]], [[10, 10]], [[0, 0], [30, 40]]]
+        coords, offsets = geometry.pack_polygons(polygons)
+
+        self.assertEqual(offsets.tolist(), [0, 4, 5, 7])
+        self.assertEqual([p.tolist() for p in geometry.unpack_polygons(coords, offsets)],
+                         [np.array(p, dtype=float).tolist() for p in polygons])
+        np.testing.assert_allclose(geometry.perimeters_ft(coords, offsets, 300, 0.25), [12.0, 0.0, 100 / 75])
+
+    def test_empty_batch_and_empty_polygon(self):
+        coords, offsets = geometry.pack_polygons([])
+        self.assertEqual(len(geometry.areas_sqft(coords, offsets, 300, 0.25)), 0)
+        with self.assertRaises(ValueError):
+            geometry.pack_polygons([[[0, 0]], []])
@@ -0,0 +1,74 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from plans.inference import BatchInferenceEngine
+
+
+class FakeModel:
+    """Returns one result per image and records the size of every batch."""
+
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.kwargs = []
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def predict(self, images, **kwargs):
+        time.sleep(self.delay)
+        with self.lock:
+            self.batches.append(len(images))
+            self.kwargs.append(kwargs)
+        return [f"result for {image}" for image in images]
+
+
+class BatchInferenceEngineTests(unittest.TestCase):
+
+    def test_concurrent_requests_share_batches(self):
+        model = FakeModel(delay=0.02)
+        engine = BatchInferenceEngine(
+            max_batch_size=4, max_wait=0.2, predict_kwargs={"project": "room_predictions", "name": "test"}
+        )
+
+        with ThreadPoolExecutor(max_workers=8) as callers:
+            results = list(callers.map(lambda i: engine.predict(model, f"page {i}"), range(8)))
+
+        self.assertEqual(results, [f"result for page {i}" for i in range(8)])
+        self.assertEqual(sum(model.batches), 8)
+        self.assertLessEqual(max(model.batches), 4)
+        self.assertLess(len(model.batches), 8)
+        self.assertEqual(model.kwargs[0], {"project": "room_predictions", "name": "test"})
+
+    def test_lone_request_waits_at_most_max_wait(self):
+        model = FakeModel()
+        engine = BatchInferenceEngine(max_batch_size=16, max_wait=0.05)
+
+        started = time.monotonic()
+        self.assertEqual(engine.predict(model, "page"), "result for page")
+        self.assertLess(time.monotonic() - started, 1.0)
+        self.assertEqual(model.batches, [1])
+
+    def test_errors_reach_every_caller_in_the_batch(self):
+        class BrokenModel:
+            def predict(self, images, **kwargs):
+                raise RuntimeError("out of memory")
+
+        engine = BatchInferenceEngine(max_batch_size=2, max_wait=0.2)
+        model = BrokenModel()
+        futures = [engine.submit(model, "a"), engine.submit(model, "b")]
+        for future in futures:
+            with self.assertRaisesRegex(RuntimeError, "out of memory"):
+                future.result(timeout=5)
+
+        # The engine keeps serving after a failed batch
+        self.assertEqual(engine.predict(FakeModel(), "c"), "result for c")
+
+    def test_requests_for_different_models_are_not_mixed(self):
+        first, second = FakeModel(), FakeModel()
+        engine = BatchInferenceEngine(max_batch_size=4, max_wait=0.2)
+
+        futures = [engine.submit(first, "a"), engine.submit(second, "b"), engine.submit(first, "c")]
+
+        self.assertEqual([f.result(timeout=5) for f in futures], ["result for a", "result for b", "result for c"])
+        self.assertEqual(sum(first.batches), 2)
+        self.assertEqual(sum(second.batches), 1)
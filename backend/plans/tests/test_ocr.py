@@ -0,0 +1,105 @@
+import os
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+from PIL import Image
+from plans.ocr import (
+    SubprocessEngine, PersistentEngine, OcrEnginePool, create_engine, get_engine,
+    SUBPROCESS, PERSISTENT,
+)
+from plans.extract_scale import extract_scale_from_image_subprocess
+import plans.ocr as ocr
+
+
+class SubprocessEngineTests(unittest.TestCase):
+
+    @patch("plans.ocr.subprocess.check_output", return_value=b"SCALE 1/4\" = 1'-0\"")
+    def test_runs_tesseract_on_temp_png_and_cleans_up(self, mock_check_output):
+        text = SubprocessEngine().image_to_text(Image.new("RGB", (10, 10)))
+
+        self.assertIn("1/4", text)
+        command = mock_check_output.call_args[0][0]
+        self.assertEqual(command[0], "tesseract")
+        self.assertTrue(command[1].endswith(".png"))
+        self.assertFalse(os.path.exists(command[1]))
+
+    @patch("plans.ocr.subprocess.check_output", side_effect=OSError("tesseract not found"))
+    def test_extract_scale_defaults_when_ocr_fails(self, mock_check_output):
+        self.assertEqual(extract_scale_from_image_subprocess(Image.new("RGB", (10, 10))), 1.1)
+
+
+class PersistentEngineTests(unittest.TestCase):
+
+    def test_feeds_raw_pixels_to_tesseract_api(self):
+        fake_tesserocr = MagicMock()
+        api = fake_tesserocr.PyTessBaseAPI.return_value
+        api.GetUTF8Text.return_value = "1/8\" = 1'-0\""
+        image = Image.new("RGB", (4, 3), color="white")
+        image.info["dpi"] = (300, 300)
+
+        with patch("plans.ocr.tesserocr", fake_tesserocr):
+            engine = PersistentEngine()
+            text = engine.image_to_text(image)
+            scale = extract_scale_from_image_subprocess(image, engine)
+
+        self.assertEqual(text, "1/8\" = 1'-0\"")
+        self.assertEqual(scale, 0.125)
+        fake_tesserocr.PyTessBaseAPI.assert_called_once_with(lang="eng")
+        api.SetImageBytes.assert_called_with(image.tobytes(), 4, 3, 3, 12)
+        api.SetSourceResolution.assert_called_with(300)
+        api.Clear.assert_called()
+
+    def test_grayscale_images_are_passed_one_byte_per_pixel(self):
+        fake_tesserocr = MagicMock()
+        image = Image.new("L", (5, 2))
+        with patch("plans.ocr.tesserocr", fake_tesserocr):
+            PersistentEngine().image_to_text(image)
+        fake_tesserocr.PyTessBaseAPI.return_value.SetImageBytes.assert_called_with(
+            image.tobytes(), 5, 2, 1, 5
+        )
+
+    @patch("plans.ocr.tesserocr", None)
+    def test_create_engine_falls_back_to_subprocess(self):
+        self.assertIsInstance(create_engine(PERSISTENT), SubprocessEngine)
+
+    def test_create_engine_rejects_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            create_engine("cuneiform")
+
+
+class OcrEnginePoolTests(unittest.TestCase):
+
+    def test_map_keeps_order_and_reuses_one_engine_per_thread(self):
+        created = []
+
+        def fake_create_engine(mode, lang):
+            engine = MagicMock()
+            engine.image_to_text.side_effect = lambda image: image.info["name"]
+            created.append(threading.get_ident())
+            return engine
+
+        images = []
+        for i in range(12):
+            image = Image.new("L", (1, 1))
+            image.info["name"] = f"page {i}"
+            images.append(image)
+
+        with patch("plans.ocr.create_engine", side_effect=fake_create_engine):
+            pool = OcrEnginePool(mode=SUBPROCESS, workers=3)
+            texts = pool.map(images)
+            texts += [pool.image_to_text(images[0])]
+            pool.close()
+
+        self.assertEqual(texts, [f"page {i}" for i in range(12)] + ["page 0"])
+        self.assertLessEqual(len(created), 3)
+        self.assertEqual(len(created), len(set(created)))
+
+    def test_get_engine_is_cached_per_thread(self):
+        ocr._thread_engines.engines = {}
+        self.assertIs(get_engine(SUBPROCESS), get_engine(SUBPROCESS))
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(get_engine(SUBPROCESS)))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], get_engine(SUBPROCESS))
@@ -0,0 +1,172 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from plans.models import Blueprint, BlueprintImage, PageArtifact, Status
+from plans.page_cache import (
+    pdf_page_hashes, cached_artifacts, cached_predictions, remember_predictions, evict_page_cache,
+)
+from plans.tasks import process_blueprint_file, async_create_annotation
+from projects.models import Project
+from users.models import CustomUser, Role
+
+
+def make_pdf(colors):
+    pdf_io = io.BytesIO()
+    pages = [Image.new("RGB", (60, 40), color=color) for color in colors]
+    pages[0].save(pdf_io, format="PDF", save_all=True, append_images=pages[1:])
+    return pdf_io.getvalue()
+
+
+def fake_convert_from_path(pdf_path, dpi, first_page, last_page):
+    return [Image.new("RGB", (60, 40), color="white") for _ in range(first_page, last_page + 1)]
+
+
+def fake_render_page_payload(image, idx, ocr=None):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG")
+    return {"page": idx, "content": buffer.getvalue(), "dpi": 300, "scale": 0.25}
+
+
+class PageHashTests(TestCase):
+
+    def write_pdf(self, colors):
+        tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+        tmp.write(make_pdf(colors))
+        tmp.close()
+        self.addCleanup(os.remove, tmp.name)
+        return tmp.name
+
+    def test_identical_pages_share_a_key_across_documents(self):
+        first = pdf_page_hashes(self.write_pdf(["red", "green", "blue"]))
+        reissue = pdf_page_hashes(self.write_pdf(["yellow", "green", "blue"]))
+
+        self.assertEqual(len(first), 3)
+        self.assertNotEqual(first[0], reissue[0])
+        self.assertEqual(first[1:], reissue[1:])
+        self.assertEqual(len(set(first)), 3)
+
+    def test_render_dpi_is_part_of_the_key(self):
+        path = self.write_pdf(["red"])
+        self.assertNotEqual(pdf_page_hashes(path, dpi=300), pdf_page_hashes(path, dpi=150))
+
+    def test_unreadable_pdf_disables_the_cache(self):
+        tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+        tmp.write(b"%PDF-1.4 not really a pdf")
+        tmp.close()
+        self.addCleanup(os.remove, tmp.name)
+        self.assertIsNone(pdf_page_hashes(tmp.name))
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_disabled_cache_returns_no_hashes(self):
+        self.assertIsNone(pdf_page_hashes(self.write_pdf(["red"])))
+
+
+@patch("plans.tasks.render_page_payload", side_effect=fake_render_page_payload)
+@patch("plans.tasks.convert_from_path", side_effect=fake_convert_from_path)
+class PageCacheTaskTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, BLUEPRINT_PROCESSING_MODE="sequential")
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = CustomUser.objects.create_user(
+            email="cache@ssnbuilders.com",
+            username="cacheuser",
+            first_name="cache",
+            last_name="user",
+            password="testpass123",
+            role=Role.ESTIMATOR
+        )
+        self.project = Project.objects.create(title="Cache Project", owner=self.user)
+
+    def upload(self, title, colors):
+        return Blueprint.objects.create(
+            title=title,
+            project=self.project,
+            description="Sheet set",
+            pdf_file=SimpleUploadedFile(f"{title}.pdf", make_pdf(colors), content_type="application/pdf"),
+        )
+
+    def test_reupload_links_cached_pages_instead_of_rendering(self, mock_convert, mock_render):
+        first = self.upload("Issue 1", ["red", "green", "blue"])
+        process_blueprint_file(first.id)
+        self.assertEqual(PageArtifact.objects.count(), 3)
+        self.assertEqual(mock_convert.call_count, 3)
+
+        mock_convert.reset_mock()
+        reissue = self.upload("Issue 2", ["yellow", "green", "blue"])
+        process_blueprint_file(reissue.id)
+
+        # Only the changed sheet is rendered again
+        self.assertEqual([c.kwargs["first_page"] for c in mock_convert.call_args_list], [1])
+        reissue.refresh_from_db()
+        self.assertEqual(reissue.status, Status.COMPLETE)
+        # Pages 2 and 3 were linked before page 1 was rendered, but they list in page order
+        pages = {img.title: img for img in reissue.images.all()}
+        self.assertEqual(list(pages), ["Issue 2 - Page 1", "Issue 2 - Page 2", "Issue 2 - Page 3"])
+        self.assertEqual([img.page_number for img in pages.values()], [1, 2, 3])
+
+        linked = pages["Issue 2 - Page 2"]
+        artifact = PageArtifact.objects.get(content_hash=linked.content_hash)
+        self.assertEqual(linked.scale, 0.25)
+        self.assertEqual(linked.dpi, 300)
+        self.assertTrue(linked.image.name.startswith("blueprints/images/"))
+        # Hardlinked, not copied
+        self.assertEqual(os.stat(linked.image.path).st_ino, os.stat(artifact.image.path).st_ino)
+
+    def test_fanout_with_every_page_cached_completes_without_tasks(self, mock_convert, mock_render):
+        process_blueprint_file(self.upload("Issue 1", ["red", "green"]).id)
+        reissue = self.upload("Issue 2", ["red", "green"])
+
+        with self.settings(BLUEPRINT_PROCESSING_MODE="fanout"), patch("plans.tasks.chord") as mock_chord:
+            process_blueprint_file(reissue.id)
+
+        mock_chord.assert_not_called()
+        reissue.refresh_from_db()
+        self.assertEqual(reissue.status, Status.COMPLETE)
+        self.assertEqual(reissue.images.count(), 2)
+
+    def test_missing_cache_file_is_a_miss(self, mock_convert, mock_render):
+        process_blueprint_file(self.upload("Issue 1", ["red"]).id)
+        artifact = PageArtifact.objects.get()
+        os.remove(artifact.image.path)
+
+        self.assertEqual(cached_artifacts([artifact.content_hash]), {})
+        self.assertFalse(PageArtifact.objects.exists())
+
+    def test_eviction_drops_least_recently_used_pages_only_from_the_cache(self, mock_convert, mock_render):
+        process_blueprint_file(self.upload("Issue 1", ["red", "green", "blue"]).id)
+        artifacts = list(PageArtifact.objects.order_by("last_used"))
+        keep = artifacts[-1]
+        # Touch the last page so it is the most recently used
+        cached_artifacts([keep.content_hash])
+
+        evicted = evict_page_cache(max_bytes=keep.size)
+
+        self.assertEqual(evicted, 2)
+        self.assertEqual(list(PageArtifact.objects.values_list("pk", flat=True)), [keep.pk])
+        self.assertFalse(os.path.exists(artifacts[0].image.path))
+        for image in BlueprintImage.objects.all():
+            self.assertTrue(os.path.exists(image.image.path))
+
+    @patch("plans.tasks.get_model")
+    def test_cached_room_predictions_skip_the_model(self, mock_get_model, mock_convert, mock_render):
+        process_blueprint_file(self.upload("Issue 1", ["red"]).id)
+        page = BlueprintImage.objects.get()
+        detections = [{"label": "room", "points": [[0, 0], [30, 0], [30, 20], [0, 20]], "confidence_score": 0.9}]
+        remember_predictions(page.content_hash, "room", detections)
+        self.assertEqual(cached_predictions(page.content_hash, "room"), detections)
+
+        result = async_create_annotation(page.id, self.user.id)
+
+        self.assertEqual(result, page.id)
+        mock_get_model.assert_not_called()
+        self.assertEqual(page.annotations.count(), 1)
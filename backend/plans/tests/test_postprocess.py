@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import MagicMock
+import cv2
+import numpy as np
+from plans.postprocess import PolygonSimplifier
+from plans.tasks import room_detections
+
+
+def full_canvas_simplify(poly, height, width):
+    """The previous per-mask implementation, kept as the reference."""
+    temp_mask = np.zeros((height, width), dtype=np.uint8)
+    poly_int = np.array([poly], dtype=np.int32)
+    cv2.fillPoly(temp_mask, poly_int, 255)
+    eroded = cv2.erode(temp_mask, np.ones((3, 3), np.uint8), iterations=1)
+    contours, _ = cv2.findContours(eroded, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    contour = max(contours, key=cv2.contourArea)
+    epsilon = 0.01 * cv2.arcLength(contour, True)
+    simplified = cv2.approxPolyDP(contour, epsilon, True)
+    return np.round(simplified.reshape(-1, 2).astype(float), 2).tolist()
+
+
+def random_polygon(rng, height, width):
+    """Star-shaped polygons of every size, some crossing or touching the page edge."""
+    cx = rng.uniform(-20, width + 20)
+    cy = rng.uniform(-20, height + 20)
+    radius = rng.choice([1.5, 4, 20, 80, 250])
+    count = rng.integers(3, 40)
+    angles = np.sort(rng.uniform(0, 2 * np.pi, count))
+    radii = radius * rng.uniform(0.3, 1.0, count)
+    return np.stack([cx + radii * np.cos(angles), cy + radii * np.sin(angles)], axis=1).astype(np.float32)
+
+
+class PolygonSimplifierTests(unittest.TestCase):
+
+    def test_matches_full_canvas_rasterization(self):
+        rng = np.random.default_rng(7)
+        height, width = 480, 640
+        simplifier = PolygonSimplifier(height, width)
+        outcomes = set()
+        for _ in range(600):
+            poly = random_polygon(rng, height, width)
+            expected = full_canvas_simplify(poly, height, width)
+            self.assertEqual(simplifier.simplify(poly), expected, poly.tolist())
+            outcomes.add(expected is None)
+        # Both kept and eroded-away polygons were exercised
+        self.assertEqual(outcomes, {True, False})
+
+    def test_edge_cases(self):
+        simplifier = PolygonSimplifier(100, 100)
+        cases = [
+            [[0, 0], [99, 0], [99, 99], [0, 99]],           # the whole page
+            [[-50, -50], [150, -50], [150, 150], [-50, 150]],  # larger than the page
+            [[200, 200], [260, 200], [260, 260]],           # off the page
+            [[10, 10], [11, 10], [11, 11]],                 # erodes away
+            [[5, 5], [40, 5], [40, 40], [20, 20], [5, 40]],  # concave
+        ]
+        for poly in cases:
+            poly = np.array(poly, dtype=np.float32)
+            self.assertEqual(simplifier.simplify(poly), full_canvas_simplify(poly, 100, 100), poly.tolist())
+        self.assertIsNone(simplifier.simplify(np.empty((0, 2), dtype=np.float32)))
+
+    def test_room_detections_output_is_unchanged(self):
+        rng = np.random.default_rng(11)
+        height, width = 300, 400
+        polys = [random_polygon(rng, height, width) for _ in range(50)]
+
+        masks = MagicMock()
+        masks.xy = polys
+        masks.cls = [np.array(0)] * len(polys)
+        box = MagicMock()
+        box.conf.item.return_value = 0.5
+        result = MagicMock()
+        result.masks = masks
+        result.orig_img = np.zeros((height, width, 3), dtype=np.uint8)
+        result.probs = None
+        result.boxes = [box] * len(polys)
+        model = MagicMock()
+        model.names = {0: "room"}
+
+        expected = [
+            {"label": "room", "points": points, "confidence_score": 0.5}
+            for points in (full_canvas_simplify(p, height, width) for p in polys)
+            if points is not None
+        ]
+        self.assertEqual(room_detections(result, model), expected)
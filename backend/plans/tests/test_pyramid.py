@@ -0,0 +1,147 @@
+import io
+import os
+import shutil
+import tempfile
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from plans import pyramid
+from plans.models import Blueprint, BlueprintImage
+from plans.serializers import BlueprintImageSerializer
+from plans.tasks import store_page_payload
+from projects.models import Project
+from users.models import CustomUser, Role
+
+
+def jpeg(size, color="white"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color=color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class TempMediaMixin:
+
+    def use_temp_media(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, PAGE_TILE_SIZE=256, PAGE_TILE_OVERLAP=1)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def make_blueprint(self):
+        owner = CustomUser.objects.create_user(
+            email="tiles@ssnbuilders.com",
+            username="tilesuser",
+            first_name="Tiles",
+            last_name="User",
+            password="testpass123",
+            role=Role.USER
+        )
+        project = Project.objects.create(title="Tiles Project", owner=owner)
+        return Blueprint.objects.create(title="Tiles", description="Sheet", project=project)
+
+
+class PyramidLayoutTests(TempMediaMixin, TestCase):
+
+    def test_levels_halve_down_to_one_pixel(self):
+        self.assertEqual(pyramid.max_level(600, 400), 10)
+        self.assertEqual(pyramid.level_size(600, 400, 10), (600, 400))
+        self.assertEqual(pyramid.level_size(600, 400, 9), (300, 200))
+        self.assertEqual(pyramid.level_size(600, 400, 0), (1, 1))
+        self.assertEqual(pyramid.max_level(1, 1), 0)
+
+    def test_tiles_overlap_their_neighbours(self):
+        boxes = {(col, row): box for col, row, box in pyramid.tile_boxes(600, 400, 256, overlap=1)}
+        self.assertEqual(len(boxes), 6)
+        self.assertEqual(boxes[0, 0], (0, 0, 257, 257))
+        self.assertEqual(boxes[1, 1], (255, 255, 513, 400))
+        self.assertEqual(boxes[2, 0], (511, 0, 600, 257))
+
+    def test_build_pyramid(self):
+        self.use_temp_media()
+        storage = FileSystemStorage()
+        image = Image.new("RGB", (600, 400), color="red")
+
+        tiles = pyramid.build_pyramid(image, "page", storage, thumbnail_size=128)
+
+        # 6 tiles at full size, 2 at 300x200, 1 for each of the 9 smaller levels
+        self.assertEqual(tiles, 6 + 2 + 9)
+        with storage.open("blueprints/tiles/page/page.dzi") as fh:
+            descriptor = fh.read().decode()
+        self.assertIn('TileSize="256"', descriptor)
+        self.assertIn('<Size Width="600" Height="400"/>', descriptor)
+        with Image.open(storage.path("blueprints/tiles/page/page_files/10/2_1.jpg")) as tile:
+            self.assertEqual(tile.size, (89, 145))
+        with Image.open(storage.path("blueprints/tiles/page/thumbnail.jpg")) as thumbnail:
+            self.assertEqual(thumbnail.size, (128, 85))
+
+        pyramid.delete_pyramid(storage, "page")
+        self.assertFalse(storage.exists("blueprints/tiles/page/page.dzi"))
+        self.assertFalse(storage.exists("blueprints/tiles/page/page_files/10/0_0.jpg"))
+
+
+class PageTilesTests(TempMediaMixin, APITestCase):
+
+    def setUp(self):
+        self.use_temp_media()
+        self.blueprint = self.make_blueprint()
+
+    def store_page(self):
+        payload = {"page": 1, "content": jpeg((600, 400)), "dpi": 300, "scale": 0.25}
+        return store_page_payload(payload, self.blueprint)
+
+    def test_processed_pages_are_tiled(self):
+        page = self.store_page()
+        page.refresh_from_db()
+        self.assertEqual((page.width, page.height, page.tile_size, page.tile_version), (600, 400, 256, 1))
+
+        tiles = BlueprintImageSerializer(page).data["tiles"]
+        self.assertEqual(tiles["dzi"], reverse("blueprint-image-dzi", args=[page.pk, 1]))
+        self.assertEqual(tiles["tile_size"], 256)
+
+    def test_tiles_are_served_with_long_lived_cache_headers(self):
+        page = self.store_page()
+
+        response = self.client.get(reverse("blueprint-image-tile", args=[page.pk, 1, 10, 0, 0]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+        self.assertEqual(b"".join(response.streaming_content)[:2], b"\xff\xd8")
+
+        response = self.client.get(reverse("blueprint-image-dzi", args=[page.pk, 1]))
+        self.assertEqual(response["Content-Type"], "application/xml")
+        self.assertEqual(self.client.get(reverse("blueprint-image-thumbnail", args=[page.pk, 1])).status_code, 200)
+        self.assertEqual(self.client.get(reverse("blueprint-image-tile", args=[page.pk, 1, 10, 9, 9])).status_code, 404)
+
+    def test_rebuilding_moves_the_pyramid_to_new_urls(self):
+        page = self.store_page()
+        old_dzi = BlueprintImageSerializer(page).data["tiles"]["dzi"]
+
+        with self.settings(PAGE_TILE_SIZE=512):
+            pyramid.tile_page(page)
+        page.refresh_from_db()
+        tiles = BlueprintImageSerializer(page).data["tiles"]
+        self.assertEqual((page.tile_version, tiles["tile_size"]), (2, 512))
+        self.assertNotEqual(tiles["dzi"], old_dzi)
+        self.assertEqual(self.client.get(old_dzi).status_code, 404)
+        response = self.client.get(tiles["dzi"])
+        self.assertIn(b'TileSize="512"', b"".join(response.streaming_content))
+
+    def test_tiling_can_be_turned_off(self):
+        with self.settings(PAGE_TILES_ENABLED=False):
+            page = self.store_page()
+        self.assertIsNone(page.tile_size)
+        self.assertIsNone(BlueprintImageSerializer(page).data["tiles"])
+
+    def test_deleting_a_page_removes_its_tiles(self):
+        page = self.store_page()
+        tile_dir = os.path.join(self.media_root, "blueprints", "tiles", str(page.pk), "1")
+        self.assertTrue(os.path.exists(os.path.join(tile_dir, "page.dzi")))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            page.delete()
+        self.assertFalse(os.path.exists(os.path.join(tile_dir, "page.dzi")))
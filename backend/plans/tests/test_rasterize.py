@@ -0,0 +1,106 @@
+import os
+import io
+import time
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from PIL import Image
+from plans.rasterize import page_ranges, render_page_payload, render_page_range, iter_rendered_pages, count_pdf_pages
+
+
+def fake_convert_from_path(pdf_path, dpi, first_page, last_page, output_folder, paths_only):
+    paths = []
+    for page in range(first_page, last_page + 1):
+        path = os.path.join(output_folder, f"page-{page:04d}.ppm")
+        Image.new("RGB", (40, 30), color=(page, 0, 0)).save(path)
+        paths.append(path)
+    return paths
+
+
+class RasterizeTests(unittest.TestCase):
+
+    def test_page_ranges(self):
+        self.assertEqual(page_ranges(10, 4), [(1, 4), (5, 8), (9, 10)])
+        self.assertEqual(page_ranges(3, 0), [(1, 1), (2, 2), (3, 3)])
+        self.assertEqual(page_ranges(0, 4), [])
+
+    def test_count_pdf_pages_reads_from_path(self):
+        pages = [Image.new("RGB", (20, 20), color="white") for _ in range(4)]
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+            pages[0].save(tmp, format="PDF", save_all=True, append_images=pages[1:])
+            tmp.flush()
+            self.assertEqual(count_pdf_pages(tmp.name), 4)
+
+    @patch("plans.rasterize.extract_scale_from_image_subprocess", return_value=0.25)
+    def test_render_page_payload_matches_jpeg_encoding(self, mock_scale):
+        image = Image.new("RGB", (50, 50), color="green")
+        image.info["dpi"] = (150, 150)
+        payload = render_page_payload(image, 3)
+
+        expected = io.BytesIO()
+        image.convert("RGB").save(expected, format="JPEG", quality=85)
+        self.assertEqual(payload["page"], 3)
+        self.assertEqual(payload["dpi"], 150)
+        self.assertEqual(payload["scale"], 0.25)
+        self.assertEqual(payload["content"], expected.getvalue())
+
+    @patch("plans.rasterize.extract_scale_from_image_subprocess", return_value=0.5)
+    @patch("plans.rasterize.convert_from_path", side_effect=fake_convert_from_path)
+    def test_render_page_range_numbers_pages(self, mock_convert, mock_scale):
+        payloads, failed = render_page_range("plan.pdf", 5, 7)
+        self.assertEqual([p["page"] for p in payloads], [5, 6, 7])
+        self.assertEqual(failed, [])
+        self.assertEqual(mock_convert.call_count, 1)  # one poppler parse per range
+        self.assertEqual(payloads[0]["dpi"], 300)
+
+    @patch("plans.rasterize.convert_from_path", side_effect=Exception("poppler crashed"))
+    def test_render_page_range_reports_failed_pages(self, mock_convert):
+        payloads, failed = render_page_range("plan.pdf", 1, 2)
+        self.assertEqual(payloads, [])
+        self.assertEqual([f["page"] for f in failed], [1, 2])
+
+    def test_iter_rendered_pages_yields_in_page_order(self):
+        def fake_render(pdf_path, first, last, dpi, **kwargs):
+            # Later ranges finish first
+            time.sleep(0.01 * (10 - first))
+            pages = [{"page": p, "content": b"", "dpi": dpi, "scale": 1.0} for p in range(first, last + 1)]
+            return pages, []
+
+        with patch("plans.rasterize.render_page_range", side_effect=fake_render), \
+                ThreadPoolExecutor(max_workers=3) as executor:
+            pages = list(iter_rendered_pages(
+                "plan.pdf", 9, pages_per_task=2, max_in_flight_pages=4, executor=executor
+            ))
+        self.assertEqual([p["page"] for p in pages], list(range(1, 10)))
+
+    def test_iter_rendered_pages_renders_in_process_inside_a_daemon(self):
+        def fake_render(pdf_path, first, last, dpi, **kwargs):
+            return [{"page": p} for p in range(first, last + 1)], []
+
+        with patch("plans.rasterize.multiprocessing.current_process") as current_process, \
+                patch("plans.rasterize.ProcessPoolExecutor") as pool, \
+                patch("plans.rasterize.get_engine"), \
+                patch("plans.rasterize.render_page_range", side_effect=fake_render) as render:
+            current_process.return_value.daemon = True
+            pages = list(iter_rendered_pages("plan.pdf", 5, pages_per_task=2, skip={3}))
+        pool.assert_not_called()
+        self.assertEqual([p["page"] for p in pages], [1, 2, 4, 5])
+        self.assertEqual(render.call_count, 2)
+
+    def test_iter_rendered_pages_bounds_in_flight_pages(self):
+        submitted = []
+
+        def fake_render(pdf_path, first, last, dpi, **kwargs):
+            submitted.append((first, last))
+            return [{"page": p} for p in range(first, last + 1)], []
+
+        with patch("plans.rasterize.render_page_range", side_effect=fake_render), \
+                ThreadPoolExecutor(max_workers=4) as executor:
+            pages = iter_rendered_pages("plan.pdf", 8, pages_per_task=2, max_in_flight_pages=4, executor=executor)
+            first = next(pages)
+            # Only two ranges (4 pages) may be outstanding before anything is consumed
+            self.assertEqual(first["page"], 1)
+            self.assertLessEqual(len(submitted), 2)
+            rest = list(pages)
+        self.assertEqual(len(rest), 7)
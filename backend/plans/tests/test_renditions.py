@@ -0,0 +1,135 @@
+import io
+import os
+import shutil
+import tempfile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from plans import renditions
+from plans.models import Blueprint, BlueprintImage
+from plans.prefetch import with_cover_image
+from plans.serializers import BlueprintSerializer
+from projects.models import Project
+from users.models import CustomUser, Role
+
+
+def jpeg(size):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color="white").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class RenditionCacheTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, RENDITION_CACHE_DIR="")
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_render_fits_the_size(self):
+        path = os.path.join(self.media_root, "page.jpg")
+        with open(path, "wb") as fh:
+            fh.write(jpeg((4000, 3000)))
+        data = renditions.render(path, 256, renditions.JPEG)
+        with Image.open(io.BytesIO(data)) as image:
+            self.assertEqual(image.size, (256, 192))
+
+    def test_least_recently_used_are_evicted(self):
+        paths = []
+        for i, name in enumerate(["old", "used", "new"]):
+            path = renditions.rendition_path(name, "v1", "thumb", renditions.JPEG)
+            os.makedirs(os.path.dirname(path))
+            with open(path, "wb") as fh:
+                fh.write(b"x" * 100)
+            os.utime(path, (1000 + i, 1000 + i))
+            paths.append(path)
+        with renditions.open_cached_rendition("used", "v1", "thumb", renditions.JPEG) as fh:
+            self.assertEqual(fh.name, paths[1])
+        self.assertIsNone(renditions.open_cached_rendition("missing", "v1", "thumb", renditions.JPEG))
+
+        self.assertEqual(renditions.evict_renditions(max_bytes=250), 1)
+        self.assertEqual([os.path.exists(path) for path in paths], [False, True, True])
+        self.assertEqual(renditions.evict_renditions(max_bytes=250), 0)
+
+
+class RenditionViewTests(APITestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, RENDITION_CACHE_DIR="", PAGE_TILES_ENABLED=False)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        owner = CustomUser.objects.create_user(
+            email="renditions@ssnbuilders.com",
+            username="renditionsuser",
+            first_name="Renditions",
+            last_name="User",
+            password="testpass123",
+            role=Role.USER
+        )
+        project = Project.objects.create(title="Renditions Project", owner=owner)
+        self.blueprint = Blueprint.objects.create(title="Renditions", description="Sheet", project=project)
+        self.page = BlueprintImage.objects.create(
+            blueprint=self.blueprint, title="Page 1", image=SimpleUploadedFile("page.jpg", jpeg((3000, 2000)))
+        )
+
+    def url(self, page, size, fmt=renditions.JPEG):
+        return reverse(
+            "blueprint-image-rendition", args=[page.pk, renditions.rendition_version(page.image.name), size, fmt]
+        )
+
+    def test_rendition_is_made_once_then_served_from_the_cache(self):
+        url = self.url(self.page, "preview")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertIn("immutable", response["Cache-Control"])
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (1024, 683))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_unknown_rendition_or_page(self):
+        self.assertEqual(self.client.get(self.url(self.page, "huge")).status_code, 404)
+        url = reverse("blueprint-image-rendition", args=[self.blueprint.pk, "0" * 12, "thumb", renditions.JPEG])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_replaced_image_gets_new_rendition_urls(self):
+        old_url = self.url(self.page, "thumb")
+        self.assertEqual(self.client.get(old_url).status_code, 200)
+
+        self.page.image = SimpleUploadedFile("page.jpg", jpeg((300, 600)))
+        self.page.save()
+        new_url = self.url(self.page, "thumb")
+
+        self.assertNotEqual(new_url, old_url)
+        response = self.client.get(new_url)
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (128, 256))
+        # An old version is never rendered from the new image
+        self.assertEqual(self.client.get(old_url.replace("thumb", "preview")).status_code, 404)
+
+    def test_deleting_a_page_removes_its_renditions(self):
+        self.client.get(self.url(self.page, "thumb"))
+        path = renditions.rendition_path(
+            self.page.pk, renditions.rendition_version(self.page.image.name), "thumb", renditions.JPEG
+        )
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.page.delete()
+        self.assertFalse(os.path.exists(path))
+
+    def test_blueprint_lists_link_the_cover_renditions(self):
+        BlueprintImage.objects.create(blueprint=self.blueprint, title="Page 2", image=SimpleUploadedFile("page2.jpg", jpeg((30, 20))))
+        with self.assertNumQueries(1):
+            data = BlueprintSerializer(with_cover_image(Blueprint.objects.all()), many=True).data
+        fmt = renditions.default_format()
+        self.assertEqual(data[0]["cover"]["thumb"], self.url(self.page, "thumb", fmt))
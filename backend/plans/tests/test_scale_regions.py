@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import MagicMock
+import cv2
+import numpy as np
+from PIL import Image
+from plans.scale_regions import find_scale_regions, scale_region_crops
+from plans.extract_scale import extract_scale_from_image_subprocess, match_scale
+
+
+def make_sheet(title_block=True, view_title=True):
+    """A 12x8" sheet at 300 DPI with a frame, some linework and optional labels."""
+    width, height = 3600, 2400
+    sheet = np.full((height, width, 3), 255, np.uint8)
+    cv2.rectangle(sheet, (40, 40), (width - 40, height - 40), (0, 0, 0), 6)
+    for k in range(10):
+        cv2.rectangle(sheet, (200 + k * 60, 200 + k * 30), (1400 + k * 40, 1300 + k * 20), (0, 0, 0), 3)
+    if title_block:
+        cv2.line(sheet, (3000, 40), (3000, height - 40), (0, 0, 0), 5)
+        for i, text in enumerate(["PROJECT NAME", "SHEET A-101", "SCALE: 1/4 = 1'-0"]):
+            cv2.putText(sheet, text, (3040, 1700 + i * 120), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 3)
+    if view_title:
+        cv2.putText(sheet, "FLOOR PLAN", (500, 1700), cv2.FONT_HERSHEY_SIMPLEX, 1.6, (0, 0, 0), 4)
+        cv2.line(sheet, (500, 1725), (800, 1725), (0, 0, 0), 5)
+        cv2.putText(sheet, "1/8 = 1'-0", (500, 1790), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 3)
+    return Image.fromarray(sheet)
+
+
+def contains(box, point):
+    return box[0] <= point[0] <= box[2] and box[1] <= point[1] <= box[3]
+
+
+class ScaleRegionTests(unittest.TestCase):
+
+    def test_title_block_comes_first_then_view_titles(self):
+        regions = find_scale_regions(make_sheet(), max_side=1200)
+
+        self.assertGreaterEqual(len(regions), 2)
+        self.assertTrue(contains(regions[0], (3100, 1930)))  # scale line in the title block
+        self.assertTrue(any(contains(box, (600, 1780)) for box in regions[1:]))  # scale under the view title
+        sheet_area = 3600 * 2400
+        cropped = sum((r - l) * (b - t) for l, t, r, b in regions)
+        self.assertLess(cropped, sheet_area / 10)
+
+    def test_blank_sheet_has_no_regions(self):
+        sheet = Image.new("RGB", (2000, 1500), color="white")
+        self.assertEqual(find_scale_regions(sheet), [])
+        self.assertEqual(scale_region_crops(sheet), [])
+
+    def test_unreadable_image_returns_no_regions(self):
+        self.assertEqual(find_scale_regions(MagicMock()), [])
+
+
+class RegionScaleExtractionTests(unittest.TestCase):
+
+    def test_match_scale_requires_a_scale_notation(self):
+        self.assertEqual(match_scale("SCALE: 1/4\" = 1'-0\""), 0.25)
+        self.assertEqual(match_scale("SCALE 3/8"), 0.375)
+        self.assertIsNone(match_scale("SHEET 1/2"))
+        self.assertIsNone(match_scale("no scale"))
+
+    def test_crop_hit_skips_full_page_ocr(self):
+        sheet = make_sheet()
+        engine = MagicMock(spec=["image_to_text"])
+        engine.image_to_text.side_effect = lambda image: (
+            "SCALE: 1/4\" = 1'-0\"" if image.size != sheet.size else "1/2"
+        )
+
+        self.assertEqual(extract_scale_from_image_subprocess(sheet, engine), 0.25)
+        sizes = [call.args[0].size for call in engine.image_to_text.call_args_list]
+        self.assertNotIn(sheet.size, sizes)
+        self.assertEqual(len(sizes), 1)
+
+    def test_falls_back_to_full_page_when_crops_have_no_scale(self):
+        sheet = make_sheet()
+        engine = MagicMock(spec=["image_to_text"])
+        engine.image_to_text.side_effect = lambda image: "3/16" if image.size == sheet.size else "PROJECT"
+
+        self.assertEqual(extract_scale_from_image_subprocess(sheet, engine), 0.1875)
+        self.assertEqual(engine.image_to_text.call_args_list[-1].args[0].size, sheet.size)
+
+    def test_pool_ocrs_all_crops_in_one_map(self):
+        sheet = make_sheet()
+        pool = MagicMock(spec=["image_to_text", "map"])
+        pool.map.side_effect = lambda crops: ["NOTES"] + ["1/8\" = 1'-0\""] * (len(crops) - 1)
+
+        self.assertEqual(extract_scale_from_image_subprocess(sheet, pool), 0.125)
+        pool.map.assert_called_once()
+        pool.image_to_text.assert_not_called()
+
+    def test_nothing_found_defaults_to_1_1(self):
+        engine = MagicMock(spec=["image_to_text"])
+        engine.image_to_text.return_value = "no scale here"
+        self.assertEqual(extract_scale_from_image_subprocess(make_sheet(), engine), 1.1)
@@ -1,4 +1,6 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.test import APIRequestFactory
 from plans.serializers import (
@@ -7,8 +9,20 @@ from plans.serializers import (
     BlueprintDetailSerializer,
     BlueprintImageDetailSerializer
 )
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from projects.models import Project
-from plans.models import Blueprint, BlueprintImage
+from plans.models import Blueprint, BlueprintImage, PageArtifact
+from plans.prefetch import prefetch_blueprint_detail, prefetch_image_detail
+from annotations.models import (
+    Annotation,
+    WallAnnotation,
+    WindowAndDoorAnnotation,
+    AnnotationMaterial,
+    WallAnnotationMaterial,
+    WindowAndDoorAnnotationMaterial,
+)
+from materials.models import Material, MaterialCategory, MaterialSubcategory
 from users.models import CustomUser
 from django.core.files.uploadedfile import SimpleUploadedFile
 from unittest.mock import patch
@@ -59,6 +73,29 @@ class BlueprintSerializersTestCase(TestCase):
         self.assertEqual(image.dpi, 300)
         self.assertEqual(image.scale, 1.0)
 
+    @patch("plans.serializers.extract_scale_from_image", return_value=0.5)
+    def test_reuploaded_image_reuses_the_cached_scale(self, mock_extract):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        request = self.factory.post("/")
+        request.user = self.user
+        blueprint = Blueprint.objects.create(title="B1", description="desc", project=self.project)
+
+        images = []
+        with override_settings(MEDIA_ROOT=media_root):
+            for title in ("First", "Again"):
+                serializer = BlueprintImageSerializer(data={
+                    "blueprint": str(blueprint.id), "title": title, "image": self.create_test_image(),
+                }, context={'request': request})
+                serializer.is_valid(raise_exception=True)
+                images.append(serializer.save())
+
+        mock_extract.assert_called_once()
+        self.assertEqual([image.scale for image in images], [0.5, 0.5])
+        self.assertIsNotNone(images[0].content_hash)
+        self.assertEqual(images[0].content_hash, images[1].content_hash)
+        self.assertEqual(PageArtifact.objects.get().content_hash, images[0].content_hash)
+
     def test_blueprint_image_serializer_create_invalid_user(self):
         image_file = self.create_test_image()
         other_user = CustomUser.objects.create_user(
@@ -89,3 +126,63 @@ class BlueprintSerializersTestCase(TestCase):
         img.save(byte_io, format='JPEG', dpi=(300, 300))
         byte_io.seek(0)
         return SimpleUploadedFile("test.jpg", byte_io.read(), content_type="image/jpeg")
+
+
+class DetailSerializerQueryCountTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="queries@example.com",
+            username='queryuser',
+            first_name='query',
+            last_name='user',
+            password="testpass123"
+            )
+        project = Project.objects.create(title="Query Project", owner=self.user)
+        self.blueprint = Blueprint.objects.create(title="Query Blueprint", description="desc", project=project)
+        category = MaterialCategory.objects.create(category_name="Finishes", division="09")
+        subcategory = MaterialSubcategory.objects.create(category=category, subcategory_name="Paint", sub_division="09 91")
+        self.materials = [
+            Material.objects.create(material_name=f"Paint {i}", subcategory=subcategory, unit="sqft") for i in range(3)
+        ]
+
+    def add_annotations(self, count):
+        image = BlueprintImage.objects.create(blueprint=self.blueprint, title="Sheet", dpi=300, scale=0.25)
+        square = [[0, 0], [100, 0], [100, 100], [0, 100]]
+        for i in range(count):
+            room = Annotation.objects.create(blueprint=image, label="Room", coordinates=square, annotation_type="polygon")
+            wall = WallAnnotation.objects.create(blueprint=image, label="Wall", coordinates=square, annotation_type="rectangle")
+            door = WindowAndDoorAnnotation.objects.create(blueprint=image, label="Door", coordinates=square, annotation_type="rectangle")
+            for material in self.materials:
+                AnnotationMaterial.objects.create(annotation=room, material=material)
+                WallAnnotationMaterial.objects.create(wall_annotation=wall, material=material)
+                WindowAndDoorAnnotationMaterial.objects.create(window_and_door_annotation=door, material=material)
+        return image
+
+    def count_queries(self, serializer_class, queryset, pk):
+        with CaptureQueriesContext(connection) as queries:
+            data = serializer_class(queryset.get(pk=pk)).data
+        return len(queries), data
+
+    def test_image_detail_queries_do_not_grow_with_annotations(self):
+        small = self.add_annotations(1)
+        large = self.add_annotations(10)
+        queryset = prefetch_image_detail(BlueprintImage.objects.all())
+
+        small_queries, _ = self.count_queries(BlueprintImageDetailSerializer, queryset, small.pk)
+        large_queries, data = self.count_queries(BlueprintImageDetailSerializer, queryset, large.pk)
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(large_queries, 7)
+        self.assertEqual(len(data["wall_annotations"]), 10)
+        category = data["wall_annotations"][0]["materials"][0]["wall_material_detail"]["subcategory"]["category"]
+        self.assertEqual(category["division"], "09")
+
+    def test_blueprint_detail_queries_do_not_grow_with_images(self):
+        self.add_annotations(1)
+        queryset = prefetch_blueprint_detail(Blueprint.objects.all())
+        one_image_queries, _ = self.count_queries(BlueprintDetailSerializer, queryset, self.blueprint.pk)
+
+        self.add_annotations(5)
+        self.add_annotations(5)
+        three_image_queries, data = self.count_queries(BlueprintDetailSerializer, queryset, self.blueprint.pk)
+        self.assertEqual(one_image_queries, three_image_queries)
+        self.assertEqual(len(data["images"]), 3)
@@ -2,7 +2,15 @@ from django.test import TestCase
 from django.core.files.uploadedfile import SimpleUploadedFile
 from plans.models import Blueprint, BlueprintImage, Status
 from users.models import CustomUser, Role     
-from plans.tasks import process_blueprint_file, async_create_annotation, process_page_image
+from plans.tasks import (
+    process_blueprint_file,
+    async_create_annotation,
+    process_page_image,
+    process_page,
+    finalize_blueprint,
+    dispatch_page_tasks,
+)
+from celery import signature
 import uuid
 from projects.models import Project
 from PIL import Image
@@ -143,15 +151,16 @@ class BlueprintTaskTestCase(TestCase):
         blueprint.refresh_from_db()
         self.assertEqual(blueprint.status, Status.FAILED)
 
-    @patch("plans.tasks.convert_from_bytes")
+    @patch("plans.tasks.convert_from_path")
+    @patch("plans.tasks.count_pdf_pages", return_value=1)
     @patch("plans.tasks.is_pdf_file", return_value=True)
     @patch("plans.tasks.is_image_file", return_value=False)
     @patch("plans.tasks.process_page_image")
     def test_process_blueprint_file_success(
-        self, mock_process_page_image, mock_is_image, mock_is_pdf, mock_convert
+        self, mock_process_page_image, mock_is_image, mock_is_pdf, mock_count, mock_convert
     ):
         """Test successful processing of a PDF blueprint file."""
-        # Mock convert_from_bytes to return a list of 2 mock PIL images
+        # Mock convert_from_path to return a list of 2 mock PIL images
         mock_img1 = MagicMock()
         mock_img2 = MagicMock()
         mock_convert.return_value = [mock_img1, mock_img2]
@@ -168,12 +177,10 @@ class BlueprintTaskTestCase(TestCase):
     @patch("django.db.models.fields.files.FieldFile.save")              # no real I/O
     @patch("plans.tasks.compute_sqft", return_value=25.0)
     @patch("plans.tasks.polygon_dimension", return_value=(5.0, 5.0))
-    @patch("plans.tasks.cv2")                                           # stub OpenCV
     @patch("plans.tasks.get_model")                                     # stub YOLO
     def test_async_create_annotation_success(
         self,
         mock_get_model,
-        mock_cv2,
         mock_polygon_dim,
         mock_compute_sqft,
         mock_fieldfile_save,
@@ -199,15 +206,122 @@ class BlueprintTaskTestCase(TestCase):
 
         mock_model.predict.return_value = [pred]
         mock_get_model.return_value = mock_model
-        contour = np.array([[[10, 10]], [[60, 10]], [[60, 60]], [[10, 60]]])
-        mock_cv2.findContours.return_value = ([contour], None)
-        mock_cv2.approxPolyDP.side_effect = lambda c, eps, closed: c
-        mock_cv2.arcLength.side_effect = lambda c, closed: 100
-        mock_cv2.erode.side_effect = lambda img, kernel, iterations=1: img
-        mock_cv2.fillPoly.side_effect = lambda *a, **k: None
-        mock_cv2.RETR_EXTERNAL = mock_cv2.CHAIN_APPROX_SIMPLE = 0
         before = Annotation.objects.count()
         result = async_create_annotation(self.blueprint_image.id, self.estimator.id)
 
         self.assertEqual(result, self.blueprint_image.id)            
-        self.assertGreater(Annotation.objects.count(), before) 
\ No newline at end of file
+        self.assertGreater(Annotation.objects.count(), before) 
+
+class BlueprintPipelineTaskTestCase(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email="pipeline@ssnbuilders.com",
+            username="pipelineuser",
+            first_name="pipeline",
+            last_name="user",
+            password="testpass123",
+            role=Role.ESTIMATOR
+        )
+        self.project = Project.objects.create(title="Pipeline Project", owner=self.user)
+        pdf_io = io.BytesIO()
+        pages = [Image.new("RGB", (60, 40), color="white") for _ in range(3)]
+        pages[0].save(pdf_io, format="PDF", save_all=True, append_images=pages[1:])
+        self.blueprint = Blueprint.objects.create(
+            title="Pipeline Blueprint",
+            project=self.project,
+            description="Three page set",
+            pdf_file=SimpleUploadedFile("set.pdf", pdf_io.getvalue(), content_type="application/pdf")
+        )
+
+    @patch("plans.tasks.iter_rendered_pages")
+    def test_pipelined_mode_stores_pages_in_order(self, mock_iter):
+        mock_iter.return_value = iter([
+            {"page": 1, "content": b"jpeg-1", "dpi": 300, "scale": 0.25},
+            {"page": 2, "error": "poppler crashed"},
+            {"page": 3, "content": b"jpeg-3", "dpi": 300, "scale": 0.125},
+        ])
+        with self.settings(BLUEPRINT_PROCESSING_MODE="pipelined"):
+            result = process_blueprint_file(self.blueprint.id)
+
+        self.assertEqual(result, self.blueprint.id)
+        args, kwargs = mock_iter.call_args
+        self.assertEqual(args[0], self.blueprint.pdf_file.path)
+        self.assertEqual(args[1], 3)
+        titles = list(BlueprintImage.objects.filter(blueprint=self.blueprint)
+                      .order_by("created_at").values_list("title", "scale"))
+        self.assertEqual(titles, [
+            ("Pipeline Blueprint - Page 1", 0.25),
+            ("Pipeline Blueprint - Page 3", 0.125),
+        ])
+        self.blueprint.refresh_from_db()
+        self.assertEqual(self.blueprint.status, Status.COMPLETE)
+
+    @patch("plans.tasks.chord")
+    def test_fanout_mode_dispatches_one_task_per_page(self, mock_chord):
+        with self.settings(BLUEPRINT_PROCESSING_MODE="fanout", BLUEPRINT_FANOUT_PAGES_PER_TASK=1):
+            result = process_blueprint_file(self.blueprint.id)
+
+        self.assertEqual(result, self.blueprint.id)
+        header = mock_chord.call_args[0][0]
+        self.assertEqual([sig.args[1:] for sig in header], [(1, 1), (2, 2), (3, 3)])
+        callback = mock_chord.return_value.call_args[0][0]
+        self.assertEqual(callback.task, "finalize_blueprint")
+        self.blueprint.refresh_from_db()
+        self.assertEqual(self.blueprint.status, Status.PROCESSING)
+
+    @patch("plans.tasks.chord")
+    def test_page_task_that_dies_fails_the_blueprint(self, mock_chord):
+        with self.settings(BLUEPRINT_FANOUT_PAGES_PER_TASK=1):
+            dispatch_page_tasks(self.blueprint, 3)
+        callback = mock_chord.return_value.call_args[0][0]
+        errback = signature(callback.options["link_error"][0])
+        self.assertEqual(errback.task, "fail_blueprint")
+
+        BlueprintImage.objects.create(
+            blueprint=self.blueprint, page_number=1, title="Pipeline Blueprint - Page 1",
+            image=SimpleUploadedFile("page1.jpg", b"jpeg", content_type="image/jpeg"),
+        )
+        # Not an Exception, so process_page does not turn it into a failed page
+        with patch("plans.tasks.render_page_range", side_effect=SystemExit(1)), self.assertRaises(SystemExit) as died:
+            process_page(str(self.blueprint.id), 2, 2)
+        # As the chord calls it: the failed request, the exception and its traceback
+        errback(None, died.exception, None)
+
+        self.blueprint.refresh_from_db()
+        self.assertEqual(self.blueprint.status, Status.FAILED)
+        self.assertEqual([item["page"] for item in self.blueprint.failed_pages], [2, 3])
+
+    @patch("plans.tasks.render_page_range")
+    def test_process_page_returns_failures_instead_of_raising(self, mock_render):
+        mock_render.return_value = (
+            [{"page": 4, "content": b"jpeg-4", "dpi": 300, "scale": 0.25}],
+            [{"page": 5, "error": "bad page"}],
+        )
+        result = process_page(str(self.blueprint.id), 4, 5)
+
+        self.assertEqual(result["stored"], [4])
+        self.assertEqual(result["failed"], [{"page": 5, "error": "bad page"}])
+        self.assertTrue(BlueprintImage.objects.filter(title="Pipeline Blueprint - Page 4").exists())
+
+    @patch("plans.tasks.render_page_range", side_effect=Exception("disk full"))
+    def test_process_page_marks_whole_range_failed(self, mock_render):
+        result = process_page(str(self.blueprint.id), 1, 2)
+        self.assertEqual(result["stored"], [])
+        self.assertEqual([f["page"] for f in result["failed"]], [1, 2])
+
+    def test_finalize_blueprint_records_failed_pages(self):
+        results = [
+            {"stored": [1], "failed": []},
+            {"stored": [], "failed": [{"page": 3, "error": "bad page"}]},
+            {"stored": [2], "failed": []},
+        ]
+        finalize_blueprint(results, str(self.blueprint.id))
+        self.blueprint.refresh_from_db()
+        self.assertEqual(self.blueprint.status, Status.COMPLETE)
+        self.assertEqual(self.blueprint.failed_pages, [{"page": 3, "error": "bad page"}])
+
+    def test_finalize_blueprint_fails_when_no_page_stored(self):
+        results = [{"stored": [], "failed": [{"page": 1, "error": "bad page"}]}]
+        finalize_blueprint(results, str(self.blueprint.id))
+        self.blueprint.refresh_from_db()
+        self.assertEqual(self.blueprint.status, Status.FAILED)
@@ -0,0 +1,202 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+import cv2
+import numpy as np
+from PIL import Image
+from django.test import override_settings
+from plans.tasks import tiled_page_detections
+from plans.rasterize import render_page_strip
+from plans.tiling import TileSource, tile_grid, tiled_detections, merge_boxes, merge_polygons
+
+RECTANGLES = [(20, 30, 260, 45), (90, 60, 130, 190), (200, 120, 290, 180), (10, 150, 40, 170)]
+
+
+def make_page(path=None):
+    page = np.full((200, 300, 3), 255, dtype=np.uint8)
+    for x1, y1, x2, y2 in RECTANGLES:
+        cv2.rectangle(page, (x1, y1), (x2, y2), (0, 0, 0), -1)
+    if path:
+        cv2.imwrite(path, page)
+    return page
+
+
+class EchoEngine:
+    """Stands in for the inference engine: the 'result' is the tile itself."""
+
+    def __init__(self):
+        self.shapes = []
+
+    def predict(self, model, image):
+        self.shapes.append(image.shape)
+        return image
+
+
+def dark_boxes(result, model):
+    ink = (cv2.cvtColor(result, cv2.COLOR_BGR2GRAY) < 128).astype(np.uint8)
+    contours, _ = cv2.findContours(ink, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    detections = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        detections.append({"label": "wall", "points": [[x, y], [x + w - 1, y], [x + w - 1, y + h - 1], [x, y + h - 1]]})
+    return detections
+
+
+def as_boxes(detections):
+    return sorted(
+        (min(p[0] for p in d["points"]), min(p[1] for p in d["points"]),
+         max(p[0] for p in d["points"]), max(p[1] for p in d["points"]))
+        for d in detections
+    )
+
+
+class TileGridTests(unittest.TestCase):
+
+    def test_tiles_cover_the_page_with_the_requested_overlap(self):
+        tiles = tile_grid(1000, 700, tile_size=400, overlap=100)
+        covered = np.zeros((700, 1000), dtype=bool)
+        for x0, y0, x1, y1 in tiles:
+            self.assertLessEqual(x1 - x0, 400)
+            self.assertLessEqual(y1 - y0, 400)
+            covered[y0:y1, x0:x1] = True
+        self.assertTrue(covered.all())
+
+        xs = sorted({t[0] for t in tiles})
+        self.assertEqual(xs[-1] + 400, 1000)
+        for a, b in zip(xs, xs[1:]):
+            self.assertGreaterEqual(a + 400 - b, 100)
+
+    def test_small_page_is_one_tile(self):
+        self.assertEqual(tile_grid(300, 200, tile_size=400, overlap=100), [(0, 0, 300, 200)])
+
+    def test_overlap_must_be_smaller_than_tile(self):
+        with self.assertRaises(ValueError):
+            tile_grid(1000, 1000, tile_size=100, overlap=100)
+
+
+class TileSourceTests(unittest.TestCase):
+
+    def test_tiles_are_read_from_the_decoded_page(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.png")
+            page = make_page(path)
+            with TileSource.open(path) as source:
+                self.assertEqual((source.height, source.width), (200, 300))
+                self.assertIsInstance(source.array, np.memmap)
+                tile = source.read((50, 20, 150, 120))
+                np.testing.assert_array_equal(tile, page[20:120, 50:150])
+                self.assertTrue(tile.flags["C_CONTIGUOUS"])
+
+
+@unittest.skipUnless(shutil.which("pdftoppm"), "poppler is not installed")
+class PdfTileSourceTests(unittest.TestCase):
+
+    def test_page_is_rendered_into_the_map_in_strips(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = os.path.join(tmp, "sheet.pdf")
+            Image.fromarray(make_page()[:, :, ::-1]).save(pdf_path, resolution=72)
+            page_path = os.path.join(tmp, "page.png")
+            make_page(page_path)
+            with patch.object(TileSource, "STRIP_ROWS", 64), \
+                    patch("plans.tiling.render_page_strip", wraps=render_page_strip) as strips, \
+                    TileSource.open(page_path, (pdf_path, 1, 72)) as source:
+                self.assertEqual((source.height, source.width), (200, 300))
+                self.assertEqual(strips.call_count, 4)
+                # Rendered again rather than decoded: compare the ink, not exact pixels
+                ink = source.read((0, 0, 300, 200)).mean(axis=2) < 128
+                np.testing.assert_array_equal(ink[35:40, 25:255], True)
+
+
+class MergeTests(unittest.TestCase):
+
+    def test_box_cut_by_a_seam_is_merged_back(self):
+        left, right = (0, 0, 120, 100), (90, 0, 300, 100)
+        halves = [
+            {"label": "wall", "points": [[0, 10], [120, 10], [120, 20], [0, 20]], "tile": left, "confidence_score": 0.6},
+            {"label": "wall", "points": [[90, 10], [300, 10], [300, 20], [90, 20]], "tile": right, "confidence_score": 0.8},
+            {"label": "wall", "points": [[0, 50], [100, 50], [100, 60], [0, 60]], "tile": left, "confidence_score": 0.7},
+            {"label": "door", "points": [[95, 12], [110, 12], [110, 18], [95, 18]], "tile": right, "confidence_score": 0.9},
+        ]
+        merged = merge_boxes(halves)
+        self.assertEqual(as_boxes(merged), [(0, 10, 300, 20), (0, 50, 100, 60), (95, 12, 110, 18)])
+        self.assertEqual(max(d["confidence_score"] for d in merged if d["label"] == "wall"), 0.8)
+
+    def test_walls_meeting_at_a_junction_stay_apart(self):
+        left, right = (0, 0, 120, 100), (90, 0, 300, 100)
+        walls = [
+            # An L junction inside one tile
+            {"label": "wall", "points": [[10, 10], [60, 10], [60, 18], [10, 18]], "tile": left},
+            {"label": "wall", "points": [[52, 10], [60, 10], [60, 70], [52, 70]], "tile": left},
+            # A T junction on the seam: the other tile sees a different wall there
+            {"label": "wall", "points": [[95, 40], [103, 40], [103, 95], [95, 95]], "tile": left},
+            {"label": "wall", "points": [[90, 40], [200, 40], [200, 48], [90, 48]], "tile": right},
+        ]
+        self.assertEqual(len(merge_boxes(walls)), 4)
+
+    def test_polygon_halves_are_united(self):
+        left, right = (0, 0, 130, 160), (90, 0, 300, 160)
+        halves = [
+            {"label": "room", "points": [[0, 0], [120, 0], [120, 80], [0, 80]], "tile": left, "confidence_score": 0.7},
+            {"label": "room", "points": [[100, 0], [200, 0], [200, 80], [100, 80]], "tile": right, "confidence_score": 0.9},
+            {"label": "room", "points": [[0, 100], [50, 100], [50, 150], [0, 150]], "tile": left, "confidence_score": 0.8},
+        ]
+
+        merged = merge_polygons(halves)
+
+        self.assertEqual(len(merged), 2)
+        united = next(d for d in merged if d["confidence_score"] == 0.9)
+        self.assertEqual(as_boxes([united]), [(0, 0, 200, 80)])
+        self.assertEqual(len(united["points"]), 4)
+        self.assertIn(halves[2], merged)
+
+    def test_polygons_from_one_tile_are_not_united(self):
+        left, right = (0, 0, 130, 160), (90, 0, 300, 160)
+        rooms = [
+            # Two rooms of one tile that share a wall
+            {"label": "room", "points": [[0, 0], [100, 0], [100, 80], [0, 80]], "tile": left},
+            {"label": "room", "points": [[95, 0], [125, 0], [125, 80], [95, 80]], "tile": left},
+            {"label": "room", "points": [[200, 0], [280, 0], [280, 80], [200, 80]], "tile": right},
+        ]
+
+        with patch("plans.tiling._polygon_overlap") as overlap:
+            merged = merge_polygons(rooms)
+
+        self.assertEqual(merged, rooms)
+        # Only the left rooms reaching into the band are checked, and never against each other
+        overlap.assert_not_called()
+
+
+class TiledDetectionTests(unittest.TestCase):
+
+    def test_tiled_detections_match_the_whole_page(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.png")
+            whole = dark_boxes(make_page(path), None)
+            engine = EchoEngine()
+            with TileSource.open(path) as source:
+                tiled = tiled_detections(
+                    source, None, engine, dark_boxes, merge_boxes, tile_size=100, overlap=30, workers=3
+                )
+
+        self.assertEqual(as_boxes(tiled), as_boxes(whole))
+        self.assertTrue(all(h <= 100 and w <= 100 for h, w, _ in engine.shapes))
+
+    @override_settings(INFERENCE_TILE_SIZE=100, INFERENCE_TILE_OVERLAP=30, INFERENCE_TILE_WORKERS=2)
+    def test_tiled_page_detections_runs_every_model(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.png")
+            make_page(path)
+            field_file = MagicMock()
+            field_file.path = path
+            jobs = {
+                "wall": (None, EchoEngine(), dark_boxes, merge_boxes),
+                "window_and_door": (None, EchoEngine(), lambda result, model: [], merge_boxes),
+            }
+
+            detections, size = tiled_page_detections(field_file, jobs)
+
+        self.assertEqual(size, (200, 300))
+        self.assertEqual(len(detections["wall"]), len(RECTANGLES))
+        self.assertEqual(detections["window_and_door"], [])
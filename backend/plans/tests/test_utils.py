@@ -1,7 +1,8 @@
 import unittest
 import numpy as np
 from unittest.mock import patch, MagicMock
-from plans.utils import get_model, compute_sqft, polygon_dimension
+import os
+from plans.utils import get_model, compute_sqft, polygon_dimension, local_file_path
 import plans.utils as model_utils
 
 class UtilsTestCase(unittest.TestCase):
@@ -41,5 +42,23 @@ class UtilsTestCase(unittest.TestCase):
         self.assertAlmostEqual(width, width_expected, places=2)
         self.assertAlmostEqual(height, height_expected, places=2)
 
+    def test_local_file_path_uses_local_storage_in_place(self):
+        field_file = MagicMock()
+        field_file.path = "/media/blueprints/set.pdf"
+        with local_file_path(field_file) as path:
+            self.assertEqual(path, "/media/blueprints/set.pdf")
+        field_file.open.assert_not_called()
+
+    def test_local_file_path_streams_remote_storage_to_temp_file(self):
+        field_file = MagicMock()
+        type(field_file).path = property(lambda self: (_ for _ in ()).throw(NotImplementedError()))
+        field_file.name = "blueprints/set.pdf"
+        field_file.chunks.return_value = [b"%PDF-", b"1.4"]
+        with local_file_path(field_file) as path:
+            self.assertTrue(path.endswith(".pdf"))
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"%PDF-1.4")
+        self.assertFalse(os.path.exists(path))
+
 # if __name__ == '__main__':
 #     unittest.main()
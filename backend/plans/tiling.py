@@ -0,0 +1,284 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from PIL import Image
+
+from .rasterize import render_page_strip
+
+DEFAULT_TILE_SIZE = 1280
+DEFAULT_OVERLAP = 256
+
+
+def tile_grid(width, height, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP):
+    """
+    Boxes ``(x0, y0, x1, y1)`` covering the page with tiles of at most
+    ``tile_size`` that overlap by ``overlap`` pixels. The last row/column is
+    aligned to the page edge instead of being padded.
+    """
+    if overlap >= tile_size:
+        raise ValueError("Tile overlap must be smaller than the tile size")
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        stride = tile_size - overlap
+        positions = list(range(0, length - tile_size, stride))
+        positions.append(length - tile_size)
+        return positions
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+class TileSource:
+    """
+    Tiles of a page read from a memory-mapped copy of its pixels (BGR, as
+    cv2.imread gives them), so each worker only pulls the tile it is working
+    on into memory.
+
+    With ``pdf_page`` (pdf path, page number, dpi) the map is filled strip by
+    strip, each STRIP_ROWS rows rendered again from the PDF by pdftoppm, and
+    the full page is never in memory. Without it, or when that fails, the
+    image file is decoded whole first: neither cv2 nor Pillow can decode part
+    of a JPEG.
+    """
+    STRIP_ROWS = 1024
+
+    def __init__(self, array):
+        self.array = array
+        self.height, self.width = array.shape[:2]
+
+    @classmethod
+    @contextmanager
+    def open(cls, path, pdf_page=None):
+        with tempfile.TemporaryDirectory() as tmp:
+            pixels_path = os.path.join(tmp, "page.npy")
+            filled = False
+            if pdf_page is not None:
+                try:
+                    cls._fill_from_pdf(pixels_path, path, *pdf_page)
+                    filled = True
+                except Exception as e:
+                    print(f"[WARNING] Could not render {pdf_page[0]} page {pdf_page[1]} in strips, decoding the image: {e}")
+            if not filled:
+                cls._fill_from_image(pixels_path, path)
+            yield cls(np.load(pixels_path, mmap_mode="r"))
+
+    @staticmethod
+    def _fill_from_image(pixels_path, path):
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not decode {path}")
+        pixels = np.lib.format.open_memmap(pixels_path, mode="w+", dtype=np.uint8, shape=image.shape)
+        pixels[:] = image
+        pixels.flush()
+
+    @classmethod
+    def _fill_from_pdf(cls, pixels_path, path, pdf_path, page_number, dpi):
+        # The stored page gives the size (its header only); the strips must match it
+        with Image.open(path) as page:
+            width, height = page.size
+        pixels = np.lib.format.open_memmap(pixels_path, mode="w+", dtype=np.uint8, shape=(height, width, 3))
+        for y in range(0, height, cls.STRIP_ROWS):
+            rows = min(cls.STRIP_ROWS, height - y)
+            with render_page_strip(pdf_path, page_number, y, width, rows, dpi) as strip:
+                if strip.size != (width, rows):
+                    raise ValueError(f"strip at row {y} is {strip.size}, expected {(width, rows)}")
+                pixels[y:y + rows] = np.asarray(strip)[:, :, ::-1]
+        pixels.flush()
+
+    def read(self, box):
+        x0, y0, x1, y1 = box
+        return np.ascontiguousarray(self.array[y0:y1, x0:x1])
+
+
+def _bounds(points):
+    points = np.asarray(points, dtype=float)
+    return points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()
+
+
+def _box_area(box):
+    return max(0.0, box[2] - box[0]) * max(0.0, box[3] - box[1])
+
+
+def _intersection(a, b):
+    return max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])
+
+
+def _iou(a, b):
+    inter = _box_area(_intersection(a, b))
+    union = _box_area(a) + _box_area(b) - inter
+    return inter / union if union else 0.0
+
+
+def _seam_pairs(detections, bounds):
+    """
+    Pairs ``(i, j, band)`` of detections from two different tiles whose boxes
+    both reach into the band where those tiles overlap. Only these can be one
+    object seen twice; everything else, which is most of a page, is never
+    compared. Detections carry their tile box under "tile" (see
+    tiled_detections).
+    """
+    by_tile = {}
+    for i, detection in enumerate(detections):
+        by_tile.setdefault(tuple(detection["tile"]), []).append(i)
+    tiles = list(by_tile)
+    for m, tile_a in enumerate(tiles):
+        for tile_b in tiles[m + 1:]:
+            band = _intersection(tile_a, tile_b)
+            if _box_area(band) == 0:
+                continue
+            in_a = [i for i in by_tile[tile_a] if _box_area(_intersection(bounds[i], band))]
+            in_b = [j for j in by_tile[tile_b] if _box_area(_intersection(bounds[j], band))]
+            for i in in_a:
+                for j in in_b:
+                    if detections[i]["label"] == detections[j]["label"]:
+                        yield i, j, band
+
+
+def _groups(count, pairs):
+    parent = list(range(count))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        parent[find(j)] = find(i)
+
+    groups = {}
+    for i in range(count):
+        groups.setdefault(find(i), []).append(i)
+    return groups.values()
+
+
+def merge_boxes(detections, min_iou=0.5):
+    """
+    Reconcile rectangles that neighbouring tiles both reported. Only pairs of
+    the same label from different tiles are compared, and only on the band
+    where their tiles overlap: when the two boxes, clipped to that band, have
+    an IoU of at least ``min_iou`` they are one object seen twice. Each group
+    becomes the union of its boxes (a wall cut by a seam is only complete
+    across both tiles) with the highest confidence of the group. Boxes from
+    the same tile are never merged, so walls meeting at a junction stay apart,
+    and boxes away from the seams are returned as they are.
+    """
+    bounds = [_bounds(d["points"]) for d in detections]
+    pairs = (
+        (i, j) for i, j, band in _seam_pairs(detections, bounds)
+        if _iou(_intersection(bounds[i], band), _intersection(bounds[j], band)) >= min_iou
+    )
+
+    merged = []
+    for members in _groups(len(detections), pairs):
+        if len(members) == 1:
+            merged.append(detections[members[0]])
+            continue
+        boxes = [bounds[i] for i in members]
+        x1, y1 = min(box[0] for box in boxes), min(box[1] for box in boxes)
+        x2, y2 = max(box[2] for box in boxes), max(box[3] for box in boxes)
+        scores = [detections[i]["confidence_score"] for i in members if detections[i].get("confidence_score") is not None]
+        merged.append({
+            "label": detections[members[0]]["label"],
+            "points": [[x1, y1], [x2, y1], [x2, y2], [x1, y2]],
+            "confidence_score": max(scores) if scores else None,
+        })
+    return merged
+
+
+def merge_polygons(detections, min_overlap=0.1):
+    """
+    Union polygons of the same label from different tiles whose areas overlap
+    by at least ``min_overlap`` of the smaller one (the two halves of a room
+    cut by a seam), then simplify the union like the whole-page
+    post-processing does. As in merge_boxes, polygons from the same tile are
+    never united and those away from the seams are returned as they are.
+    """
+    bounds = [_bounds(d["points"]) for d in detections]
+    pairs = (
+        (i, j) for i, j, _ in _seam_pairs(detections, bounds)
+        if _polygon_overlap(detections[i]["points"], detections[j]["points"]) >= min_overlap
+    )
+
+    merged = []
+    for members in _groups(len(detections), pairs):
+        if len(members) == 1:
+            merged.append(detections[members[0]])
+            continue
+        scores = [detections[i]["confidence_score"] for i in members if detections[i].get("confidence_score") is not None]
+        merged.append({
+            "label": detections[members[0]]["label"],
+            "points": _union([detections[i]["points"] for i in members]),
+            "confidence_score": max(scores) if scores else None,
+        })
+    return merged
+
+
+def _roi_masks(polygons):
+    points = [np.round(np.asarray(p, dtype=float)).astype(np.int32) for p in polygons]
+    stacked = np.concatenate(points)
+    x0, y0 = stacked.min(axis=0) - 1
+    x1, y1 = stacked.max(axis=0) + 2
+    masks = []
+    for p in points:
+        mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        cv2.fillPoly(mask, [p - (x0, y0)], 255)
+        masks.append(mask)
+    return masks, (x0, y0)
+
+
+def _polygon_overlap(a, b):
+    (mask_a, mask_b), _ = _roi_masks([a, b])
+    inter = cv2.countNonZero(cv2.bitwise_and(mask_a, mask_b))
+    smaller = min(cv2.countNonZero(mask_a), cv2.countNonZero(mask_b))
+    return inter / smaller if smaller else 0.0
+
+
+def _union(polygons):
+    masks, (x0, y0) = _roi_masks(polygons)
+    union = masks[0]
+    for mask in masks[1:]:
+        union = cv2.bitwise_or(union, mask)
+    contours, _ = cv2.findContours(union, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    contour = max(contours, key=cv2.contourArea)
+    epsilon = 0.01 * cv2.arcLength(contour, True)
+    simplified = cv2.approxPolyDP(contour, epsilon, True).reshape(-1, 2) + (x0, y0)
+    return np.round(simplified.astype(float), 2).tolist()
+
+
+def _offset(detection, box):
+    x0, y0 = box[:2]
+    return {**detection, "points": [[x + x0, y + y0] for x, y in detection["points"]], "tile": box}
+
+
+def tiled_detections(source, model, engine, detect, merge, tile_size=DEFAULT_TILE_SIZE,
+                     overlap=DEFAULT_OVERLAP, workers=2):
+    """
+    Run ``model`` over every tile of ``source`` and return page-level detections.
+
+    ``detect(result, model)`` turns one tile's Results into detection dicts in
+    tile pixels (as the whole-page helpers do) and ``merge`` is merge_boxes or
+    merge_polygons; it gets them in page pixels, each with its tile box. Each of the ``workers`` threads reads one tile at a time
+    and submits it to ``engine``, so up to ``workers`` tiles are batched
+    together and no more than that are held in memory.
+    """
+    tiles = tile_grid(source.width, source.height, tile_size, overlap)
+
+    def run(box):
+        tile = source.read(box)
+        result = engine.predict(model, tile)
+        del tile
+        return [_offset(d, box) for d in detect(result, model)]
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="tile") as pool:
+        detections = [d for tile_detections in pool.map(run, tiles) for d in tile_detections]
+    print(f"[INFO] {len(tiles)} tiles, {len(detections)} raw detections")
+    return [{key: value for key, value in d.items() if key != "tile"} for d in merge(detections)]
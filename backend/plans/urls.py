@@ -7,8 +7,11 @@ from .views import (
     BlueprintDeleteView,
     BlueprintImageDetailView,
     BlueprintImageCreateView,
+    BlueprintImageTileView,
+    BlueprintImageRenditionView,
     EstimatorRequestCreateView
 )
+from .pyramid import DZI_NAME, THUMBNAIL_NAME, TILES_FOLDER
 
 urlpatterns = [
     path('create/', BlueprintCreateView.as_view(), name='blueprint-create'),
@@ -18,5 +21,9 @@ urlpatterns = [
     path('delete/<uuid:pk>/', BlueprintDeleteView.as_view(), name='blueprint-delete'),
     path('blueprint-images/', BlueprintImageCreateView.as_view(), name='blueprint-image-create'),
     path('blueprint-images/<uuid:pk>/', BlueprintImageDetailView.as_view(), name='blueprint-image-detail'),
+    path(f'blueprint-images/<uuid:pk>/tiles/<int:version>/{DZI_NAME}', BlueprintImageTileView.as_view(), {'name': DZI_NAME}, name='blueprint-image-dzi'),
+    path(f'blueprint-images/<uuid:pk>/tiles/<int:version>/{TILES_FOLDER}/<int:level>/<int:col>_<int:row>.jpg', BlueprintImageTileView.as_view(), name='blueprint-image-tile'),
+    path(f'blueprint-images/<uuid:pk>/tiles/<int:version>/{THUMBNAIL_NAME}', BlueprintImageTileView.as_view(), {'name': THUMBNAIL_NAME}, name='blueprint-image-thumbnail'),
+    path('blueprint-images/<uuid:pk>/renditions/<slug:version>/<slug:size>.<slug:fmt>', BlueprintImageRenditionView.as_view(), name='blueprint-image-rendition'),
     path('estimator-request/', EstimatorRequestCreateView.as_view(), name='estimator_request'),
 ]
\ No newline at end of file
@@ -1,7 +1,13 @@
 import os
+import json
 from ultralytics import YOLO
 import numpy as np
+import cv2
 import threading
+import tempfile
+from contextlib import contextmanager
+from django.core.files.base import ContentFile
+from PIL import Image
 
 _model_instance = None
 _model_lock = threading.Lock()
@@ -17,6 +23,71 @@ def get_model():
                 print("Model task:", _model_instance.task)
     return _model_instance
 
+@contextmanager
+def local_file_path(field_file):
+    """
+    Yield a filesystem path for a stored file. Files on local storage are used in
+    place; other storage backends are streamed to a temporary file chunk by chunk.
+    """
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        path = None
+
+    if path is not None:
+        yield path
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(field_file.name)[1]) as tmp:
+        field_file.open('rb')
+        try:
+            for chunk in field_file.chunks():
+                tmp.write(chunk)
+        finally:
+            field_file.close()
+        tmp.flush()
+        yield tmp.name
+
+def read_page_bgr(field_file):
+    """
+    Decode a stored page once into the BGR array the YOLO models take, so several
+    models can share it. OpenCV decodes straight to BGR; PIL is the fallback for
+    formats it cannot read.
+    """
+    with local_file_path(field_file) as path:
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            with Image.open(path) as img:
+                image = cv2.cvtColor(np.asarray(img.convert("RGB")), cv2.COLOR_RGB2BGR)
+    return image
+
+
+def page_size(blueprint_image):
+    """
+    (height, width) of a stored page: the recorded size when the page has
+    been tiled, else read from the image header without decoding the pixels.
+    """
+    if blueprint_image.width and blueprint_image.height:
+        return blueprint_image.height, blueprint_image.width
+    with local_file_path(blueprint_image.image) as path, Image.open(path) as img:
+        width, height = img.size
+    return height, width
+
+
+def annotation_json_file(shapes, image_path, height, width):
+    """LabelMe-style JSON stored alongside each annotation set."""
+    json_data = {
+        "version": "4.5.6",
+        "flags": {},
+        "shapes": shapes,
+        "imagePath": image_path,
+        "imageData": None,
+        "imageHeight": height,
+        "imageWidth": width,
+    }
+    return ContentFile(json.dumps(json_data, indent=4).encode('utf-8'))
+
+
 def compute_sqft(points, dpi, scale):
     points = np.round(points).astype(int)
     x = points[:, 0]
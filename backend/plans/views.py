@@ -8,11 +8,15 @@ from config.permissions import IsCustomUser, IsOwnerOrReadOnly
 from rest_framework.exceptions import ValidationError
 from estimators.serializers import EstimatorRequestSerializer
 from estimators.tasks import send_estimator_request_email
-from annotations.serializers import AnnotationSerializer, WallAnnotationSerializer, WindowAndDoorAnnotationSerializer
-from annotations.models import Annotation, WallAnnotation, WindowAndDoorAnnotation
+from annotations.serializers import AnnotationSerializer, WallAnnotationSerializer, WindowAndDoorAnnotationSerializer, skips_json_coordinates
+from .prefetch import prefetch_blueprint_detail, prefetch_image_detail, with_cover_image
 import numpy as np
 from .utils import compute_sqft, polygon_dimension
 from rest_framework.parsers import MultiPartParser, FormParser
+from django.conf import settings
+from django.http import FileResponse, Http404
+from django.utils.cache import patch_cache_control
+from . import pyramid, renditions
 class BlueprintCreateView(generics.CreateAPIView):
     serializer_class = BlueprintSerializer
     permission_classes = [permissions.IsAuthenticated, IsCustomUser]
@@ -41,15 +45,17 @@ class BlueprintListView(generics.ListAPIView):
     serializer_class = BlueprintSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
     def get(self, request, format=None):
-        blueprint = Blueprint.objects.filter(project__owner = request.user)
-        serializer = BlueprintSerializer(blueprint, many=True)
+        blueprint = with_cover_image(Blueprint.objects.filter(project__owner = request.user))
+        serializer = BlueprintSerializer(blueprint, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 class BlueprintDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
     def get_object(self):
         try:
-            return Blueprint.objects.select_related('project__owner').prefetch_related('images').get(pk=self.kwargs['pk'])
+            return prefetch_blueprint_detail(
+                Blueprint.objects.select_related('project__owner'), skips_json_coordinates(self.request),
+            ).get(pk=self.kwargs['pk'])
         except Blueprint.DoesNotExist:
             return None
     def get(self, request, pk, format=None):
@@ -57,7 +63,7 @@ class BlueprintDetailView(APIView):
         if blueprint is None:
             return Response({"detail": "Blueprint not found."}, status=status.HTTP_404_NOT_FOUND)
         self.check_object_permissions(request, blueprint)
-        serializer = BlueprintDetailSerializer(blueprint)
+        serializer = BlueprintDetailSerializer(blueprint, context={'request': request})
         return Response({
             "message": "Blueprint Detail!",
             "data": serializer.data
@@ -95,7 +101,9 @@ class BlueprintImageDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly, IsCustomUser]
     def get_object(self, pk):
         try:
-            return BlueprintImage.objects.select_related('blueprint__project__owner').get(pk=pk)
+            return prefetch_image_detail(
+                BlueprintImage.objects.select_related('blueprint__project__owner'), skips_json_coordinates(self.request),
+            ).get(pk=pk)
         except BlueprintImage.DoesNotExist:
             return None
     def get(self, request, pk):
@@ -104,23 +112,21 @@ class BlueprintImageDetailView(APIView):
         if not image:
             return Response({"Detail": "Image not found!"}, status = status.HTTP_404_NOT_FOUND)
         self.check_object_permissions(request, image)
-        serializer = BlueprintImageDetailSerializer(image)
-        response_data = {
-            "Message": "Blueprint Image Detail!",
-            "data": serializer.data
-        }
-
+        context = {'request': request}
         if image.is_verified:
-            annotations = Annotation.objects.filter(blueprint=image)
-            wall_annotation = WallAnnotation.objects.filter(blueprint=image)
-            window_and_door_annotation = WindowAndDoorAnnotation.objects.filter(blueprint=image)
-            annotation_serializer = AnnotationSerializer(annotations, many=True)
-            wall_annotation_serializer = WallAnnotationSerializer(wall_annotation, many=True)
-            window_and_door_annotation_serializer = WindowAndDoorAnnotationSerializer(window_and_door_annotation, many=True)
+            # The annotations were prefetched with their materials by get_object
+            response_data = {
+                'annotations': AnnotationSerializer(image.annotations.all(), many=True, context=context).data,
+                'wall_annotations': WallAnnotationSerializer(image.wall_annotations.all(), many=True, context=context).data,
+                'window_and_door_annotations': WindowAndDoorAnnotationSerializer(
+                    image.window_and_door_annotations.all(), many=True, context=context
+                ).data,
+            }
+        else:
+            serializer = BlueprintImageDetailSerializer(image, context=context)
             response_data = {
-                'annotations': annotation_serializer.data,
-                'wall_annotations': wall_annotation_serializer.data,
-                'window_and_door_annotations': window_and_door_annotation_serializer.data,
+                "Message": "Blueprint Image Detail!",
+                "data": serializer.data
             }
         return Response(response_data, status=status.HTTP_200_OK)
 
@@ -132,6 +138,55 @@ class BlueprintImageDetailView(APIView):
         image.delete()
         return Response({"message": "Image deleted!"}, status=status.HTTP_204_NO_CONTENT)
 
+class BlueprintImageTileView(APIView):
+    """
+    A file of a page's deep zoom pyramid (plans.pyramid): the ``page.dzi``
+    descriptor, a tile or the thumbnail. Like the page image under MEDIA_URL
+    they need no login. The URL carries the pyramid's version and a rebuild
+    writes a new one, so a file never changes under its URL and browsers and
+    proxies may keep it for PAGE_TILE_MAX_AGE.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request, pk, version, name=None, level=None, col=None, row=None):
+        if name is None:
+            path = pyramid.tile_name(pk, level, col, row, version)
+        else:
+            path = f"{pyramid.pyramid_dir(pk, version)}/{name}"
+        storage = BlueprintImage._meta.get_field("image").storage
+        if not storage.exists(path):
+            raise Http404("Tile not found.")
+        content_type = "application/xml" if path.endswith(".dzi") else "image/jpeg"
+        response = FileResponse(storage.open(path), content_type=content_type)
+        patch_cache_control(response, public=True, max_age=settings.PAGE_TILE_MAX_AGE, immutable=True)
+        return response
+
+class BlueprintImageRenditionView(APIView):
+    """
+    A page scaled to one of plans.renditions.SIZES, as WebP or JPEG. It is
+    made on the first request and served from the rendition cache after that,
+    so only a miss looks the page up. A ``version`` that is not the page's
+    current one (see plans.renditions.rendition_version) is not found.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request, pk, version, size, fmt):
+        if size not in renditions.SIZES or fmt not in renditions.FORMATS:
+            raise Http404("Unknown rendition.")
+        fh = renditions.open_cached_rendition(pk, version, size, fmt)
+        if fh is None:
+            image = BlueprintImage.objects.filter(pk=pk).only("image").first()
+            if image is None or not image.image:
+                raise Http404("Image not found.")
+            if renditions.rendition_version(image.image.name) != version:
+                raise Http404("Unknown rendition.")
+            fh = open(renditions.create_rendition(image, size, fmt), "rb")
+        response = FileResponse(fh, content_type=renditions.FORMATS[fmt][1])
+        patch_cache_control(response, public=True, max_age=settings.RENDITION_MAX_AGE, immutable=True)
+        return response
+
 class SendEmailToAdminView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly, IsCustomUser]
 
@@ -168,7 +223,8 @@ class EstimatorRequestCreateView(APIView):
             return Response({"error": "You are not allowed to send this image."}, status=status.HTTP_403_FORBIDDEN)
         image_path = image.image.path
         submitted_by_email = request.user.email
-        result = send_estimator_request_email.delay(image_path, submitted_by_email)
+        image_url = request.build_absolute_uri(image.image.url)
+        result = send_estimator_request_email.delay(image_path, submitted_by_email, image_url)
 
         data = {
             "image": image.id,
@@ -66,4 +66,41 @@ class ProjectViewsTestCase(APITestCase):
         invalid_uuid = uuid.uuid4()
         url = reverse('project-detail', kwargs={'pk': invalid_uuid})
         response = self.client.get(url)
-        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class ProjectTakeoffExportViewTestCase(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email = 'exportowner@gmail.com',
+            username = 'exportowner',
+            first_name = 'Export',
+            last_name = 'Owner',
+            password = 'HelloWorld!1'
+        )
+        self.other = CustomUser.objects.create_user(
+            email = 'exportother@gmail.com',
+            username = 'exportother',
+            first_name = 'Export',
+            last_name = 'Other',
+            password = 'HelloWorld!1'
+        )
+        self.project = Project.objects.create(title = 'Export Project', owner = self.user)
+        self.url = reverse('project-export', kwargs={'pk': self.project.pk})
+
+    def test_csv_is_streamed(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn('takeoff-export-project.csv', response['Content-Disposition'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'Blueprint,Page,Type'))
+
+    def test_unknown_type(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {'type': 'pdf'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_cannot_export(self):
+        self.client.force_authenticate(user=self.other)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -5,6 +5,7 @@ from .views import (
     ProjectDeleteView,
     ProjectUpdateView,
     ProjectDetailView,
+    ProjectTakeoffExportView,
 )
 
 urlpatterns = [
@@ -13,4 +14,5 @@ urlpatterns = [
     path("list/", ProjectListView.as_view(), name="project-list"),
     path("detail/<uuid:pk>/", ProjectDetailView.as_view(), name="project-detail"),
     path("delete/<uuid:pk>/", ProjectDeleteView.as_view(), name="project-delete"),
+    path("export/<uuid:pk>/", ProjectTakeoffExportView.as_view(), name="project-export"),
 ]
@@ -8,6 +8,15 @@ from rest_framework.exceptions import ValidationError
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 from django.core.cache import cache
+from django.http import FileResponse, StreamingHttpResponse
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from django.utils.text import slugify
+from rest_framework.exceptions import PermissionDenied
+from annotations import export
+from plans.models import Blueprint
+from plans.prefetch import with_cover_image
+from users.models import Role
 
 
 class ProjectCreateView(generics.CreateAPIView):
@@ -67,7 +76,9 @@ class ProjectDetailView(APIView):
         if not project:
             try:
                 project = (
-                    Project.objects.prefetch_related("blueprints")
+                    Project.objects.prefetch_related(
+                        Prefetch("blueprints", queryset=with_cover_image(Blueprint.objects.all()))
+                    )
                     .select_related("owner")
                     .get(id=pk)
                 )
@@ -75,7 +86,7 @@ class ProjectDetailView(APIView):
             except Project.DoesNotExist:
                 return Response(status=status.HTTP_404_NOT_FOUND)
         self.check_object_permissions(request, project)
-        serializer = ProjectDetailSerializer(project)
+        serializer = ProjectDetailSerializer(project, context={"request": request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -100,3 +111,33 @@ class ProjectDeleteView(generics.DestroyAPIView):
             {"message": "Project successfully deleted!"},
             status=status.HTTP_204_NO_CONTENT,
         )
+
+
+class ProjectTakeoffExportView(APIView):
+    """
+    Every annotation of the project with its material quantities and prices as
+    a spreadsheet, ``?type=csv`` (default, streamed) or ``?type=xlsx``.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk, format=None):
+        project = get_object_or_404(Project, pk=pk)
+        if not (project.owner_id == request.user.pk or request.user.role == Role.ESTIMATOR):
+            raise PermissionDenied("You cannot export this project.")
+        file_type = request.query_params.get("type", export.CSV)
+        if file_type not in export.EXPORT_FORMATS:
+            raise ValidationError({"type": [f"Must be one of: {', '.join(export.EXPORT_FORMATS)}."]})
+        if file_type == export.XLSX and export.Workbook is None:
+            raise ValidationError({"type": ["XLSX export is not available on this server."]})
+
+        filename = f"takeoff-{slugify(project.title) or project.pk}.{file_type}"
+        if file_type == export.CSV:
+            response = StreamingHttpResponse(export.stream_csv(project.pk), content_type=export.CONTENT_TYPES[export.CSV])
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+            return response
+        return FileResponse(
+            export.xlsx_file(project.pk),
+            as_attachment=True,
+            filename=filename,
+            content_type=export.CONTENT_TYPES[export.XLSX],
+        )
@@ -0,0 +1,59 @@
+import io
+import os
+import tempfile
+from django.core import mail as django_mail
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+from unittest.mock import MagicMock, patch
+from config import mail
+
+
+class SendGridTransportTest(SimpleTestCase):
+    def setUp(self):
+        self.transport = mail.SendGridTransport("key")
+        self.transport.session.post = MagicMock(return_value=MagicMock(status_code=202))
+
+    def test_recipients_of_the_same_message_share_a_request(self):
+        messages = [
+            mail.message(f"user{i}@example.com", "Welcome", html="<p>Hi</p>", from_email="team@example.com")
+            for i in range(3)
+        ]
+        messages.append(mail.message("other@example.com", "Reset", text="Reset", from_email="team@example.com"))
+
+        self.assertEqual(self.transport.send_messages(messages), 4)
+        self.assertEqual(self.transport.session.post.call_count, 2)
+        welcome = self.transport.session.post.call_args_list[0].kwargs["json"]
+        self.assertEqual([p["to"][0]["email"] for p in welcome["personalizations"]],
+                         ["user0@example.com", "user1@example.com", "user2@example.com"])
+        self.assertEqual(welcome["content"], [{"type": "text/html", "value": "<p>Hi</p>"}])
+        self.assertEqual(self.transport.session.post.call_args_list[0].kwargs["timeout"], 10)
+
+    def test_only_unaccepted_posts_are_retried(self):
+        retry = self.transport.session.get_adapter(mail.SENDGRID_URL).max_retries
+        self.assertEqual(set(retry.status_forcelist), {429, 503})
+        self.assertEqual(retry.read, 0)
+        self.assertGreater(retry.connect, 0)
+
+    @patch("config.mail.MAX_PERSONALIZATIONS", 2)
+    def test_large_batches_are_split(self):
+        messages = [mail.message(f"user{i}@example.com", "News", text="Hi", from_email="team@example.com") for i in range(5)]
+        self.transport.send_messages(messages)
+        self.assertEqual(self.transport.session.post.call_count, 3)
+
+
+class ImagePreviewTest(SimpleTestCase):
+    def test_preview_is_a_small_jpeg(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "scan.jpg")
+            Image.new("RGB", (4000, 3000), "white").save(path, format="JPEG")
+            name, content, mimetype = mail.image_preview(path)
+        self.assertEqual((name, mimetype), ("scan_preview.jpg", "image/jpeg"))
+        self.assertEqual(Image.open(io.BytesIO(content)).size, (800, 600))
+
+
+@override_settings(EMAIL_TRANSPORT="django", EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class DjangoTransportTest(SimpleTestCase):
+    def test_batch_goes_to_the_outbox(self):
+        sent = mail.send_many(mail.message(f"user{i}@example.com", "Hello", text="Hi") for i in range(3))
+        self.assertEqual(sent, 3)
+        self.assertEqual(len(django_mail.outbox), 3)
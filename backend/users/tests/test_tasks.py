@@ -1,54 +1,43 @@
-from django.test import TestCase
+from django.core import mail
+from django.test import TestCase, override_settings
 from unittest.mock import patch
 from users.tasks import send_email_verification, send_rest_password_email
 
+
+@override_settings(EMAIL_TRANSPORT='django', EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
 class EmailTaskTest(TestCase):
-    @patch('users.tasks.send_mail')
-    def test_send_email_verification(self, mock_send_mail):
-        mock_send_mail.return_value = 1
+    def test_send_email_verification(self):
         result = send_email_verification(
             subject = 'Test Subject',
-            message = 'Test Message',
+            message = '<p>Test Message</p>',
             to_email = 'testing@gmail.com'
         )
-        mock_send_mail.assert_called_once_with(
-            subject = 'Test Subject',
-            message = 'Test Message',
-            from_email = 'toshiro.limbu01@gmail.com',
-            recipient_list = ['testing@gmail.com']
-        )
         self.assertTrue(result)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Test Subject')
+        self.assertEqual(mail.outbox[0].to, ['testing@gmail.com'])
+        self.assertEqual(mail.outbox[0].alternatives[0][0], '<p>Test Message</p>')
 
-    @patch('users.tasks.send_mail')
-    def test_send_rest_password_email_success(self, mock_send_mail):
-        mock_send_mail.return_value = 1
-
+    def test_send_rest_password_email_success(self):
         result = send_rest_password_email(
             subject="Reset Password",
             message="Click here to reset your password",
             to_email="test@example.com"
         )
-
-        mock_send_mail.assert_called_once_with(
-            subject="Reset Password",
-            message="Click here to reset your password",
-            from_email='toshiro.limbu01@gmail.com',
-            recipient_list=["test@example.com"]
-        )
         self.assertTrue(result)
-
-    @patch('users.tasks.send_mail', side_effect=Exception("SMTP Error"))
-    def test_send_email_verification_failure(self, mock_send_mail):
-        result = send_email_verification(
-            subject="Fail Subject",
-            message="This should fail",
-            to_email="fail@example.com"
-        )
-
-        self.assertFalse(result)
-
-    @patch('users.tasks.send_mail', side_effect=Exception("SMTP Error"))
-    def test_send_rest_password_email_failure(self, mock_send_mail):
+        self.assertEqual(mail.outbox[0].to, ["test@example.com"])
+
+    @patch('config.mail.DjangoTransport.send_messages', side_effect=Exception("SMTP Error"))
+    def test_send_email_verification_failure(self, mock_send):
+        with self.assertRaises(Exception):
+            send_email_verification(
+                subject="Fail Subject",
+                message="This should fail",
+                to_email="fail@example.com"
+            )
+
+    @patch('config.mail.DjangoTransport.send_messages', side_effect=Exception("SMTP Error"))
+    def test_send_rest_password_email_failure(self, mock_send):
         result = send_rest_password_email(
             subject="Fail Reset",
             message="Failure test",
@@ -72,7 +72,7 @@ class UserViewTests(APITestCase):
     
     
 
-    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+    @override_settings(EMAIL_TRANSPORT='django', EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
     @patch('users.serializers.send_rest_password_email.delay')
     def test_password_reset_email(self, mock_send_email):
         mock_send_email.side_effect = send_rest_password_email 